@@ -0,0 +1,476 @@
+"""LLM backends the agents stream their responses from.
+
+BaseAgent talks to a backend instead of a concrete SDK. A backend opens a
+stream for one request and yields normalized events:
+
+- StreamEvent("start", usage=...) once input usage is known
+- StreamEvent("text", text=...) for every text delta
+
+After the stream ends, final_usage() returns the exact usage and
+stop_reason tells why generation stopped ("end_turn", "max_tokens", ...).
+HTTP errors are raised as BackendError, connection failures as
+ConnectionError.
+"""
+
+import http.client
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+if TYPE_CHECKING:
+    import anthropic
+
+
+def usage_dict(
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    cache_creation: int = 0,
+    cache_read: int = 0,
+) -> dict:
+    """Token usage dictionary shared by all backends."""
+    return {
+        "input": input_tokens or 0,
+        "output": output_tokens or 0,
+        "cache_creation": cache_creation or 0,
+        "cache_read": cache_read or 0,
+    }
+
+
+@dataclass
+class StreamEvent:
+    """Normalized stream event.
+
+    Attributes:
+        type: "start" | "text"
+        text: Text delta (text events)
+        usage: Usage known so far (start events)
+    """
+
+    type: str
+    text: str = ""
+    usage: Optional[dict] = None
+
+
+class BackendError(Exception):
+    """Raised when a backend request fails.
+
+    Attributes:
+        status_code: HTTP status code
+        provider: Display name of the backend (e.g., "Anthropic")
+        retry_after: Seconds the backend asked to wait, if it said so
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int,
+        provider: str = "Anthropic",
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """Initialize BackendError.
+
+        Args:
+            message: Error message from the backend
+            status_code: HTTP status code
+            provider: Display name of the backend
+            retry_after: Seconds the backend asked to wait
+        """
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class BackendStream(ABC):
+    """One streaming request. Use as a context manager and iterate it."""
+
+    def __init__(self) -> None:
+        self.stop_reason: Optional[str] = None
+
+    def __enter__(self) -> "BackendStream":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.close()
+        return False
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[StreamEvent]:
+        """Yield normalized stream events."""
+
+    @abstractmethod
+    def final_usage(self) -> dict:
+        """Exact usage of the finished request (see usage_dict)."""
+
+    def close(self) -> None:
+        """Close the connection; nothing more is generated."""
+
+
+class LLMBackend(ABC):
+    """Source of streamed completions for agents."""
+
+    # Display name used in error messages
+    name = "LLM"
+
+    @property
+    def requires_api_key(self) -> bool:
+        """Whether the backend reads ANTHROPIC_API_KEY from the environment."""
+        return False
+
+    @abstractmethod
+    def stream(
+        self,
+        model: str,
+        system: str,
+        user: str,
+        max_tokens: int,
+    ) -> BackendStream:
+        """Open a streaming request.
+
+        Args:
+            model: Model ID
+            system: System prompt
+            user: User prompt
+            max_tokens: Output token budget
+
+        Returns:
+            BackendStream to iterate
+
+        Raises:
+            BackendError: If the request fails
+        """
+
+
+class AnthropicBackend(LLMBackend):
+    """Anthropic Messages API (or any client exposing messages.stream())."""
+
+    name = "Anthropic"
+
+    def __init__(self, client: Optional[Any] = None, timeout: float = 300.0) -> None:
+        """Initialize AnthropicBackend.
+
+        Args:
+            client: Client exposing messages.stream() (e.g., a shared
+                    anthropic.Anthropic or agents.mock_client.MockAnthropicClient).
+                    Defaults to an anthropic.Anthropic client created on first use.
+            timeout: Request timeout of the default client in seconds
+        """
+        self._client = client
+        self._requires_api_key = client is None
+        self.timeout = timeout
+
+    @property
+    def requires_api_key(self) -> bool:
+        """Only the default client reads ANTHROPIC_API_KEY from the environment."""
+        return self._requires_api_key
+
+    @property
+    def client(self) -> Any:
+        """Client exposing messages.stream() (created on first use)."""
+        if self._client is None:
+            # The SDK takes over a second to import; load it on the first request
+            import anthropic
+
+            self._client = anthropic.Anthropic(timeout=self.timeout)
+        return self._client
+
+    def stream(self, model: str, system: str, user: str, max_tokens: int) -> BackendStream:
+        """Open a Messages API stream with the system prompt cached."""
+        return _AnthropicStream(self.client, self.build_request(model, system, user, max_tokens))
+
+    @staticmethod
+    def build_request(model: str, system: str, user: str, max_tokens: int) -> dict:
+        """Messages API request with the system prompt marked for caching."""
+        return {
+            "model": model,
+            "max_tokens": max_tokens,
+            "system": [
+                {
+                    "type": "text",
+                    "text": system,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+            "messages": [{"role": "user", "content": user}],
+        }
+
+    @staticmethod
+    def open_stream(client: Any, request: dict) -> BackendStream:
+        """Stream a Messages API request with the given client."""
+        return _AnthropicStream(client, request)
+
+
+class _AnthropicStream(BackendStream):
+    """Adapter from an SDK MessageStream to normalized events."""
+
+    def __init__(self, client: Any, request: dict) -> None:
+        super().__init__()
+        self._client = client
+        self._request = request
+        self._manager = None
+        self._stream = None
+
+    @property
+    def headers(self) -> Any:
+        """HTTP response headers, if the client exposes them."""
+        return getattr(getattr(self._stream, "response", None), "headers", None)
+
+    def __enter__(self) -> "_AnthropicStream":
+        status_error, connection_error = _sdk_errors()
+        try:
+            self._manager = self._client.messages.stream(**self._request)
+            self._stream = self._manager.__enter__()
+        except status_error as e:
+            raise _anthropic_error(e) from e
+        except connection_error as e:
+            raise ConnectionError(f"Anthropic API に接続できません: {e}") from e
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        if self._manager is not None:
+            self._manager.__exit__(*exc_info)
+        return False
+
+    def __iter__(self) -> Iterator[StreamEvent]:
+        status_error, connection_error = _sdk_errors()
+        try:
+            for event in self._stream:
+                if event.type == "message_start":
+                    # Input usage (including prompt cache) is known up front
+                    yield StreamEvent("start", usage=self._usage(event.message.usage))
+                elif event.type == "text":
+                    yield StreamEvent("text", text=event.text)
+        except status_error as e:
+            raise _anthropic_error(e) from e
+        except connection_error as e:
+            raise ConnectionError(f"Anthropic API に接続できません: {e}") from e
+
+    def final_usage(self) -> dict:
+        message = self._stream.get_final_message()
+        self.stop_reason = getattr(message, "stop_reason", None)
+        return self._usage(message.usage)
+
+    @staticmethod
+    def _usage(usage: Any) -> dict:
+        return usage_dict(
+            usage.input_tokens,
+            usage.output_tokens,
+            getattr(usage, "cache_creation_input_tokens", None),
+            getattr(usage, "cache_read_input_tokens", None),
+        )
+
+
+def _sdk_errors() -> tuple:
+    """(APIStatusError, APIConnectionError) of the SDK.
+
+    Only a loaded SDK can have raised them, so without one (e.g., mock
+    clients) nothing is caught and the SDK is not imported for it.
+    """
+    anthropic = sys.modules.get("anthropic")
+    if anthropic is None:
+        return (), ()
+    return anthropic.APIStatusError, anthropic.APIConnectionError
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds of a Retry-After header (e.g., "7" or "1.5"), or None."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        # HTTP dates are not used by the supported backends
+        return None
+    return seconds if seconds >= 0 else None
+
+
+def _anthropic_error(error: "anthropic.APIStatusError") -> BackendError:
+    """Convert an SDK status error to a BackendError."""
+    response = getattr(error, "response", None)
+    retry_after = _retry_after(response.headers.get("retry-after")) if response is not None else None
+    return BackendError(
+        error.message, status_code=error.status_code, provider="Anthropic", retry_after=retry_after
+    )
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Chat Completions endpoint of an OpenAI-compatible server.
+
+    Works with self-hosted servers such as llama.cpp (llama-server) or
+    vLLM. Uses only the standard library; no extra dependency is needed.
+    """
+
+    name = "OpenAI互換"
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        model_map: Optional[dict[str, str]] = None,
+        timeout: float = 300.0,
+    ) -> None:
+        """Initialize OpenAICompatibleBackend.
+
+        Args:
+            base_url: API base URL (e.g., "http://localhost:8080/v1")
+            api_key: Bearer token, if the server requires one
+                     (defaults to the OPENAI_API_KEY environment variable)
+            model_map: Model IDs to send in place of the agents' model IDs
+                       (e.g., {"claude-haiku-4-5-20251001": "qwen2.5-7b-instruct"});
+                       a "*" entry applies to every other model
+            timeout: Request timeout in seconds
+        """
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.model_map = model_map or {}
+        self.timeout = timeout
+
+    def stream(self, model: str, system: str, user: str, max_tokens: int) -> BackendStream:
+        """Open a streaming chat completion."""
+        body = {
+            "model": self.model_map.get(model, self.model_map.get("*", model)),
+            "max_tokens": max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+        }
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=json.dumps(body).encode("utf-8"),
+            headers=headers,
+            method="POST",
+        )
+        return _OpenAIStream(request, self.timeout, self.name)
+
+
+class _OpenAIStream(BackendStream):
+    """Server-Sent Events reader for streaming chat completions."""
+
+    # Chat Completions finish reasons in Anthropic terms
+    STOP_REASONS = {"stop": "end_turn", "length": "max_tokens"}
+
+    def __init__(self, request: urllib.request.Request, timeout: float, provider: str) -> None:
+        super().__init__()
+        self._request = request
+        self._timeout = timeout
+        self._provider = provider
+        self._response = None
+        self._usage = usage_dict()
+
+    def __enter__(self) -> "_OpenAIStream":
+        try:
+            self._response = urllib.request.urlopen(self._request, timeout=self._timeout)
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode("utf-8", errors="replace")[:500]
+            raise BackendError(
+                detail or e.reason,
+                status_code=e.code,
+                provider=self._provider,
+                retry_after=_retry_after(e.headers.get("Retry-After") if e.headers else None),
+            ) from e
+        except urllib.error.URLError as e:
+            raise ConnectionError(f"{self._provider} サーバーに接続できません: {e.reason}") from e
+        except (OSError, http.client.HTTPException) as e:
+            # Timeouts and dropped connections while waiting for the headers
+            raise ConnectionError(f"{self._provider} サーバーに接続できません: {e}") from e
+        return self
+
+    def __iter__(self) -> Iterator[StreamEvent]:
+        # Chat Completions report usage only at the end; start with none
+        yield StreamEvent("start", usage=usage_dict())
+        for line in self._lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                chunk = None
+            if not isinstance(chunk, dict):
+                raise BackendError(
+                    f"不正なストリームデータを受信しました: {data[:200]}",
+                    status_code=502,
+                    provider=self._provider,
+                )
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+                self._usage = usage_dict(
+                    usage.get("prompt_tokens", 0),
+                    usage.get("completion_tokens", 0),
+                    cache_read=(usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+                )
+            for choice in chunk.get("choices") or []:
+                text = (choice.get("delta") or {}).get("content")
+                if text:
+                    yield StreamEvent("text", text=text)
+                if choice.get("finish_reason"):
+                    reason = choice["finish_reason"]
+                    self.stop_reason = self.STOP_REASONS.get(reason, reason)
+
+    def _lines(self) -> Iterator[str]:
+        """Lines of the response body; read errors surface as ConnectionError."""
+        lines = iter(self._response)
+        while True:
+            try:
+                raw = next(lines)
+            except StopIteration:
+                return
+            except (OSError, http.client.HTTPException) as e:
+                # Timeouts, resets and truncated chunked bodies mid-stream
+                raise ConnectionError(f"{self._provider} との接続が切断されました: {e}") from e
+            yield raw.decode("utf-8", errors="replace").strip()
+
+    def final_usage(self) -> dict:
+        return self._usage
+
+    def close(self) -> None:
+        if self._response is not None:
+            self._response.close()
+
+
+class FakeBackend(AnthropicBackend):
+    """In-process fake backend for offline runs, tests and benchmarks.
+
+    Streams MockAnthropicClient output with the given pacing; no network
+    access and no API key are needed.
+    """
+
+    name = "Fake"
+
+    def __init__(
+        self,
+        chunk_count: int = 100,
+        chunk_delay: float = 0.01,
+        first_token_delay: float = 0.2,
+    ) -> None:
+        """Initialize FakeBackend.
+
+        Args:
+            chunk_count: Number of text chunks streamed per request
+            chunk_delay: Seconds between chunks
+            first_token_delay: Seconds before the first chunk
+        """
+        # Imported here so the mock stays out of production import paths
+        from agents.mock_client import MockAnthropicClient
+
+        super().__init__(
+            client=MockAnthropicClient(
+                chunk_count=chunk_count,
+                chunk_delay=chunk_delay,
+                first_token_delay=first_token_delay,
+            )
+        )
@@ -1,47 +1,189 @@
 """BaseAgent class for business plan generation agents."""
 
-from typing import Callable, Optional
+import threading
+import time
+from typing import Any, Callable, Optional
 from abc import ABC, abstractmethod
-import anthropic
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+
+from agents.backends import AnthropicBackend, BackendError, LLMBackend
+from agents.dispatch import ProgressDispatcher
+from exporters.markdown_blocks import MarkdownStreamParser
+from orchestrator.metrics import AGENT_RETRIES, API_ERRORS
+
+
+class RunCancelledError(Exception):
+    """Raised inside an agent run when the run has been cancelled."""
+
+
+class BudgetExhaustedError(Exception):
+    """Raised when a run's cost governor leaves an agent no output budget."""
+
+# Appended to output that was cut short by the cost governor
+TRUNCATED_NOTE = "\n\n> ⚠️ 予算上限に達したため、このセクションは途中で打ち切られました。"
+
+
+def _count_retry(retry_state) -> None:
+    """Count, trace and settle a retried agent call (tenacity before_sleep hook)."""
+    agent = retry_state.args[0]
+    error = retry_state.outcome.exception()
+    AGENT_RETRIES.inc(agent=agent.key or agent.name)
+    if agent.tracer is not None:
+        agent.tracer.event(
+            "retry",
+            "agent",
+            attempt=retry_state.attempt_number,
+            error=type(error).__name__ if error else None,
+        )
+    if agent.governor is not None:
+        # The failed attempt was billed; the retry is charged on top of it
+        agent.governor.restart(agent.key)
+    if agent.on_retry is not None:
+        # Progress callbacks already delivered the failed attempt's text
+        agent.on_retry(retry_state.attempt_number, error)
 
 
 class BaseAgent(ABC):
     """Abstract base class for all business plan generation agents.
     
     This class handles common functionality for AI agents including:
-    - Anthropic API client initialization
+    - LLM backend selection (agents.backends; Anthropic by default)
     - Status and progress tracking
     - Streaming response handling
     - Error handling with retry logic
     - Token usage tracking
     """
 
+    # Progress callbacks are coalesced: at most one call per interval,
+    # or earlier once this many characters are pending. Both can be
+    # overridden per run via context["progress_interval"] and
+    # context["progress_flush_chars"].
+    PROGRESS_MIN_INTERVAL = 0.1
+    PROGRESS_FLUSH_CHARS = 4096
+
+    # Agent key ("market", "product", ...) used for per-agent settings
+    key = ""
+    # Output token budget when the context doesn't set one
+    DEFAULT_MAX_TOKENS = 5000
+
     def __init__(
         self,
         name: str,
         role: str,
         model: str = "claude-sonnet-4-5-20250929",
+        client: Optional[Any] = None,
+        backend: Optional[LLMBackend] = None,
     ) -> None:
         """Initialize a BaseAgent instance.
         
         Args:
             name: Agent name (e.g., "MarketResearcher")
             role: Agent role description (e.g., "Market Analysis Expert")
-            model: Claude model to use. Defaults to claude-sonnet-4-5-20250929
+            model: Model to use. Defaults to claude-sonnet-4-5-20250929
+            client: Client exposing messages.stream() (e.g., a shared
+                    anthropic.Anthropic or agents.mock_client.MockAnthropicClient),
+                    used through an AnthropicBackend
+            backend: LLM backend to stream from (takes precedence over client).
+                     Defaults to the Anthropic API; its HTTP client is created
+                     on first use, so agents built only for pre-flight
+                     estimates never open one.
         """
         self.name = name
         self.role = role
         self.model = model
-        # Initialize Anthropic client with timeout (300 seconds = 5 minutes)
-        self.client = anthropic.Anthropic(timeout=300)
+        self.backend: LLMBackend = backend or AnthropicBackend(client=client)
         
         # State management
-        self.status: str = "waiting"  # "waiting" | "running" | "streaming" | "done" | "error"
+        self.status: str = "waiting"  # "waiting" | "running" | "streaming" | "done" | "error" | "cancelled"
         self.progress: float = 0.0  # 0.0 ~ 1.0
-        self.output: str = ""
+        self._chunks: list[str] = []
+        self._output_cache: tuple[int, str] = (0, "")
         self.token_usage: dict = {"input": 0, "output": 0}
         self.error_message: Optional[str] = None
+        self._cancel_event = threading.Event()
+        
+        # Optional per-run spend limit (orchestrator.governor.CostGovernor),
+        # and whether it cut the last run short
+        self.governor = None
+        self.truncated = False
+        
+        # Optional span recorder of the run (orchestrator.tracing.Tracer)
+        self.tracer = None
+        
+        # Optional hook called with (attempt, error) before a failed run is
+        # retried, so consumers of the streamed text can discard it
+        self.on_retry: Optional[Callable[[int, Optional[BaseException]], None]] = None
+        
+        # Why the backend stopped generating ("end_turn", "max_tokens", ...)
+        self.stop_reason: Optional[str] = None
+        
+        # Seconds from opening the last request to its first text delta
+        self.first_token_seconds: Optional[float] = None
+        
+        # Headings, tables and section tree of the last run's output,
+        # parsed from its text deltas as they stream in
+        self.document = MarkdownStreamParser()
+
+    @property
+    def client(self) -> Any:
+        """Client of an AnthropicBackend (created on first use)."""
+        return getattr(self.backend, "client", None)
+
+    @client.setter
+    def client(self, value: Any) -> None:
+        """Stream from another messages.stream() client."""
+        self.backend = AnthropicBackend(client=value)
+
+    def cancel(self) -> None:
+        """Cancel the current (or next) run.
+        
+        A streaming run stops at the next text delta and closes its
+        connection; a run that has not started yet is never started.
+        """
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() has been called."""
+        return self._cancel_event.is_set()
+
+    @property
+    def output(self) -> str:
+        """Text generated so far.
+        
+        Streamed deltas are appended to a list and only joined when the
+        output is read, instead of reallocating the string on every delta.
+        """
+        chunks = self._chunks
+        count = len(chunks)
+        cached_count, cached_text = self._output_cache
+        if cached_count != count:
+            cached_text = "".join(chunks[:count])
+            self._output_cache = (count, cached_text)
+        return cached_text
+
+    @output.setter
+    def output(self, value: str) -> None:
+        """Replace the generated text."""
+        self._chunks = [value] if value else []
+        self._output_cache = (len(self._chunks), value)
+
+    def get_max_tokens(self, context: dict) -> int:
+        """Get the output token budget for this agent.
+        
+        context["max_tokens"] is either a single value for every agent or
+        a dictionary keyed by agent key, as built by the sidebar.
+        
+        Args:
+            context: Context dictionary with task information
+            
+        Returns:
+            Maximum number of output tokens
+        """
+        max_tokens = context.get("max_tokens", self.DEFAULT_MAX_TOKENS)
+        if isinstance(max_tokens, dict):
+            max_tokens = max_tokens.get(self.key, self.DEFAULT_MAX_TOKENS)
+        return int(max_tokens)
 
     @abstractmethod
     def get_system_prompt(self, context: dict) -> str:
@@ -82,8 +224,10 @@ class BaseAgent(ABC):
         )
 
     @retry(
+        retry=retry_if_not_exception_type((RunCancelledError, BudgetExhaustedError)),
         stop=stop_after_attempt(2),
         wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=_count_retry,
     )
     def run(
         self,
@@ -92,7 +236,7 @@ class BaseAgent(ABC):
     ) -> str:
         """Run the agent with streaming API.
         
-        Uses Anthropic's streaming API to generate responses with real-time
+        Streams the response from the agent's backend with real-time
         progress callbacks. Implements retry logic for transient failures.
         
         Args:
@@ -104,19 +248,26 @@ class BaseAgent(ABC):
             Complete response text from API
             
         Raises:
-            anthropic.APIError: After maximum retries if API call fails
+            BackendError: After maximum retries if the backend request fails
         """
         try:
+            if self.cancelled:
+                raise RunCancelledError(f"{self.name} was cancelled")
+            
             self.status = "running"
             self.output = ""
+            self.document = MarkdownStreamParser()
             self.error_message = None
             self.progress = 0.0
+            self.truncated = False
+            self.stop_reason = None
+            self.first_token_seconds = None
             
             # Check API key is set
             try:
                 import os
                 api_key = os.getenv("ANTHROPIC_API_KEY")
-                if not api_key or api_key.strip() == "":
+                if self.backend.requires_api_key and (not api_key or api_key.strip() == ""):
                     self.status = "error"
                     self.error_message = (
                         "❌ APIキーが設定されていません。\n"
@@ -134,64 +285,140 @@ class BaseAgent(ABC):
             user_prompt = self.get_user_prompt(context)
             
             # Get max_tokens from context or use default
-            max_tokens = context.get("max_tokens", 5000)
+            max_tokens = self.get_max_tokens(context)
             
-            # Create system message with cache control
-            system_with_cache = [
-                {
-                    "type": "text",
-                    "text": system_prompt,
-                    "cache_control": {"type": "ephemeral"},
-                }
-            ]
+            # Never ask for more output than the run can still afford
+            governor = self.governor
+            if governor is not None:
+                max_tokens = governor.cap_max_tokens(self.key, self.model, max_tokens)
+                if max_tokens <= 0:
+                    governor.finish(self.key)
+                    self.truncated = True
+                    raise BudgetExhaustedError(f"{self.name}: run budget exhausted")
             
             self.status = "streaming"
             total_chars = 0
             
-            # Stream the message
-            with self.client.messages.stream(
-                model=self.model,
-                max_tokens=max_tokens,
-                system=system_with_cache,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": user_prompt,
-                    }
-                ],
-            ) as stream:
-                for text in stream.text_stream:
-                    self.output += text
-                    total_chars += len(text)
+            # Coalesce progress callbacks off the stream-reading thread
+            dispatcher = None
+            if on_progress:
+                dispatcher = ProgressDispatcher(
+                    self.name,
+                    on_progress,
+                    min_interval=context.get("progress_interval", self.PROGRESS_MIN_INTERVAL),
+                    flush_chars=context.get("progress_flush_chars", self.PROGRESS_FLUSH_CHARS),
+                )
+            
+            # Stream the message (the backend caches the system prompt
+            # where it supports prompt caching)
+            tracer = self.tracer
+            requested_ns = time.time_ns()
+            first_token_ns = None
+            try:
+                with self.backend.stream(
+                    model=self.model,
+                    system=system_prompt,
+                    user=user_prompt,
+                    max_tokens=max_tokens,
+                ) as stream:
+                    chunks = self._chunks
+                    document = self.document
+                    for event in stream:
+                        if self._cancel_event.is_set():
+                            raise RunCancelledError(f"{self.name} was cancelled")
+                        
+                        if event.type == "start":
+                            # Input usage (including prompt cache) is known up front
+                            self.token_usage = dict(event.usage)
+                            if governor is not None and not governor.start(
+                                self.key, self.model, self.token_usage
+                            ):
+                                self.truncated = True
+                                break
+                            continue
+                        
+                        if event.type != "text":
+                            continue
+                        
+                        text = event.text
+                        if first_token_ns is None:
+                            first_token_ns = time.time_ns()
+                            self.first_token_seconds = (first_token_ns - requested_ns) / 1e9
+                            if tracer is not None:
+                                tracer.event("first_token", "api", agent=self.key, model=self.model)
+                        chunks.append(text)
+                        document.feed(text)
+                        total_chars += len(text)
+                        
+                        # Update progress - estimate based on character count
+                        # Assuming avg 4 chars per token
+                        self.progress = min(
+                            total_chars / (max_tokens * 4),
+                            0.99,
+                        )
+                        
+                        # Hand the delta to the dispatcher if a callback was provided
+                        if dispatcher:
+                            dispatcher.feed(self.progress, text)
+                        
+                        # Leaving the with-block closes the connection, so
+                        # nothing more is generated (or billed)
+                        if governor is not None and not governor.charge_text(self.key, text):
+                            self.truncated = True
+                            break
                     
-                    # Update progress - estimate based on character count
-                    # Assuming avg 4 chars per token
-                    self.progress = min(
-                        total_chars / (max_tokens * 4),
-                        0.99,
+                    # Exact token usage of the finished request
+                    final_usage = None if self.truncated else stream.final_usage()
+                    self.stop_reason = stream.stop_reason
+            finally:
+                if tracer is not None:
+                    # Request until the first token, then the stream
+                    tracer.record(
+                        "request", requested_ns, first_token_ns, "api",
+                        agent=self.key, model=self.model, max_tokens=max_tokens,
                     )
-                    
-                    # Call progress callback if provided
-                    if on_progress:
-                        on_progress(self.name, self.progress, text)
-                
-                # Get final message object with token usage
-                final_message = stream.get_final_message()
+                    if first_token_ns is not None:
+                        tracer.record(
+                            "stream", first_token_ns, category="api",
+                            agent=self.key, chars=total_chars, stop_reason=self.stop_reason,
+                        )
+                if dispatcher:
+                    if self.truncated:
+                        dispatcher.feed(self.progress, TRUNCATED_NOTE)
+                    dispatcher.close()
             
             # Record token usage
-            self.token_usage = {
-                "input": final_message.usage.input_tokens,
-                "output": final_message.usage.output_tokens,
-            }
+            if final_usage is not None:
+                self.token_usage = final_usage
+                if governor is not None:
+                    governor.finish(self.key, self.token_usage)
+            else:
+                # Stopped early: keep the streamed output estimate
+                self.token_usage["output"] = governor.output_tokens(self.key)
+                governor.finish(self.key)
+                self._chunks.append(TRUNCATED_NOTE)
+                self.document.feed(TRUNCATED_NOTE)
+            self.document.close()
             
             self.progress = 1.0
             self.status = "done"
             
             return self.output
             
-        except anthropic.APIStatusError as e:
+        except RunCancelledError:
+            self.status = "cancelled"
+            self.error_message = "⏹️ 生成が中止されました。"
+            raise
+            
+        except BudgetExhaustedError:
+            self.status = "error"
+            self.error_message = "💰 予算上限に達したため、このエージェントは実行されませんでした。"
+            raise
+            
+        except BackendError as e:
             # Handle API status errors (429 rate limit, 401 auth, etc.)
             self.status = "error"
+            API_ERRORS.inc(provider=e.provider, status=e.status_code)
             if e.status_code == 429:
                 self.error_message = (
                     "⏱️ レート制限に達しました。\n"
@@ -204,7 +431,7 @@ class BaseAgent(ABC):
                 )
             elif e.status_code == 500:
                 self.error_message = (
-                    "⚠️ Anthropic API サーバーエラー。\n"
+                    f"⚠️ {e.provider} API サーバーエラー。\n"
                     "少ししてから再試行してください。"
                 )
             else:
@@ -214,6 +441,7 @@ class BaseAgent(ABC):
         except (ConnectionError, TimeoutError) as e:
             # Handle network errors
             self.status = "error"
+            API_ERRORS.inc(provider=self.backend.name, status="connection")
             self.error_message = (
                 f"🌐 ネットワークエラー: {type(e).__name__}\n"
                 "インターネット接続を確認してください。"
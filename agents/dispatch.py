@@ -0,0 +1,131 @@
+"""Coalescing, rate-limited dispatch of streaming progress callbacks."""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class ProgressDispatcher:
+    """Coalesce streamed text deltas into throttled progress callbacks.
+
+    The stream-reading thread only appends deltas to a list via feed().
+    Pending deltas are joined and delivered as a single
+    on_progress(agent_name, progress, text) call at most once per
+    min_interval seconds, or earlier once flush_chars characters are
+    pending. With threaded=True delivery happens on a separate thread, so
+    a slow consumer (UI rendering, SSE fan-out) never blocks the reader.
+    """
+
+    def __init__(
+        self,
+        agent_name: str,
+        on_progress: Callable[[str, float, str], None],
+        min_interval: float = 0.1,
+        flush_chars: int = 4096,
+        threaded: bool = True,
+    ) -> None:
+        """Initialize ProgressDispatcher.
+
+        Args:
+            agent_name: Agent name passed to the callback
+            on_progress: Callback with signature
+                         (agent_name: str, progress: float, chunk: str) -> None
+            min_interval: Minimum seconds between two callback invocations
+            flush_chars: Deliver early once this many characters are pending
+            threaded: Deliver on a background thread instead of the caller's
+        """
+        self.agent_name = agent_name
+        self.on_progress = on_progress
+        self.min_interval = min_interval
+        self.flush_chars = flush_chars
+        self.threaded = threaded
+
+        # Statistics
+        self.chunks_received = 0
+        self.callbacks_delivered = 0
+
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._progress = 0.0
+        self._last_delivery = 0.0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._delivery_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        if threaded:
+            self._thread = threading.Thread(
+                target=self._deliver_loop,
+                name=f"progress-{agent_name}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def feed(self, progress: float, text: str) -> None:
+        """Queue a streamed text delta. Cheap enough for the reader thread.
+
+        Args:
+            progress: Current progress (0.0 ~ 1.0)
+            text: Streamed text delta
+        """
+        with self._lock:
+            # The first pending delta arms the delivery thread's timer, so
+            # it is delivered min_interval after the last callback at most
+            first = not self._pending
+            self._pending.append(text)
+            self._pending_chars += len(text)
+            self._progress = progress
+            self.chunks_received += 1
+            due = (
+                self._pending_chars >= self.flush_chars
+                or time.monotonic() - self._last_delivery >= self.min_interval
+            )
+            if (due or first) and self.threaded:
+                self._wakeup.notify()
+
+        if due and not self.threaded:
+            self.flush()
+
+    def flush(self) -> None:
+        """Deliver all pending text now as a single callback."""
+        with self._delivery_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                text = "".join(self._pending)
+                progress = self._progress
+                self._pending = []
+                self._pending_chars = 0
+                self._last_delivery = time.monotonic()
+
+            # Call outside the buffer lock so feed() never waits for the consumer
+            self.on_progress(self.agent_name, progress, text)
+            self.callbacks_delivered += 1
+
+    def close(self) -> None:
+        """Deliver remaining text and stop the delivery thread."""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def _deliver_loop(self) -> None:
+        """Background delivery loop used when threaded=True."""
+        while True:
+            with self._lock:
+                while not self._closed:
+                    elapsed = time.monotonic() - self._last_delivery
+                    if self._pending and (
+                        self._pending_chars >= self.flush_chars
+                        or elapsed >= self.min_interval
+                    ):
+                        break
+                    timeout = self.min_interval - elapsed if self._pending else None
+                    self._wakeup.wait(timeout=max(timeout, 0.0) if timeout is not None else None)
+                if self._closed:
+                    return
+            self.flush()
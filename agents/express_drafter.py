@@ -0,0 +1,120 @@
+"""ExpressDrafter agent for single-call draft business plans."""
+
+import re
+
+from agents.base import BaseAgent
+
+
+# Phase 1 sections written by the drafter, in order, with their headings
+EXPRESS_SECTIONS = {
+    "market": "市場分析",
+    "product": "プロダクト戦略",
+    "finance": "財務計画",
+    "gtm": "GTM・営業戦略",
+}
+
+# Marker line separating the sections (an HTML comment, so a marker left
+# in the text never shows up in rendered Markdown)
+SECTION_MARKER = "<!-- section:{key} -->"
+_MARKER_RE = re.compile(r"^[ \t]*<!--\s*section:\s*([a-z_]+)\s*-->[ \t]*$", re.MULTILINE)
+
+
+def parse_sections(text: str) -> dict[str, str]:
+    """Split drafter output into sections at the section markers.
+
+    Works on partial output too, so live previews can show the sections
+    streamed so far.
+
+    Args:
+        text: Drafter output (complete or partial)
+
+    Returns:
+        Section text by key, in the order the sections appear
+    """
+    sections: dict[str, str] = {}
+    matches = list(_MARKER_RE.finditer(text))
+    for idx, match in enumerate(matches):
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(text)
+        sections[match.group(1)] = text[match.end():end].strip()
+    return sections
+
+
+class ExpressDrafter(BaseAgent):
+    """Express Draft Agent.
+
+    Writes the market, product, finance and GTM sections in one call,
+    separated by section markers, as a fast and cheap alternative to the
+    four Phase 1 agents.
+    """
+
+    # Key in the orchestrator and in context["max_tokens"]
+    key = "express"
+    DEFAULT_MAX_TOKENS = 6000
+
+    def __init__(self, **kwargs) -> None:
+        """Initialize ExpressDrafter agent.
+
+        Args:
+            **kwargs: Passed through to BaseAgent (model, client)
+        """
+        super().__init__(
+            name="ExpressDrafter",
+            role="事業計画ドラフト作成エキスパート",
+            **kwargs,
+        )
+
+    def get_system_prompt(self, context: dict) -> str:
+        """Get system prompt for the combined draft.
+
+        Args:
+            context: Context dictionary containing company and business info
+
+        Returns:
+            System prompt for the draft
+        """
+        outline = "\n".join(
+            f"{SECTION_MARKER.format(key=key)}\n"
+            f"（{title}の本文）"
+            for key, title in EXPRESS_SECTIONS.items()
+        )
+        return (
+            "あなたは事業計画書のドラフトを短時間で作成する専門家です。\n"
+            "以下の4セクションを簡潔に作成してください:\n\n"
+            "- 市場分析: TAM/SAM/SOM、市場成長率、主要競合3社、市場トレンド\n"
+            "- プロダクト戦略: 価値提案、主要機能、差別化、ロードマップ\n"
+            "- 財務計画: 年次の売上・コスト・利益予測表、主要前提、資金調達\n"
+            "- GTM・営業戦略: ターゲット顧客、獲得チャネル、価格、CAC/LTV\n\n"
+            "【出力形式】\n"
+            "各セクションの直前に、次の区切り行をそのまま1行で出力してください:\n\n"
+            f"{outline}\n\n"
+            "- セクション内の見出しは ### を使用すること\n"
+            "- 数値は表（Markdown）で示し、セクション間で整合させること\n"
+            "- 各セクションは要点に絞り、冗長な説明は省くこと"
+        )
+
+    def get_user_prompt(self, context: dict) -> str:
+        """Get user prompt for the combined draft.
+
+        Args:
+            context: Context dictionary with business details
+
+        Returns:
+            User prompt with company and business information
+        """
+        company_name = context.get("company_name", "企業")
+        business_desc = context.get("business_description", "")
+        plan_years = context.get("plan_years", 5)
+        additional = context.get("additional_context", "")
+
+        prompt = (
+            f"企業名: {company_name}\n"
+            f"事業説明: {business_desc}\n"
+            f"計画期間: {plan_years}年\n"
+        )
+
+        if additional:
+            prompt += f"追加情報: {additional}\n"
+
+        prompt += "\n上記の企業について、4セクションの事業計画ドラフトを作成してください。"
+
+        return prompt
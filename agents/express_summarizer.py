@@ -0,0 +1,83 @@
+"""ExpressSummarizer agent for the short summary pass of express drafts."""
+
+from agents.base import BaseAgent
+from agents.express_drafter import EXPRESS_SECTIONS, SECTION_MARKER
+
+
+# Sections written by the summarizer, in order, with their headings
+SUMMARY_SECTIONS = {
+    "summary": "エグゼクティブサマリー",
+    "risks": "リスクと対策",
+    "roadmap": "実行ロードマップ",
+}
+
+
+class ExpressSummarizer(BaseAgent):
+    """Express Summary Agent.
+
+    Short Phase 2 pass of the express pipeline: instead of rewriting the
+    whole plan like IntegrationEditor, it only writes the executive
+    summary, risks and roadmap; the draft sections are used as they are.
+    """
+
+    # Key in the orchestrator and in context["max_tokens"]
+    key = "summary"
+    DEFAULT_MAX_TOKENS = 1500
+
+    def __init__(self, **kwargs) -> None:
+        """Initialize ExpressSummarizer agent.
+
+        Args:
+            **kwargs: Passed through to BaseAgent (model, client)
+        """
+        super().__init__(
+            name="ExpressSummarizer",
+            role="事業計画サマリー作成エキスパート",
+            **kwargs,
+        )
+
+    def get_system_prompt(self, context: dict) -> str:
+        """Get system prompt for the summary pass.
+
+        Args:
+            context: Context dictionary
+
+        Returns:
+            System prompt for the summary
+        """
+        outline = "\n".join(
+            f"{SECTION_MARKER.format(key=key)}\n"
+            f"（{title}の本文）"
+            for key, title in SUMMARY_SECTIONS.items()
+        )
+        return (
+            "あなたは事業計画書の編集者です。\n"
+            "ドラフトの各セクションを読み、以下の3セクションのみを簡潔に作成してください:\n\n"
+            "- エグゼクティブサマリー: 事業概要、価値提案、市場機会、売上目標、資金計画（5〜8行）\n"
+            "- リスクと対策: 主要リスク3〜5点と対策（表形式）\n"
+            "- 実行ロードマップ: 四半期ごとのマイルストーン（表形式）\n\n"
+            "【出力形式】\n"
+            "各セクションの直前に、次の区切り行をそのまま1行で出力してください:\n\n"
+            f"{outline}\n\n"
+            "- セクション内の見出しは ### を使用すること\n"
+            "- 数値はドラフトと一致させること"
+        )
+
+    def get_user_prompt(self, context: dict) -> str:
+        """Get user prompt for the summary pass.
+
+        Args:
+            context: Context dictionary including the draft sections
+
+        Returns:
+            User prompt with the draft sections
+        """
+        company_name = context.get("company_name", "企業")
+        sections = context.get("sections", {})
+
+        prompt = f"企業名: {company_name}\n\n"
+        for key, title in EXPRESS_SECTIONS.items():
+            prompt += f"## {title}\n{sections.get(key, '')}\n\n---\n\n"
+        prompt += "上記ドラフトをもとに、3セクションを作成してください。"
+
+        return prompt
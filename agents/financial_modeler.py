@@ -10,11 +10,20 @@ class FinancialModeler(BaseAgent):
     cost structures, unit economics, funding plans, and sensitivity analysis.
     """
 
-    def __init__(self) -> None:
-        """Initialize FinancialModeler agent."""
+    # Key in the orchestrator and in context["max_tokens"]
+    key = "finance"
+    DEFAULT_MAX_TOKENS = 5000
+
+    def __init__(self, **kwargs) -> None:
+        """Initialize FinancialModeler agent.
+        
+        Args:
+            **kwargs: Passed through to BaseAgent (model, client)
+        """
         super().__init__(
             name="FinancialModeler",
             role="財務モデリング専門家",
+            **kwargs,
         )
 
     def get_system_prompt(self, context: dict) -> str:
@@ -10,11 +10,20 @@ class GTMStrategist(BaseAgent):
     sales channels, marketing strategy, and partnership approach.
     """
 
-    def __init__(self) -> None:
-        """Initialize GTMStrategist agent."""
+    # Key in the orchestrator and in context["max_tokens"]
+    key = "gtm"
+    DEFAULT_MAX_TOKENS = 4000
+
+    def __init__(self, **kwargs) -> None:
+        """Initialize GTMStrategist agent.
+        
+        Args:
+            **kwargs: Passed through to BaseAgent (model, client)
+        """
         super().__init__(
             name="GTMStrategist",
             role="GTM・営業戦略専門家",
+            **kwargs,
         )
 
     def get_system_prompt(self, context: dict) -> str:
@@ -11,11 +11,20 @@ class IntegrationEditor(BaseAgent):
     comprehensive business plan document.
     """
 
-    def __init__(self) -> None:
-        """Initialize IntegrationEditor agent."""
+    # Key in the orchestrator and in context["max_tokens"]
+    key = "integration"
+    DEFAULT_MAX_TOKENS = 8000
+
+    def __init__(self, **kwargs) -> None:
+        """Initialize IntegrationEditor agent.
+        
+        Args:
+            **kwargs: Passed through to BaseAgent (model, client)
+        """
         super().__init__(
             name="IntegrationEditor",
             role="統合編集エキスパート",
+            **kwargs,
         )
 
     def get_system_prompt(self, context: dict) -> str:
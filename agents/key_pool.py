@@ -0,0 +1,364 @@
+"""Spread Anthropic API traffic across several API keys (accounts or workspaces).
+
+Each key's rate-limit headroom is read from the anthropic-ratelimit-*
+response headers. New plans go to the key with the most headroom, and a
+plan's later requests stay on the same key so its prompt-cache entries are
+reused. Keys that are rate limited cool down for the Retry-After period;
+keys that are rejected as invalid are taken out of rotation.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+from agents.backends import AnthropicBackend, BackendError, BackendStream, StreamEvent
+from orchestrator.estimator import get_pricing
+from orchestrator.metrics import (
+    API_KEY_ERRORS,
+    API_KEY_HEADROOM,
+    API_KEY_HEALTHY,
+    API_KEY_IN_FLIGHT,
+    API_KEY_REQUESTS,
+    API_KEY_SPEND,
+)
+
+
+# Rate-limit headers: (header prefix, state attribute)
+RATE_LIMIT_HEADERS = (
+    ("anthropic-ratelimit-requests", "requests"),
+    ("anthropic-ratelimit-input-tokens", "input_tokens"),
+    ("anthropic-ratelimit-output-tokens", "output_tokens"),
+)
+
+# Header snapshots older than this are assumed to have been replenished
+HEADROOM_TTL_SECONDS = 60.0
+
+# Cooldown after a 5xx or connection error, when no Retry-After is given
+ERROR_COOLDOWN_SECONDS = 10.0
+
+
+@dataclass
+class PooledKey:
+    """One API key of the pool with its observed limits, health and spend.
+
+    Attributes:
+        label: Display name (never the key itself)
+        remaining: Remaining requests/tokens by limit name, from the last response
+        limits: Request/token limits by limit name, from the last response
+        observed_at: When the rate-limit headers were last read
+        in_flight: Requests currently streaming on the key
+        cooldown_until: Monotonic time until which the key is skipped
+        disabled: Whether the key was rejected (401/403) and left rotation
+        requests: Successful requests
+        errors: Failed requests
+        tokens: Input+output tokens of successful requests
+        spend_usd: Estimated spend of successful requests
+    """
+
+    label: str
+    api_key: str = field(repr=False)
+    client: Any = field(repr=False)
+    remaining: dict[str, int] = field(default_factory=dict)
+    limits: dict[str, int] = field(default_factory=dict)
+    observed_at: float = 0.0
+    in_flight: int = 0
+    cooldown_until: float = 0.0
+    disabled: bool = False
+    requests: int = 0
+    errors: int = 0
+    tokens: int = 0
+    spend_usd: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the key can take requests right now."""
+        return not self.disabled and time.monotonic() >= self.cooldown_until
+
+    @property
+    def headroom(self) -> float:
+        """Smallest remaining share of the key's limits (1.0 = untouched)."""
+        if not self.limits or time.monotonic() - self.observed_at > HEADROOM_TTL_SECONDS:
+            return 1.0
+        shares = [
+            self.remaining.get(name, limit) / limit
+            for name, limit in self.limits.items()
+            if limit > 0
+        ]
+        return min(shares, default=1.0)
+
+
+class KeyPool:
+    """API keys shared by all runs of the process. Thread-safe."""
+
+    def __init__(
+        self,
+        api_keys: list[str],
+        timeout: float = 300.0,
+        client_factory: Optional[Callable[[str], Any]] = None,
+    ) -> None:
+        """Initialize KeyPool.
+
+        Args:
+            api_keys: API keys, optionally labelled as "label=key"
+            timeout: Request timeout of the clients in seconds
+            client_factory: Builds a messages.stream() client from an API key
+                            (defaults to anthropic.Anthropic)
+
+        Raises:
+            ValueError: If no API key is given
+        """
+        if not api_keys:
+            raise ValueError("API キーが1つも指定されていません")
+        client_factory = client_factory or (
+            lambda api_key: _anthropic_client(api_key, timeout)
+        )
+        self.keys: list[PooledKey] = []
+        for entry in api_keys:
+            label, _, api_key = entry.rpartition("=")
+            api_key = api_key.strip()
+            self.keys.append(
+                PooledKey(
+                    label=label.strip() or f"…{api_key[-4:]}",
+                    api_key=api_key,
+                    client=client_factory(api_key),
+                )
+            )
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, timeout: float = 300.0) -> Optional["KeyPool"]:
+        """Build a pool from ANTHROPIC_API_KEYS (comma-separated).
+
+        Returns:
+            KeyPool, or None if ANTHROPIC_API_KEYS is not set
+        """
+        entries = [
+            entry.strip()
+            for entry in os.getenv("ANTHROPIC_API_KEYS", "").split(",")
+            if entry.strip()
+        ]
+        return cls(entries, timeout=timeout) if entries else None
+
+    def backend(self, sticky: bool = True) -> "PooledAnthropicBackend":
+        """Backend for one plan; its requests share a key if sticky.
+
+        Args:
+            sticky: Keep the plan's requests on one key while it is healthy
+
+        Returns:
+            PooledAnthropicBackend drawing keys from this pool
+        """
+        return PooledAnthropicBackend(self, sticky=sticky)
+
+    def acquire(self, preferred: Optional[PooledKey] = None) -> PooledKey:
+        """Pick a key for a request and count it as in flight.
+
+        Args:
+            preferred: Key to keep using while it is healthy (the key of
+                       the plan's earlier requests, for prompt-cache locality)
+
+        Returns:
+            PooledKey to send the request with
+
+        Raises:
+            BackendError: If every key was rejected as invalid
+        """
+        with self._lock:
+            key = preferred if preferred is not None and preferred.healthy else self._best_key()
+            key.in_flight += 1
+            return key
+
+    def release(self, key: PooledKey) -> None:
+        """Finish a request started with acquire()."""
+        with self._lock:
+            key.in_flight = max(key.in_flight - 1, 0)
+
+    def record_headers(self, key: PooledKey, headers: Any) -> None:
+        """Update a key's rate-limit headroom from response headers."""
+        if headers is None:
+            return
+        remaining, limits = {}, {}
+        for prefix, name in RATE_LIMIT_HEADERS:
+            try:
+                if headers.get(f"{prefix}-limit") is not None:
+                    limits[name] = int(headers[f"{prefix}-limit"])
+                    remaining[name] = int(headers[f"{prefix}-remaining"])
+            except (KeyError, TypeError, ValueError):
+                continue
+        if not limits:
+            return
+        with self._lock:
+            key.limits = limits
+            key.remaining = remaining
+            key.observed_at = time.monotonic()
+
+    def record_success(self, key: PooledKey, model: str, usage: dict) -> None:
+        """Record a finished request's tokens and spend."""
+        cost = get_pricing(model).cost(
+            usage.get("input", 0),
+            usage.get("output", 0),
+            cache_write_tokens=usage.get("cache_creation", 0),
+            cache_read_tokens=usage.get("cache_read", 0),
+        )
+        with self._lock:
+            key.requests += 1
+            key.tokens += usage.get("input", 0) + usage.get("output", 0)
+            key.spend_usd += cost
+        API_KEY_REQUESTS.inc(key=key.label)
+        API_KEY_SPEND.inc(cost, key=key.label)
+
+    def record_failure(
+        self,
+        key: PooledKey,
+        status_code: Optional[int],
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """Record a failed request and take the key out of rotation if needed.
+
+        Args:
+            key: Key the request was sent with
+            status_code: HTTP status, or None for a connection error
+            retry_after: Seconds the API asked to wait
+        """
+        API_KEY_ERRORS.inc(key=key.label, status=status_code if status_code is not None else "connection")
+        with self._lock:
+            key.errors += 1
+            if status_code in (401, 403):
+                key.disabled = True
+            elif status_code in (429, 529):
+                key.cooldown_until = time.monotonic() + (retry_after or HEADROOM_TTL_SECONDS)
+                key.remaining = {name: 0 for name in key.limits}
+                key.observed_at = time.monotonic()
+            elif status_code is None or status_code >= 500:
+                key.cooldown_until = time.monotonic() + (retry_after or ERROR_COOLDOWN_SECONDS)
+
+    def snapshot(self) -> list[dict]:
+        """Per-key health, headroom and spend for status endpoints and metrics."""
+        with self._lock:
+            return [
+                {
+                    "label": key.label,
+                    "healthy": key.healthy,
+                    "disabled": key.disabled,
+                    "headroom": round(key.headroom, 3),
+                    "in_flight": key.in_flight,
+                    "requests": key.requests,
+                    "errors": key.errors,
+                    "tokens": key.tokens,
+                    "spend_usd": round(key.spend_usd, 4),
+                }
+                for key in self.keys
+            ]
+
+    def export_metrics(self) -> None:
+        """Publish each key's headroom, in-flight requests and health as gauges.
+
+        Requests, errors and spend are counted as they are recorded.
+        """
+        for key in self.snapshot():
+            API_KEY_HEADROOM.set(key["headroom"], key=key["label"])
+            API_KEY_IN_FLIGHT.set(key["in_flight"], key=key["label"])
+            API_KEY_HEALTHY.set(1 if key["healthy"] else 0, key=key["label"])
+
+    def _best_key(self) -> PooledKey:
+        """Healthy key with the most headroom. Lock must be held."""
+        candidates = [key for key in self.keys if key.healthy]
+        if candidates:
+            return max(candidates, key=lambda key: (key.headroom, -key.in_flight))
+
+        # Every key is cooling down: use the one that recovers first
+        usable = [key for key in self.keys if not key.disabled]
+        if not usable:
+            raise BackendError(
+                "有効な API キーがありません", status_code=401, provider="Anthropic"
+            )
+        return min(usable, key=lambda key: key.cooldown_until)
+
+
+class PooledAnthropicBackend(AnthropicBackend):
+    """AnthropicBackend that sends each request with a key from a KeyPool.
+
+    One instance serves one plan: with sticky=True all of its requests use
+    the same key while that key is healthy.
+    """
+
+    def __init__(self, pool: KeyPool, sticky: bool = True) -> None:
+        """Initialize PooledAnthropicBackend.
+
+        Args:
+            pool: Key pool to draw keys from
+            sticky: Keep the plan's requests on one key
+        """
+        super().__init__(client=pool.keys[0].client)
+        self.pool = pool
+        self.sticky = sticky
+        # Key of the plan's most recent request
+        self.key: Optional[PooledKey] = None
+
+    def stream(self, model: str, system: str, user: str, max_tokens: int) -> BackendStream:
+        """Open a stream with the plan's key, or the best key if it is unhealthy."""
+        key = self.pool.acquire(self.key if self.sticky else None)
+        self.key = key
+        request = self.build_request(model, system, user, max_tokens)
+        return _PooledStream(self.pool, key, model, self.open_stream(key.client, request))
+
+
+class _PooledStream(BackendStream):
+    """Stream that reports headers, usage and failures back to the pool."""
+
+    def __init__(
+        self,
+        pool: KeyPool,
+        key: PooledKey,
+        model: str,
+        stream: BackendStream,
+    ) -> None:
+        super().__init__()
+        self._pool = pool
+        self._key = key
+        self._model = model
+        self._inner = stream
+
+    def __enter__(self) -> "_PooledStream":
+        try:
+            self._inner.__enter__()
+        except BaseException as e:
+            self._fail(e)
+            self._pool.release(self._key)
+            raise
+        self._pool.record_headers(self._key, getattr(self._inner, "headers", None))
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        try:
+            self._inner.__exit__(*exc_info)
+        finally:
+            if exc_info[1] is not None:
+                self._fail(exc_info[1])
+            self._pool.release(self._key)
+        return False
+
+    def __iter__(self) -> Iterator[StreamEvent]:
+        return iter(self._inner)
+
+    def final_usage(self) -> dict:
+        usage = self._inner.final_usage()
+        self.stop_reason = self._inner.stop_reason
+        self._pool.record_success(self._key, self._model, usage)
+        return usage
+
+    def _fail(self, error: BaseException) -> None:
+        """Report a failed request to the pool."""
+        if isinstance(error, BackendError):
+            self._pool.record_failure(self._key, error.status_code, error.retry_after)
+        elif isinstance(error, ConnectionError):
+            self._pool.record_failure(self._key, None)
+
+
+def _anthropic_client(api_key: str, timeout: float) -> Any:
+    """anthropic.Anthropic client of one key (the SDK is imported on first use)."""
+    import anthropic
+
+    return anthropic.Anthropic(api_key=api_key, timeout=timeout)
@@ -10,11 +10,20 @@ class MarketResearcher(BaseAgent):
     and market trends to provide comprehensive market analysis.
     """
 
-    def __init__(self) -> None:
-        """Initialize MarketResearcher agent."""
+    # Key in the orchestrator and in context["max_tokens"]
+    key = "market"
+    DEFAULT_MAX_TOKENS = 4000
+
+    def __init__(self, **kwargs) -> None:
+        """Initialize MarketResearcher agent.
+        
+        Args:
+            **kwargs: Passed through to BaseAgent (model, client)
+        """
         super().__init__(
             name="MarketResearcher",
             role="市場調査エキスパート",
+            **kwargs,
         )
 
     def get_system_prompt(self, context: dict) -> str:
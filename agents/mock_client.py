@@ -0,0 +1,117 @@
+"""Offline mock of the Anthropic streaming client for local runs and benchmarks."""
+
+import re
+import time
+from types import SimpleNamespace
+from typing import Iterator, Optional
+
+
+class MockAnthropicClient:
+    """Drop-in replacement for anthropic.Anthropic's streaming interface.
+
+    Only client.messages.stream(...) is implemented. Iterating the stream
+    yields message_start, text and message_delta events like the SDK's
+    MessageStream; text_stream yields just the text. Each call waits
+    first_token_delay seconds, then streams chunk_count chunks with
+    chunk_delay seconds between them, so orchestrator and server runs can
+    be exercised and benchmarked without network access or API cost.
+    When the system prompt asks for section markers (express mode), the
+    chunks are spread across those sections.
+    """
+
+    def __init__(
+        self,
+        chunk_count: int = 100,
+        chunk_delay: float = 0.01,
+        first_token_delay: float = 0.2,
+        headers: Optional[dict] = None,
+    ) -> None:
+        """Initialize MockAnthropicClient.
+
+        Args:
+            chunk_count: Number of text chunks streamed per request
+            chunk_delay: Seconds between chunks
+            first_token_delay: Seconds before the first chunk
+            headers: HTTP response headers of every stream (e.g.,
+                     anthropic-ratelimit-* headers)
+        """
+        self.chunk_count = chunk_count
+        self.chunk_delay = chunk_delay
+        self.first_token_delay = first_token_delay
+        self.headers = headers or {}
+        self.requests = 0
+        self.messages = SimpleNamespace(stream=self._stream)
+
+    def _stream(self, **kwargs) -> "_MockStream":
+        """Create a mock stream for a messages.stream() call."""
+        self.requests += 1
+        return _MockStream(self, kwargs)
+
+
+class _MockStream:
+    """Context manager mimicking anthropic's MessageStream."""
+
+    def __init__(self, client: MockAnthropicClient, request: dict) -> None:
+        self._client = client
+        self._request = request
+        self._output_chars = 0
+        self.response = SimpleNamespace(headers=dict(client.headers))
+
+    def __enter__(self) -> "_MockStream":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def __iter__(self) -> Iterator[SimpleNamespace]:
+        """Yield SDK-style stream events around the text chunks."""
+        yield SimpleNamespace(
+            type="message_start",
+            message=SimpleNamespace(usage=self._usage(output_tokens=1)),
+        )
+        for text in self.text_stream:
+            yield SimpleNamespace(type="text", text=text)
+        yield SimpleNamespace(
+            type="message_delta",
+            usage=SimpleNamespace(output_tokens=self._output_chars // 2),
+        )
+
+    @property
+    def text_stream(self) -> Iterator[str]:
+        """Yield Markdown text chunks with the configured pacing, up to max_tokens."""
+        client = self._client
+        max_tokens = self._request.get("max_tokens")
+        system = "".join(block.get("text", "") for block in self._request.get("system", []))
+        markers = list(dict.fromkeys(re.findall(r"<!-- section:[a-z_]+ -->", system)))
+        per_section = max(client.chunk_count // max(len(markers), 1), 1)
+        time.sleep(client.first_token_delay)
+        for idx in range(client.chunk_count):
+            if max_tokens is not None and self._output_chars // 2 >= max_tokens:
+                break
+            if idx % per_section == 0:
+                text = "## モック出力\n\n| 項目 | 1年目 | 2年目 |\n|------|------|------|\n"
+                if idx // per_section < len(markers):
+                    text = f"{markers[idx // per_section]}\n{text}"
+            else:
+                text = f"| 指標{idx} | {idx * 100:,}万円 | {idx * 150:,}万円 |\n"
+            self._output_chars += len(text)
+            yield text
+            if client.chunk_delay:
+                time.sleep(client.chunk_delay)
+
+    def get_final_message(self) -> SimpleNamespace:
+        """Return a message-like object with approximate token usage."""
+        return SimpleNamespace(usage=self._usage(output_tokens=self._output_chars // 2))
+
+    def _usage(self, output_tokens: int) -> SimpleNamespace:
+        """Approximate usage of the request (about two characters per token)."""
+        system = self._request.get("system", [])
+        messages = self._request.get("messages", [])
+        prompt_chars = sum(len(block.get("text", "")) for block in system)
+        prompt_chars += sum(len(str(message.get("content", ""))) for message in messages)
+        return SimpleNamespace(
+            input_tokens=prompt_chars // 2,
+            output_tokens=output_tokens,
+            cache_creation_input_tokens=0,
+            cache_read_input_tokens=0,
+        )
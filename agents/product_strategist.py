@@ -10,11 +10,20 @@ class ProductStrategist(BaseAgent):
     roadmap, and technical risk mitigation strategies.
     """
 
-    def __init__(self) -> None:
-        """Initialize ProductStrategist agent."""
+    # Key in the orchestrator and in context["max_tokens"]
+    key = "product"
+    DEFAULT_MAX_TOKENS = 5000
+
+    def __init__(self, **kwargs) -> None:
+        """Initialize ProductStrategist agent.
+        
+        Args:
+            **kwargs: Passed through to BaseAgent (model, client)
+        """
         super().__init__(
             name="ProductStrategist",
             role="プロダクト戦略専門家",
+            **kwargs,
         )
 
     def get_system_prompt(self, context: dict) -> str:
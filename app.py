@@ -1,16 +1,24 @@
 """Main Streamlit application for business plan generator."""
 
 import streamlit as st
+import os
 import threading
 import time
+import uuid
 from pathlib import Path
-from anthropic import BadRequestError, APIConnectionError, RateLimitError
-
 from ui.sidebar import render_sidebar
-from ui.progress import render_progress
+from ui.progress import render_progress, render_stream_previews
+from agents.backends import BackendError
+from agents.base import BudgetExhaustedError, RunCancelledError
+from agents.key_pool import KeyPool
+from orchestrator.admission import AdmissionController, AdmissionRejected
+from orchestrator.coalescing import RunCoalescer, Subscription
+from orchestrator.estimator import BudgetExceededError
+from orchestrator.metrics import METRICS
 from orchestrator.runner import AgentOrchestrator
-from exporters.excel_exporter import ExcelExporter
-from exporters.pdf_exporter import PDFExporter
+from exporters.cache import ExportCache
+from exporters.document import plan_document
+from exporters.scheduler import ExportScheduler
 
 
 # Page configuration
@@ -34,95 +42,239 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def generate_business_plan(context: dict) -> None:
-    """Generate business plan in a separate thread.
+# Refresh interval of the live progress fragment (seconds)
+PROGRESS_REFRESH_SECONDS = 1.0
+
+# Refresh interval of pending export downloads (seconds)
+EXPORT_REFRESH_SECONDS = 1.0
+
+
+@st.cache_resource
+def get_key_pool() -> KeyPool | None:
+    """Process-wide API key pool when ANTHROPIC_API_KEYS lists several keys."""
+    return KeyPool.from_env()
+
+
+@st.cache_resource
+def get_export_cache() -> ExportCache:
+    """Process-wide cache of rendered exports.
+    
+    Streamlit reruns the results view on every interaction; the cache
+    renders each format once per plan. BPG_EXPORT_CACHE_MB bounds its
+    memory, and BPG_EXPORT_CACHE_DIR adds a disk tier shared by processes.
+    """
+    return ExportCache.from_env()
+
+
+@st.cache_resource
+def get_export_scheduler() -> ExportScheduler:
+    """Process-wide background renderer of exports.
+    
+    Exports are rendered in worker processes (BPG_EXPORT_WORKERS, default
+    2; 0 renders in threads) as soon as a plan is complete, so that
+    WeasyPrint does not hold the GIL other sessions' streams need.
+    """
+    return ExportScheduler.from_env(get_export_cache())
+
+
+@st.cache_resource
+def get_run_coalescer() -> RunCoalescer:
+    """Process-wide coalescer shared by all sessions.
+    
+    Sessions that submit the same context and model while a run is in
+    flight attach to that run instead of starting another five-agent run.
+    New runs are admitted fairly across sessions; beyond the concurrency
+    cap they wait in a bounded queue, and beyond that they are refused.
+    With BPG_EXPRESS_LOAD set, runs submitted at or above that load use
+    the express pipeline. With ANTHROPIC_API_KEYS set, runs are spread
+    across those keys.
+    """
+    admission = AdmissionController(
+        max_concurrent_runs=int(os.getenv("BPG_MAX_CONCURRENT_RUNS", "4")),
+        max_queue_length=int(os.getenv("BPG_MAX_QUEUED_RUNS", "16")),
+        max_pending_per_tenant=1,
+        express_load_threshold=float(os.environ["BPG_EXPRESS_LOAD"]) if os.getenv("BPG_EXPRESS_LOAD") else None,
+    )
+    key_pool = get_key_pool()
+    if key_pool is None:
+        return RunCoalescer(admission=admission)
+    return RunCoalescer(
+        orchestrator_factory=lambda context, model: AgentOrchestrator(
+            context=context, model=model, backend=key_pool.backend()
+        ),
+        admission=admission,
+    )
+
+
+def generate_business_plan(
+    subscription: Subscription, job: dict, scheduler: ExportScheduler | None = None
+) -> None:
+    """Wait for a (possibly shared) run in a separate thread.
+    
+    The worker thread has no Streamlit script context, so it never touches
+    st.session_state directly. Instead it fills in the shared job dict,
+    which the progress fragment picks up on its next refresh.
     
     Args:
-        context: User input context dictionary
+        subscription: This session's subscription to the shared run
+        job: Shared job dict with "result", "error" and "done" keys
+        scheduler: Export scheduler to start rendering the finished plan on
     """
     try:
-        orchestrator = AgentOrchestrator(context=context, model=context.get("model"))
+        # Wait for all phases of the shared run
+        job["result"] = subscription.result()
+        job["error"] = None
+        
+    except RunCancelledError:
+        job["error"] = {
+            "type": "cancelled",
+            "message": "生成を中止しました。",
+        }
         
-        # Run all phases
-        result = orchestrator.run_all()
+    except BudgetExceededError as e:
+        job["error"] = {
+            "type": "budget_exceeded",
+            "message": str(e),
+        }
         
-        # Save to session state
-        st.session_state.generation_result = result
-        st.session_state.orchestrator = orchestrator
-        st.session_state.is_generating = False
-        st.session_state.generation_error = None
+    except BudgetExhaustedError:
+        job["error"] = {
+            "type": "budget_exceeded",
+            "message": "生成中に予算上限に達したため、統合編集を実行できませんでした。",
+        }
         
-    except BadRequestError as e:
+    except BackendError as e:
         # Handle API request errors (invalid input, insufficient credits, etc.)
         error_msg = str(e)
         
-        if "credit balance is too low" in error_msg.lower():
-            st.session_state.generation_error = {
+        if e.status_code == 429:
+            job["error"] = {
+                "type": "rate_limit_error",
+                "message": "API呼び出し回数の制限に達しました。",
+                "details": "しばらく待ってからリトライしてください。"
+            }
+        elif "credit balance is too low" in error_msg.lower():
+            job["error"] = {
                 "type": "insufficient_credits",
                 "message": "APIクレジットの残高が不足しています。",
                 "details": "https://console.anthropic.com/account/billing/overview でクレジットを追加してください。"
             }
         elif "invalid_request_error" in error_msg.lower():
-            st.session_state.generation_error = {
+            job["error"] = {
                 "type": "api_request_error",
                 "message": "APIリクエストエラーが発生しました。",
                 "details": error_msg
             }
         else:
-            st.session_state.generation_error = {
+            job["error"] = {
                 "type": "api_error",
                 "message": "APIエラーが発生しました。",
                 "details": error_msg
             }
-        st.session_state.is_generating = False
-        
-    except RateLimitError as e:
-        st.session_state.generation_error = {
-            "type": "rate_limit_error",
-            "message": "API呼び出し回数の制限に達しました。",
-            "details": "しばらく待ってからリトライしてください。"
-        }
-        st.session_state.is_generating = False
-        
-    except APIConnectionError as e:
-        st.session_state.generation_error = {
-            "type": "connection_error",
-            "message": "APIに接続できません。",
-            "details": str(e)
-        }
-        st.session_state.is_generating = False
         
     except TimeoutError as e:
-        st.session_state.generation_error = {
+        job["error"] = {
             "type": "timeout_error",
             "message": "生成処理がタイムアウトしました（5分以上かかっています）。",
             "details": "入力内容を簡潔にして再度お試しください。"
         }
-        st.session_state.is_generating = False
         
     except ValueError as e:
         # Handle API key missing error
-        st.session_state.generation_error = {
+        job["error"] = {
             "type": "api_key_error",
             "message": str(e)
         }
-        st.session_state.is_generating = False
         
     except ConnectionError as e:
-        st.session_state.generation_error = {
-            "type": "network_error",
-            "message": f"ネットワークエラー: {str(e)}"
+        job["error"] = {
+            "type": "connection_error",
+            "message": "APIに接続できません。",
+            "details": str(e)
         }
-        st.session_state.is_generating = False
         
     except Exception as e:
         # Handle unexpected errors
-        st.session_state.generation_error = {
+        job["error"] = {
             "type": "unknown_error",
             "message": f"予期しないエラーが発生しました: {type(e).__name__}",
             "details": str(e)
         }
+    
+    finally:
+        if scheduler is not None and job["result"]:
+            # Render the downloads while the user reads the plan
+            try:
+                scheduler.schedule(job["result"], tracer=subscription.run.orchestrator.tracer)
+            except Exception:
+                # The download tabs render (and report) on demand instead
+                pass
+        job["done"] = True
+        
+        # Expose this process's metrics to a node_exporter textfile collector
+        metrics_file = os.getenv("BPG_METRICS_FILE")
+        if metrics_file:
+            try:
+                METRICS.write_textfile(metrics_file)
+            except OSError:
+                pass
+
+
+def release_generation() -> None:
+    """Leave the current run and reset the generation state."""
+    subscription = st.session_state.get("generation_subscription")
+    if subscription is not None:
+        subscription.release()
+    st.session_state.generation_subscription = None
+    st.session_state.generation_job = None
+    st.session_state.orchestrator = None
+    st.session_state.is_generating = False
+
+
+@st.fragment(run_every=PROGRESS_REFRESH_SECONDS)
+def render_generation_status() -> None:
+    """Render live progress and stream previews until the job finishes.
+    
+    Runs as a timed fragment, so only this part of the page is refreshed
+    while the worker thread streams. Once the job is done, its result or
+    error is moved into session state and the whole app is rerun.
+    """
+    job = st.session_state.generation_job
+    orchestrator = st.session_state.orchestrator
+    
+    if job is None or orchestrator is None:
+        return
+    
+    if job["done"]:
+        st.session_state.generation_result = job["result"]
+        st.session_state.generation_error = job["error"]
         st.session_state.is_generating = False
+        st.session_state.generation_job = None
+        st.session_state.generation_subscription = None
+        st.rerun()
+    
+    subscription = st.session_state.generation_subscription
+    if subscription is not None and subscription.run.status == "queued":
+        ticket = subscription.run.ticket
+        st.info(
+            f"⏳ 順番待ち中です（{ticket.queue_position or 1}番目、"
+            f"開始まで約{ticket.eta_seconds:.0f}秒）"
+        )
+        return
+    
+    elapsed = time.time() - (st.session_state.generation_start_time or time.time())
+    st.caption(f"⏱️ 経過時間: {elapsed:.0f}秒")
+    
+    render_progress(orchestrator)
+    render_stream_previews(orchestrator)
+
+
+@st.fragment(run_every=EXPORT_REFRESH_SECONDS)
+def render_export_pending(result: dict, fmt: str, label: str) -> None:
+    """Show a pending state until a background export is done, then rerun the app."""
+    if get_export_scheduler().ready(result, fmt):
+        st.rerun()
+    st.info(f"⏳ {label}を生成中です... 完了するとダウンロードできます")
 
 
 def main():
@@ -139,6 +291,13 @@ def main():
         st.session_state.generation_error = None
     if "generation_start_time" not in st.session_state:
         st.session_state.generation_start_time = None
+    if "generation_job" not in st.session_state:
+        st.session_state.generation_job = None
+    if "generation_subscription" not in st.session_state:
+        st.session_state.generation_subscription = None
+    if "tenant_id" not in st.session_state:
+        # Each browser session is its own tenant for fair-share admission
+        st.session_state.tenant_id = uuid.uuid4().hex
     
     # Main title
     st.markdown("# 🤖 Agent Teams 事業計画ジェネレーター")
@@ -150,31 +309,56 @@ def main():
     
     # Handle generation request
     if context and not st.session_state.is_generating and not st.session_state.generation_result:
-        st.session_state.is_generating = True
-        st.session_state.generation_start_time = time.time()
-        
-        # Start generation in a thread
-        thread = threading.Thread(
-            target=generate_business_plan,
-            args=(context,),
-            daemon=True,
-        )
-        thread.start()
+        # Attach to an identical in-flight run, or start a new one, and
+        # publish its orchestrator right away so progress is live
+        try:
+            subscription = get_run_coalescer().acquire(
+                context, context.get("model"), tenant=st.session_state.tenant_id
+            )
+        except AdmissionRejected as e:
+            # Refuse up front rather than slowing down everyone's runs
+            st.session_state.generation_error = {
+                "type": "admission_rejected",
+                "message": str(e),
+            }
+        else:
+            job = {"result": None, "error": None, "done": False}
+            
+            st.session_state.orchestrator = subscription.run.orchestrator
+            st.session_state.generation_subscription = subscription
+            st.session_state.generation_job = job
+            st.session_state.is_generating = True
+            st.session_state.generation_error = None
+            st.session_state.generation_start_time = time.time()
+            
+            # Start generation in a thread
+            thread = threading.Thread(
+                target=generate_business_plan,
+                args=(subscription, job, get_export_scheduler()),
+                daemon=True,
+            )
+            thread.start()
     
     # Display progress while generating
-    if st.session_state.is_generating and st.session_state.orchestrator is None:
+    if st.session_state.is_generating:
         st.info("🚀 事業計画を生成中... 少々お待ちください（初回は最大3分かかる場合があります）")
+        subscription = st.session_state.generation_subscription
+        if subscription is not None and subscription.coalesced:
+            st.caption("🔗 同じ内容の生成が進行中のため、その結果を共有しています")
+        orchestrator = st.session_state.orchestrator
+        if orchestrator is not None and orchestrator.mode != orchestrator.context.get("mode", "full"):
+            st.caption("⚡ 混雑しているため、エクスプレスモードに切り替えて生成しています")
+        
+        if st.button("⏹️ 生成を中止", use_container_width=True):
+            # The shared run is only cancelled when its last session leaves
+            release_generation()
+            st.session_state.generation_error = {
+                "type": "cancelled",
+                "message": "生成を中止しました。",
+            }
+            st.rerun()
         
-        # Polling loop for progress updates
-        progress_placeholder = st.empty()
-        while st.session_state.is_generating:
-            time.sleep(0.5)
-            
-            # Check if orchestrator is available
-            if st.session_state.orchestrator:
-                with progress_placeholder.container():
-                    render_progress(st.session_state.orchestrator)
-                break
+        render_generation_status()
     
     # Display generation result
     if st.session_state.generation_result:
@@ -194,8 +378,20 @@ def main():
         with tab1:
             st.subheader("事業計画書")
             
+            # Jump to a chapter through the plan's parsed chapter index
+            chapters = [chapter for chapter in plan_document(result).plan.chapters if chapter.title]
+            chapter = None
+            if len(chapters) > 1:
+                selected = st.selectbox(
+                    "章を選択",
+                    range(len(chapters) + 1),
+                    format_func=lambda index: chapters[index - 1].title if index else "すべて表示",
+                    key="plan_chapter",
+                )
+                chapter = chapters[selected - 1] if selected else None
+            
             # Display markdown content
-            st.markdown(business_plan)
+            st.markdown(chapter.markdown if chapter is not None else business_plan)
             
             # Download button
             st.download_button(
@@ -217,18 +413,19 @@ def main():
                 "- **GTM戦略**: Go-to-Market戦略"
             )
             
-            # Generate Excel
+            # Pick up the background render (started when the plan finished)
             try:
-                exporter = ExcelExporter()
-                excel_bytes = exporter.export(business_plan, sections)
-                
-                st.download_button(
-                    label="📥 Excel（.xlsx）をダウンロード",
-                    data=excel_bytes,
-                    file_name="business_plan.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True,
-                )
+                excel = get_export_scheduler().get(result, "xlsx")
+                if excel is None:
+                    render_export_pending(result, "xlsx", "Excel")
+                else:
+                    st.download_button(
+                        label="📥 Excel（.xlsx）をダウンロード",
+                        data=excel[0],
+                        file_name="business_plan.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        use_container_width=True,
+                    )
             except Exception as e:
                 st.error(f"❌ Excel生成エラー: {e}")
         
@@ -239,22 +436,22 @@ def main():
                 "（weasyprint が利用可能な環境では PDF、そうでない場合は HTML で提供）"
             )
             
-            # Generate PDF/HTML
+            # Pick up the background render (started when the plan finished)
             try:
-                exporter = PDFExporter()
-                export_format = exporter.get_export_format()
-                pdf_bytes = exporter.export(business_plan)
-                
-                file_ext = "pdf" if export_format == "PDF" else "html"
-                mime_type = "application/pdf" if export_format == "PDF" else "text/html"
-                
-                st.download_button(
-                    label=f"📥 {export_format}（.{file_ext}）をダウンロード",
-                    data=pdf_bytes,
-                    file_name=f"business_plan.{file_ext}",
-                    mime=mime_type,
-                    use_container_width=True,
-                )
+                pdf = get_export_scheduler().get(result, "pdf")
+                if pdf is None:
+                    render_export_pending(result, "pdf", "PDF")
+                else:
+                    pdf_bytes, file_ext = pdf
+                    mime_type = "application/pdf" if file_ext == "pdf" else "text/html"
+                    
+                    st.download_button(
+                        label=f"📥 {file_ext.upper()}（.{file_ext}）をダウンロード",
+                        data=pdf_bytes,
+                        file_name=f"business_plan.{file_ext}",
+                        mime=mime_type,
+                        use_container_width=True,
+                    )
             except Exception as e:
                 st.error(f"❌ PDF生成エラー: {e}")
         
@@ -277,10 +474,17 @@ def main():
                 value=f"{token_usage.get('output', 0):,}",
             )
         
+        preflight = result.get("preflight") or {}
+        
         with col3:
             st.metric(
                 label="推定コスト",
                 value=f"${estimated_cost:.4f}",
+                delta=(
+                    f"事前見積 ${preflight['cost_usd']:.4f}"
+                    if preflight else None
+                ),
+                delta_color="off",
             )
         
         with col4:
@@ -289,6 +493,36 @@ def main():
                 value=f"{elapsed_time:.1f}秒",
             )
         
+        limited_agents = (result.get("budget") or {}).get("limited_agents")
+        if limited_agents:
+            st.caption(
+                f"💰 予算上限 ${result['budget']['budget_usd']:.2f} に達したため、"
+                f"一部のセクション（{', '.join(limited_agents)}）を途中で打ち切りました"
+            )
+        
+        if result.get("mode") == "express":
+            st.caption(
+                "⚡ エクスプレスモードで生成しました（統合編集を省いた高速・低コスト版）。"
+                "より詳細な計画書が必要な場合は標準モードで再生成してください"
+            )
+        
+        routing = result.get("routing") or {}
+        routed = [
+            key for key, entry in routing.get("agents", {}).items()
+            if entry["model"] != routing["selected_model"]
+        ]
+        if routed:
+            st.caption(
+                f"🔀 {', '.join(routed)} を高速モデルで生成し、選択モデルのみの場合と比べて "
+                f"約${routing['savings_usd']:.3f}・{routing['seconds_saved']:.0f}秒を節約しました"
+            )
+
+        if preflight.get("downgraded_from"):
+            st.caption(
+                f"💡 予算内に収めるため {preflight['downgraded_from']} から "
+                f"{preflight['model']} に切り替えて生成しました"
+            )
+        
         st.markdown("---")
         
         # Individual sections expander
@@ -313,6 +547,7 @@ def main():
         if st.button("🔄 別の事業計画を作成", use_container_width=True):
             st.session_state.generation_result = None
             st.session_state.orchestrator = None
+            st.session_state.generation_job = None
             st.session_state.is_generating = False
             st.rerun()
     
@@ -402,6 +637,19 @@ def main():
                 詳細: {error_details}
                 """)
                 
+            elif error_type == "cancelled":
+                st.info(f"⏹️ {error_msg}")
+                
+            elif error_type == "admission_rejected":
+                st.warning(f"⏳ {error_msg}")
+                
+            elif error_type == "budget_exceeded":
+                st.warning(f"💰 {error_msg}")
+                st.markdown(
+                    "サイドバーの **詳細設定** で予算を引き上げるか、"
+                    "max_tokens を減らすか、予算超過時のモデル切り替えを有効にしてください。"
+                )
+                
             elif error_type == "network_error":
                 st.error("🌐 ネットワークエラーが発生しました")
                 st.warning("""
@@ -428,11 +676,12 @@ def main():
             if st.button("🏠 初期状態に戻す", use_container_width=True):
                 st.session_state.generation_result = None
                 st.session_state.orchestrator = None
+                st.session_state.generation_job = None
                 st.session_state.is_generating = False
                 st.session_state.generation_error = None
                 st.rerun()
     
-    else:
+    elif not st.session_state.is_generating:
         # Welcome message
         st.info(
             """
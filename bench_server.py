@@ -0,0 +1,131 @@
+"""Benchmark the HTTP/SSE service locally against the mock backend.
+
+Usage:
+    python bench_server.py --runs 8 --watchers 3 --max-runs 4
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.backends import FakeBackend
+from server.runs import RunManager
+from server.service import PlanServer
+
+
+def _post_run(base_url: str, company: str) -> str:
+    """Start a run and return its ID, retrying while the server is at capacity."""
+    body = json.dumps({
+        "company_name": company,
+        "business_description": "ベンチマーク用のモック事業",
+    }).encode("utf-8")
+    while True:
+        request = urllib.request.Request(
+            f"{base_url}/runs",
+            data=body,
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read())["run_id"]
+        except urllib.error.HTTPError as e:
+            if e.code != 503:
+                raise
+            time.sleep(0.1)
+
+
+def _watch(base_url: str, run_id: str, started: float) -> tuple[float, float, int]:
+    """Consume a run's SSE stream.
+
+    Returns:
+        Tuple of (seconds to first event, seconds to last event, event count)
+    """
+    first_event = None
+    count = 0
+    with urllib.request.urlopen(f"{base_url}/runs/{run_id}/events") as response:
+        for line in response:
+            if line.startswith(b"id: "):
+                count += 1
+                if first_event is None:
+                    first_event = time.perf_counter() - started
+    return first_event or 0.0, time.perf_counter() - started, count
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def main() -> None:
+    """Run the benchmark and print a summary."""
+    parser = argparse.ArgumentParser(description="HTTP/SSE サーバーのベンチマーク（モックバックエンド）")
+    parser.add_argument("--runs", type=int, default=8, help="開始するラン数")
+    parser.add_argument("--watchers", type=int, default=3, help="ラン1件あたりのSSEクライアント数")
+    parser.add_argument("--max-runs", type=int, default=4, help="サーバーの同時実行上限")
+    parser.add_argument("--chunks", type=int, default=100, help="モック応答のチャンク数")
+    parser.add_argument("--chunk-delay", type=float, default=0.005, help="チャンク間隔（秒）")
+    args = parser.parse_args()
+
+    manager = RunManager(
+        max_concurrent_runs=args.max_runs,
+        # Every bench run comes from one tenant; queue beyond the cap instead of rejecting
+        max_queued_runs=args.runs,
+        max_runs_per_tenant=args.runs,
+        backend_factory=lambda: FakeBackend(
+            chunk_count=args.chunks,
+            chunk_delay=args.chunk_delay,
+            first_token_delay=0.05,
+        ),
+    )
+    server = PlanServer(("127.0.0.1", 0), manager)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    def one_run(idx: int) -> list[tuple[float, float, int]]:
+        started = time.perf_counter()
+        run_id = _post_run(base_url, f"Bench{idx}")
+        with ThreadPoolExecutor(max_workers=args.watchers) as watchers:
+            return list(watchers.map(lambda _: _watch(base_url, run_id, started), range(args.watchers)))
+
+    bench_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.runs) as executor:
+        samples = [sample for run in executor.map(one_run, range(args.runs)) for sample in run]
+    wall = time.perf_counter() - bench_start
+
+    server.drain_and_shutdown(timeout=10)
+    server.server_close()
+
+    first_events = [sample[0] for sample in samples]
+    totals = [sample[1] for sample in samples]
+    event_counts = [sample[2] for sample in samples]
+
+    print("=" * 70)
+    print("HTTP/SSE サーバー ベンチマーク（モックバックエンド）")
+    print("=" * 70)
+    print(f"  ラン数:           {args.runs}（同時実行上限 {args.max_runs}）")
+    print(f"  SSEクライアント数: {len(samples)}（ラン1件あたり {args.watchers}）")
+    print(f"  総実行時間:       {wall:.2f}秒")
+    print(f"  スループット:     {args.runs / wall:.2f} runs/s")
+    print(f"  初回イベント p50: {statistics.median(first_events) * 1000:.0f}ms / p95: {_percentile(first_events, 95) * 1000:.0f}ms")
+    print(f"  完了まで p50:     {statistics.median(totals):.2f}秒 / p95: {_percentile(totals, 95):.2f}秒")
+    print(f"  イベント数/クライアント: {statistics.mean(event_counts):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Benchmark cold import times of the app and service entry points.
+
+Every target is imported in a fresh interpreter with ``-X importtime``.
+The median cumulative import time is checked against its budget, and
+the heavy libraries that should only load on first use (the Anthropic
+SDK, openpyxl, Markdown, WeasyPrint, pypdf) must not be imported at all.
+
+Usage:
+    python bench_startup.py --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Budget of each target's cumulative import time (milliseconds)
+STARTUP_BUDGETS_MS = {
+    # Streamlit itself takes about 400ms of this
+    "app": 1500,
+    "orchestrator.runner": 500,
+    "server.service": 500,
+    "exporters.scheduler": 200,
+}
+
+# Packages that are imported on first use only
+LAZY_PACKAGES = ("anthropic", "openpyxl", "markdown", "weasyprint", "pypdf")
+
+
+@dataclass
+class ImportProfile:
+    """Import-time profile of one target in a fresh interpreter.
+
+    Attributes:
+        target: Module imported
+        milliseconds: Cumulative import time of the target
+        self_ms: Self import time (milliseconds) of every top-level package
+    """
+
+    target: str
+    milliseconds: float
+    self_ms: dict[str, float]
+
+    @property
+    def lazy_loaded(self) -> list[str]:
+        """LAZY_PACKAGES the import loaded."""
+        return [package for package in LAZY_PACKAGES if package in self.self_ms]
+
+
+def measure(target: str) -> ImportProfile:
+    """Import a module in a fresh interpreter and parse its -X importtime report.
+
+    Args:
+        target: Module to import (run from the project root)
+
+    Returns:
+        ImportProfile of the import
+
+    Raises:
+        RuntimeError: If the import failed
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{completed.stderr[-2000:]}")
+
+    milliseconds = 0.0
+    self_ms: dict[str, float] = {}
+    # "import time: self [us] | cumulative | imported package" (nesting by indentation)
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].strip()
+        package = name.split(".")[0]
+        self_ms[package] = self_ms.get(package, 0.0) + int(fields[0]) / 1000
+        if name == target:
+            milliseconds = int(fields[1]) / 1000
+    return ImportProfile(target, milliseconds, self_ms)
+
+
+def main() -> int:
+    """Run the benchmark, print a summary and return 1 if a budget is exceeded."""
+    parser = argparse.ArgumentParser(description="起動時の import 時間のベンチマーク（予算チェック付き）")
+    parser.add_argument("--repeat", type=int, default=5, help="ターゲットごとの計測回数（中央値を使用）")
+    parser.add_argument("--top", type=int, default=5, help="表示する重いパッケージの数")
+    parser.add_argument("targets", nargs="*", default=list(STARTUP_BUDGETS_MS), help="計測するモジュール")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("起動時 import 時間（-X importtime、新しいインタプリタで計測）")
+    print("=" * 70)
+    failed = False
+    for target in args.targets:
+        profiles = [measure(target) for _ in range(max(args.repeat, 1))]
+        median = statistics.median(profile.milliseconds for profile in profiles)
+        budget = STARTUP_BUDGETS_MS.get(target)
+        lazy_loaded = profiles[0].lazy_loaded
+        over = (budget is not None and median > budget) or bool(lazy_loaded)
+        failed |= over
+
+        budget_text = f" / 予算 {budget}ms" if budget is not None else ""
+        print(f"{'❌' if over else '✅'} {target}: {median:.0f}ms{budget_text}")
+        heaviest = sorted(profiles[0].self_ms.items(), key=lambda item: item[1], reverse=True)
+        print("    重いパッケージ: " + ", ".join(
+            f"{package} {ms:.0f}ms" for package, ms in heaviest[:args.top]
+        ))
+        if lazy_loaded:
+            print(f"    初回使用時に読み込むはずのパッケージ: {', '.join(lazy_loaded)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+"""Batch export of many plans (portfolio runs) in a bounded worker pool.
+
+BatchExporter renders every format of many run results in worker
+processes and writes each file into a ZIP archive or an output directory
+as soon as it is finished. Results are read from the input lazily and no
+more renders than workers are in flight, so reading, rendering and
+writing move at the pace of the slowest of them (backpressure) and memory
+stays bounded however many plans there are. A render that runs past the
+per-job timeout is reported as failed and the batch goes on.
+
+    python -m exporters.batch results/*.json --output plans.zip --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from exporters.scheduler import EXPORTERS, render_export
+from orchestrator.metrics import BATCH_EXPORTS, METRICS
+
+
+# Extra seconds the parent waits for a worker process to enforce its own timeout
+TIMEOUT_GRACE_SECONDS = 5.0
+
+
+@dataclass
+class BatchReport:
+    """Outcome and throughput of a batch export.
+
+    Attributes:
+        jobs: Files submitted (one per plan and format)
+        succeeded: Files written
+        failures: (name, format, error) of every file that failed or timed out
+        bytes: Size of the files written
+        seconds: Wall-clock seconds of the batch
+    """
+
+    jobs: int = 0
+    succeeded: int = 0
+    failures: list[tuple[str, str, str]] = field(default_factory=list)
+    bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def failed(self) -> int:
+        """Files that failed or timed out."""
+        return len(self.failures)
+
+    @property
+    def files_per_second(self) -> float:
+        """Files written per second."""
+        return self.succeeded / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """Megabytes written per second."""
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        """One-line summary for logs."""
+        return (
+            f"{self.succeeded}/{self.jobs} ファイル成功（失敗 {self.failed}）"
+            f" {self.seconds:.1f}秒 {self.files_per_second:.2f} ファイル/秒"
+            f" {self.megabytes_per_second:.2f} MB/秒"
+        )
+
+
+class ZipSink:
+    """Writes finished files into a ZIP archive."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(self.path, "w")
+
+    def write(self, filename: str, content: bytes) -> None:
+        """Add a file (PDF and XLSX are already compressed, HTML is deflated)."""
+        compression = zipfile.ZIP_DEFLATED if filename.endswith(".html") else zipfile.ZIP_STORED
+        self._zip.writestr(filename, content, compress_type=compression)
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+class DirectorySink:
+    """Writes finished files into a directory."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def write(self, filename: str, content: bytes) -> None:
+        """Write a file; readers never see a partial one."""
+        target = self.path / filename
+        partial = target.with_name(f".{target.name}.tmp")
+        partial.write_bytes(content)
+        partial.replace(target)
+
+    def close(self) -> None:
+        pass
+
+
+def open_sink(path: Union[str, Path]) -> Union[ZipSink, DirectorySink]:
+    """ZipSink for .zip paths, DirectorySink otherwise."""
+    return ZipSink(path) if str(path).lower().endswith(".zip") else DirectorySink(path)
+
+
+@contextmanager
+def _alarm(seconds: Optional[float]) -> Iterator[None]:
+    """Raise TimeoutError in this thread after some seconds (main thread on Unix only)."""
+    if (
+        not seconds
+        or not hasattr(signal, "SIGALRM")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise TimeoutError(f"render exceeded {seconds:g}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _export_job(fmt: str, result: dict, timeout: Optional[float]) -> tuple[bytes, str, dict]:
+    """render_export() in a worker process, stopped after timeout seconds,
+    plus the metrics it recorded."""
+    # Workers are reused; report only this job's samples
+    METRICS.reset()
+    with _alarm(timeout):
+        content, export_format = render_export(fmt, result)
+    return content, export_format, METRICS.snapshot()
+
+
+class BatchExporter:
+    """Exports many plans into a ZIP archive or directory in a bounded pool."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        formats: tuple = tuple(EXPORTERS),
+        timeout: Optional[float] = 120.0,
+        processes: bool = True,
+    ) -> None:
+        """Initialize BatchExporter.
+
+        Args:
+            max_workers: Files rendered at the same time (default: CPU count)
+            formats: Keys of exporters.scheduler.EXPORTERS to render per plan
+            timeout: Seconds one file may take to render (None: no limit)
+            processes: Render in worker processes (False: in threads, where
+                       timed-out renders cannot be stopped, only abandoned)
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.formats = formats
+        self.timeout = timeout
+        self.processes = processes
+
+    def export(
+        self,
+        results: Iterable[Union[dict, tuple[str, dict]]],
+        sink: Union[ZipSink, DirectorySink],
+        on_progress: Optional[Callable[[BatchReport], None]] = None,
+    ) -> BatchReport:
+        """Render every format of every result into a sink.
+
+        Args:
+            results: Results from AgentOrchestrator.run_all(), or (name,
+                     result) pairs; read lazily, so this may be a generator
+            sink: Where finished files go (see open_sink()); not closed here
+            on_progress: Called with the report after every finished file
+
+        Returns:
+            BatchReport of the batch
+        """
+        report = BatchReport()
+        started = time.perf_counter()
+        # Renders in flight: future -> (name, format, deadline)
+        in_flight: dict[Future, tuple[str, str, Optional[float]]] = {}
+        abandoned = False
+        executor = self._create_executor()
+        try:
+            for name, fmt, result in self._jobs(results):
+                # Backpressure: read the next result only when a worker is free
+                while len(in_flight) >= self.max_workers:
+                    abandoned |= self._collect(in_flight, sink, report, on_progress)
+                if self.processes:
+                    future = executor.submit(_export_job, fmt, result, self.timeout)
+                else:
+                    future = executor.submit(render_export, fmt, result)
+                in_flight[future] = (name, fmt, self._deadline())
+                report.jobs += 1
+            while in_flight:
+                abandoned |= self._collect(in_flight, sink, report, on_progress)
+        finally:
+            # Renders given up on (or left by an error) are not waited for
+            executor.shutdown(wait=not (in_flight or abandoned), cancel_futures=True)
+            report.seconds = time.perf_counter() - started
+        return report
+
+    def _jobs(self, results: Iterable[Union[dict, tuple[str, dict]]]) -> Iterator[tuple[str, str, dict]]:
+        """(file name stem, format, result) of every file to render."""
+        for index, item in enumerate(results, 1):
+            name, result = item if isinstance(item, tuple) else (f"plan_{index:04d}", item)
+            name = name.replace("/", "_").replace("\\", "_")
+            for fmt in self.formats:
+                yield name, fmt, result
+
+    def _deadline(self) -> Optional[float]:
+        """When the parent gives up on a render submitted now.
+
+        Worker processes stop their own render at the timeout; the grace
+        period only covers a worker that does not.
+        """
+        if self.timeout is None:
+            return None
+        return time.monotonic() + self.timeout + (TIMEOUT_GRACE_SECONDS if self.processes else 0.0)
+
+    def _collect(
+        self,
+        in_flight: dict[Future, tuple[str, str, Optional[float]]],
+        sink: Union[ZipSink, DirectorySink],
+        report: BatchReport,
+        on_progress: Optional[Callable[[BatchReport], None]],
+    ) -> bool:
+        """Wait for the next render to finish (or time out) and record it.
+
+        Returns:
+            Whether a render was given up on past its deadline
+        """
+        deadlines = [deadline for _, _, deadline in in_flight.values() if deadline is not None]
+        wait_seconds = max(min(deadlines) - time.monotonic(), 0.0) if deadlines else None
+        done, _ = wait(in_flight, timeout=wait_seconds, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            name, fmt, _ = in_flight.pop(future)
+            try:
+                content, export_format, *snapshot = future.result()
+            except Exception as e:
+                outcome = "timeout" if isinstance(e, TimeoutError) else "error"
+                report.failures.append((name, fmt, f"{type(e).__name__}: {e}"))
+            else:
+                if snapshot:
+                    METRICS.merge(snapshot[0])
+                sink.write(f"{name}.{export_format}", content)
+                report.succeeded += 1
+                report.bytes += len(content)
+                outcome = "ok"
+            BATCH_EXPORTS.inc(format=fmt, result=outcome)
+            if on_progress:
+                on_progress(report)
+
+        abandoned = False
+        now = time.monotonic()
+        for future, (name, fmt, deadline) in list(in_flight.items()):
+            if deadline is not None and now >= deadline and not future.done():
+                del in_flight[future]
+                future.cancel()
+                report.failures.append((name, fmt, f"TimeoutError: render exceeded {self.timeout:g}s"))
+                BATCH_EXPORTS.inc(format=fmt, result="timeout")
+                abandoned = True
+                if on_progress:
+                    on_progress(report)
+        return abandoned
+
+    def _create_executor(self) -> Executor:
+        if not self.processes:
+            return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch-export")
+        # Forking a process with running threads can deadlock; start clean ones
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+
+def _read_results(paths: list[str]) -> Iterator[tuple[str, dict]]:
+    """(name, result) of JSON files holding one result or a list of them."""
+    for path in paths:
+        stem = Path(path).stem
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            for index, result in enumerate(data, 1):
+                yield f"{stem}_{index:04d}", result
+        else:
+            yield stem, data
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Export saved run results (JSON) in a batch."""
+    parser = argparse.ArgumentParser(description="保存した生成結果（JSON）をまとめて Excel/PDF に出力します")
+    parser.add_argument("inputs", nargs="+", help="run_all() の結果の JSON（1件またはリスト）")
+    parser.add_argument("--output", required=True, help="出力先（.zip またはディレクトリ）")
+    parser.add_argument("--formats", nargs="+", default=list(EXPORTERS), choices=list(EXPORTERS))
+    parser.add_argument("--workers", type=int, default=None, help="並列数（既定: CPU コア数）")
+    parser.add_argument("--timeout", type=float, default=120.0, help="1ファイルの上限秒数")
+    args = parser.parse_args(argv)
+
+    exporter = BatchExporter(max_workers=args.workers, formats=tuple(args.formats), timeout=args.timeout)
+
+    def progress(report: BatchReport) -> None:
+        print(f"\r{report.summary()}", end="", flush=True)
+
+    sink = open_sink(args.output)
+    try:
+        report = exporter.export(_read_results(args.inputs), sink, on_progress=progress)
+    finally:
+        sink.close()
+    print(f"\r{report.summary()}")
+    for name, fmt, error in report.failures:
+        print(f"  ❌ {name} ({fmt}): {error}")
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
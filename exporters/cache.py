@@ -0,0 +1,239 @@
+"""Content-addressed cache of rendered exports.
+
+Streamlit reruns the results view on every interaction, and the HTTP
+service may be asked for the same export many times; rendering (above all
+WeasyPrint) is the most CPU-heavy thing the app does. ExportCache renders
+each (plan content, exporter, exporter version, options) combination at
+most once and keeps the bytes in a bounded in-memory LRU, optionally
+backed by a bounded directory on disk.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any, Optional
+
+from orchestrator.metrics import METRICS
+
+
+EXPORT_CACHE_REQUESTS = METRICS.counter(
+    "bpg_export_cache_requests_total", "Export cache lookups by format and result (hit, miss)", ("format", "result")
+)
+
+# Formats the exporters write, i.e. the extensions of the disk tier's files
+DISK_FORMATS = ("xlsx", "pdf", "html")
+
+
+def export_key(exporter: Any, result: dict) -> str:
+    """Cache key of rendering a result with an exporter.
+
+    Args:
+        exporter: ExcelExporter or PDFExporter (anything with VERSION and
+                  cache_options()), or its class to key the output of a new
+                  exporter without creating one (default_cache_options())
+        result: Result dictionary from AgentOrchestrator.run_all()
+
+    Returns:
+        SHA-256 hex digest of the plan content, exporter name, version and options
+    """
+    if isinstance(exporter, type):
+        name, options = exporter.__name__, exporter.default_cache_options()
+    else:
+        name, options = type(exporter).__name__, exporter.cache_options()
+    payload = {
+        "exporter": name,
+        "version": exporter.VERSION,
+        "options": options,
+        "business_plan": result.get("business_plan", ""),
+        "sections": result.get("sections", {}),
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ExportCache:
+    """LRU cache of rendered exports, safe to share across sessions and threads."""
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        """Initialize ExportCache.
+
+        Args:
+            max_bytes: Memory budget of the cached exports
+            directory: Optional directory to keep evicted and new exports in
+                       (survives restarts and is shared by processes)
+            max_disk_bytes: Size budget of the directory
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, tuple[bytes, str]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Keys being rendered, so concurrent requests render once
+        self._rendering: dict[str, threading.Lock] = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "ExportCache":
+        """Build a cache from BPG_EXPORT_CACHE_MB (memory budget, default 64)
+        and BPG_EXPORT_CACHE_DIR (optional disk tier).
+        """
+        return cls(
+            max_bytes=int(os.getenv("BPG_EXPORT_CACHE_MB", "64")) * 1024 * 1024,
+            directory=os.getenv("BPG_EXPORT_CACHE_DIR") or None,
+        )
+
+    @property
+    def size_bytes(self) -> int:
+        """Bytes held in memory."""
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_render(self, exporter: Any, result: dict) -> tuple[bytes, str]:
+        """Return a cached export, rendering it on the first request.
+
+        Args:
+            exporter: ExcelExporter or PDFExporter
+            result: Result dictionary from AgentOrchestrator.run_all()
+
+        Returns:
+            Tuple of (content, format written by the exporter)
+        """
+        key = export_key(exporter, result)
+
+        cached = self.get(key)
+        if cached is not None:
+            EXPORT_CACHE_REQUESTS.inc(format=cached[1], result="hit")
+            return cached
+
+        with self._lock:
+            render_lock = self._rendering.setdefault(key, threading.Lock())
+        with render_lock:
+            # Another thread may have rendered it while we waited
+            cached = self.get(key)
+            if cached is not None:
+                EXPORT_CACHE_REQUESTS.inc(format=cached[1], result="hit")
+                return cached
+            try:
+                buffer = BytesIO()
+                export_format = exporter.write(result, buffer)
+                entry = (buffer.getvalue(), export_format)
+                self.put(key, entry)
+            finally:
+                with self._lock:
+                    self._rendering.pop(key, None)
+        EXPORT_CACHE_REQUESTS.inc(format=export_format, result="miss")
+        return entry
+
+    def clear(self) -> None:
+        """Drop every in-memory entry (the directory is left as is)."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get(self, key: str) -> Optional[tuple[bytes, str]]:
+        """Cached (content, format) of an export_key(), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            self.put(key, entry, write_disk=False)
+        return entry
+
+    def put(self, key: str, entry: tuple[bytes, str], write_disk: bool = True) -> bool:
+        """Store (content, format) rendered elsewhere under an export_key().
+
+        Returns:
+            Whether get() can serve the entry (False if it is larger than
+            the memory budget and there is no disk tier to keep it in)
+        """
+        content, _ = entry
+        stored = len(content) <= self.max_bytes
+        if stored:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = entry
+                    self._size += len(content)
+                self._entries.move_to_end(key)
+                while self._size > self.max_bytes:
+                    _, (evicted, _) = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        if write_disk:
+            stored = self._write_disk(key, entry) or stored
+        return stored
+
+    def _disk_path(self, key: str, export_format: str) -> str:
+        return os.path.join(self.directory, f"{key}.{export_format}")
+
+    def _read_disk(self, key: str) -> Optional[tuple[bytes, str]]:
+        if not self.directory:
+            return None
+        # The key decides the file name, so a lookup never lists the directory
+        for export_format in DISK_FORMATS:
+            path = self._disk_path(key, export_format)
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+                os.utime(path)  # mark as recently used
+            except FileNotFoundError:
+                continue
+            except OSError:
+                return None
+            return content, export_format
+        return None
+
+    def _write_disk(self, key: str, entry: tuple[bytes, str]) -> bool:
+        """Write an entry to the directory; whether it is there afterwards."""
+        if not self.directory:
+            return False
+        content, export_format = entry
+        if export_format not in DISK_FORMATS:
+            return False
+        path = self._disk_path(key, export_format)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            self._trim_disk()
+        except OSError:
+            # The memory tier may still have the entry
+            return False
+        # Trimming deletes a file larger than the whole directory budget
+        return os.path.exists(path)
+
+    def _trim_disk(self) -> None:
+        """Delete least recently used files until the directory fits its budget."""
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
@@ -0,0 +1,185 @@
+"""Parse-once document model of a generated plan, shared by every renderer.
+
+The Excel and PDF exporters and the Streamlit result view all work from
+the same Markdown. PlanDocument parses it once into blocks, a section
+tree and a chapter index (and converts it to HTML once, on first use),
+and plan_document() keeps recent plans cached, so each format renders
+from the same structure and chapters can be looked up without re-reading
+the text.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Optional
+
+from exporters.markdown_blocks import (
+    Block,
+    Heading,
+    MarkdownBlockParser,
+    OutlineBuilder,
+    Section,
+    Table,
+)
+
+
+# Python-Markdown extensions of the HTML rendering
+MARKDOWN_EXTENSIONS = ["tables", "toc", "fenced_code"]
+
+# Plans kept parsed by plan_document()
+PLAN_DOCUMENT_CACHE_SIZE = 16
+
+# Section keys of a result, in the order of the Excel sheets
+SECTION_KEYS = ("market", "product", "finance", "gtm")
+
+
+@dataclass
+class Chapter:
+    """Part of a document from one ## heading to the next.
+
+    Attributes:
+        title: Heading text ("" for the text before the first chapter)
+        markdown: Markdown of the chapter, heading included
+        blocks: Parsed blocks of the chapter, heading included
+    """
+
+    title: str
+    markdown: str
+    blocks: list[Block] = field(default_factory=list)
+
+    @cached_property
+    def html(self) -> str:
+        """HTML of the chapter (converted on first use)."""
+        return to_html(self.markdown)
+
+
+class MarkdownDocument:
+    """One Markdown text, parsed once into blocks, chapters and a section tree."""
+
+    def __init__(self, markdown: str) -> None:
+        """Parse a Markdown document.
+
+        Args:
+            markdown: Document text
+        """
+        self.markdown = markdown
+        self.chapters = _split_chapters(markdown)
+        self.blocks: list[Block] = [block for chapter in self.chapters for block in chapter.blocks]
+        self._chapters_by_title = {chapter.title: chapter for chapter in self.chapters}
+
+    @cached_property
+    def outline(self) -> Section:
+        """Section tree of the document."""
+        builder = OutlineBuilder()
+        for block in self.blocks:
+            builder.add(block)
+        return builder.root
+
+    @cached_property
+    def html(self) -> str:
+        """HTML body of the document (converted on first use)."""
+        return to_html(self.markdown)
+
+    @property
+    def tables(self) -> list[Table]:
+        """Tables in document order."""
+        return [block for block in self.blocks if isinstance(block, Table)]
+
+    def chapter(self, title: str) -> Optional[Chapter]:
+        """Chapter with the given title (exact match first, then containing it)."""
+        chapter = self._chapters_by_title.get(title)
+        if chapter is not None:
+            return chapter
+        return next((c for c in self.chapters if c.title and title in c.title), None)
+
+
+class PlanDocument:
+    """Parsed business plan and sections of a run result."""
+
+    def __init__(self, business_plan: str, sections: Optional[dict] = None) -> None:
+        """Parse a plan and its sections.
+
+        Args:
+            business_plan: Integrated plan Markdown
+            sections: Section Markdown by key (market, product, finance, gtm)
+        """
+        self.plan = MarkdownDocument(business_plan)
+        self.sections = {key: MarkdownDocument(text or "") for key, text in (sections or {}).items()}
+
+    def section(self, key: str) -> MarkdownDocument:
+        """Parsed section (empty if the result has none)."""
+        document = self.sections.get(key)
+        if document is None:
+            document = self.sections[key] = MarkdownDocument("")
+        return document
+
+
+_cache: "OrderedDict[str, PlanDocument]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def plan_document(result: dict) -> PlanDocument:
+    """Parsed document of a run result, cached by content.
+
+    Args:
+        result: Result dictionary from AgentOrchestrator.run_all()
+
+    Returns:
+        PlanDocument shared by every caller rendering the same plan
+    """
+    business_plan = result.get("business_plan", "")
+    sections = {key: result.get("sections", {}).get(key, "") for key in SECTION_KEYS}
+    key = hashlib.sha256(
+        json.dumps([business_plan, sections], ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+    with _cache_lock:
+        document = _cache.get(key)
+        if document is not None:
+            _cache.move_to_end(key)
+            return document
+
+    # Parsed outside the lock; a concurrent parse of the same plan is harmless
+    document = PlanDocument(business_plan, sections)
+    with _cache_lock:
+        _cache[key] = document
+        while len(_cache) > PLAN_DOCUMENT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return document
+
+
+def to_html(markdown: str) -> str:
+    """Convert Markdown to an HTML body with MARKDOWN_EXTENSIONS."""
+    # Imported here: the Streamlit view and Excel export never need HTML
+    import markdown as md
+
+    return md.markdown(markdown, extensions=MARKDOWN_EXTENSIONS)
+
+
+def _split_chapters(markdown: str) -> list[Chapter]:
+    """Parse a document and split it at its ## headings.
+
+    Headings are recognized by the block parser, so "## " lines inside
+    code blocks do not start chapters. The first chapter holds the text
+    before the first ## heading (and may be empty).
+    """
+    lines = markdown.splitlines()
+    parser = MarkdownBlockParser()
+    chapters = [Chapter("", "")]
+    start = 0
+    for index, line in enumerate(lines):
+        blocks = parser.feed_line(line)
+        if blocks and isinstance(blocks[-1], Heading) and blocks[-1].level == 2:
+            # Blocks closed by the heading line still belong to the previous chapter
+            chapters[-1].blocks += blocks[:-1]
+            chapters[-1].markdown = "\n".join(lines[start:index])
+            chapters.append(Chapter(blocks[-1].text, "", [blocks[-1]]))
+            start = index
+        else:
+            chapters[-1].blocks += blocks
+    chapters[-1].blocks += parser.close()
+    chapters[-1].markdown = "\n".join(lines[start:])
+    return chapters
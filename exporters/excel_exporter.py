@@ -1,72 +1,239 @@
 """Excel exporter for business plan documents."""
 
+import unicodedata
+from copy import copy
 from io import BytesIO
+from typing import BinaryIO, Iterable, Optional
+
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from exporters.document import MarkdownDocument, plan_document
+from exporters.markdown_blocks import Block, CodeBlock, Heading, ListItem, Table, Text
+from orchestrator.metrics import EXPORT_SECONDS
+from orchestrator.profiling import profile
+from orchestrator.tracing import Tracer, span
+
+
+# Longest text Excel accepts in a cell
+MAX_CELL_CHARS = 32767
+
+# Width range of table columns (characters)
+MIN_COLUMN_WIDTH = 10
+MAX_COLUMN_WIDTH = 50
+
+_THIN = Side(style="thin", color="CCCCCC")
+_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+
+# Named styles, registered once per workbook and shared by all its cells
+STYLES = {
+    "bpg_title": {"font": Font(bold=True, size=14)},
+    "bpg_h1": {"font": Font(bold=True, size=14, color="1A3A52")},
+    "bpg_h2": {"font": Font(bold=True, size=12, color="2C5282")},
+    "bpg_h3": {"font": Font(bold=True, size=11, color="2D3748")},
+    "bpg_text": {},
+    "bpg_list": {},
+    "bpg_code": {"font": Font(name="Courier New", size=10)},
+    "bpg_table_header": {
+        "font": Font(bold=True, color="FFFFFF"),
+        "fill": PatternFill("solid", fgColor="2C5282"),
+        "border": _BORDER,
+        "alignment": Alignment(vertical="center", wrap_text=True),
+    },
+    "bpg_table_cell": {"border": _BORDER, "alignment": Alignment(vertical="top", wrap_text=True)},
+}
 
 
 class ExcelExporter:
-    """Export business plan to Excel format."""
+    """Export business plan to Excel format.
+    
+    Markdown headings, lists and text become styled rows, and tables
+    become real rows and columns with numbers, percentages and currency
+    amounts typed as numbers. The blocks come from the plan's shared
+    PlanDocument, so a plan already parsed for another format or the UI
+    is not parsed again. Sheets are written in openpyxl's write-only mode.
+    
+    Renders in memory (to_bytes()) or into any writable binary stream
+    (write()), so concurrent exports never share a file; export() writes
+    to a file path.
+    """
 
-    def __init__(self) -> None:
-        """Initialize ExcelExporter."""
-        self.workbook = Workbook()
-        self.workbook.remove(self.workbook.active)
+    # Bump when the rendered output changes, to invalidate cached exports
+    VERSION = "3"
+
+    def __init__(self, tracer: Optional[Tracer] = None) -> None:
+        """Initialize ExcelExporter.
+        
+        Args:
+            tracer: Optional tracer of the run, to record the export as a span
+        """
+        self.tracer = tracer
+        # Workbook of the last export
+        self.workbook: Optional[Workbook] = None
+        # Resolved style of each (named style, number format) in the workbook
+        self._styles: dict[tuple, object] = {}
 
     def export(self, result: dict, filename: str = "business_plan.xlsx") -> str:
-        """Export business plan to Excel.
+        """Export business plan to an Excel file.
         
         Args:
             result: Result dictionary from AgentOrchestrator.run_all()
                    Contains 'business_plan' and 'sections' keys
             filename: Output filename
-            
+        
         Returns:
             Path to created Excel file
         """
-        business_plan = result.get("business_plan", "")
-        sections = result.get("sections", {})
+        with open(filename, "wb") as f:
+            self.write(result, f)
+        return filename
+
+    def to_bytes(self, result: dict) -> bytes:
+        """Export business plan to Excel in memory.
         
-        # Create sheets
-        self._create_summary_sheet(business_plan)
-        self._create_section_sheet("市場分析", sections.get("market", ""))
-        self._create_section_sheet("プロダクト", sections.get("product", ""))
-        self._create_section_sheet("財務計画", sections.get("finance", ""))
-        self._create_section_sheet("GTM戦略", sections.get("gtm", ""))
+        Args:
+            result: Result dictionary from AgentOrchestrator.run_all()
         
-        # Save to file
-        self.workbook.save(filename)
-        return filename
+        Returns:
+            Contents of the .xlsx file
+        """
+        buffer = BytesIO()
+        self.write(result, buffer)
+        return buffer.getvalue()
 
-    def _create_summary_sheet(self, business_plan: str) -> None:
-        """Create summary sheet."""
-        ws = self.workbook.create_sheet("サマリー", 0)
+    def write(self, result: dict, stream: BinaryIO) -> str:
+        """Export business plan to Excel into a writable binary stream.
         
-        ws['A1'] = "事業計画書 - サマリー"
-        ws['A1'].font = Font(bold=True, size=14)
+        Args:
+            result: Result dictionary from AgentOrchestrator.run_all()
+                   Contains 'business_plan' and 'sections' keys
+            stream: Destination (e.g., BytesIO, an HTTP response body or an
+                    open file)
         
-        # Extract first 30 lines
-        lines = business_plan.split('\n')[:30]
-        row = 3
-        for line in lines:
-            if line.strip():
-                ws[f'A{row}'] = line[:100]
-                row += 1
+        Returns:
+            Format written ("xlsx")
+        """
+        with (
+            EXPORT_SECONDS.time(format="xlsx"),
+            span(self.tracer, "export", "export", format="xlsx"),
+            profile("excel_export", self.tracer.trace_id if self.tracer else None),
+        ):
+            self.workbook = Workbook(write_only=True)
+            self._styles = {}
+            for name, options in STYLES.items():
+                self.workbook.add_named_style(NamedStyle(name, **options))
+            
+            # Create sheets
+            document = plan_document(result)
+            self._create_summary_sheet(document.plan)
+            self._create_section_sheet("市場分析", document.section("market"))
+            self._create_section_sheet("プロダクト", document.section("product"))
+            self._create_section_sheet("財務計画", document.section("finance"))
+            self._create_section_sheet("GTM戦略", document.section("gtm"))
+            
+            self.workbook.save(stream)
+        return "xlsx"
+
+    def cache_options(self) -> dict:
+        """Options that change the output, for ExportCache keys."""
+        return self.default_cache_options()
+
+    @classmethod
+    def default_cache_options(cls) -> dict:
+        """cache_options() of a new exporter (the output has no options)."""
+        return {}
+
+    def _create_summary_sheet(self, plan: MarkdownDocument) -> None:
+        """Create summary sheet from the title and first chapter of the plan."""
+        blocks = [block for chapter in plan.chapters[:2] for block in chapter.blocks]
         
-        ws.column_dimensions['A'].width = 80
+        ws = self.workbook.create_sheet("サマリー")
+        self._set_column_widths(ws, blocks)
+        ws.append([self._cell(ws, "事業計画書 - サマリー", "bpg_title")])
+        ws.append([])
+        self._write_blocks(ws, blocks)
 
-    def _create_section_sheet(self, sheet_name: str, content: str) -> None:
+    def _create_section_sheet(self, sheet_name: str, section: MarkdownDocument) -> None:
         """Create sheet for each section."""
         ws = self.workbook.create_sheet(sheet_name)
         
-        if not content.strip():
-            ws['A1'] = f"{sheet_name}の内容なし"
+        if not section.markdown.strip():
+            ws.append([f"{sheet_name}の内容なし"])
             return
         
-        # Split by lines and write to cells
-        lines = content.split('\n')
-        for row_idx, line in enumerate(lines[:100], 1):
-            if line.strip():
-                ws[f'A{row_idx}'] = line[:200]
+        self._set_column_widths(ws, section.blocks)
+        self._write_blocks(ws, section.blocks)
+
+    def _write_blocks(self, ws, blocks: Iterable[Block]) -> None:
+        """Append blocks as styled rows; tables keep their columns."""
+        previous = None
+        for block in blocks:
+            if isinstance(block, Heading):
+                # Tables are already followed by a blank row
+                if previous is not None and not isinstance(previous, Table):
+                    ws.append([])
+                ws.append([self._cell(ws, block.text, f"bpg_h{min(block.level, 3)}")])
+            elif isinstance(block, Table):
+                ws.append([self._cell(ws, text, "bpg_table_header") for text in block.header])
+                for row in block.rows:
+                    ws.append(
+                        [self._cell(ws, cell.value, "bpg_table_cell", cell.number_format) for cell in row]
+                    )
+                ws.append([])
+            elif isinstance(block, ListItem):
+                text = f"{'    ' * block.level}{block.marker} {block.text}"
+                ws.append([self._cell(ws, text, "bpg_list")])
+            elif isinstance(block, CodeBlock):
+                for line in block.lines:
+                    ws.append([self._cell(ws, line, "bpg_code")])
+            elif isinstance(block, Text):
+                ws.append([self._cell(ws, block.text, "bpg_text")])
+            previous = block
+
+    def _cell(self, ws, value, style: str, number_format: Optional[str] = None) -> WriteOnlyCell:
+        """Write-only cell with a named style and optional number format."""
+        if isinstance(value, str) and len(value) > MAX_CELL_CHARS:
+            value = value[:MAX_CELL_CHARS]
+        cell = WriteOnlyCell(ws, value=value)
+        
+        # Resolve each style combination once, then copy it into cells
+        key = (style, number_format)
+        resolved = self._styles.get(key)
+        if resolved is None:
+            cell.style = style
+            if number_format:
+                cell.number_format = number_format
+            self._styles[key] = copy(cell._style)
+        else:
+            cell._style = copy(resolved)
+        return cell
+
+    @staticmethod
+    def _set_column_widths(ws, blocks: list[Block]) -> None:
+        """Size columns to the widest table cells.
         
-        ws.column_dimensions['A'].width = 100
+        Write-only sheets need their widths before the first row, so this
+        scans the tables before the blocks are written.
+        """
+        widths: dict[int, int] = {}
+        for block in blocks:
+            if not isinstance(block, Table):
+                continue
+            rows = [block.header] + [[cell.text for cell in row] for row in block.rows]
+            for row in rows:
+                for column, text in enumerate(row, 1):
+                    widths[column] = max(widths.get(column, 0), _display_width(text))
+        
+        for column, width in widths.items():
+            ws.column_dimensions[get_column_letter(column)].width = min(
+                max(width + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH
+            )
+        if not widths:
+            ws.column_dimensions["A"].width = 100
+
+
+def _display_width(text: str) -> int:
+    """Width of text in half-width characters (CJK characters count two)."""
+    return sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
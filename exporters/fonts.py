@@ -0,0 +1,160 @@
+"""Local fonts of PDF exports, so rendering never fetches anything over the network.
+
+No fonts ship with the repository: Noto Sans JP is optional and has to be
+supplied. PDF exports use the files in BPG_FONT_DIR if set, otherwise
+those placed in exporters/fonts/. Build subsets from the full Noto Sans JP
+fonts (SIL Open Font License 1.1, keep OFL.txt next to them) with:
+
+    python -m exporters.fonts NotoSansJP-Regular.otf NotoSansJP-Bold.otf \\
+        --text demo_outputs.zip
+
+The subsets keep JIS X 0208 (kana, level 1 and 2 kanji, symbols), ASCII,
+and every character of the sample texts given with --text, and are a
+fraction of the size of the full fonts. The character set is fixed when
+the subsets are built, not taken from the plans being exported: a
+character outside it is drawn with the next font of the stack that has
+it (a system font), if there is one. WeasyPrint then embeds
+only the glyphs a document uses. Without local files, fonts installed on
+the system are picked by family name (see PDFExporter.CSS_STYLE).
+"""
+
+import argparse
+import os
+import sys
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+FONT_FAMILY = "Noto Sans JP"
+
+# Default directory of the supplied fonts (empty in the repository)
+LOCAL_FONT_DIR = Path(__file__).with_name("fonts")
+
+# File names of each weight, in lookup order
+FONT_FILES = {
+    400: ("NotoSansJP-Regular.subset.otf", "NotoSansJP-Regular.otf", "NotoSansJP-Regular.ttf"),
+    700: ("NotoSansJP-Bold.subset.otf", "NotoSansJP-Bold.otf", "NotoSansJP-Bold.ttf"),
+}
+
+
+@lru_cache(maxsize=None)
+def font_files(directory: Optional[str] = None) -> dict[int, Path]:
+    """Local Noto Sans JP files by weight (looked up once per process).
+
+    Args:
+        directory: Directory to search (default: BPG_FONT_DIR, then
+                   exporters/fonts/)
+
+    Returns:
+        Path of each weight found (empty if there are no local fonts)
+    """
+    if directory is None:
+        directory = os.getenv("BPG_FONT_DIR") or str(LOCAL_FONT_DIR)
+    found = {}
+    for weight, names in FONT_FILES.items():
+        path = next((Path(directory, name) for name in names if Path(directory, name).is_file()), None)
+        if path is not None:
+            found[weight] = path.resolve()
+    return found
+
+
+def font_face_css(files: dict[int, Path]) -> str:
+    """@font-face rules of local font files.
+
+    Args:
+        files: Font file of each weight (see font_files())
+
+    Returns:
+        CSS declaring the files as FONT_FAMILY
+    """
+    return "".join(
+        f"@font-face {{ font-family: '{FONT_FAMILY}'; font-weight: {weight}; "
+        f"src: url('{path.as_uri()}'); }}\n"
+        for weight, path in sorted(files.items())
+    )
+
+
+def jis_characters() -> str:
+    """ASCII and every character of JIS X 0208 (kana, level 1 and 2 kanji, symbols)."""
+    characters = [chr(code) for code in range(0x20, 0x7F)]
+    for first in range(0xA1, 0xFF):
+        for second in range(0xA1, 0xFF):
+            try:
+                characters.append(bytes((first, second)).decode("euc_jp"))
+            except UnicodeDecodeError:
+                continue
+    return "".join(characters)
+
+
+def sample_characters(paths: Iterable[str]) -> str:
+    """Characters of sample texts (files, or every file of .zip archives)."""
+    characters: set[str] = set()
+    for path in paths:
+        if path.endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                for name in archive.namelist():
+                    characters.update(archive.read(name).decode("utf-8", errors="ignore"))
+        else:
+            characters.update(Path(path).read_text(encoding="utf-8", errors="ignore"))
+    return "".join(sorted(characters))
+
+
+def subset_font(source: Path, destination: Path, characters: str) -> int:
+    """Write a subset of a font with only the glyphs of some characters.
+
+    Args:
+        source: Full font (.otf or .ttf)
+        destination: Subset font to write
+        characters: Characters to keep
+
+    Returns:
+        Size of the subset in bytes
+    """
+    # fontTools is installed with WeasyPrint; only needed to build subsets
+    from fontTools import subset
+
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    font = subset.load_font(str(source), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=characters)
+    subsetter.subset(font)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    subset.save_font(font, str(destination), options)
+    font.close()
+    return destination.stat().st_size
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Build font subsets (into exporters/fonts/ by default) from full Noto Sans JP fonts."""
+    parser = argparse.ArgumentParser(description="Noto Sans JP のサブセットフォントを作成します")
+    parser.add_argument("regular", help="NotoSansJP-Regular.otf")
+    parser.add_argument("bold", help="NotoSansJP-Bold.otf")
+    parser.add_argument(
+        "--text", nargs="*", default=[], help="文字を収集するサンプル（.md / .html / .zip）"
+    )
+    parser.add_argument(
+        "--text-only", action="store_true", help="JIS X 0208 を含めず、サンプルの文字だけを残す"
+    )
+    parser.add_argument("--output", default=str(LOCAL_FONT_DIR), help="出力先ディレクトリ")
+    args = parser.parse_args(argv)
+
+    characters = sample_characters(args.text)
+    if not args.text_only:
+        characters += jis_characters()
+    for source, weight in ((args.regular, 400), (args.bold, 700)):
+        source = Path(source)
+        destination = Path(args.output, FONT_FILES[weight][0])
+        size = subset_font(source, destination, characters)
+        print(
+            f"{destination}: {size / 1024:,.0f} KB "
+            f"(元 {source.stat().st_size / 1024:,.0f} KB, {len(set(characters)):,} 文字)"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
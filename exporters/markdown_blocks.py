@@ -0,0 +1,513 @@
+"""Line-based parser of the Markdown the agents write, for structured exports.
+
+Splits a document into headings, tables, list items, code blocks and
+text lines, in one pass over the lines. Table cells are typed: numbers,
+percentages, currency amounts and Japanese unit amounts (e.g. "5,000億円",
+"▲1,200万円", "10.5%") become numeric values plus a spreadsheet number
+format that shows them as written.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional, Union
+
+
+# Unit suffixes kept as a number format instead of text, longest first
+UNIT_SUFFIXES = (
+    "百万円", "千万円", "兆円", "億円", "万円", "千円", "円",
+    "ドル", "ヶ月", "か月", "カ月", "社", "人", "件", "倍",
+)
+
+# Currency prefixes kept as a number format
+CURRENCY_PREFIXES = ("US$", "$", "¥", "￥")
+
+# Negative markers used in Japanese financial statements
+NEGATIVE_MARKERS = ("-", "−", "▲", "△")
+
+# ASCII digits only: str.isdigit() also accepts "①" and "²", which int() rejects
+DIGITS = re.compile(r"[0-9]+")
+
+
+@dataclass
+class Cell:
+    """Table cell.
+
+    Attributes:
+        text: Cell text without inline Markdown
+        value: Number for numeric cells, otherwise the text
+        number_format: Spreadsheet number format showing the value as
+                       written (None for text)
+    """
+
+    text: str
+    value: Union[int, float, str]
+    number_format: Optional[str] = None
+
+
+@dataclass
+class Heading:
+    """ATX heading (# ... ######)."""
+
+    level: int
+    text: str
+
+
+@dataclass
+class Text:
+    """Non-blank line of a paragraph or blockquote."""
+
+    text: str
+
+
+@dataclass
+class ListItem:
+    """Bullet or numbered list item.
+
+    Attributes:
+        text: Item text without its marker
+        level: Nesting level (0 for top-level items)
+        marker: "•" for bullets, e.g. "1." for numbered items
+    """
+
+    text: str
+    level: int
+    marker: str
+
+
+@dataclass
+class CodeBlock:
+    """Fenced code block."""
+
+    lines: list[str]
+    language: str = ""
+
+
+@dataclass
+class Table:
+    """Pipe table with typed cells.
+
+    Attributes:
+        header: Header cell texts
+        rows: Body rows, padded to the header's width
+        alignments: "left", "center", "right" or None per column
+    """
+
+    header: list[str]
+    rows: list[list[Cell]] = field(default_factory=list)
+    alignments: list[Optional[str]] = field(default_factory=list)
+
+
+Block = Union[Heading, Text, ListItem, CodeBlock, Table]
+
+
+def plain_text(text: str) -> str:
+    """Text without inline Markdown (emphasis, code spans, links, <br>)."""
+    for marker in ("**", "__", "~~", "`"):
+        text = text.replace(marker, "")
+    text = text.replace("<br>", "\n").replace("<br/>", "\n").replace("<br />", "\n")
+
+    # [label](url) -> label
+    start = text.find("](")
+    while start != -1:
+        open_bracket = text.rfind("[", 0, start)
+        close_paren = text.find(")", start)
+        if open_bracket == -1 or close_paren == -1:
+            break
+        text = text[:open_bracket] + text[open_bracket + 1:start] + text[close_paren + 1:]
+        start = text.find("](", open_bracket)
+    return text.strip()
+
+
+def parse_cell(text: str) -> Cell:
+    """Type a table cell.
+
+    Args:
+        text: Raw cell text (may contain inline Markdown)
+
+    Returns:
+        Cell with a numeric value and number format if the text is a
+        number, percentage, currency or unit amount
+    """
+    text = plain_text(text)
+    number = parse_number(text)
+    if number is None:
+        return Cell(text, text)
+    value, number_format = number
+    return Cell(text, value, number_format)
+
+
+def parse_number(text: str) -> Optional[tuple[Union[int, float], str]]:
+    """Parse a number as written in a financial table.
+
+    Args:
+        text: e.g. "1,500", "10.5%", "$3.2", "5,000億円", "▲1,200万円", "(300)"
+
+    Returns:
+        Tuple of (value, number format), or None if the text is not a number
+    """
+    body = text.strip().replace(" ", "")
+    if not body:
+        return None
+
+    negative_marker = ""
+    parenthesized = body.startswith("(") and body.endswith(")")
+    if parenthesized:
+        body = body[1:-1]
+    elif body.startswith("+"):
+        body = body[1:]
+    elif body.startswith(NEGATIVE_MARKERS):
+        negative_marker, body = body[0], body[1:]
+
+    prefix = next((p for p in CURRENCY_PREFIXES if body.startswith(p)), "")
+    body = body[len(prefix):]
+    percent = body.endswith("%")
+    suffix = "%" if percent else next((s for s in UNIT_SUFFIXES if body.endswith(s)), "")
+    body = body[: len(body) - len(suffix)]
+
+    # Digits with optional thousands separators and one decimal point
+    integer, _, decimals = body.partition(".")
+    grouped = "," in integer
+    groups = integer.split(",")
+    if (
+        not integer
+        or (decimals and not DIGITS.fullmatch(decimals))
+        or not all(DIGITS.fullmatch(g) for g in groups)
+    ):
+        return None
+    if grouped and (len(groups[0]) > 3 or any(len(g) != 3 for g in groups[1:])):
+        return None
+
+    digits = integer.replace(",", "")
+    value: Union[int, float] = float(f"{digits}.{decimals}") if decimals else int(digits)
+    if percent:
+        value = value / 100
+    if negative_marker or parenthesized:
+        value = -value
+
+    number_format = ("#,##0" if grouped else "0") + ("." + "0" * len(decimals) if decimals else "")
+    if percent:
+        number_format += "%"
+    else:
+        if prefix:
+            number_format = f'"{prefix}"{number_format}'
+        if suffix:
+            number_format = f'{number_format}"{suffix}"'
+    if parenthesized:
+        number_format = f"{number_format};({number_format})"
+    elif negative_marker in ("▲", "△"):
+        number_format = f'{number_format};"{negative_marker}"{number_format}'
+    return value, number_format
+
+
+class MarkdownBlockParser:
+    """Turns Markdown lines into blocks, one line at a time."""
+
+    def __init__(self) -> None:
+        self._table: Optional[Table] = None
+        # First row of a possible table, until the separator row confirms it
+        self._table_candidate: Optional[str] = None
+        self._code: Optional[CodeBlock] = None
+        self._fence = ""
+
+    def feed_line(self, line: str) -> list[Block]:
+        """Parse the next line.
+
+        Args:
+            line: One line without its line break
+
+        Returns:
+            Blocks completed by this line (tables complete on the first
+            line after them)
+        """
+        blocks: list[Block] = []
+        stripped = line.strip()
+
+        if self._code is not None:
+            if stripped.startswith(self._fence):
+                blocks.append(self._code)
+                self._code = None
+            else:
+                self._code.lines.append(line)
+            return blocks
+
+        if self._table_candidate is not None:
+            candidate, self._table_candidate = self._table_candidate, None
+            if is_separator_row(stripped):
+                header = [plain_text(cell) for cell in split_row(candidate)]
+                alignments = [_alignment(cell) for cell in split_row(stripped)]
+                self._table = Table(header, alignments=alignments)
+                return blocks
+            blocks.append(Text(plain_text(candidate)))
+
+        if self._table is not None:
+            if stripped.startswith("|"):
+                width = len(self._table.header)
+                cells = [parse_cell(cell) for cell in split_row(stripped)][:width]
+                cells += [Cell("", "") for _ in range(width - len(cells))]
+                self._table.rows.append(cells)
+                return blocks
+            blocks.append(self._table)
+            self._table = None
+
+        if not stripped or _is_rule(stripped):
+            return blocks
+        if stripped.startswith(("```", "~~~")):
+            self._fence = stripped[:3]
+            self._code = CodeBlock([], stripped[3:].strip())
+        elif stripped.startswith("|"):
+            self._table_candidate = stripped
+        elif stripped.startswith("#"):
+            level = len(stripped) - len(stripped.lstrip("#"))
+            if level <= 6 and stripped[level:level + 1] in (" ", ""):
+                blocks.append(Heading(level, plain_text(stripped[level:].strip().rstrip("#"))))
+            else:
+                blocks.append(Text(plain_text(stripped)))
+        else:
+            item = _list_item(line)
+            if item is not None:
+                blocks.append(item)
+            else:
+                blocks.append(Text(plain_text(stripped.lstrip(">").strip() if stripped.startswith(">") else stripped)))
+        return blocks
+
+    def close(self) -> list[Block]:
+        """Blocks still open at the end of the document."""
+        blocks: list[Block] = []
+        if self._table_candidate is not None:
+            blocks.append(Text(plain_text(self._table_candidate)))
+        if self._table is not None:
+            blocks.append(self._table)
+        if self._code is not None:
+            blocks.append(self._code)
+        self._table_candidate = self._table = self._code = None
+        return blocks
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Block]:
+    """Parse Markdown lines into blocks as they complete.
+
+    Only the block being parsed is held in memory, so long documents can
+    be converted while they are read.
+
+    Args:
+        lines: Document lines (line breaks are stripped)
+
+    Yields:
+        Blocks in document order
+    """
+    parser = MarkdownBlockParser()
+    for line in lines:
+        yield from parser.feed_line(line.rstrip("\r\n"))
+    yield from parser.close()
+
+
+def parse_blocks(markdown: str) -> list[Block]:
+    """Parse a Markdown document into blocks.
+
+    Args:
+        markdown: Document text
+
+    Returns:
+        Blocks in document order
+    """
+    return list(iter_blocks(markdown.splitlines()))
+
+
+@dataclass
+class Section:
+    """Heading and the blocks under it, before the next heading of the
+    same or a higher level.
+
+    Attributes:
+        level: Heading level (0 for the document root)
+        title: Heading text ("" for the document root)
+        blocks: Blocks directly under the heading
+        children: Subsections
+    """
+
+    level: int
+    title: str
+    blocks: list[Block] = field(default_factory=list)
+    children: list["Section"] = field(default_factory=list)
+
+    def find(self, title: str) -> Optional["Section"]:
+        """First section (depth-first) whose title contains title."""
+        for child in self.children:
+            if title in child.title:
+                return child
+            found = child.find(title)
+            if found is not None:
+                return found
+        return None
+
+
+class OutlineBuilder:
+    """Builds the section tree of blocks added in document order."""
+
+    def __init__(self) -> None:
+        self.root = Section(0, "")
+        # Sections still open for blocks, from the root down
+        self._open: list[Section] = [self.root]
+
+    @property
+    def current(self) -> Section:
+        """Section the next block goes into (the root before the first heading)."""
+        return self._open[-1]
+
+    def add(self, block: Block) -> None:
+        """Add the next block: headings open a section, other blocks join the current one."""
+        if isinstance(block, Heading):
+            while self._open[-1].level >= block.level:
+                self._open.pop()
+            section = Section(block.level, block.text)
+            self._open[-1].children.append(section)
+            self._open.append(section)
+        else:
+            self._open[-1].blocks.append(block)
+
+
+class MarkdownStreamParser:
+    """Parses Markdown while it streams in, from arbitrary text deltas.
+
+    Each delta is scanned once for line breaks and every completed line
+    goes through MarkdownBlockParser, so the cost is linear in the text
+    and a block is available as soon as its last line has arrived. The
+    result is the same as parse_blocks() on the whole text.
+
+    Parsing is a preview and never fails the stream: a line the parser
+    cannot handle is kept as a Text block of its raw text.
+
+    Attributes:
+        blocks: Completed blocks in document order
+        outline: Section tree of the blocks
+        closed: Whether close() has been called
+        errors: Lines kept as raw text because the parser failed on them
+    """
+
+    def __init__(self) -> None:
+        self._parser = MarkdownBlockParser()
+        # Pieces of the line being received
+        self._partial: list[str] = []
+        self.blocks: list[Block] = []
+        self._outline = OutlineBuilder()
+        self.outline = self._outline.root
+        self.closed = False
+        self.errors = 0
+
+    def feed(self, delta: str) -> list[Block]:
+        """Parse the next piece of the stream.
+
+        Args:
+            delta: Text delta, split anywhere (even inside a line)
+
+        Returns:
+            Blocks completed by this delta
+        """
+        completed: list[Block] = []
+        start = 0
+        end = delta.find("\n")
+        while end != -1:
+            if self._partial:
+                self._partial.append(delta[start:end])
+                line = "".join(self._partial)
+                self._partial = []
+            else:
+                line = delta[start:end]
+            completed += self._feed_line(line.rstrip("\r"))
+            start = end + 1
+            end = delta.find("\n", start)
+        if start < len(delta):
+            self._partial.append(delta[start:])
+        self._add(completed)
+        return completed
+
+    def close(self) -> list[Block]:
+        """Finish the stream.
+
+        Returns:
+            Blocks completed by its last line
+        """
+        if self.closed:
+            return []
+        completed: list[Block] = []
+        if self._partial:
+            line = "".join(self._partial)
+            self._partial = []
+            completed += self._feed_line(line.rstrip("\r"))
+        try:
+            completed += self._parser.close()
+        except Exception:
+            self.errors += 1
+        self.closed = True
+        self._add(completed)
+        return completed
+
+    @property
+    def tables(self) -> list[Table]:
+        """Completed tables in document order."""
+        return [block for block in self.blocks if isinstance(block, Table)]
+
+    @property
+    def current_section(self) -> Section:
+        """Section the stream is in (the root before the first heading)."""
+        return self._outline.current
+
+    def _feed_line(self, line: str) -> list[Block]:
+        """MarkdownBlockParser.feed_line(), with the raw line as a fallback."""
+        try:
+            return self._parser.feed_line(line)
+        except Exception:
+            self.errors += 1
+            return [Text(line.strip())] if line.strip() else []
+
+    def _add(self, blocks: list[Block]) -> None:
+        """Append completed blocks to the block list and section tree."""
+        for block in blocks:
+            self.blocks.append(block)
+            self._outline.add(block)
+
+
+def split_row(row: str) -> list[str]:
+    """Cells of a pipe table row (escaped pipes stay in the cell)."""
+    row = row.strip()
+    if row.startswith("|"):
+        row = row[1:]
+    if row.endswith("|") and not row.endswith("\\|"):
+        row = row[:-1]
+    # Escaped pipes are kept out of the split
+    cells = row.replace("\\|", "\0").split("|")
+    return [cell.replace("\0", "|").strip() for cell in cells]
+
+
+def is_separator_row(row: str) -> bool:
+    """Whether a line is a table's |---|:--:| row."""
+    return row.startswith("|") and "-" in row and all(char in "|-: " for char in row)
+
+
+def _alignment(cell: str) -> Optional[str]:
+    if cell.startswith(":") and cell.endswith(":"):
+        return "center"
+    if cell.endswith(":"):
+        return "right"
+    if cell.startswith(":"):
+        return "left"
+    return None
+
+
+def _is_rule(line: str) -> bool:
+    """Whether a line is a thematic break (---, ***, ___)."""
+    compact = line.replace(" ", "")
+    return len(compact) >= 3 and compact[0] in "-*_" and compact == compact[0] * len(compact)
+
+
+def _list_item(line: str) -> Optional[ListItem]:
+    """List item of a line, or None."""
+    expanded = line.expandtabs(4)
+    stripped = expanded.lstrip(" ")
+    level = (len(expanded) - len(stripped)) // 2
+    if stripped[:2] in ("- ", "* ", "+ "):
+        return ListItem(plain_text(stripped[2:]), level, "•")
+    number, _, rest = stripped.partition(" ")
+    if len(number) >= 2 and DIGITS.fullmatch(number[:-1]) and number[-1] in ".)" and rest:
+        return ListItem(plain_text(rest), level, number)
+    return None
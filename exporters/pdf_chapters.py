@@ -0,0 +1,249 @@
+"""Parallel PDF rendering of long plans, one ## chapter per worker process.
+
+WeasyPrint lays out a document on a single core, so a long plan takes
+many seconds in one render. ChapterRenderer lays out the text before the
+first chapter and every ## chapter in a pool of worker processes, then
+merges the parts in order with pypdf:
+
+- the plan's 目次 chapter is replaced by a table of contents listing
+  the first page of every chapter,
+- page numbers are stamped from one render of blank pages that carry
+  only the page footer, so they run on continuously across the parts,
+- the bookmarks of every part are kept, pointing at their merged pages.
+
+pypdf is optional; without it PDFExporter renders in a single pass.
+"""
+
+import html
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, wraps
+from io import BytesIO
+from typing import Any, Callable, Optional
+
+from exporters.document import Chapter, MarkdownDocument
+
+
+# Title of the generated table of contents (and of the chapter it replaces)
+TOC_TITLE = "目次"
+
+# Parts are laid out without the page footer; it is stamped on after merging
+PART_CSS = """
+@page { @bottom-center { content: none; } }
+
+table.toc { page-break-inside: auto; }
+table.toc td { border: none; padding: 4pt 0; }
+table.toc tr:nth-child(even) { background-color: transparent; }
+table.toc td.toc-page { text-align: right; width: 15%; }
+"""
+
+# Tries at sizing the table of contents (its own length moves the page numbers)
+TOC_LAYOUT_ATTEMPTS = 3
+
+
+def thread_cached(build: Callable[[], Any]) -> Callable[[], Any]:
+    """Cache a no-argument function's result once per thread.
+
+    WeasyPrint's FontConfiguration (and every stylesheet parsed with it)
+    is not thread-safe, and the HTTP service renders exports on its
+    request threads, so each thread builds and reuses its own.
+
+    Args:
+        build: Function building the value
+
+    Returns:
+        Function returning the calling thread's value
+    """
+    local = threading.local()
+
+    @wraps(build)
+    def cached() -> Any:
+        try:
+            return local.value
+        except AttributeError:
+            local.value = build()
+            return local.value
+
+    return cached
+
+
+def pypdf_available() -> bool:
+    """Whether pypdf, needed to merge the parts, can be imported."""
+    try:
+        import pypdf  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+@thread_cached
+def _part_stylesheet():
+    """PART_CSS parsed once per thread (with the thread's font configuration)."""
+    from weasyprint import CSS
+    from exporters.pdf_exporter import weasyprint_context
+
+    return CSS(string=PART_CSS, font_config=weasyprint_context()[1])
+
+
+def _render_part(html_document: str, footer: bool = False) -> tuple[bytes, int]:
+    """Render an HTML document to PDF with the exporter's stylesheet.
+
+    Args:
+        html_document: Complete HTML document
+        footer: Keep the page-number footer (only for the page-number stamps)
+
+    Returns:
+        Tuple of (PDF bytes, number of pages)
+    """
+    from weasyprint import HTML
+    from exporters.pdf_exporter import weasyprint_context
+
+    stylesheet, font_config = weasyprint_context()
+    stylesheets = [stylesheet] if footer else [stylesheet, _part_stylesheet()]
+    document = HTML(string=html_document).render(stylesheets=stylesheets, font_config=font_config)
+    return document.write_pdf(), len(document.pages)
+
+
+class ChapterRenderer:
+    """Renders the chapters of a plan in parallel and merges them into one PDF."""
+
+    def __init__(self, max_workers: Optional[int] = None, processes: bool = True) -> None:
+        """Initialize ChapterRenderer.
+
+        Args:
+            max_workers: Chapters rendered at the same time (default: CPU count)
+            processes: Render in worker processes (False: in threads)
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.processes = processes
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["ChapterRenderer"]:
+        """Build a renderer from BPG_PDF_WORKERS ("auto" for the CPU count).
+
+        Returns:
+            None if BPG_PDF_WORKERS is unset or below 2, or pypdf is missing
+        """
+        value = os.getenv("BPG_PDF_WORKERS", "0").strip().lower()
+        workers = (os.cpu_count() or 1) if value == "auto" else int(value or 0)
+        if workers < 2 or not pypdf_available():
+            return None
+        return cls(max_workers=workers)
+
+    def render(self, plan: MarkdownDocument, create_html: Callable[[str], str]) -> bytes:
+        """Render a plan chapter by chapter and merge the parts.
+
+        Args:
+            plan: Parsed plan
+            create_html: Builds a complete HTML document from an HTML body
+
+        Returns:
+            PDF bytes of the whole plan
+        """
+        from pypdf import PdfReader, PdfWriter
+
+        parts = [chapter for chapter in plan.chapters if chapter.markdown.strip()]
+        toc = next((i for i, chapter in enumerate(parts) if chapter.title == TOC_TITLE), None)
+        if toc is not None:
+            del parts[toc]
+        else:
+            # After the title block, or first if the plan starts with a chapter
+            toc = 1 if parts and not parts[0].title else 0
+
+        futures = [self._submit(create_html(chapter.html)) for chapter in parts]
+        rendered = [future.result() for future in futures]
+
+        toc_part = self._render_toc(parts, rendered, toc, create_html)
+        rendered.insert(toc, toc_part)
+        total = sum(pages for _, pages in rendered)
+
+        stamps, stamp_pages = _render_part(create_html(_blank_pages(total)), footer=True)
+        if stamp_pages != total:
+            raise RuntimeError(f"page-number stamps cover {stamp_pages} of {total} pages")
+
+        writer = PdfWriter()
+        for pdf, _ in rendered:
+            writer.append(PdfReader(BytesIO(pdf)))
+        for page, stamp in zip(writer.pages, PdfReader(BytesIO(stamps)).pages):
+            page.merge_page(stamp)
+        writer.add_metadata({"/Title": "事業計画書"})
+
+        buffer = BytesIO()
+        writer.write(buffer)
+        return buffer.getvalue()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _render_toc(
+        self,
+        parts: list[Chapter],
+        rendered: list[tuple[bytes, int]],
+        position: int,
+        create_html: Callable[[str], str],
+    ) -> tuple[bytes, int]:
+        """Render the table of contents, with each chapter's first page."""
+        before = sum(pages for _, pages in rendered[:position])
+        toc_pages = 1
+        for _ in range(TOC_LAYOUT_ATTEMPTS):
+            entries = []
+            page = before + toc_pages + 1
+            for chapter, (_, pages) in zip(parts[position:], rendered[position:]):
+                entries.append((chapter.title, page))
+                page += pages
+            pdf, pages = _render_part(create_html(_toc_html(entries)))
+            if pages == toc_pages:
+                break
+            toc_pages = pages
+        return pdf, pages
+
+    def _submit(self, html_document: str) -> Future:
+        """Submit a part to the worker pool."""
+        with self._lock:
+            for attempt in range(2):
+                if self._executor is None:
+                    self._executor = self._create_executor()
+                try:
+                    return self._executor.submit(_render_part, html_document)
+                except BrokenProcessPool:
+                    # A worker died (e.g., killed for memory); start a fresh pool
+                    self._executor = None
+                    if attempt:
+                        raise
+
+    def _create_executor(self) -> Executor:
+        if not self.processes:
+            return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pdf-chapter")
+        # Forking a process with running threads can deadlock; start clean ones
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+
+def _toc_html(entries: list[tuple[str, int]]) -> str:
+    """HTML body of a table of contents."""
+    rows = "".join(
+        f'<tr><td>{html.escape(title)}</td><td class="toc-page">{page}</td></tr>'
+        for title, page in entries
+    )
+    return f'<h2>{TOC_TITLE}</h2>\n<table class="toc">{rows}</table>'
+
+
+def _blank_pages(count: int) -> str:
+    """HTML body of count empty pages."""
+    return '<div style="page-break-before: always"></div>'.join(["<div></div>"] * count)
+
+
+@lru_cache(maxsize=1)
+def default_chapter_renderer() -> Optional[ChapterRenderer]:
+    """Process-wide ChapterRenderer configured by BPG_PDF_WORKERS (None when off)."""
+    return ChapterRenderer.from_env()
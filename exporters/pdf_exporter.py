@@ -1,34 +1,50 @@
 """PDF exporter for business plan documents."""
 
+import time
+from functools import lru_cache
 from io import BytesIO
-from typing import Optional
+from typing import BinaryIO, Optional
 
-import markdown as md
+from exporters.document import MarkdownDocument, plan_document
+from exporters.fonts import font_face_css, font_files
+from exporters.pdf_chapters import ChapterRenderer, default_chapter_renderer, thread_cached
+from orchestrator.metrics import EXPORT_BYTES, EXPORT_SECONDS
+from orchestrator.profiling import profile
+from orchestrator.tracing import Tracer, span
 
 
 class PDFExporter:
     """Export business plan to PDF format.
     
-    Converts Markdown to HTML, then to PDF with styled formatting.
+    Renders the HTML of the plan's shared PlanDocument to PDF with
+    styled formatting, using local fonts only (see exporters.fonts) and a
+    stylesheet parsed once per thread. Long plans can be rendered chapter
+    by chapter in worker processes (see exporters.pdf_chapters).
     Falls back to HTML download if PDF generation is not available.
+    Renders in memory (to_bytes()) or into any writable binary stream
+    (write()); export() writes to a file path.
     """
 
+    # Bump when the rendered output changes, to invalidate cached exports
+    VERSION = "2"
+
+    # Fewest chapters worth rendering in parallel
+    PARALLEL_MIN_CHAPTERS = 3
+
     # CSS Styling
     CSS_STYLE = """
-    @import url('https://fonts.googleapis.com/css2?family=Noto+Sans+JP:wght@400;700&display=swap');
-    
     @page {
         size: A4;
         margin: 20mm;
         @bottom-center {
             content: "- " counter(page) " -";
-            font-family: 'Noto Sans JP', sans-serif;
+            font-family: 'Noto Sans JP', 'Noto Sans CJK JP', 'Hiragino Sans', 'Yu Gothic', 'Meiryo', sans-serif;
             font-size: 10pt;
         }
     }
     
     body {
-        font-family: 'Noto Sans JP', sans-serif;
+        font-family: 'Noto Sans JP', 'Noto Sans CJK JP', 'Hiragino Sans', 'Yu Gothic', 'Meiryo', sans-serif;
         font-size: 11pt;
         line-height: 1.8;
         color: #333;
@@ -131,8 +147,20 @@ class PDFExporter:
     }
     """
 
-    def __init__(self) -> None:
-        """Initialize PDFExporter."""
+    def __init__(
+        self,
+        tracer: Optional[Tracer] = None,
+        chapter_renderer: Optional[ChapterRenderer] = None,
+    ) -> None:
+        """Initialize PDFExporter.
+        
+        Args:
+            tracer: Optional tracer of the run, to record the export as a span
+            chapter_renderer: Renders chapters in parallel (default: the
+                              process-wide one of BPG_PDF_WORKERS, if set)
+        """
+        self.tracer = tracer
+        self.chapter_renderer = chapter_renderer or default_chapter_renderer()
         self._weasyprint_available = self._check_weasyprint()
 
     def _check_weasyprint(self) -> bool:
@@ -141,15 +169,10 @@ class PDFExporter:
         Returns:
             True if weasyprint can be imported, False otherwise
         """
-        try:
-            import weasyprint  # noqa: F401
-            return True
-        except Exception:
-            # weasyprint may fail on import due to missing system libraries
-            return False
+        return weasyprint_available()
 
     def export(self, result: dict, filename_prefix: str = "business_plan") -> str:
-        """Export business plan to PDF or HTML.
+        """Export business plan to a PDF or HTML file.
         
         If weasyprint is not available, exports as HTML instead.
         
@@ -161,39 +184,86 @@ class PDFExporter:
         Returns:
             Path to created PDF or HTML file
         """
-        business_plan = result.get("business_plan", "")
+        buffer = BytesIO()
+        export_format = self.write(result, buffer)
+        filename = f"{filename_prefix}.{export_format}"
+        with open(filename, "wb") as f:
+            f.write(buffer.getvalue())
+        return filename
+
+    def to_bytes(self, result: dict) -> bytes:
+        """Export business plan to PDF (or HTML) in memory.
         
-        # Convert Markdown to HTML
-        md_extensions = ['tables', 'toc', 'fenced_code']
-        html_content = md.markdown(business_plan, extensions=md_extensions)
+        get_export_format() tells which format was produced.
         
-        # Create complete HTML document
-        html_document = self._create_html_document(html_content)
+        Args:
+            result: Result dictionary from AgentOrchestrator.run_all()
         
-        # Try to export as PDF, fall back to HTML
-        if self._weasyprint_available:
-            return self._export_pdf(html_document, filename_prefix)
-        else:
-            return self._export_html(html_document, filename_prefix)
+        Returns:
+            Contents of the PDF or HTML file
+        """
+        buffer = BytesIO()
+        self.write(result, buffer)
+        return buffer.getvalue()
 
-    def _create_html_document(self, html_content: str) -> str:
+    def write(self, result: dict, stream: BinaryIO) -> str:
+        """Export business plan to PDF (or HTML) into a writable binary stream.
+        
+        Args:
+            result: Result dictionary from AgentOrchestrator.run_all()
+                   Contains 'business_plan' key
+            stream: Destination (e.g., BytesIO, an HTTP response body or an
+                    open file)
+        
+        Returns:
+            Format written: "pdf", or "html" if weasyprint is unavailable
+            or failed
+        """
+        started = time.perf_counter()
+        
+        with (
+            span(self.tracer, "export", "export") as export_span,
+            profile("pdf_export", self.tracer.trace_id if self.tracer else None),
+        ):
+            # Parsed plan (shared with the other formats)
+            plan = plan_document(result).plan
+            
+            # Try to export as PDF, fall back to HTML
+            content = self._render_pdf(plan) if self._weasyprint_available else None
+            if content is not None:
+                export_format = "pdf"
+            else:
+                export_format = "html"
+                content = self._create_html_document(plan.html, self.CSS_STYLE).encode("utf-8")
+            stream.write(content)
+            if export_span is not None:
+                export_span.attributes["format"] = export_format
+                export_span.attributes["bytes"] = len(content)
+        
+        EXPORT_SECONDS.observe(time.perf_counter() - started, format=export_format)
+        EXPORT_BYTES.observe(len(content), format=export_format)
+        return export_format
+
+    def _create_html_document(self, html_content: str, css: str = "") -> str:
         """Create complete HTML document with CSS.
         
         Args:
             html_content: HTML content converted from Markdown
+            css: Stylesheet to embed (PDF renders pass theirs pre-parsed)
             
         Returns:
             Complete HTML document as string
         """
+        style = f"""
+    <style>
+        {css}
+    </style>""" if css else ""
         return f"""<!DOCTYPE html>
 <html lang="ja">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>事業計画書</title>
-    <style>
-        {self.CSS_STYLE}
-    </style>
+    <title>事業計画書</title>{style}
 </head>
 <body>
     {html_content}
@@ -201,47 +271,103 @@ class PDFExporter:
 </html>
 """
 
-    def _export_pdf(self, html_document: str, filename_prefix: str) -> str:
-        """Export HTML document to PDF using weasyprint.
+    def _render_pdf(self, plan: MarkdownDocument) -> Optional[bytes]:
+        """Render a plan to PDF using weasyprint.
         
         Args:
-            html_document: Complete HTML document
-            filename_prefix: Prefix for output filename
+            plan: Parsed plan
             
         Returns:
-            Path to PDF file
+            PDF bytes, or None if PDF generation failed
         """
+        renderer = self.chapter_renderer
+        if renderer is not None and len(plan.chapters) >= self.PARALLEL_MIN_CHAPTERS:
+            try:
+                return renderer.render(plan, self._create_html_document)
+            except Exception as e:
+                print(f"⚠️ 章ごとの並列PDF生成失敗（{type(e).__name__}）。一括で生成します。")
+        
         try:
             from weasyprint import HTML as WeasyprintHTML
             
-            filename = f"{filename_prefix}.pdf"
-            # Create PDF from HTML string
-            WeasyprintHTML(string=html_document).write_pdf(filename)
-            return filename
+            stylesheet, font_config = weasyprint_context()
+            # Render fully before writing, so a failure leaves the stream untouched
+            return WeasyprintHTML(string=self._create_html_document(plan.html)).write_pdf(
+                stylesheets=[stylesheet], font_config=font_config
+            )
         except Exception as e:
-            # If PDF generation fails, fall back to HTML
+            # If PDF generation fails, fall back to HTML for this exporter
             print(f"⚠️ PDF生成失敗（{type(e).__name__}）。HTMLで出力します。")
-            return self._export_html(html_document, filename_prefix)
-
-    def _export_html(self, html_document: str, filename_prefix: str) -> str:
-        """Export as HTML document (fallback).
-        
-        Args:
-            html_document: Complete HTML document
-            filename_prefix: Prefix for output filename
-            
-        Returns:
-            Path to HTML file
-        """
-        filename = f"{filename_prefix}.html"
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(html_document)
-        return filename
+            self._weasyprint_available = False
+            return None
 
     def get_export_format(self) -> str:
         """Get the export format that will be used.
         
+        After a failed PDF render the exporter falls back to HTML, so
+        this also tells the format of the last to_bytes() result.
+        
         Returns:
             "PDF" if weasyprint is available, "HTML" otherwise
         """
         return "PDF" if self._weasyprint_available else "HTML"
+
+    def cache_options(self) -> dict:
+        """Options that change the output, for ExportCache keys."""
+        options = {"format": self.get_export_format().lower()}
+        if options["format"] == "pdf" and self.chapter_renderer is not None:
+            options["chapters"] = "parallel"
+        return options
+
+    @classmethod
+    def default_cache_options(cls) -> dict:
+        """cache_options() of a new exporter with the default renderer.
+        
+        Lets ExportScheduler key exports without creating an exporter in
+        the parent process; the renders themselves run in its workers.
+        """
+        options = {"format": "pdf" if weasyprint_available() else "html"}
+        if options["format"] == "pdf" and default_chapter_renderer() is not None:
+            options["chapters"] = "parallel"
+        return options
+
+
+@lru_cache(maxsize=1)
+def weasyprint_available() -> bool:
+    """Whether weasyprint can be imported, probed once per process.
+    
+    A failed import is not cached by Python, so without this every
+    PDFExporter (one per Streamlit rerun showing the downloads) would try
+    to load the Cairo/Pango stack again.
+    
+    Returns:
+        True if weasyprint can be imported, False otherwise
+    """
+    try:
+        import weasyprint  # noqa: F401
+        return True
+    except Exception:
+        # weasyprint may fail on import due to missing system libraries
+        return False
+
+
+@thread_cached
+def weasyprint_context():
+    """Stylesheet and font configuration of PDF renders, built once per thread.
+    
+    Parsing the CSS and registering the @font-face files are the same for
+    every render, so renders only lay out and write their own document.
+    FontConfiguration is not thread-safe, so concurrent renders (the HTTP
+    service's request threads) each use their own thread's pair.
+    
+    Returns:
+        Tuple of (weasyprint.CSS, weasyprint FontConfiguration)
+    """
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+    
+    font_config = FontConfiguration()
+    stylesheet = CSS(
+        string=font_face_css(font_files()) + PDFExporter.CSS_STYLE, font_config=font_config
+    )
+    return stylesheet, font_config
@@ -0,0 +1,277 @@
+"""Background rendering of exports as soon as a plan is complete.
+
+ExportScheduler submits every export format of a finished plan to a pool
+of worker processes, so the Excel and PDF files are usually ready by the
+time the user opens the download tabs. Rendering (WeasyPrint above all)
+is CPU-bound; running it in separate processes keeps it from holding the
+GIL that other sessions' streaming threads need. Finished files go into
+an ExportCache, which the download buttons read from.
+"""
+
+import importlib
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from io import BytesIO
+from typing import Callable, Optional
+
+from exporters.cache import EXPORT_CACHE_REQUESTS, ExportCache, export_key
+from orchestrator.metrics import METRICS
+from orchestrator.tracing import Tracer
+
+
+# Exporter of each schedulable format ("pdf" may come out as HTML), as
+# "module:class"; imported on first use, so openpyxl and the PDF stack are
+# not loaded by processes that never export
+EXPORTERS = {
+    "xlsx": "exporters.excel_exporter:ExcelExporter",
+    "pdf": "exporters.pdf_exporter:PDFExporter",
+}
+
+
+# Finished exports too large for the cache that are still handed out from
+# their futures (the latest ones; older ones are rendered again on request)
+MAX_UNCACHED_EXPORTS = 2
+
+
+@lru_cache(maxsize=None)
+def exporter_class(fmt: str) -> type:
+    """Exporter class of a format, imported on first use.
+
+    Args:
+        fmt: Key of EXPORTERS
+
+    Returns:
+        ExcelExporter or PDFExporter
+
+    Raises:
+        KeyError: If the format is not in EXPORTERS
+    """
+    module_name, _, class_name = EXPORTERS[fmt].partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def render_export(fmt: str, result: dict) -> tuple[bytes, str]:
+    """Render one export format in memory.
+
+    Args:
+        fmt: Key of EXPORTERS
+        result: Result dictionary from AgentOrchestrator.run_all()
+
+    Returns:
+        Tuple of (content, format written by the exporter)
+    """
+    buffer = BytesIO()
+    export_format = exporter_class(fmt)().write(result, buffer)
+    return buffer.getvalue(), export_format
+
+
+def _render_in_worker(fmt: str, result: dict) -> tuple[bytes, str, dict]:
+    """render_export() in a worker process, plus the metrics it recorded."""
+    # Workers are reused and may be forked with the parent's samples
+    METRICS.reset()
+    content, export_format = render_export(fmt, result)
+    return content, export_format, METRICS.snapshot()
+
+
+class ExportScheduler:
+    """Renders exports in the background and hands them out when ready."""
+
+    def __init__(
+        self,
+        cache: ExportCache,
+        max_workers: int = 2,
+        processes: bool = True,
+    ) -> None:
+        """Initialize ExportScheduler.
+
+        Args:
+            cache: Cache finished exports are stored in and looked up from
+            max_workers: Exports rendered at the same time
+            processes: Render in worker processes (False: in threads, e.g.,
+                       where subprocesses are not allowed)
+        """
+        self.cache = cache
+        self.max_workers = max_workers
+        self.processes = processes
+        self._executor: Optional[Executor] = None
+        # Renders in flight (and failed ones, until retried) by cache key
+        self._pending: dict[str, Future] = {}
+        # Keys of finished renders the cache could not keep, oldest first;
+        # their futures stay in _pending and serve the bytes
+        self._uncached: deque[str] = deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, cache: ExportCache) -> "ExportScheduler":
+        """Build a scheduler from BPG_EXPORT_WORKERS (default 2); set it to 0
+        to render in threads instead of worker processes.
+        """
+        workers = int(os.getenv("BPG_EXPORT_WORKERS", "2"))
+        return cls(cache, max_workers=max(workers, 1), processes=workers > 0)
+
+    def schedule(
+        self,
+        result: dict,
+        formats: tuple = tuple(EXPORTERS),
+        tracer: Optional[Tracer] = None,
+    ) -> None:
+        """Start rendering the formats of a plan that are not cached or in flight.
+
+        Args:
+            result: Result dictionary from AgentOrchestrator.run_all()
+            formats: Keys of EXPORTERS to render
+            tracer: Tracer of the run, to record each render as a span
+        """
+        for fmt in formats:
+            key = export_key(exporter_class(fmt), result)
+            with self._lock:
+                future = self._pending.get(key)
+                if future is not None and not (future.done() and future.exception()):
+                    continue
+                if self.cache.get(key) is not None:
+                    continue
+                render = self._submit(fmt, result)
+                # Resolved once the export is cached, not when the worker returns
+                future = self._pending[key] = Future()
+            # Outside the lock: the callback runs right away if already done
+            render.add_done_callback(self._finish(key, fmt, future, tracer))
+            EXPORT_CACHE_REQUESTS.inc(format=fmt, result="miss")
+
+    def get(self, result: dict, fmt: str) -> Optional[tuple[bytes, str]]:
+        """Finished export of a plan, scheduling it if nobody has yet.
+
+        Args:
+            result: Result dictionary from AgentOrchestrator.run_all()
+            fmt: Key of EXPORTERS
+
+        Returns:
+            Tuple of (content, format written), or None while it is rendering
+
+        Raises:
+            Exception: Whatever the render raised (it is retried by the
+                       next schedule() or get() call)
+        """
+        key = export_key(exporter_class(fmt), result)
+        with self._lock:
+            future = self._pending.get(key)
+        if future is None:
+            entry = self.cache.get(key)
+            if entry is not None:
+                EXPORT_CACHE_REQUESTS.inc(format=entry[1], result="hit")
+                return entry
+            self.schedule(result, (fmt,))
+            return None
+        if not future.done():
+            return None
+        error = future.exception()
+        if error is not None:
+            with self._lock:
+                if self._pending.get(key) is future:
+                    del self._pending[key]
+            raise error
+        return future.result()
+
+    def ready(self, result: dict, fmt: str) -> bool:
+        """Whether get() would return the export (or raise) without waiting."""
+        key = export_key(exporter_class(fmt), result)
+        with self._lock:
+            future = self._pending.get(key)
+        return future.done() if future is not None else self.cache.get(key) is not None
+
+    def wait(self, result: dict, fmt: str, timeout: Optional[float] = None) -> tuple[bytes, str]:
+        """Finished export of a plan, waiting for (or starting) its render.
+
+        Args:
+            result: Result dictionary from AgentOrchestrator.run_all()
+            fmt: Key of EXPORTERS
+            timeout: Maximum seconds to wait
+
+        Returns:
+            Tuple of (content, format written)
+
+        Raises:
+            TimeoutError: If the render did not finish in time
+        """
+        entry = self.get(result, fmt)
+        if entry is not None:
+            return entry
+        key = export_key(exporter_class(fmt), result)
+        with self._lock:
+            future = self._pending.get(key)
+        if future is None:
+            # Finished between the two lookups
+            return self.get(result, fmt)
+        return future.result(timeout=timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _submit(self, fmt: str, result: dict) -> Future:
+        """Submit a render; the caller holds self._lock."""
+        for attempt in range(2):
+            if self._executor is None:
+                self._executor = self._create_executor()
+            try:
+                if self.processes:
+                    return self._executor.submit(_render_in_worker, fmt, result)
+                return self._executor.submit(render_export, fmt, result)
+            except BrokenProcessPool:
+                # A worker died (e.g., killed for memory); start a fresh pool
+                self._executor = None
+                if attempt:
+                    raise
+
+    def _finish(
+        self, key: str, fmt: str, future: Future, tracer: Optional[Tracer]
+    ) -> Callable[[Future], None]:
+        """Done-callback of a render that caches it and resolves its future."""
+        started_ns = Tracer.now()
+
+        def finish(render: Future) -> None:
+            try:
+                content, export_format, *snapshot = render.result()
+            except Exception as e:
+                if tracer is not None:
+                    tracer.record(
+                        "export", started_ns, category="export", format=fmt, background=True,
+                        error=type(e).__name__,
+                    )
+                future.set_exception(e)
+                return
+            if snapshot:
+                METRICS.merge(snapshot[0])
+            cached = self.cache.put(key, (content, export_format))
+            if tracer is not None:
+                tracer.record("export", started_ns, category="export", format=export_format, background=True)
+            with self._lock:
+                if self._pending.get(key) is future:
+                    if cached:
+                        del self._pending[key]
+                    else:
+                        # Larger than the cache: get() returns the future's
+                        # result instead of scheduling the render again
+                        if key in self._uncached:
+                            self._uncached.remove(key)
+                        self._uncached.append(key)
+                        while len(self._uncached) > MAX_UNCACHED_EXPORTS:
+                            self._pending.pop(self._uncached.popleft(), None)
+            future.set_result((content, export_format))
+
+        return finish
+
+    def _create_executor(self) -> Executor:
+        if not self.processes:
+            return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export")
+        # Forking a process with running threads can deadlock; start clean ones
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
@@ -0,0 +1,385 @@
+"""Multi-tenant admission control in front of the orchestrator.
+
+The AdmissionController caps the number of concurrently generating runs,
+keeps a bounded wait queue ordered by weighted fair queuing across
+tenants, and enforces per-tenant token/cost quotas over a rolling window.
+Runs that cannot be admitted are rejected with a retry-after hint instead
+of slowing down everyone else's runs.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+
+DEFAULT_TENANT = "default"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a run is not admitted."""
+
+    def __init__(self, message: str, retry_after: float, reason: str = "overloaded") -> None:
+        """Initialize AdmissionRejected.
+
+        Args:
+            message: Human-readable reason
+            retry_after: Suggested number of seconds before retrying
+            reason: "overloaded" | "tenant_limit" | "quota" | "draining"
+        """
+        super().__init__(message)
+        self.retry_after = max(1.0, retry_after)
+        self.reason = reason
+
+
+@dataclass(frozen=True)
+class TenantQuota:
+    """Token and cost limits of a tenant over a rolling window.
+
+    Attributes:
+        max_tokens: Maximum input+output tokens per window (None = unlimited)
+        max_cost_usd: Maximum estimated cost per window (None = unlimited)
+        window_seconds: Length of the rolling window
+    """
+
+    max_tokens: Optional[int] = None
+    max_cost_usd: Optional[float] = None
+    window_seconds: float = 86_400.0
+
+
+class Ticket:
+    """A run's place in the admission queue."""
+
+    def __init__(self, controller: "AdmissionController", tenant: str, finish_tag: float) -> None:
+        """Initialize Ticket.
+
+        Args:
+            controller: Controller that issued the ticket
+            tenant: Tenant the run belongs to
+            finish_tag: Weighted fair queuing virtual finish time
+        """
+        self.tenant = tenant
+        self.finish_tag = finish_tag
+        self.state = "queued"  # "queued" | "admitted" | "released"
+        # Whether the system was loaded enough at submit time to run the
+        # cheaper express pipeline instead (see express_load_threshold)
+        self.express = False
+        self.enqueued_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self._controller = controller
+        self._admitted = threading.Event()
+
+    @property
+    def queue_position(self) -> Optional[int]:
+        """1-based position in the wait queue, or None once admitted."""
+        return self._controller.queue_position(self)
+
+    @property
+    def eta_seconds(self) -> float:
+        """Estimated seconds until the run is admitted."""
+        return self._controller.estimate_wait(self)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the run is admitted (or the ticket is released).
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if the run was admitted
+        """
+        self._admitted.wait(timeout=timeout)
+        return self.admitted_at is not None and self.state == "admitted"
+
+    def release(self, tokens: int = 0, cost_usd: float = 0.0) -> None:
+        """Leave the queue or free the run's slot and record its usage.
+
+        Args:
+            tokens: Input+output tokens the run consumed
+            cost_usd: Estimated cost of the run
+        """
+        self._controller.release(self, tokens=tokens, cost_usd=cost_usd)
+
+    def cancel(self) -> bool:
+        """Leave the wait queue if the run has not been admitted yet.
+
+        Returns:
+            True if the ticket was still queued
+        """
+        return self._controller.cancel(self)
+
+
+class AdmissionController:
+    """Concurrency cap, bounded fair-share wait queue and per-tenant quotas."""
+
+    def __init__(
+        self,
+        max_concurrent_runs: int = 4,
+        max_queue_length: int = 16,
+        max_pending_per_tenant: int = 2,
+        tenant_weights: Optional[dict[str, float]] = None,
+        default_quota: Optional[TenantQuota] = None,
+        tenant_quotas: Optional[dict[str, TenantQuota]] = None,
+        initial_run_seconds: float = 200.0,
+        express_load_threshold: Optional[float] = None,
+    ) -> None:
+        """Initialize AdmissionController.
+
+        Args:
+            max_concurrent_runs: Maximum number of runs generating at once
+            max_queue_length: Maximum number of runs waiting for a slot
+            max_pending_per_tenant: Maximum queued + running runs per tenant
+            tenant_weights: Fair-share weights by tenant (default weight 1.0)
+            default_quota: Quota applied to tenants without their own
+            tenant_quotas: Per-tenant quotas
+            initial_run_seconds: Run duration assumed before any run finished
+            express_load_threshold: Load (see load) at or above which new
+                                    runs are flagged to use the express
+                                    pipeline, or None to never switch
+        """
+        self.max_concurrent_runs = max_concurrent_runs
+        self.max_queue_length = max_queue_length
+        self.max_pending_per_tenant = max_pending_per_tenant
+        self.tenant_weights = tenant_weights or {}
+        self.default_quota = default_quota
+        self.tenant_quotas = tenant_quotas or {}
+        self.avg_run_seconds = initial_run_seconds
+        self.express_load_threshold = express_load_threshold
+
+        self._running: dict[Ticket, float] = {}  # ticket -> admitted_at
+        self._queue: list[tuple[float, int, Ticket]] = []
+        self._order = itertools.count()
+        self._virtual_time = 0.0
+        self._tenant_finish: dict[str, float] = {}
+        self._usage: dict[str, deque] = {}
+        self._draining = False
+        self._lock = threading.Lock()
+
+    @property
+    def running_count(self) -> int:
+        """Number of admitted runs."""
+        return len(self._running)
+
+    @property
+    def queued_count(self) -> int:
+        """Number of runs waiting for a slot."""
+        return len(self._queue)
+
+    @property
+    def load(self) -> float:
+        """Demand relative to capacity (1.0 = all slots busy, >1.0 = queueing)."""
+        return (len(self._running) + len(self._queue)) / max(self.max_concurrent_runs, 1)
+
+    def submit(self, tenant: str = DEFAULT_TENANT) -> Ticket:
+        """Request a slot for a new run.
+
+        The run is admitted immediately when a slot is free; otherwise it
+        waits in the queue (see Ticket.wait).
+
+        Args:
+            tenant: Tenant the run belongs to
+
+        Returns:
+            Ticket for the run
+
+        Raises:
+            AdmissionRejected: If the tenant is over quota or its pending
+                               limit, or the queue is full
+        """
+        tenant = tenant or DEFAULT_TENANT
+        with self._lock:
+            if self._draining:
+                raise AdmissionRejected(
+                    "サーバーは停止処理中です。30秒後に再試行してください",
+                    retry_after=30,
+                    reason="draining",
+                )
+
+            self._check_quota(tenant)
+
+            pending = sum(1 for ticket in self._running if ticket.tenant == tenant)
+            pending += sum(1 for _, _, ticket in self._queue if ticket.tenant == tenant)
+            if pending >= self.max_pending_per_tenant:
+                retry_after = self._earliest_slot_seconds()
+                raise AdmissionRejected(
+                    f"同時に実行できる生成は{self.max_pending_per_tenant}件までです。"
+                    f"{retry_after:.0f}秒後に再試行してください",
+                    retry_after=retry_after,
+                    reason="tenant_limit",
+                )
+
+            if len(self._running) >= self.max_concurrent_runs and len(self._queue) >= self.max_queue_length:
+                retry_after = self._simulate_wait(len(self._queue))
+                raise AdmissionRejected(
+                    f"混雑しています。{retry_after:.0f}秒後に再試行してください",
+                    retry_after=retry_after,
+                    reason="overloaded",
+                )
+
+            # Weighted fair queuing: a tenant's runs are spaced 1/weight apart
+            # in virtual time, so a tenant with many submissions doesn't
+            # push everyone else to the back of the queue.
+            weight = self.tenant_weights.get(tenant, 1.0)
+            start = max(self._virtual_time, self._tenant_finish.get(tenant, 0.0))
+            ticket = Ticket(self, tenant, start + 1.0 / weight)
+            ticket.express = (
+                self.express_load_threshold is not None
+                and self.load >= self.express_load_threshold
+            )
+            self._tenant_finish[tenant] = ticket.finish_tag
+            heapq.heappush(self._queue, (ticket.finish_tag, next(self._order), ticket))
+            self._dispatch()
+            return ticket
+
+    def release(self, ticket: Ticket, tokens: int = 0, cost_usd: float = 0.0) -> None:
+        """Free a ticket's slot (or drop it from the queue) and record usage.
+
+        Args:
+            ticket: Ticket returned by submit()
+            tokens: Input+output tokens the run consumed
+            cost_usd: Estimated cost of the run
+        """
+        with self._lock:
+            if ticket.state == "released":
+                return
+
+            if ticket.state == "admitted":
+                admitted_at = self._running.pop(ticket)
+                elapsed = time.monotonic() - admitted_at
+                # Exponential moving average of completed run durations
+                self.avg_run_seconds = 0.8 * self.avg_run_seconds + 0.2 * elapsed
+            else:
+                self._queue = [entry for entry in self._queue if entry[2] is not ticket]
+                heapq.heapify(self._queue)
+
+            ticket.state = "released"
+            ticket._admitted.set()
+
+            if tokens or cost_usd:
+                self._usage.setdefault(ticket.tenant, deque()).append(
+                    (time.time(), tokens, cost_usd)
+                )
+            self._dispatch()
+
+    def cancel(self, ticket: Ticket) -> bool:
+        """Drop a ticket from the wait queue; admitted tickets are left alone.
+
+        Args:
+            ticket: Ticket returned by submit()
+
+        Returns:
+            True if the ticket was still queued
+        """
+        with self._lock:
+            if ticket.state != "queued":
+                return False
+            self._queue = [entry for entry in self._queue if entry[2] is not ticket]
+            heapq.heapify(self._queue)
+            ticket.state = "released"
+            ticket._admitted.set()
+            return True
+
+    def drain(self) -> None:
+        """Stop admitting new submissions (queued runs still get their turn)."""
+        with self._lock:
+            self._draining = True
+
+    def queue_position(self, ticket: Ticket) -> Optional[int]:
+        """1-based queue position of a ticket, or None if not queued."""
+        with self._lock:
+            if ticket.state != "queued":
+                return None
+            ordered = sorted(self._queue)
+            for position, (_, _, queued) in enumerate(ordered, 1):
+                if queued is ticket:
+                    return position
+            return None
+
+    def estimate_wait(self, ticket: Ticket) -> float:
+        """Estimated seconds until a ticket is admitted."""
+        position = self.queue_position(ticket)
+        if position is None:
+            return 0.0
+        with self._lock:
+            return self._simulate_wait(position - 1)
+
+    def tenant_usage(self, tenant: str) -> dict:
+        """Tokens and cost used by a tenant within its quota window."""
+        with self._lock:
+            quota = self.tenant_quotas.get(tenant, self.default_quota)
+            window = quota.window_seconds if quota else 86_400.0
+            tokens, cost = self._window_usage(tenant, window)
+            return {"tokens": tokens, "cost_usd": cost, "window_seconds": window}
+
+    def snapshot(self) -> dict:
+        """Current state for status endpoints and logs."""
+        with self._lock:
+            return {
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "max_concurrent_runs": self.max_concurrent_runs,
+                "max_queue_length": self.max_queue_length,
+                "avg_run_seconds": round(self.avg_run_seconds, 1),
+                "load": round(self.load, 2),
+                "express_load_threshold": self.express_load_threshold,
+            }
+
+    def _dispatch(self) -> None:
+        """Admit queued tickets while slots are free. Lock must be held."""
+        while self._queue and len(self._running) < self.max_concurrent_runs:
+            finish_tag, _, ticket = heapq.heappop(self._queue)
+            self._virtual_time = max(self._virtual_time, finish_tag)
+            ticket.state = "admitted"
+            ticket.admitted_at = time.monotonic()
+            self._running[ticket] = ticket.admitted_at
+            ticket._admitted.set()
+
+    def _simulate_wait(self, runs_ahead: int) -> float:
+        """Seconds until a run with runs_ahead queued runs before it starts. Lock must be held."""
+        now = time.monotonic()
+        slots = [
+            max(self.avg_run_seconds - (now - admitted_at), 1.0)
+            for admitted_at in self._running.values()
+        ]
+        slots += [0.0] * (self.max_concurrent_runs - len(slots))
+        heapq.heapify(slots)
+        for _ in range(runs_ahead):
+            heapq.heappush(slots, heapq.heappop(slots) + self.avg_run_seconds)
+        return slots[0] if slots else self.avg_run_seconds
+
+    def _earliest_slot_seconds(self) -> float:
+        """Seconds until the earliest running run is expected to finish. Lock must be held."""
+        return self._simulate_wait(0) or self.avg_run_seconds
+
+    def _window_usage(self, tenant: str, window: float) -> tuple[int, float]:
+        """Tokens and cost of a tenant within the window. Lock must be held."""
+        usage = self._usage.get(tenant)
+        if not usage:
+            return 0, 0.0
+        cutoff = time.time() - window
+        while usage and usage[0][0] < cutoff:
+            usage.popleft()
+        return sum(entry[1] for entry in usage), sum(entry[2] for entry in usage)
+
+    def _check_quota(self, tenant: str) -> None:
+        """Raise AdmissionRejected if the tenant is over its quota. Lock must be held."""
+        quota = self.tenant_quotas.get(tenant, self.default_quota)
+        if quota is None:
+            return
+
+        tokens, cost = self._window_usage(tenant, quota.window_seconds)
+        over_tokens = quota.max_tokens is not None and tokens >= quota.max_tokens
+        over_cost = quota.max_cost_usd is not None and cost >= quota.max_cost_usd
+        if not (over_tokens or over_cost):
+            return
+
+        oldest = self._usage[tenant][0][0]
+        retry_after = oldest + quota.window_seconds - time.time()
+        raise AdmissionRejected(
+            f"利用上限に達しました。{retry_after:.0f}秒後に再試行してください",
+            retry_after=retry_after,
+            reason="quota",
+        )
@@ -0,0 +1,396 @@
+"""Single-flight coalescing of identical concurrent generation requests.
+
+Identical submissions (same canonicalized context and model) that arrive
+while a run is in flight attach to that run instead of starting their own.
+All subscribers share one AgentOrchestrator, its events and its result.
+The run is cancelled only when the last subscriber releases it.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Iterator, Optional
+
+from agents.base import RunCancelledError
+from orchestrator import events
+from orchestrator.admission import DEFAULT_TENANT, AdmissionController, AdmissionRejected, Ticket
+from orchestrator.events import EventBroadcaster, RunEvent
+from orchestrator.runner import AgentOrchestrator
+
+
+# Context keys that don't influence the generated plan
+IGNORED_CONTEXT_KEYS = frozenset({"model", "tenant", "request_id"})
+
+
+def _normalize(value: Any) -> Any:
+    """Normalize a context value for comparison.
+
+    Strings are NFKC-normalized (full-width/half-width forms) with
+    whitespace collapsed; empty values are dropped from dicts.
+    """
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFKC", value).split())
+    if isinstance(value, dict):
+        normalized = {}
+        for key in sorted(value):
+            item = _normalize(value[key])
+            if item in (None, "", [], {}):
+                continue
+            normalized[str(key)] = item
+        return normalized
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def canonical_key(context: dict, model: str) -> str:
+    """Build the coalescing key for a context and model.
+
+    Args:
+        context: Context dictionary (as built by the sidebar or the HTTP API)
+        model: Claude model the run will use
+
+    Returns:
+        Hex digest identifying identical submissions
+    """
+    relevant = {
+        key: value for key, value in context.items()
+        if key not in IGNORED_CONTEXT_KEYS
+    }
+    payload = json.dumps(
+        {"context": _normalize(relevant), "model": model},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SharedRun:
+    """One in-flight orchestrator run shared by all identical submissions.
+
+    A single producer thread consumes AgentOrchestrator.stream_run() and
+    publishes into the run's EventBroadcaster.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        context: dict,
+        model: str,
+        orchestrator: AgentOrchestrator,
+        ticket: Optional[Ticket] = None,
+    ) -> None:
+        """Initialize SharedRun.
+
+        Args:
+            key: Coalescing key (see canonical_key)
+            context: Context dictionary of the first submission
+            model: Claude model used by the run
+            orchestrator: Orchestrator executing the run
+            ticket: Admission ticket; the run waits for it before generating
+        """
+        self.run_id = uuid.uuid4().hex
+        self.key = key
+        self.context = context
+        self.model = model
+        self.orchestrator = orchestrator
+        self.ticket = ticket
+        self.broadcaster = EventBroadcaster()
+
+        # "queued" | "running" | "done" | "error" | "cancelled"
+        self.status = "queued" if ticket is not None and ticket.state == "queued" else "running"
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.exception: Optional[Exception] = None
+        self.subscribers = 0
+        self.total_subscribers = 0
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        """Whether the run has finished (successfully or not)."""
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Wait for the run to finish.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            Result dictionary, or None if the timeout expired
+
+        Raises:
+            Exception: Whatever the run raised
+        """
+        if not self._done.wait(timeout=timeout):
+            return None
+        if self.exception is not None:
+            raise self.exception
+        return self.result
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        """Convert the run to a JSON-serializable dictionary.
+
+        Args:
+            include_result: Whether to include the full result
+
+        Returns:
+            Run status dictionary
+        """
+        data = {
+            "run_id": self.run_id,
+            "status": self.status,
+            "model": self.model,
+            "mode": self.orchestrator.mode,
+            "company_name": self.context.get("company_name", ""),
+            "subscribers": self.subscribers,
+            "total_subscribers": self.total_subscribers,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "progress": self.orchestrator.get_progress(),
+            "error": self.error,
+        }
+        if self.orchestrator.estimate is not None:
+            data["estimate"] = self.orchestrator.estimate.to_dict()
+        if self.status == "queued":
+            data["queue_position"] = self.ticket.queue_position
+            data["eta_seconds"] = round(self.ticket.eta_seconds, 1)
+        if include_result:
+            data["result"] = self.result
+        return data
+
+    def _produce(self, on_finished: Callable[["SharedRun"], None]) -> None:
+        """Producer thread: wait for admission, then forward the run's events."""
+        try:
+            if self.ticket is not None:
+                if not self.ticket.wait():
+                    raise RunCancelledError("Run was cancelled while queued")
+                self.status = "running"
+            for event in self.orchestrator.stream_run():
+                if event.type == events.RUN_COMPLETED:
+                    self.result = event.data.get("result")
+                    self.status = "done"
+                self.broadcaster.publish(event)
+        except Exception as e:
+            self.exception = e
+            self.status = "cancelled" if self.orchestrator.cancelled else "error"
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            if self.ticket is not None:
+                usage = self.orchestrator.total_token_usage
+                self.ticket.release(
+                    tokens=usage.get("input", 0) + usage.get("output", 0),
+                    cost_usd=self.orchestrator.estimate_cost(),
+                )
+            self.finished_at = time.time()
+            self._done.set()
+            self.broadcaster.close()
+            on_finished(self)
+
+
+class Subscription:
+    """A single submitter's handle on a SharedRun."""
+
+    def __init__(self, coalescer: "RunCoalescer", run: SharedRun, coalesced: bool) -> None:
+        """Initialize Subscription.
+
+        Args:
+            coalescer: Coalescer that created the subscription
+            run: Shared run being watched
+            coalesced: True if the submission attached to an existing run
+        """
+        self.run = run
+        self.coalesced = coalesced
+        self._coalescer = coalescer
+        self._released = False
+
+    def events(
+        self, after_seq: int = 0, timeout: Optional[float] = None
+    ) -> Iterator[Optional[RunEvent]]:
+        """Iterate over the shared run's events (see EventBroadcaster.subscribe)."""
+        return self.run.broadcaster.subscribe(after_seq=after_seq, timeout=timeout)
+
+    def result(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Wait for the shared run's result (see SharedRun.wait)."""
+        return self.run.wait(timeout=timeout)
+
+    def release(self) -> None:
+        """Leave the run. The last subscriber to leave cancels an unfinished run."""
+        if not self._released:
+            self._released = True
+            self._coalescer._release(self.run)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class RunCoalescer:
+    """Single-flight registry of in-flight runs keyed on context and model."""
+
+    def __init__(
+        self,
+        orchestrator_factory: Optional[Callable[[dict, str], AgentOrchestrator]] = None,
+        admission: Optional[AdmissionController] = None,
+    ) -> None:
+        """Initialize RunCoalescer.
+
+        Args:
+            orchestrator_factory: Builds the orchestrator for a new run from
+                                  (context, model). Defaults to AgentOrchestrator.
+            admission: Admission controller consulted before starting a new
+                       run; coalesced submissions don't take a slot
+        """
+        self.orchestrator_factory = orchestrator_factory or (
+            lambda context, model: AgentOrchestrator(context=context, model=model)
+        )
+        self.admission = admission
+        self.runs_started = 0
+        self.submissions_coalesced = 0
+
+        self._inflight: dict[str, SharedRun] = {}
+        # Cancelled runs whose producer has not finished yet; they still
+        # generate and hold their admission slot, so the coalescer is not idle
+        self._draining: set[SharedRun] = set()
+        # Runs whose orchestrator is being built, by key; identical
+        # submissions wait for the outcome instead of building their own
+        self._building: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    @property
+    def inflight_count(self) -> int:
+        """Number of runs currently generating (including cancelled ones
+        that are still winding down)."""
+        return len(self._inflight) + len(self._draining)
+
+    def acquire(
+        self,
+        context: dict,
+        model: str,
+        tenant: str = DEFAULT_TENANT,
+    ) -> Subscription:
+        """Attach to an identical in-flight run or start a new one.
+
+        Args:
+            context: Context dictionary
+            model: Claude model to use
+            tenant: Tenant charged for a new run (see AdmissionController)
+
+        Returns:
+            Subscription to the shared run; call release() when leaving
+
+        Raises:
+            AdmissionRejected: If a new run would be needed and the admission
+                               controller refuses it for this tenant
+        """
+        key = canonical_key(context, model)
+        while True:
+            with self._lock:
+                run = self._inflight.get(key)
+                if run is not None:
+                    self.submissions_coalesced += 1
+                    run.subscribers += 1
+                    run.total_subscribers += 1
+                    return Subscription(self, run, True)
+                building = self._building.get(key)
+                if building is None:
+                    # Reserve the key; the orchestrator is built outside the lock
+                    building = self._building[key] = Future()
+                    break
+            # An identical run is being built: share its run, or its error
+            try:
+                building.result()
+            except AdmissionRejected:
+                # Admission depends on the builder's tenant, not the context;
+                # this caller's own tenant may still be admitted
+                continue
+
+        try:
+            # Build the orchestrator (and run its pre-flight estimate) first:
+            # a factory that refuses the run must not leave a ticket behind
+            orchestrator = self.orchestrator_factory(context, model)
+            ticket = self.admission.submit(tenant) if self.admission is not None else None
+            if ticket is not None and ticket.express and context.get("allow_express", True):
+                # Under heavy load, degrade to the faster, cheaper pipeline
+                try:
+                    orchestrator.set_mode("express")
+                except Exception:
+                    ticket.release()
+                    raise
+            run = SharedRun(key, context, model, orchestrator, ticket=ticket)
+            with self._lock:
+                self._inflight[key] = run
+                del self._building[key]
+                self.runs_started += 1
+                run.subscribers += 1
+                run.total_subscribers += 1
+        except BaseException as e:
+            with self._lock:
+                self._building.pop(key, None)
+            building.set_exception(e)
+            raise
+
+        threading.Thread(
+            target=run._produce,
+            args=(self._finished,),
+            name=f"run-{run.run_id[:8]}",
+            daemon=True,
+        ).start()
+        building.set_result(run)
+        return Subscription(self, run, False)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no run is in flight.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if no run is in flight
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            while self._inflight or self._draining:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(timeout=remaining)
+        return True
+
+    def _release(self, run: SharedRun) -> None:
+        """Drop one subscriber; cancel the run when the last one leaves."""
+        with self._lock:
+            run.subscribers -= 1
+            if run.subscribers > 0 or run.done:
+                return
+            # Identical submissions arriving from now on start a fresh run;
+            # the cancelled one counts as in flight until its producer ends
+            if self._inflight.get(run.key) is run:
+                del self._inflight[run.key]
+                self._draining.add(run)
+        run.orchestrator.cancel()
+        if run.ticket is not None:
+            # Give up a queued run's place; an admitted run frees its slot
+            # (and records its usage) when its producer finishes
+            run.ticket.cancel()
+
+    def _finished(self, run: SharedRun) -> None:
+        """Producer callback: remove a finished run from the in-flight table."""
+        with self._lock:
+            if self._inflight.get(run.key) is run:
+                del self._inflight[run.key]
+            self._draining.discard(run)
+            self._idle.notify_all()
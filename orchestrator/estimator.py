@@ -0,0 +1,367 @@
+"""Pre-flight token, cost and latency estimation for orchestrator runs.
+
+The estimator builds every agent's prompts before anything is sent,
+counts their input tokens (locally, or with the count-tokens endpoint when
+the client supports it) and predicts output tokens from each agent's
+max_tokens budget and the output sizes observed in earlier runs.
+"""
+
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+from agents.base import BaseAgent
+
+
+@dataclass(frozen=True)
+class ModelPricing:
+    """Prices (USD per million tokens) and typical speed of a model.
+
+    Attributes:
+        input: Uncached input tokens
+        output: Output tokens
+        cache_write: Input tokens written to the prompt cache
+        cache_read: Input tokens read from the prompt cache
+        output_tokens_per_second: Typical streaming speed
+        first_token_seconds: Typical time to first token
+    """
+
+    input: float
+    output: float
+    cache_write: float
+    cache_read: float
+    output_tokens_per_second: float = 60.0
+    first_token_seconds: float = 2.0
+
+    def cost(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        cache_write_tokens: int = 0,
+        cache_read_tokens: int = 0,
+    ) -> float:
+        """Cost in USD of a request's tokens.
+
+        Args:
+            input_tokens: Uncached input tokens
+            output_tokens: Output tokens
+            cache_write_tokens: Input tokens written to the prompt cache
+            cache_read_tokens: Input tokens read from the prompt cache
+
+        Returns:
+            Cost in USD
+        """
+        return (
+            input_tokens * self.input
+            + output_tokens * self.output
+            + cache_write_tokens * self.cache_write
+            + cache_read_tokens * self.cache_read
+        ) / 1_000_000
+
+
+SONNET_MODEL = "claude-sonnet-4-5-20250929"
+OPUS_MODEL = "claude-opus-4-1-20250805"
+HAIKU_MODEL = "claude-haiku-4-5-20251001"
+
+MODEL_PRICING: dict[str, ModelPricing] = {
+    SONNET_MODEL: ModelPricing(3.0, 15.0, 3.75, 0.30, output_tokens_per_second=60.0),
+    OPUS_MODEL: ModelPricing(15.0, 75.0, 18.75, 1.50, output_tokens_per_second=35.0, first_token_seconds=3.0),
+    HAIKU_MODEL: ModelPricing(1.0, 5.0, 1.25, 0.10, output_tokens_per_second=120.0, first_token_seconds=1.0),
+}
+
+# Cheaper models to fall back to when a run is over budget, most capable first
+DOWNGRADE_CHAIN = [OPUS_MODEL, SONNET_MODEL, HAIKU_MODEL]
+
+
+def get_pricing(model: str) -> ModelPricing:
+    """Get the pricing of a model.
+
+    Unknown model IDs are matched by family name (opus, sonnet, haiku)
+    and fall back to Sonnet pricing.
+
+    Args:
+        model: Claude model ID
+
+    Returns:
+        ModelPricing for the model
+    """
+    if model in MODEL_PRICING:
+        return MODEL_PRICING[model]
+    for family, known in (("opus", OPUS_MODEL), ("haiku", HAIKU_MODEL)):
+        if family in (model or ""):
+            return MODEL_PRICING[known]
+    return MODEL_PRICING[SONNET_MODEL]
+
+
+def approximate_tokens(text: str) -> int:
+    """Approximate the token count of a text without calling the API.
+
+    Japanese (kana/kanji) text is close to one token per character;
+    other text averages about four characters per token.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Approximate number of tokens
+    """
+    wide = sum(1 for char in text if ord(char) >= 0x3000)
+    return wide + (len(text) - wide + 3) // 4
+
+
+class BudgetExceededError(Exception):
+    """Raised when a run's pre-flight estimate exceeds the configured budget."""
+
+    def __init__(self, estimate: "RunEstimate", budget_usd: float) -> None:
+        """Initialize BudgetExceededError.
+
+        Args:
+            estimate: Estimate of the cheapest acceptable configuration
+            budget_usd: Configured budget
+        """
+        super().__init__(
+            f"推定コスト ${estimate.cost_usd:.2f} が予算 ${budget_usd:.2f} を超えています"
+        )
+        self.estimate = estimate
+        self.budget_usd = budget_usd
+
+
+@dataclass
+class AgentEstimate:
+    """Pre-flight estimate for one agent."""
+
+    model: str
+    input_tokens: int
+    output_tokens: int
+    max_output_tokens: int
+    cost_usd: float
+    max_cost_usd: float
+    seconds: float
+
+
+@dataclass
+class RunEstimate:
+    """Pre-flight estimate for a whole run.
+
+    Attributes:
+        model: Model the run was estimated for
+        agents: Estimates by agent key
+        input_tokens: Expected input tokens of all agents
+        output_tokens: Expected output tokens of all agents
+        cost_usd: Expected cost
+        max_cost_usd: Cost if every agent used its whole max_tokens budget
+        seconds: Expected wall-clock time (Phase 1 in parallel, then Phase 2)
+        downgraded_from: Original model if the run was downgraded for budget
+    """
+
+    model: str
+    agents: dict[str, AgentEstimate] = field(default_factory=dict)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    max_cost_usd: float = 0.0
+    seconds: float = 0.0
+    downgraded_from: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        """Convert to a JSON-serializable dictionary."""
+        data = asdict(self)
+        data["cost_usd"] = round(self.cost_usd, 4)
+        data["max_cost_usd"] = round(self.max_cost_usd, 4)
+        data["seconds"] = round(self.seconds, 1)
+        return data
+
+
+class OutputHistory:
+    """Moving averages of observed output sizes and streaming speeds.
+
+    Shared process-wide by default, so estimates improve as runs finish.
+    """
+
+    # Share of max_tokens assumed used before any run has been observed
+    DEFAULT_OUTPUT_RATIO = 0.8
+
+    def __init__(self, smoothing: float = 0.3) -> None:
+        """Initialize OutputHistory.
+
+        Args:
+            smoothing: Weight of the newest observation in the moving average
+        """
+        self.smoothing = smoothing
+        self._output_ratio: dict[str, float] = {}
+        self._tokens_per_second: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        agent_key: str,
+        model: str,
+        output_tokens: int,
+        max_tokens: int,
+        seconds: Optional[float] = None,
+    ) -> None:
+        """Record a finished agent run.
+
+        Args:
+            agent_key: Agent key
+            model: Model the agent used
+            output_tokens: Output tokens the agent generated
+            max_tokens: Output token budget the agent had
+            seconds: Wall-clock duration of the agent run
+        """
+        if max_tokens <= 0 or output_tokens <= 0:
+            return
+        ratio = min(output_tokens / max_tokens, 1.0)
+        with self._lock:
+            self._output_ratio[agent_key] = self._blend(self._output_ratio.get(agent_key), ratio)
+            if seconds and seconds > 0:
+                self._tokens_per_second[model] = self._blend(
+                    self._tokens_per_second.get(model), output_tokens / seconds
+                )
+
+    def expected_output(self, agent_key: str, max_tokens: int) -> int:
+        """Expected output tokens of an agent with the given budget."""
+        with self._lock:
+            ratio = self._output_ratio.get(agent_key, self.DEFAULT_OUTPUT_RATIO)
+        return int(max_tokens * ratio)
+
+    def tokens_per_second(self, model: str) -> float:
+        """Observed (or typical) streaming speed of a model."""
+        with self._lock:
+            observed = self._tokens_per_second.get(model)
+        return observed or get_pricing(model).output_tokens_per_second
+
+    def _blend(self, current: Optional[float], value: float) -> float:
+        """Exponential moving average step."""
+        if current is None:
+            return value
+        return (1 - self.smoothing) * current + self.smoothing * value
+
+
+# Process-wide history used when none is given
+DEFAULT_HISTORY = OutputHistory()
+
+
+class CostEstimator:
+    """Estimate a run's tokens, cost and latency before it starts."""
+
+    def __init__(
+        self,
+        history: Optional[OutputHistory] = None,
+        client: Optional[Any] = None,
+        use_count_tokens_api: bool = False,
+    ) -> None:
+        """Initialize CostEstimator.
+
+        Args:
+            history: Output history to predict from (defaults to DEFAULT_HISTORY)
+            client: Anthropic client for the count-tokens endpoint
+            use_count_tokens_api: Count input tokens with the API instead of
+                                  the local approximation (falls back to the
+                                  approximation if the call fails)
+        """
+        self.history = history or DEFAULT_HISTORY
+        self.client = client
+        self.use_count_tokens_api = use_count_tokens_api
+
+    def count_input_tokens(self, agent: BaseAgent, context: dict, model: str) -> int:
+        """Count the input tokens of an agent's prompts.
+
+        Args:
+            agent: Agent whose prompts are built
+            context: Context the agent would run with
+            model: Model the agent would use
+
+        Returns:
+            Input token count
+        """
+        system_prompt = agent.get_system_prompt(context)
+        user_prompt = agent.get_user_prompt(context)
+
+        if self.use_count_tokens_api and self.client is not None:
+            try:
+                response = self.client.messages.count_tokens(
+                    model=model,
+                    system=system_prompt,
+                    messages=[{"role": "user", "content": user_prompt}],
+                )
+                return response.input_tokens
+            except Exception:
+                # Estimation must never block a run; use the approximation
+                pass
+
+        return approximate_tokens(system_prompt) + approximate_tokens(user_prompt)
+
+    def estimate(
+        self,
+        agents: dict[str, BaseAgent],
+        context: dict,
+        model: Optional[str] = None,
+        final_key: str = "integration",
+        models: Optional[dict[str, str]] = None,
+    ) -> RunEstimate:
+        """Estimate a run.
+
+        Phase 1 agents run in parallel, so the run takes as long as the
+        slowest one plus the final pass. The final prompt includes the
+        Phase 1 outputs, which are predicted here.
+
+        Args:
+            agents: Agents by key
+            context: Context dictionary of the run
+            model: Estimate as if every agent used this model
+                   (defaults to each agent's own model)
+            final_key: Key of the Phase 2 agent that reads the Phase 1 output
+            models: Models by agent key, taking precedence over model
+                    (e.g., the routed models of a downgraded run)
+
+        Returns:
+            RunEstimate
+        """
+        run_model = model or next(iter(agents.values())).model
+        estimate = RunEstimate(model=run_model)
+        phase1_output = 0
+        phase1_seconds = 0.0
+
+        phase1 = [key for key in agents if key != final_key]
+        for key in phase1 + [final_key]:
+            agent = agents.get(key)
+            if agent is None:
+                continue
+            agent_model = (models or {}).get(key) or model or agent.model
+            pricing = get_pricing(agent_model)
+
+            if key == final_key:
+                # Prompt with empty sections plus the predicted Phase 1 outputs
+                input_tokens = self.count_input_tokens(
+                    agent, {**context, "sections": {}}, agent_model
+                ) + phase1_output
+            else:
+                input_tokens = self.count_input_tokens(agent, context, agent_model)
+
+            max_output = agent.get_max_tokens(context)
+            output_tokens = self.history.expected_output(key, max_output)
+            seconds = pricing.first_token_seconds + output_tokens / self.history.tokens_per_second(agent_model)
+
+            estimate.agents[key] = AgentEstimate(
+                model=agent_model,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                max_output_tokens=max_output,
+                cost_usd=pricing.cost(input_tokens, output_tokens),
+                max_cost_usd=pricing.cost(input_tokens, max_output),
+                seconds=seconds,
+            )
+
+            if key == final_key:
+                estimate.seconds = phase1_seconds + seconds
+            else:
+                phase1_output += output_tokens
+                phase1_seconds = max(phase1_seconds, seconds)
+
+        for agent_estimate in estimate.agents.values():
+            estimate.input_tokens += agent_estimate.input_tokens
+            estimate.output_tokens += agent_estimate.output_tokens
+            estimate.cost_usd += agent_estimate.cost_usd
+            estimate.max_cost_usd += agent_estimate.max_cost_usd
+        return estimate
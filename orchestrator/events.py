@@ -0,0 +1,242 @@
+"""Run events, a bounded event queue and a broadcaster for orchestrator runs."""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+
+# Event types emitted by AgentOrchestrator.stream_run()
+AGENT_STARTED = "agent_started"
+CHUNK = "chunk"
+SECTION_COMPLETED = "section_completed"
+USAGE = "usage"
+BUDGET_LIMITED = "budget_limited"
+AGENT_FAILED = "agent_failed"
+# An agent's failed attempt is retried: discard its chunk text received so far
+AGENT_RETRIED = "agent_retried"
+PHASE_COMPLETED = "phase_completed"
+RUN_COMPLETED = "run_completed"
+RUN_FAILED = "run_failed"
+
+EVENT_TYPES = (
+    AGENT_STARTED,
+    CHUNK,
+    SECTION_COMPLETED,
+    USAGE,
+    BUDGET_LIMITED,
+    AGENT_FAILED,
+    AGENT_RETRIED,
+    PHASE_COMPLETED,
+    RUN_COMPLETED,
+    RUN_FAILED,
+)
+
+
+@dataclass(frozen=True)
+class RunEvent:
+    """A single sequence-numbered event of an orchestrator run.
+
+    Attributes:
+        seq: Monotonic sequence number within the run (starts at 1)
+        type: One of EVENT_TYPES
+        agent: Agent key (market, product, finance, gtm, integration) or None
+        data: Event payload
+        timestamp: Wall-clock time the event was published
+    """
+
+    seq: int
+    type: str
+    agent: Optional[str] = None
+    data: dict = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        """Convert the event to a JSON-serializable dictionary."""
+        return {
+            "seq": self.seq,
+            "type": self.type,
+            "agent": self.agent,
+            "data": self.data,
+            "timestamp": self.timestamp,
+        }
+
+
+class EventQueue:
+    """Bounded, thread-safe queue of RunEvents.
+
+    Publishers are the orchestrator's worker threads; there is a single
+    consumer. When the buffer is full, chunk events are dropped (the
+    following section_completed event carries the full content), while
+    lifecycle events block until the consumer catches up, so a slow
+    consumer never stalls a stream reader for longer than necessary.
+    """
+
+    def __init__(self, maxsize: int = 1000) -> None:
+        """Initialize EventQueue.
+
+        Args:
+            maxsize: Maximum number of buffered events
+        """
+        self.maxsize = maxsize
+        self.dropped_chunks = 0
+        self._buffer: deque = deque()
+        self._seq = 0
+        self._closed = False
+        self._detached = False
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def publish(
+        self, event_type: str, agent: Optional[str] = None, **data
+    ) -> Optional[RunEvent]:
+        """Publish an event.
+
+        Args:
+            event_type: One of EVENT_TYPES
+            agent: Agent key the event belongs to
+            **data: Event payload
+
+        Returns:
+            The published event, or None if it was dropped
+        """
+        with self._lock:
+            while len(self._buffer) >= self.maxsize and not self._detached:
+                if event_type == CHUNK:
+                    self.dropped_chunks += 1
+                    return None
+                self._not_full.wait()
+
+            if self._closed or self._detached:
+                return None
+
+            self._seq += 1
+            event = RunEvent(seq=self._seq, type=event_type, agent=agent, data=data)
+            self._buffer.append(event)
+            self._not_empty.notify()
+            return event
+
+    def get(self, timeout: Optional[float] = None) -> Optional[RunEvent]:
+        """Get the next event.
+
+        Args:
+            timeout: Seconds to wait, or None to wait until an event arrives
+
+        Returns:
+            Next event, or None on timeout or when the queue is closed and drained
+        """
+        with self._lock:
+            if not self._buffer and not self._closed:
+                self._not_empty.wait_for(
+                    lambda: self._buffer or self._closed, timeout=timeout
+                )
+            if not self._buffer:
+                return None
+            event = self._buffer.popleft()
+            self._not_full.notify()
+            return event
+
+    def close(self) -> None:
+        """Mark the end of the run. Buffered events can still be consumed."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+
+    def detach(self) -> None:
+        """Detach the consumer: drop buffered events and never block publishers again."""
+        with self._lock:
+            self._detached = True
+            self._closed = True
+            self._buffer.clear()
+            self._not_full.notify_all()
+            self._not_empty.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        """Whether the queue has been closed."""
+        return self._closed
+
+    def __iter__(self) -> Iterator[RunEvent]:
+        """Iterate over events until the queue is closed and drained."""
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+
+class EventBroadcaster:
+    """Fan out the events of one run to any number of subscribers.
+
+    A single producer publishes events into a shared, append-only history.
+    Each subscriber reads from the history at its own pace, so late
+    subscribers replay the run from the start (or from a given sequence
+    number) and a slow subscriber never delays the producer or the others.
+    """
+
+    def __init__(self) -> None:
+        """Initialize EventBroadcaster."""
+        self._history: list[RunEvent] = []
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def publish(self, event: RunEvent) -> None:
+        """Append an event and wake up waiting subscribers.
+
+        Args:
+            event: Event to broadcast
+        """
+        with self._condition:
+            self._history.append(event)
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        """Mark the end of the run."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        """Whether the run has ended."""
+        return self._closed
+
+    def __len__(self) -> int:
+        """Number of events published so far."""
+        return len(self._history)
+
+    def subscribe(
+        self, after_seq: int = 0, timeout: Optional[float] = None
+    ) -> Iterator[Optional[RunEvent]]:
+        """Iterate over the run's events.
+
+        Args:
+            after_seq: Only yield events with a sequence number above this
+                       (e.g., the SSE Last-Event-ID of a reconnecting client)
+            timeout: If set, yield None whenever no event arrived within
+                     this many seconds (used for keep-alives)
+
+        Yields:
+            RunEvents in sequence order, or None on idle timeouts
+        """
+        index = 0
+        while True:
+            with self._condition:
+                if index >= len(self._history) and not self._closed:
+                    self._condition.wait(timeout=timeout)
+                pending = self._history[index:]
+                closed = self._closed
+            index += len(pending)
+
+            if not pending and not closed:
+                yield None
+                continue
+
+            for event in pending:
+                if event.seq > after_seq:
+                    yield event
+
+            if closed and index >= len(self._history):
+                return
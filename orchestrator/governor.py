@@ -0,0 +1,219 @@
+"""Live per-run spend limit enforced while agents stream.
+
+The pre-flight estimate (orchestrator.estimator) only predicts a run's
+cost. The CostGovernor tracks what a run actually spends as its agents
+stream: input (including prompt-cache writes and reads) is charged when
+message_start arrives, output as text deltas arrive, and both are
+reconciled with the exact usage once an agent finishes. Lower-priority
+agents are stopped first when the budget runs low.
+"""
+
+import threading
+from typing import Optional
+
+from orchestrator.estimator import approximate_tokens, get_pricing
+
+
+# Higher values are more important; lower-priority agents are stopped first
+DEFAULT_PRIORITIES = {
+    "integration": 3,
+    "summary": 3,
+    "express": 2,
+    "finance": 2,
+    "market": 2,
+    "product": 1,
+    "gtm": 1,
+}
+
+
+class CostGovernor:
+    """Spend limit shared by all agents of one run. Thread-safe."""
+
+    def __init__(
+        self,
+        budget_usd: float,
+        priorities: Optional[dict[str, int]] = None,
+        safety_margin: float = 0.05,
+    ) -> None:
+        """Initialize CostGovernor.
+
+        Args:
+            budget_usd: Maximum spend of the run in USD
+            priorities: Agent priorities (defaults to DEFAULT_PRIORITIES)
+            safety_margin: Share of the budget at which lower-priority agents
+                           are stopped, before the hard limit is reached
+        """
+        self.budget_usd = budget_usd
+        self.priorities = priorities or DEFAULT_PRIORITIES
+        self.safety_margin = safety_margin
+
+        self._models: dict[str, str] = {}
+        self._input_cost: dict[str, float] = {}
+        self._output_tokens: dict[str, int] = {}
+        self._reserved: dict[str, float] = {}
+        # Spend of attempts that failed and were retried
+        self._retried_cost: dict[str, float] = {}
+        self._active: set[str] = set()
+        self.limited: list[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def spent_usd(self) -> float:
+        """Spend of the run so far (estimated while agents are streaming)."""
+        with self._lock:
+            return self._spent()
+
+    def reserve(self, agent_key: str, cost_usd: float) -> None:
+        """Keep part of the budget for an agent that has not started yet.
+
+        Args:
+            agent_key: Agent key (e.g., "integration")
+            cost_usd: Amount to set aside
+        """
+        with self._lock:
+            self._reserved[agent_key] = cost_usd
+
+    def cap_max_tokens(self, agent_key: str, model: str, max_tokens: int) -> int:
+        """Cap an agent's output budget to what the run can still afford.
+
+        Called when an agent starts; releases the agent's reservation.
+
+        Args:
+            agent_key: Agent key
+            model: Model the agent uses
+            max_tokens: Requested output token budget
+
+        Returns:
+            Output token budget to request (0 if nothing is affordable)
+        """
+        with self._lock:
+            self._reserved.pop(agent_key, None)
+            self._models[agent_key] = model
+            self._active.add(agent_key)
+            available = self.budget_usd - self._spent() - sum(self._reserved.values())
+            affordable = int(max(available, 0.0) * 1_000_000 / get_pricing(model).output)
+            if affordable < max_tokens:
+                self._mark_limited(agent_key)
+                return affordable
+            return max_tokens
+
+    def start(self, agent_key: str, model: str, usage: dict) -> bool:
+        """Charge an agent's input when its message starts.
+
+        Args:
+            agent_key: Agent key
+            model: Model the agent uses
+            usage: Usage from message_start ("input", "cache_creation", "cache_read")
+
+        Returns:
+            False if the agent must stop right away
+        """
+        pricing = get_pricing(model)
+        with self._lock:
+            self._models[agent_key] = model
+            self._active.add(agent_key)
+            self._input_cost[agent_key] = pricing.cost(
+                usage.get("input", 0),
+                0,
+                cache_write_tokens=usage.get("cache_creation", 0),
+                cache_read_tokens=usage.get("cache_read", 0),
+            )
+            return self._allowed(agent_key)
+
+    def charge_text(self, agent_key: str, text: str) -> bool:
+        """Charge a streamed text delta as (approximate) output tokens.
+
+        Args:
+            agent_key: Agent key
+            text: Streamed text delta
+
+        Returns:
+            False if the agent must stop streaming
+        """
+        tokens = approximate_tokens(text)
+        with self._lock:
+            self._output_tokens[agent_key] = self._output_tokens.get(agent_key, 0) + tokens
+            return self._allowed(agent_key)
+
+    def output_tokens(self, agent_key: str) -> int:
+        """Output tokens charged to an agent so far."""
+        with self._lock:
+            return self._output_tokens.get(agent_key, 0)
+
+    def restart(self, agent_key: str) -> None:
+        """Settle a failed attempt of an agent that is about to be retried.
+
+        The failed attempt was billed, so its charges stay spent and the
+        retry is charged on top of them instead of replacing them.
+
+        Args:
+            agent_key: Agent key
+        """
+        with self._lock:
+            pricing = get_pricing(self._models.get(agent_key, ""))
+            self._retried_cost[agent_key] = (
+                self._retried_cost.get(agent_key, 0.0)
+                + self._input_cost.pop(agent_key, 0.0)
+                + pricing.cost(0, self._output_tokens.pop(agent_key, 0))
+            )
+
+    def finish(self, agent_key: str, usage: Optional[dict] = None) -> None:
+        """Mark an agent as finished and reconcile its exact usage.
+
+        Args:
+            agent_key: Agent key
+            usage: Final usage ("input", "output", "cache_creation", "cache_read"),
+                   or None to keep the streamed estimate
+        """
+        with self._lock:
+            self._active.discard(agent_key)
+            self._reserved.pop(agent_key, None)
+            if usage is None:
+                return
+            pricing = get_pricing(self._models.get(agent_key, ""))
+            self._input_cost[agent_key] = pricing.cost(
+                usage.get("input", 0),
+                0,
+                cache_write_tokens=usage.get("cache_creation", 0),
+                cache_read_tokens=usage.get("cache_read", 0),
+            )
+            self._output_tokens[agent_key] = usage.get("output", 0)
+
+    def snapshot(self) -> dict:
+        """Budget state for results and status endpoints."""
+        with self._lock:
+            return {
+                "budget_usd": self.budget_usd,
+                "spent_usd": round(self._spent(), 4),
+                "limited_agents": list(self.limited),
+            }
+
+    def _spent(self) -> float:
+        """Total spend so far. Lock must be held."""
+        output_cost = sum(
+            get_pricing(self._models.get(key, "")).cost(0, tokens)
+            for key, tokens in self._output_tokens.items()
+        )
+        return sum(self._input_cost.values()) + output_cost + sum(self._retried_cost.values())
+
+    def _allowed(self, agent_key: str) -> bool:
+        """Whether an agent may keep streaming. Lock must be held."""
+        committed = self._spent() + sum(self._reserved.values())
+        if committed < self.budget_usd * (1 - self.safety_margin):
+            return True
+
+        # Past the hard limit every agent stops; within the safety margin
+        # only agents outranked by another active or reserved agent do
+        priority = self.priorities.get(agent_key, 0)
+        others = (self._active | set(self._reserved)) - {agent_key}
+        outranked = any(self.priorities.get(key, 0) > priority for key in others)
+        if committed < self.budget_usd and not outranked:
+            return True
+
+        self._mark_limited(agent_key)
+        return False
+
+    def _mark_limited(self, agent_key: str) -> None:
+        """Record that an agent was stopped or capped. Lock must be held."""
+        if agent_key not in self.limited:
+            self.limited.append(agent_key)
@@ -0,0 +1,372 @@
+"""Operational metrics in the Prometheus text exposition format.
+
+Metrics live in a process-wide registry (METRICS) and are safe to update
+from the orchestrator's executor threads. Worker processes can send
+snapshot() to the parent, which adds them with merge().
+
+The registry is served at GET /metrics by the HTTP service and can be
+written to a file for the node_exporter textfile collector
+(write_textfile(); the Streamlit app does so after every run when
+BPG_METRICS_FILE is set).
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+# Latency buckets in seconds, from API round trips to whole runs
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Named metric with a fixed set of label names."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        """Label values in declaration order."""
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"{self.name}: expected labels {self.label_names}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def reset(self) -> None:
+        """Drop every sample."""
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Add a non-negative amount."""
+        if amount < 0:
+            raise ValueError(f"{self.name}: counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """Current value of a label set (0 if never incremented)."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, samples: dict) -> None:
+        with self._lock:
+            for key, value in samples.items():
+                self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(_Metric):
+    """Value per label set that can go up and down."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        """Set the current value."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels) -> float:
+        """Current value of a label set (0 if never set)."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, samples: dict) -> None:
+        # The parent process's own reading wins over a worker's
+        with self._lock:
+            for key, value in samples.items():
+                self._values.setdefault(key, value)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: (count per bucket incl. +Inf, sum)
+        self._values: dict[tuple, tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation."""
+        key = self._key(labels)
+        index = next(
+            (i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets)
+        )
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock seconds of a with-block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        """Number of observations of a label set."""
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([], 0.0))
+            return sum(counts)
+
+    def sum(self, **labels) -> float:
+        """Sum of the observations of a label set."""
+        with self._lock:
+            return self._values.get(self._key(labels), ([], 0.0))[1]
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self._header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+    def merge(self, samples: dict) -> None:
+        with self._lock:
+            for key, (counts, total) in samples.items():
+                own, own_total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+                self._values[key] = ([a + b for a, b in zip(own, counts)], own_total + total)
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together. Thread-safe."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        """Register a counter."""
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple = ()) -> Gauge:
+        """Register a gauge."""
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Register a histogram."""
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Atomically write render() to a file (node_exporter textfile collector).
+
+        Args:
+            path: Destination file, usually ending in .prom
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def snapshot(self) -> dict:
+        """Picklable copy of every sample, for merge() in another process."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def merge(self, snapshot: dict) -> None:
+        """Add the samples of another process's snapshot() to this registry.
+
+        Args:
+            snapshot: Result of snapshot() in a worker process; unknown
+                      metric names are ignored
+        """
+        for name, samples in snapshot.items():
+            metric: Optional[_Metric] = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(samples)
+
+    def reset(self) -> None:
+        """Drop every sample (worker processes do so before each task, so
+        that their snapshot() holds only that task's samples).
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+# Process-wide registry
+METRICS = MetricsRegistry()
+
+RUNS = METRICS.counter(
+    "bpg_runs_total", "Finished runs by mode and outcome", ("mode", "status")
+)
+RUN_SECONDS = METRICS.histogram(
+    "bpg_run_duration_seconds", "Wall-clock seconds of completed runs", ("mode",)
+)
+AGENT_SECONDS = METRICS.histogram(
+    "bpg_agent_duration_seconds", "Wall-clock seconds of successful agent calls", ("agent", "model")
+)
+AGENT_TTFT = METRICS.histogram(
+    "bpg_agent_ttft_seconds", "Seconds from request to first text delta", ("agent", "model")
+)
+TOKENS = METRICS.counter(
+    "bpg_tokens_total",
+    "Tokens of finished agent calls (kind: input, output, cache_creation, cache_read)",
+    ("agent", "model", "kind"),
+)
+AGENT_RETRIES = METRICS.counter(
+    "bpg_agent_retries_total", "Agent calls retried after a failure", ("agent",)
+)
+API_ERRORS = METRICS.counter(
+    "bpg_api_errors_total",
+    "Failed backend requests by HTTP status (\"connection\" for network errors)",
+    ("provider", "status"),
+)
+PLACEHOLDERS = METRICS.counter(
+    "bpg_placeholders_total", "Sections replaced by placeholder content", ("section",)
+)
+EXPORT_SECONDS = METRICS.histogram(
+    "bpg_export_duration_seconds", "Seconds to render an export", ("format",)
+)
+EXPORT_BYTES = METRICS.histogram(
+    "bpg_export_size_bytes",
+    "Size of rendered exports in bytes",
+    ("format",),
+    buckets=(1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7),
+)
+BATCH_EXPORTS = METRICS.counter(
+    "bpg_batch_exports_total",
+    "Files of batch exports by format and outcome (ok, error, timeout)",
+    ("format", "result"),
+)
+API_KEY_HEADROOM = METRICS.gauge(
+    "bpg_api_key_headroom", "Smallest remaining share of each pooled API key's rate limits", ("key",)
+)
+API_KEY_IN_FLIGHT = METRICS.gauge(
+    "bpg_api_key_in_flight", "Requests streaming on each pooled API key", ("key",)
+)
+API_KEY_HEALTHY = METRICS.gauge(
+    "bpg_api_key_healthy", "Whether each pooled API key takes requests (1) or not (0)", ("key",)
+)
+API_KEY_REQUESTS = METRICS.counter(
+    "bpg_api_key_requests_total", "Successful requests of each pooled API key", ("key",)
+)
+API_KEY_ERRORS = METRICS.counter(
+    "bpg_api_key_errors_total",
+    "Failed requests of each pooled API key by HTTP status (\"connection\" for network errors)",
+    ("key", "status"),
+)
+API_KEY_SPEND = METRICS.counter(
+    "bpg_api_key_spend_usd_total", "Estimated spend of each pooled API key in USD", ("key",)
+)
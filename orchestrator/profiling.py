@@ -0,0 +1,189 @@
+"""Opt-in CPU and memory profiling of plan runs and exports.
+
+Set BPG_PROFILE_DIR (or pass profile_dir to AgentOrchestrator) to
+profile AgentOrchestrator runs, ExcelExporter.export() and
+PDFExporter.export() with cProfile and tracemalloc. For each profiled call
+the following files are written to <dir>/<run_id>/:
+
+- <name>.pstats: cProfile statistics of every thread that worked on the
+  call (open with `python -m pstats` or snakeviz)
+- <name>.txt: the 40 most expensive functions by cumulative time
+- <name>.allocations.txt: peak traced memory and the allocation sites
+  that grew the most during the call
+
+run_id is the run's trace ID (orchestrator.tracer.trace_id). Profiling is
+off unless the directory is set, and then costs nothing on the hot path.
+Profiling is process-wide and costly, so it is enabled by configuration
+only, never by a run's context.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Iterator, Optional
+
+
+PROFILE_DIR_ENV = "BPG_PROFILE_DIR"
+
+# Rows written to the text reports
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 30
+
+# tracemalloc is process-wide; keep it running while any session needs it
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_started = False
+
+
+def profile_dir(override: Optional[str] = None) -> Optional[str]:
+    """Directory profiles are written to, or None if profiling is off.
+
+    Args:
+        override: Directory from configuration (e.g., AgentOrchestrator's
+                  profile_dir), used instead of BPG_PROFILE_DIR
+    """
+    return override or os.getenv(PROFILE_DIR_ENV) or None
+
+
+class ProfileSession:
+    """cProfile and tracemalloc data of one profiled call.
+
+    The thread that opened the session is profiled from the start; worker
+    threads join with thread(), and all threads' statistics are merged.
+    """
+
+    def __init__(self, name: str, run_id: str, directory: str) -> None:
+        """Initialize ProfileSession.
+
+        Args:
+            name: File name stem (e.g., "run_all", "excel_export")
+            run_id: Subdirectory the files are written to
+            directory: Base directory
+        """
+        self.name = name
+        self.run_id = run_id
+        self.directory = os.path.join(directory, run_id)
+        self._profiles: list[cProfile.Profile] = []
+        self._threads: set[int] = set()
+        self._lock = threading.Lock()
+
+    def thread(self) -> ContextManager:
+        """Profile the calling thread for the duration of a with-block.
+
+        A no-op on threads that are already profiled by this session (a
+        thread can run only one profiler at a time).
+        """
+        thread_id = threading.get_ident()
+        with self._lock:
+            if thread_id in self._threads:
+                return nullcontext()
+            self._threads.add(thread_id)
+        return self._profile_thread(thread_id)
+
+    @contextmanager
+    def _profile_thread(self, thread_id: int) -> Iterator[None]:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+                self._threads.discard(thread_id)
+
+    def write(self, start: tracemalloc.Snapshot, end: tracemalloc.Snapshot, peak_bytes: int) -> list[str]:
+        """Write the statistics and allocation report.
+
+        Args:
+            start: tracemalloc snapshot from when the call started
+            end: tracemalloc snapshot from when it ended
+            peak_bytes: Peak traced memory during the call
+
+        Returns:
+            Paths of the written files
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, self.name)
+        paths = []
+
+        with self._lock:
+            profiles = list(self._profiles)
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(f"{base}.pstats")
+            report = io.StringIO()
+            pstats.Stats(f"{base}.pstats", stream=report).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            with open(f"{base}.txt", "w", encoding="utf-8") as f:
+                f.write(report.getvalue())
+            paths += [f"{base}.pstats", f"{base}.txt"]
+
+        ignored = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )
+        growth = end.filter_traces(ignored).compare_to(start.filter_traces(ignored), "lineno")
+        with open(f"{base}.allocations.txt", "w", encoding="utf-8") as f:
+            f.write(f"peak traced memory: {peak_bytes / 1024 / 1024:.1f} MiB\n")
+            f.write(f"top {TOP_ALLOCATIONS} allocation sites by growth:\n")
+            for stat in growth[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+        paths.append(f"{base}.allocations.txt")
+        return paths
+
+
+@contextmanager
+def profile(
+    name: str,
+    run_id: Optional[str] = None,
+    directory: Optional[str] = None,
+) -> Iterator[Optional[ProfileSession]]:
+    """Profile a with-block if profiling is enabled.
+
+    Args:
+        name: File name stem of the profile
+        run_id: Run the call belongs to (defaults to a new random ID)
+        directory: Directory from configuration; overrides BPG_PROFILE_DIR
+
+    Yields:
+        ProfileSession (for worker threads to join), or None if profiling is off
+    """
+    directory = profile_dir(directory)
+    if directory is None:
+        yield None
+        return
+
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            # Leave tracing alone if someone else started it
+            _tracemalloc_started = not tracemalloc.is_tracing()
+            if _tracemalloc_started:
+                tracemalloc.start()
+        _tracemalloc_users += 1
+        tracemalloc.reset_peak()
+    start = tracemalloc.take_snapshot()
+
+    session = ProfileSession(name, run_id or uuid.uuid4().hex, directory)
+    try:
+        with session.thread():
+            yield session
+    finally:
+        end = tracemalloc.take_snapshot()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        with _tracemalloc_lock:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0 and _tracemalloc_started:
+                tracemalloc.stop()
+        try:
+            session.write(start, end, peak_bytes)
+        except OSError:
+            # Profiling must never fail the profiled call
+            pass
@@ -0,0 +1,113 @@
+"""Per-agent model routing.
+
+A routing policy maps agent keys to a model tier or a model ID. Tiers are
+relative to the model selected for the run, so a downgrade for budget
+moves every agent down together:
+
+- "selected": the run's model
+- "fast": the next faster, cheaper model in DOWNGRADE_CHAIN (Opus ->
+  Sonnet -> Haiku); the run's model if there is none
+
+Policies come from context["model_routing"] or, if that is not set, from
+the template's "model_routing" entry in templates/catalog.py.
+"""
+
+from typing import Optional
+
+from orchestrator.estimator import DOWNGRADE_CHAIN, OutputHistory, get_pricing
+from templates.catalog import get_template
+
+
+TIERS = ("selected", "fast")
+
+
+def routing_policy(context: dict) -> dict[str, str]:
+    """Get the routing policy of a run.
+
+    Args:
+        context: Context dictionary of the run
+
+    Returns:
+        Tier or model ID by agent key (empty: every agent uses the selected model)
+    """
+    if "model_routing" in context:
+        return dict(context["model_routing"] or {})
+    template = get_template((context.get("template") or {}).get("key", ""))
+    return dict((template or {}).get("model_routing") or {})
+
+
+def resolve_model(route: Optional[str], selected: str) -> str:
+    """Resolve a tier or model ID against the run's selected model.
+
+    Args:
+        route: Tier name, model ID, or None for the selected model
+        selected: Model selected for the run
+
+    Returns:
+        Model ID
+    """
+    if not route or route == "selected":
+        return selected
+    if route == "fast":
+        if selected in DOWNGRADE_CHAIN and selected != DOWNGRADE_CHAIN[-1]:
+            return DOWNGRADE_CHAIN[DOWNGRADE_CHAIN.index(selected) + 1]
+        return selected
+    return route
+
+
+def routing_report(
+    agents: dict,
+    selected: str,
+    seconds: dict[str, float],
+    history: OutputHistory,
+) -> dict:
+    """Compare each routed agent with running it on the selected model.
+
+    Args:
+        agents: Agents by key, after the run
+        selected: Model selected for the run
+        seconds: Measured wall-clock seconds by agent key
+        history: Output history used to predict the selected model's speed
+
+    Returns:
+        Dictionary with "selected_model", per-agent "agents" entries (model,
+        seconds, cost_usd and the same for the selected model) and the
+        total "savings_usd" / "seconds_saved" of the routed agents
+    """
+    report = {"selected_model": selected, "agents": {}, "savings_usd": 0.0, "seconds_saved": 0.0}
+    for key, agent in agents.items():
+        usage = agent.token_usage
+        if not usage.get("output"):
+            continue
+        tokens = (
+            usage.get("input", 0),
+            usage.get("output", 0),
+            usage.get("cache_creation", 0),
+            usage.get("cache_read", 0),
+        )
+        cost = get_pricing(agent.model).cost(*tokens)
+        took = seconds.get(key, 0.0)
+
+        if agent.model == selected:
+            selected_cost, selected_seconds = cost, took
+        else:
+            pricing = get_pricing(selected)
+            selected_cost = pricing.cost(*tokens)
+            selected_seconds = (
+                pricing.first_token_seconds
+                + usage.get("output", 0) / history.tokens_per_second(selected)
+            )
+
+        report["agents"][key] = {
+            "model": agent.model,
+            "seconds": round(took, 1),
+            "cost_usd": round(cost, 4),
+            "selected_seconds": round(selected_seconds, 1),
+            "selected_cost_usd": round(selected_cost, 4),
+        }
+        report["savings_usd"] += selected_cost - cost
+        report["seconds_saved"] += selected_seconds - took
+
+    report["savings_usd"] = round(report["savings_usd"], 4)
+    report["seconds_saved"] = round(report["seconds_saved"], 1)
+    return report
@@ -1,14 +1,61 @@
 """Agent Orchestrator for managing parallel agent execution."""
 
+import asyncio
+import os
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Callable, Optional
+from contextlib import contextmanager, nullcontext
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
 
 from agents.market_researcher import MarketResearcher
 from agents.product_strategist import ProductStrategist
 from agents.financial_modeler import FinancialModeler
 from agents.gtm_strategist import GTMStrategist
 from agents.integration_editor import IntegrationEditor
+from agents.express_drafter import EXPRESS_SECTIONS, ExpressDrafter, parse_sections
+from agents.express_summarizer import SUMMARY_SECTIONS, ExpressSummarizer
+from agents.backends import LLMBackend
+from agents.base import BaseAgent, RunCancelledError
+from exporters.markdown_blocks import MarkdownStreamParser
+from orchestrator import events
+from orchestrator.estimator import (
+    DOWNGRADE_CHAIN,
+    HAIKU_MODEL,
+    BudgetExceededError,
+    CostEstimator,
+    RunEstimate,
+    get_pricing,
+)
+from orchestrator.events import EventQueue, RunEvent
+from orchestrator.governor import CostGovernor
+from orchestrator.profiling import ProfileSession, profile
+from orchestrator.metrics import (
+    AGENT_SECONDS,
+    AGENT_TTFT,
+    PLACEHOLDERS,
+    RUN_SECONDS,
+    RUNS,
+    TOKENS,
+)
+from orchestrator.routing import resolve_model, routing_policy, routing_report
+from orchestrator.tracing import Span, Tracer
+
+
+# Run modes: the full five-agent pipeline, or a combined draft call plus a
+# short summary pass (see run_express())
+MODES = ("full", "express")
+
+# Phase 2 agent of each mode
+FINAL_AGENT_KEYS = {"full": "integration", "express": "summary"}
+
+# Placeholder content for graceful degradation of failed Phase 1 sections
+PLACEHOLDER_CONTENT = {
+    "market": "# 市場分析\n\n⚠️ 市場分析の生成に失敗しました。\n詳細は以下のゴールドマンテンプレートを参考にしてください。",
+    "product": "# プロダクト戦略\n\n⚠️ プロダクト戦略の生成に失敗しました。\nあなたのプロダクトの独自性と差別化ポイントを明確にしてください。",
+    "finance": "# 財務計画\n\n⚠️ 財務計画の生成に失敗しました。\n3年～5年の収入、支出、利益予測を作成してください。",
+    "gtm": "# Go-To-Market 戦略\n\n⚠️ GTM戦略の生成に失敗しました。\n顧客獲得チャネルと営業体制を定義してください。",
+}
 
 
 class AgentOrchestrator:
@@ -21,28 +68,104 @@ class AgentOrchestrator:
             - GTMStrategist
     
     Phase 2: Sequential execution of IntegrationEditor
+    
+    In express mode (context["mode"] == "express") the same sections are
+    produced by one ExpressDrafter call plus a short ExpressSummarizer pass
+    on a smaller model (context["express_model"], Haiku by default).
+    
+    In the full pipeline each agent's model follows the run's routing
+    policy (see orchestrator.routing): e.g., market research and GTM on the
+    next faster model, finance and integration on the selected one.
+    
+    Prices per model are in orchestrator.estimator.MODEL_PRICING.
     """
 
-    # Pricing for Claude Sonnet 4.5 (in USD per million tokens)
-    INPUT_COST_PER_MTOKEN = 3.0
-    OUTPUT_COST_PER_MTOKEN = 15.0
-
-    def __init__(self, context: dict, model: str = "claude-sonnet-4-5-20250929") -> None:
+    def __init__(
+        self,
+        context: dict,
+        model: str = "claude-sonnet-4-5-20250929",
+        client: Optional[Any] = None,
+        estimator: Optional[CostEstimator] = None,
+        backend: Optional[LLMBackend] = None,
+        trace_dir: Optional[str] = None,
+        profile_dir: Optional[str] = None,
+    ) -> None:
         """Initialize AgentOrchestrator.
         
         Args:
             context: Context dictionary with company and business info
             model: Claude model to use
+            client: Optional client shared by all agents (e.g., a
+                    MockAnthropicClient for offline runs). Each agent
+                    creates its own anthropic.Anthropic client by default.
+            estimator: Pre-flight estimator (defaults to one using the
+                       process-wide output history)
+            backend: Optional LLM backend shared by all agents (see
+                     agents.backends; e.g., an OpenAICompatibleBackend for a
+                     self-hosted server or a FakeBackend for offline runs).
+                     Takes precedence over client. Individual agents can be
+                     moved to another backend by setting agent.backend.
+            trace_dir: Directory the run's Chrome trace is written to
+                       (defaults to BPG_TRACE_DIR; never taken from the
+                       context, which may come from a remote client)
+            profile_dir: Directory the run's CPU and memory profile is
+                         written to, which turns profiling on (defaults to
+                         BPG_PROFILE_DIR; never taken from the context)
         """
         self.context = context
+        self.trace_dir = trace_dir
+        self.profile_dir = profile_dir
         self.model = model
+        self.mode = context.get("mode", "full")
+        self.estimator = estimator or CostEstimator(client=client)
+        
+        # Pre-flight estimate of the run (see preflight())
+        self.estimate: Optional[RunEstimate] = None
         
         # Initialize agents
-        self.market_researcher = MarketResearcher()
-        self.product_strategist = ProductStrategist()
-        self.financial_modeler = FinancialModeler()
-        self.gtm_strategist = GTMStrategist()
-        self.integration_editor = IntegrationEditor()
+        agent_kwargs = {"model": model}
+        if client is not None:
+            agent_kwargs["client"] = client
+        if backend is not None:
+            agent_kwargs["backend"] = backend
+        self.market_researcher = MarketResearcher(**agent_kwargs)
+        self.product_strategist = ProductStrategist(**agent_kwargs)
+        self.financial_modeler = FinancialModeler(**agent_kwargs)
+        self.gtm_strategist = GTMStrategist(**agent_kwargs)
+        self.integration_editor = IntegrationEditor(**agent_kwargs)
+        
+        # Agents by key, in display order
+        self.agents: dict[str, BaseAgent] = {
+            "market": self.market_researcher,
+            "product": self.product_strategist,
+            "finance": self.financial_modeler,
+            "gtm": self.gtm_strategist,
+            "integration": self.integration_editor,
+        }
+        
+        # Per-agent model tiers, relative to the selected model
+        self.routing_policy = routing_policy(context)
+        self.set_model(model)
+        
+        # Agents of the express pipeline, on a smaller model
+        express_kwargs = {**agent_kwargs, "model": context.get("express_model", HAIKU_MODEL)}
+        self.express_drafter = ExpressDrafter(**express_kwargs)
+        self.express_summarizer = ExpressSummarizer(**express_kwargs)
+        self.express_agents: dict[str, BaseAgent] = {
+            "express": self.express_drafter,
+            "summary": self.express_summarizer,
+        }
+        
+        # Live spend limit checked while the agents stream
+        budget_usd = context.get("budget_usd")
+        self.governor: Optional[CostGovernor] = CostGovernor(budget_usd) if budget_usd else None
+        
+        # Spans of the run (see orchestrator.tracing)
+        self.tracer = Tracer()
+        for agent in self._all_agents():
+            agent.governor = self.governor
+            agent.tracer = self.tracer
+            agent.on_retry = self._retry_callback(agent.key)
         
         # Progress tracking for each agent
         self.progress_state = {
@@ -56,8 +179,55 @@ class AgentOrchestrator:
         # Total token usage
         self.total_token_usage = {"input": 0, "output": 0}
         
+        # Wall-clock seconds of each finished agent
+        self.agent_seconds: dict[str, float] = {}
+        
         # Start time for elapsed tracking
         self.start_time: Optional[float] = None
+        
+        # Guards progress_state and total_token_usage, which are updated
+        # from the Phase 1 worker threads
+        self._lock = threading.Lock()
+        
+        # Event queue of the active stream_run(), if any
+        self._events: Optional[EventQueue] = None
+        
+        # Profile of the active run when profiling is on (see orchestrator.profiling)
+        self._profile: Optional[ProfileSession] = None
+
+    def cancel(self) -> None:
+        """Cancel the run.
+        
+        Streaming agents stop at their next text delta, agents that have
+        not started are skipped, and run_all() raises RunCancelledError
+        instead of starting Phase 2.
+        """
+        for agent in self._all_agents():
+            agent.cancel()
+
+    def _all_agents(self) -> list[BaseAgent]:
+        """Agents of both pipelines."""
+        return list(self.agents.values()) + list(self.express_agents.values())
+
+    def _mode_agents(self, mode: str) -> dict[str, BaseAgent]:
+        """Agents by key of a run mode."""
+        return self.express_agents if mode == "express" else self.agents
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() has been called."""
+        return self.integration_editor.cancelled
+
+    def _emit(self, event_type: str, agent: Optional[str] = None, **data) -> None:
+        """Publish a run event if a stream_run() consumer is attached.
+        
+        Args:
+            event_type: One of orchestrator.events.EVENT_TYPES
+            agent: Agent key the event belongs to
+            **data: Event payload
+        """
+        if self._events is not None:
+            self._events.publish(event_type, agent, **data)
 
     def _progress_callback(
         self, agent_key: str
@@ -72,10 +242,116 @@ class AgentOrchestrator:
         """
         def callback(name: str, progress: float, chunk: str) -> None:
             """Progress callback function."""
-            self.progress_state[agent_key] = progress
+            with self._lock:
+                self.progress_state[agent_key] = progress
+            self._emit(events.CHUNK, agent_key, progress=progress, text=chunk)
         
         return callback
 
+    def _retry_callback(
+        self, agent_key: str
+    ) -> Callable[[int, Optional[BaseException]], None]:
+        """Create the hook an agent calls before retrying a failed attempt.
+        
+        The failed attempt's chunks were already published; consumers
+        drop them on agent_retried, and the retry streams from the start.
+        
+        Args:
+            agent_key: Key for the agent
+            
+        Returns:
+            Callback resetting the agent's progress and publishing agent_retried
+        """
+        def callback(attempt: int, error: Optional[BaseException]) -> None:
+            """Retry callback function."""
+            with self._lock:
+                if agent_key in self.progress_state:
+                    self.progress_state[agent_key] = 0.0
+            self._emit(
+                events.AGENT_RETRIED,
+                agent_key,
+                attempt=attempt,
+                error_type=type(error).__name__ if error else None,
+            )
+        
+        return callback
+
+    def _run_agent(
+        self,
+        agent_key: str,
+        agent: BaseAgent,
+        context: dict,
+        callback: Callable[[str, float, str], None],
+        parent: Optional[Span] = None,
+        queued_ns: Optional[int] = None,
+    ) -> str:
+        """Run a single agent, publishing start and failure events.
+        
+        Args:
+            agent_key: Key for the agent (market, product, finance, gtm, integration)
+            agent: Agent instance to run
+            context: Context dictionary passed to the agent
+            callback: Progress callback for the agent
+            parent: Phase span, when the agent runs on a worker thread
+            queued_ns: When the agent was submitted to the worker pool
+                       (Tracer.now()), to trace its queue wait
+            
+        Returns:
+            Generated content
+        """
+        if queued_ns is not None:
+            self.tracer.record("queue_wait", queued_ns, category="agent", parent=parent, agent=agent_key)
+        self._emit(events.AGENT_STARTED, agent_key, name=agent.name, model=agent.model)
+        started = time.monotonic()
+        session = self._profile
+        try:
+            with self.tracer.span(
+                f"agent:{agent_key}", "agent", parent=parent, agent=agent_key, model=agent.model
+            ) as span, (session.thread() if session is not None else nullcontext()):
+                output = agent.run_sync(context, callback)
+                span.attributes.update(
+                    input_tokens=agent.token_usage.get("input", 0),
+                    output_tokens=agent.token_usage.get("output", 0),
+                    cache_read_tokens=agent.token_usage.get("cache_read", 0),
+                )
+        except Exception as e:
+            self._emit(
+                events.AGENT_FAILED,
+                agent_key,
+                error=agent.error_message or str(e),
+                error_type=type(e).__name__,
+            )
+            raise
+        
+        seconds = time.monotonic() - started
+        with self._lock:
+            self.agent_seconds[agent_key] = seconds
+        AGENT_SECONDS.observe(seconds, agent=agent_key, model=agent.model)
+        if agent.first_token_seconds is not None:
+            AGENT_TTFT.observe(agent.first_token_seconds, agent=agent_key, model=agent.model)
+        
+        # Feed the observed output size into future pre-flight estimates
+        self.estimator.history.record(
+            agent_key,
+            agent.model,
+            agent.token_usage.get("output", 0),
+            agent.get_max_tokens(context),
+            seconds=seconds,
+        )
+        
+        self._emit(events.SECTION_COMPLETED, agent_key, content=output)
+        self._emit(
+            events.USAGE,
+            agent_key,
+            input=agent.token_usage.get("input", 0),
+            output=agent.token_usage.get("output", 0),
+            cache_creation=agent.token_usage.get("cache_creation", 0),
+            cache_read=agent.token_usage.get("cache_read", 0),
+        )
+        if agent.truncated and self.governor is not None:
+            self._emit(events.BUDGET_LIMITED, agent_key, **self.governor.snapshot())
+        return output
+
     def run_phase1(self) -> dict[str, str]:
         """Run Phase 1: parallel execution of 4 agents.
         
@@ -94,53 +370,50 @@ class AgentOrchestrator:
             "gtm": (self.gtm_strategist, self._progress_callback("gtm")),
         }
         
-        # Placeholder content for graceful degradation
-        placeholder_content = {
-            "market": "# 市場分析\n\n⚠️ 市場分析の生成に失敗しました。\n詳細は以下のゴールドマンテンプレートを参考にしてください。",
-            "product": "# プロダクト戦略\n\n⚠️ プロダクト戦略の生成に失敗しました。\nあなたのプロダクトの独自性と差別化ポイントを明確にしてください。",
-            "finance": "# 財務計画\n\n⚠️ 財務計画の生成に失敗しました。\n3年～5年の収入、支出、利益予測を作成してください。",
-            "gtm": "# Go-To-Market 戦略\n\n⚠️ GTM戦略の生成に失敗しました。\n顧客獲得チャネルと営業体制を定義してください。",
-        }
-        
         results = {}
         
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            # Submit all tasks
-            futures = {}
-            for key, (agent, callback) in agent_tasks.items():
-                future = executor.submit(
-                    agent.run_sync,
-                    self.context,
-                    callback,
-                )
-                futures[future] = key
-            
-            # Process completed tasks
-            for future in as_completed(futures):
-                key = futures[future]
-                try:
-                    output = future.result()
-                    results[key] = output
-                    
-                    # Update token usage
-                    agent = agent_tasks[key][0]
-                    self.total_token_usage["input"] += agent.token_usage.get("input", 0)
-                    self.total_token_usage["output"] += agent.token_usage.get("output", 0)
-                    
-                    # Mark as complete
-                    self.progress_state[key] = 1.0
-                    
-                except Exception as e:
-                    # Graceful degradation: use placeholder content
-                    agent = agent_tasks[key][0]
-                    error_msg = agent.error_message or str(e)
-                    
-                    # Combine error info with placeholder
-                    results[key] = f"{placeholder_content.get(key, '')}\n\n**エラー詳細**: {error_msg}"
-                    
-                    # Mark as failed but complete
-                    self.progress_state[key] = 1.0
-        
+        with self.tracer.span("phase1") as phase:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                # Submit all tasks
+                futures = {}
+                for key, (agent, callback) in agent_tasks.items():
+                    future = executor.submit(
+                        self._run_agent,
+                        key,
+                        agent,
+                        self.context,
+                        callback,
+                        parent=phase,
+                        queued_ns=self.tracer.now(),
+                    )
+                    futures[future] = key
+                
+                # Process completed tasks
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        output = future.result()
+                        results[key] = output
+                        self._record_usage(key, agent_tasks[key][0])
+                        
+                        # Mark as complete
+                        with self._lock:
+                            self.progress_state[key] = 1.0
+                        
+                    except Exception as e:
+                        # Graceful degradation: use placeholder content
+                        agent = agent_tasks[key][0]
+                        error_msg = agent.error_message or str(e)
+                        
+                        # Combine error info with placeholder
+                        results[key] = f"{PLACEHOLDER_CONTENT.get(key, '')}\n\n**エラー詳細**: {error_msg}"
+                        PLACEHOLDERS.inc(section=key)
+                        
+                        # Mark as failed but complete
+                        with self._lock:
+                            self.progress_state[key] = 1.0
+        
+        self._emit(events.PHASE_COMPLETED, phase=1, sections=sorted(results))
         return results
 
     def run_phase2(self, sections: dict) -> str:
@@ -157,23 +430,164 @@ class AgentOrchestrator:
         phase2_context = {**self.context, "sections": sections}
         
         # Run integration editor
-        output = self.integration_editor.run_sync(
-            context=phase2_context,
-            on_progress=self._progress_callback("integration"),
-        )
+        with self.tracer.span("phase2"):
+            output = self._run_agent(
+                "integration",
+                self.integration_editor,
+                phase2_context,
+                self._progress_callback("integration"),
+            )
         
-        # Update token usage
-        self.total_token_usage["input"] += self.integration_editor.token_usage.get("input", 0)
-        self.total_token_usage["output"] += self.integration_editor.token_usage.get("output", 0)
+        self._record_usage("integration", self.integration_editor)
         
         # Mark as complete
-        self.progress_state["integration"] = 1.0
+        with self._lock:
+            self.progress_state["integration"] = 1.0
         
+        self._emit(events.PHASE_COMPLETED, phase=2)
         return output
 
+    def set_model(self, model: str) -> None:
+        """Switch the run to another model before the run starts.
+        
+        Agents follow the routing policy relative to the new model, so a
+        downgrade moves routed agents down as well.
+        
+        Args:
+            model: Claude model ID
+        """
+        self.model = model
+        for key, model_id in self.routed_models(model).items():
+            self.agents[key].model = model_id
+
+    def routed_models(self, model: str) -> dict[str, str]:
+        """Models the full pipeline's agents use when the run selects a model.
+        
+        Args:
+            model: Claude model ID selected for the run
+        
+        Returns:
+            Model ID by agent key
+        """
+        return {key: resolve_model(self.routing_policy.get(key), model) for key in self.agents}
+
+    def set_mode(self, mode: str) -> None:
+        """Switch the run mode before the run starts.
+        
+        If a pre-flight estimate was already made, it is redone for the
+        new mode with the context's budget settings.
+        
+        Args:
+            mode: "full" or "express"
+        
+        Raises:
+            ValueError: If the mode is unknown
+            BudgetExceededError: If the new mode's estimate exceeds the budget
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if mode == self.mode:
+            return
+        self.mode = mode
+        if self.estimate is not None:
+            self.preflight(
+                budget_usd=self.context.get("budget_usd") or None,
+                allow_downgrade=bool(self.context.get("downgrade_on_budget", False)),
+            )
+
+    def compare_modes(self) -> dict[str, RunEstimate]:
+        """Estimate both run modes side by side, without changing the run.
+        
+        Returns:
+            RunEstimate by mode ("full", "express")
+        """
+        return {
+            mode: self.estimator.estimate(
+                self._mode_agents(mode), self.context, final_key=FINAL_AGENT_KEYS[mode]
+            )
+            for mode in MODES
+        }
+
+    def preflight(
+        self,
+        budget_usd: Optional[float] = None,
+        allow_downgrade: bool = False,
+    ) -> RunEstimate:
+        """Estimate the run's tokens, cost and latency before it starts.
+        
+        If the expected cost exceeds the budget, the run is either
+        downgraded to the most capable cheaper model that fits, or refused.
+        The estimate covers the agents of the current mode.
+        
+        Args:
+            budget_usd: Maximum expected cost in USD, or None for no limit
+            allow_downgrade: Whether to switch to a cheaper model instead of
+                             refusing an over-budget run
+        
+        Returns:
+            RunEstimate for the model the run will use
+        
+        Raises:
+            BudgetExceededError: If no acceptable model fits the budget
+        """
+        agents = self._mode_agents(self.mode)
+        final_key = FINAL_AGENT_KEYS[self.mode]
+        full = self.mode == "full"
+        original_model = self.model if full else next(iter(agents.values())).model
+        estimate = self.estimator.estimate(
+            agents, self.context, model=original_model, final_key=final_key,
+            models=self.routed_models(original_model) if full else None,
+        )
+        
+        if budget_usd is not None and estimate.cost_usd > budget_usd:
+            candidates = []
+            if allow_downgrade and original_model in DOWNGRADE_CHAIN:
+                candidates = DOWNGRADE_CHAIN[DOWNGRADE_CHAIN.index(original_model) + 1:]
+            
+            for model in candidates:
+                estimate = self.estimator.estimate(
+                    agents, self.context, model=model, final_key=final_key,
+                    models=self.routed_models(model) if full else None,
+                )
+                if estimate.cost_usd <= budget_usd:
+                    if full:
+                        self.set_model(model)
+                    else:
+                        for agent in agents.values():
+                            agent.model = model
+                    estimate.downgraded_from = original_model
+                    break
+            else:
+                raise BudgetExceededError(estimate, budget_usd)
+        
+        self.estimate = estimate
+        if self.governor is not None and final_key in estimate.agents:
+            # Keep the final pass affordable while Phase 1 streams; if the
+            # whole run doesn't fit, keep its share of the budget
+            final_cost = estimate.agents[final_key].cost_usd
+            share = final_cost / estimate.cost_usd if estimate.cost_usd else 0.0
+            self.governor.reserve(
+                final_key, min(final_cost, self.governor.budget_usd * share)
+            )
+        return estimate
+
+    def run(self) -> dict:
+        """Run the pipeline of the current mode.
+        
+        Returns:
+            Result dictionary of run_all() or run_express()
+        """
+        if self.mode == "express":
+            return self.run_express()
+        return self.run_all()
+
     def run_all(self) -> dict:
         """Run all phases and return comprehensive results.
         
+        A pre-flight estimate is made first (unless preflight() was already
+        called); context["budget_usd"] and context["downgrade_on_budget"]
+        configure budget enforcement.
+        
         Returns:
             Dictionary with:
             - sections: Phase 1 results (dict)
@@ -181,67 +595,412 @@ class AgentOrchestrator:
             - token_usage: Total tokens used (dict)
             - estimated_cost_usd: Estimated cost in USD (float)
             - elapsed_seconds: Total elapsed time (float)
+            - preflight: Pre-flight estimate (dict)
+            - budget: Live budget state, if context["budget_usd"] is set (dict)
+            - mode: "full"
+            - routing: Model, seconds and cost of each agent versus running
+              it on the selected model (dict, see orchestrator.routing)
+        
+        Raises:
+            BudgetExceededError: If the run's estimate exceeds the budget
+            RunCancelledError: If cancel() was called during the run
         """
-        self.start_time = time.time()
+        if self.estimate is None:
+            self.preflight(
+                budget_usd=self.context.get("budget_usd") or None,
+                allow_downgrade=bool(self.context.get("downgrade_on_budget", False)),
+            )
+        
+        with self._observe_run():
+            # Phase 1: Parallel execution
+            sections = self.run_phase1()
+            
+            # Don't pay for the integration pass of a cancelled run
+            if self.cancelled:
+                raise RunCancelledError("Run was cancelled")
+            
+            # Phase 2: Integration
+            business_plan = self.run_phase2(sections)
+            
+            return self._complete(sections, business_plan)
+
+    def run_express(self) -> dict:
+        """Run the express pipeline and return results like run_all().
         
-        # Phase 1: Parallel execution
-        sections = self.run_phase1()
+        Phase 1 is a single ExpressDrafter call writing all four sections;
+        Phase 2 only writes the executive summary, risks and roadmap, and
+        the plan is assembled from the draft sections as they are.
         
-        # Phase 2: Integration
-        business_plan = self.run_phase2(sections)
+        Returns:
+            Same dictionary as run_all(), with mode "express"
         
-        # Calculate elapsed time
-        elapsed_seconds = time.time() - self.start_time
+        Raises:
+            BudgetExceededError: If the run's estimate exceeds the budget
+            RunCancelledError: If cancel() was called during the run
+        """
+        self.mode = "express"
+        if self.estimate is None:
+            self.preflight(
+                budget_usd=self.context.get("budget_usd") or None,
+                allow_downgrade=bool(self.context.get("downgrade_on_budget", False)),
+            )
+        
+        with self._observe_run():
+            # Phase 1: One combined draft call; missing sections degrade to placeholders
+            error_msg = ""
+            try:
+                with self.tracer.span("phase1"):
+                    draft = self._run_agent(
+                        "express",
+                        self.express_drafter,
+                        self.context,
+                        self._progress_callback("express"),
+                    )
+            except Exception as e:
+                draft = self.express_drafter.output
+                error_msg = self.express_drafter.error_message or str(e)
+            
+            parsed = parse_sections(draft)
+            sections = {}
+            for key in EXPRESS_SECTIONS:
+                if parsed.get(key):
+                    sections[key] = parsed[key]
+                else:
+                    sections[key] = PLACEHOLDER_CONTENT[key]
+                    PLACEHOLDERS.inc(section=key)
+                    if error_msg:
+                        sections[key] += f"\n\n**エラー詳細**: {error_msg}"
+            self._record_usage("express", self.express_drafter)
+            self._emit(events.PHASE_COMPLETED, phase=1, sections=sorted(sections))
+            
+            if self.cancelled:
+                raise RunCancelledError("Run was cancelled")
+            
+            # Phase 2: Short summary pass
+            with self.tracer.span("phase2"):
+                summary = self._run_agent(
+                    "summary",
+                    self.express_summarizer,
+                    {**self.context, "sections": sections},
+                    self._progress_callback("summary"),
+                )
+            self._record_usage("summary", self.express_summarizer)
+            self._emit(events.PHASE_COMPLETED, phase=2)
+            
+            business_plan = self._assemble_express_plan(sections, parse_sections(summary))
+            return self._complete(sections, business_plan)
+
+    def _assemble_express_plan(self, sections: dict, summary: dict) -> str:
+        """Assemble the express plan in the integration editor's chapter order.
         
-        # Estimate cost
-        estimated_cost = self.estimate_cost()
+        Args:
+            sections: Draft sections by key (market, product, finance, gtm)
+            summary: Summary sections by key (summary, risks, roadmap)
         
-        return {
+        Returns:
+            Business plan as Markdown string
+        """
+        chapters = [(SUMMARY_SECTIONS["summary"], summary.get("summary", ""))]
+        chapters += [(title, sections[key]) for key, title in EXPRESS_SECTIONS.items()]
+        chapters += [
+            (SUMMARY_SECTIONS[key], summary.get(key, "")) for key in ("risks", "roadmap")
+        ]
+        
+        company_name = self.context.get("company_name", "企業")
+        plan = f"# {company_name} 事業計画書\n\n"
+        for number, (title, body) in enumerate(chapters, start=1):
+            plan += f"## {number}. {title}\n\n{body}\n\n"
+        return plan.rstrip() + "\n"
+
+    def _record_usage(self, agent_key: str, agent: BaseAgent) -> None:
+        """Add a finished agent's tokens to total_token_usage and the metrics.
+        
+        Args:
+            agent_key: Key for the agent
+            agent: Agent that finished (or failed) its call
+        """
+        with self._lock:
+            self.total_token_usage["input"] += agent.token_usage.get("input", 0)
+            self.total_token_usage["output"] += agent.token_usage.get("output", 0)
+        for kind in ("input", "output", "cache_creation", "cache_read"):
+            tokens = agent.token_usage.get(kind, 0)
+            if tokens:
+                TOKENS.inc(tokens, agent=agent_key, model=agent.model, kind=kind)
+
+    @contextmanager
+    def _observe_run(self) -> Iterator[None]:
+        """Time, trace and optionally profile the run's phases, and count
+        its outcome in the metrics.
+        
+        With trace_dir or BPG_TRACE_DIR set, the run's Chrome trace is
+        written there when it ends; with profile_dir or BPG_PROFILE_DIR
+        set, its CPU and memory profile (run_all or run_express, under the
+        trace ID).
+        """
+        self.start_time = time.time()
+        try:
+            with profile(
+                f"run_{'express' if self.mode == 'express' else 'all'}",
+                self.tracer.trace_id,
+                self.profile_dir,
+            ) as self._profile, self.tracer.span("run", mode=self.mode, model=self.model):
+                yield
+        except RunCancelledError:
+            RUNS.inc(mode=self.mode, status="cancelled")
+            raise
+        except BaseException:
+            RUNS.inc(mode=self.mode, status="failed")
+            raise
+        else:
+            RUNS.inc(mode=self.mode, status="completed")
+            RUN_SECONDS.observe(time.time() - self.start_time, mode=self.mode)
+        finally:
+            self._profile = None
+            trace_dir = self.trace_dir or os.getenv("BPG_TRACE_DIR")
+            if trace_dir:
+                try:
+                    os.makedirs(trace_dir, exist_ok=True)
+                    self.tracer.write_chrome_trace(trace_dir)
+                except OSError:
+                    # Tracing must never fail a run
+                    pass
+
+    def _complete(self, sections: dict, business_plan: str) -> dict:
+        """Build the result dictionary and publish run_completed.
+        
+        Args:
+            sections: Phase 1 results
+            business_plan: Phase 2 output
+        
+        Returns:
+            Result dictionary (see run_all())
+        """
+        result = {
             "sections": sections,
             "business_plan": business_plan,
             "token_usage": self.total_token_usage,
-            "estimated_cost_usd": estimated_cost,
-            "elapsed_seconds": elapsed_seconds,
+            "estimated_cost_usd": self.estimate_cost(),
+            "elapsed_seconds": time.time() - self.start_time,
+            "preflight": self.estimate.to_dict(),
+            "mode": self.mode,
         }
+        if self.mode == "full":
+            result["routing"] = routing_report(
+                self.agents, self.model, self.agent_seconds, self.estimator.history
+            )
+        if self.governor is not None:
+            result["budget"] = self.governor.snapshot()
+        self._emit(events.RUN_COMPLETED, result=result)
+        return result
+
+    def stream_run(self, max_buffer: int = 1000, cancel_on_close: bool = True) -> Iterator[RunEvent]:
+        """Run all phases in a background thread and yield events as they happen.
+        
+        Events are sequence-numbered RunEvents of the types listed in
+        orchestrator.events.EVENT_TYPES. The final event is run_completed
+        (its data contains the same dictionary run() returns) or
+        run_failed, in which case the exception is re-raised after it.
+        
+        If the consumer stops iterating before the final event (closes the
+        generator or drops it), the run is cancelled, so nothing keeps
+        generating and spending tokens with nobody listening.
+        
+        Args:
+            max_buffer: Maximum number of buffered events. When the consumer
+                        falls behind, chunk events are dropped first.
+            cancel_on_close: Cancel the run when the consumer stops early
+                             (False: let it finish in the background)
+        
+        Yields:
+            RunEvent instances in sequence order
+        
+        Raises:
+            Exception: Whatever run() raised
+        """
+        event_queue = EventQueue(maxsize=max_buffer)
+        self._events = event_queue
+        outcome: dict = {}
+        
+        def worker() -> None:
+            """Run all phases and close the event queue."""
+            try:
+                outcome["result"] = self.run()
+            except Exception as e:
+                outcome["error"] = e
+                self._emit(
+                    events.RUN_FAILED,
+                    error=str(e),
+                    error_type=type(e).__name__,
+                )
+            finally:
+                event_queue.close()
+        
+        thread = threading.Thread(target=worker, name="orchestrator-stream", daemon=True)
+        thread.start()
+        
+        finished = False
+        try:
+            yield from event_queue
+            finished = True
+        finally:
+            # Never block the worker threads once the consumer is gone
+            event_queue.detach()
+            if self._events is event_queue:
+                self._events = None
+            if not finished and cancel_on_close:
+                self.cancel()
+        
+        if "error" in outcome:
+            raise outcome["error"]
+
+    async def astream_run(
+        self, max_buffer: int = 1000, cancel_on_close: bool = True
+    ) -> AsyncIterator[RunEvent]:
+        """Async variant of stream_run() for asyncio-based consumers.
+        
+        Args:
+            max_buffer: Maximum number of buffered events
+            cancel_on_close: Cancel the run when the consumer stops early
+        
+        Yields:
+            RunEvent instances in sequence order
+        """
+        loop = asyncio.get_running_loop()
+        event_iter = self.stream_run(max_buffer=max_buffer, cancel_on_close=cancel_on_close)
+        done = object()
+        try:
+            while True:
+                event = await loop.run_in_executor(None, next, event_iter, done)
+                if event is done:
+                    break
+                yield event
+        finally:
+            event_iter.close()
 
     def get_progress(self) -> dict[str, dict]:
         """Get current progress for all agents.
         
         Returns:
-            Dictionary with agent status, progress, and error messages
+            Dictionary with agent status, progress, error messages and
+            whether the cost governor cut the agent short
         """
-        agent_map = {
-            "market": self.market_researcher,
-            "product": self.product_strategist,
-            "finance": self.financial_modeler,
-            "gtm": self.gtm_strategist,
-            "integration": self.integration_editor,
-        }
+        if self.mode == "express":
+            return self._express_progress()
+        
+        with self._lock:
+            progress_state = dict(self.progress_state)
         
         progress = {}
-        for key, agent in agent_map.items():
+        for key, agent in self.agents.items():
             progress[key] = {
                 "status": agent.status,
-                "progress": self.progress_state.get(key, 0.0),
+                "progress": progress_state.get(key, 0.0),
                 "error_message": agent.error_message,
+                "truncated": agent.truncated,
             }
         
         return progress
 
+    def _express_progress(self) -> dict[str, dict]:
+        """Per-section progress of an express run, derived from the draft stream.
+        
+        Sections before the last streamed marker are complete; the section
+        after it is still streaming.
+        """
+        drafter = self.express_drafter
+        streamed = list(parse_sections(drafter.output))
+        
+        progress = {}
+        for key in EXPRESS_SECTIONS:
+            if drafter.status == "done" or key in streamed[:-1]:
+                status, value = "done", 1.0
+            elif streamed and key == streamed[-1] and drafter.status == "streaming":
+                status, value = "streaming", drafter.progress
+            elif drafter.status in ("error", "cancelled"):
+                status, value = drafter.status, 0.0
+            else:
+                status, value = "waiting", 0.0
+            progress[key] = {
+                "status": status,
+                "progress": value,
+                "error_message": drafter.error_message,
+                "truncated": drafter.truncated,
+            }
+        
+        summarizer = self.express_summarizer
+        progress["integration"] = {
+            "status": summarizer.status,
+            "progress": summarizer.progress,
+            "error_message": summarizer.error_message,
+            "truncated": summarizer.truncated,
+        }
+        return progress
+
+    def get_preview(self, agent_key: str, max_chars: int = 1500) -> str:
+        """Get the tail of an agent's streamed output for live previews.
+        
+        The tail is cut at a line boundary so partially rendered Markdown
+        (tables, headings) is not shown from the middle of a line.
+        
+        Args:
+            agent_key: Key for the agent (market, product, finance, gtm, integration)
+            max_chars: Maximum number of characters to return
+            
+        Returns:
+            Streamed text so far (possibly truncated at the start)
+        """
+        if self.mode == "express":
+            if agent_key == "integration":
+                output = self.express_summarizer.output
+            else:
+                output = parse_sections(self.express_drafter.output).get(agent_key, "")
+        else:
+            agent = self.agents.get(agent_key)
+            if agent is None:
+                return ""
+            output = agent.output
+        
+        if len(output) <= max_chars:
+            return output
+        
+        tail = output[-max_chars:]
+        newline = tail.find("\n")
+        return tail[newline + 1:] if newline != -1 else tail
+
+    def get_document(self, agent_key: str) -> Optional[MarkdownStreamParser]:
+        """Get the structure parsed from an agent's stream so far.
+        
+        Headings, section tree and typed tables are parsed from the text
+        deltas as they arrive, so they are complete as soon as the agent
+        finishes, without re-parsing its output.
+        
+        Args:
+            agent_key: Key for the agent (market, product, finance, gtm, integration)
+            
+        Returns:
+            The agent's MarkdownStreamParser, or None for unknown keys and
+            for the sections of an express draft (one stream for all four)
+        """
+        if self.mode == "express":
+            return self.express_summarizer.document if agent_key == "integration" else None
+        agent = self.agents.get(agent_key)
+        return agent.document if agent is not None else None
+
     def estimate_cost(self) -> float:
         """Estimate total cost in USD based on token usage.
         
-        Uses Claude Sonnet 4.5 pricing:
-        - Input: $3 per 1M tokens
-        - Output: $15 per 1M tokens
+        Each agent's usage is priced at the model it ran with, including
+        prompt-cache writes and reads (see orchestrator.estimator.MODEL_PRICING).
         
         Returns:
             Estimated cost in USD
         """
-        input_tokens = self.total_token_usage.get("input", 0)
-        output_tokens = self.total_token_usage.get("output", 0)
-        
-        input_cost = (input_tokens / 1_000_000) * self.INPUT_COST_PER_MTOKEN
-        output_cost = (output_tokens / 1_000_000) * self.OUTPUT_COST_PER_MTOKEN
-        
-        return input_cost + output_cost
+        return sum(
+            get_pricing(agent.model).cost(
+                agent.token_usage.get("input", 0),
+                agent.token_usage.get("output", 0),
+                cache_write_tokens=agent.token_usage.get("cache_creation", 0),
+                cache_read_tokens=agent.token_usage.get("cache_read", 0),
+            )
+            for agent in self._all_agents()
+        )
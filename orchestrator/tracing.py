@@ -0,0 +1,262 @@
+"""Lightweight span tracing of plan runs.
+
+Each AgentOrchestrator owns a Tracer that records spans for the run, its
+phases, every agent's queue wait, request, first token and stream, retries
+and exporter calls. Spans are kept in memory (a few dozen per run) and can
+be exported as:
+
+- Chrome Trace Event JSON (to_chrome_trace(); open in https://ui.perfetto.dev
+  or chrome://tracing) to see the Phase 1 fan-out and the Phase 2 tail
+- OTLP/JSON (to_otlp()), which any OpenTelemetry collector accepts at
+  POST /v1/traces; no OpenTelemetry package is needed
+
+Set BPG_TRACE_DIR (or pass trace_dir to AgentOrchestrator) to write a
+Chrome trace of every run; the HTTP service also serves it at
+GET /runs/{run_id}/trace.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, ContextManager, Iterator, Optional
+
+
+@dataclass
+class Span:
+    """One timed operation (or an instant event when end_ns == start_ns).
+
+    Attributes:
+        name: Operation name (e.g., "phase1", "request")
+        category: Group shown as the Chrome trace category (run, agent, api, export)
+        start_ns: Start time in nanoseconds since the epoch
+        end_ns: End time, or None while the span is open
+        span_id: 16 hex digits, unique within the trace
+        parent_id: span_id of the enclosing span
+        thread_id: Thread the span ran on
+        thread_name: Name of that thread
+        attributes: Free-form details (agent, model, tokens, error, ...)
+        instant: Whether this is a point-in-time event
+    """
+
+    name: str
+    category: str
+    start_ns: int
+    end_ns: Optional[int] = None
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    thread_id: int = field(default_factory=threading.get_ident)
+    thread_name: str = field(default_factory=lambda: threading.current_thread().name)
+    attributes: dict = field(default_factory=dict)
+    instant: bool = False
+
+    @property
+    def duration_seconds(self) -> float:
+        """Length of the span (0 while open)."""
+        return ((self.end_ns or self.start_ns) - self.start_ns) / 1e9
+
+
+class Tracer:
+    """Collects the spans of one run. Thread-safe."""
+
+    def __init__(self) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def now() -> int:
+        """Current time in nanoseconds since the epoch."""
+        return time.time_ns()
+
+    @property
+    def current(self) -> Optional[Span]:
+        """Innermost open span of the calling thread."""
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        category: str = "run",
+        parent: Optional[Span] = None,
+        **attributes: Any,
+    ) -> Iterator[Span]:
+        """Record a with-block as a span.
+
+        Args:
+            name: Operation name
+            category: Span category
+            parent: Enclosing span (defaults to the thread's current span;
+                    pass it explicitly for work handed to another thread)
+            **attributes: Span attributes; more can be set on the yielded span
+
+        Yields:
+            The open Span
+        """
+        parent = parent or self.current
+        span = Span(
+            name,
+            category,
+            self.now(),
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes,
+        )
+        with self._lock:
+            self.spans.append(span)
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            stack.pop()
+            span.end_ns = self.now()
+
+    def record(
+        self,
+        name: str,
+        start_ns: int,
+        end_ns: Optional[int] = None,
+        category: str = "run",
+        parent: Optional[Span] = None,
+        **attributes: Any,
+    ) -> Span:
+        """Record a span that already happened (e.g., a queue wait).
+
+        Args:
+            name: Operation name
+            start_ns: Start time from now()
+            end_ns: End time (defaults to now)
+            category: Span category
+            parent: Enclosing span (defaults to the thread's current span)
+            **attributes: Span attributes
+
+        Returns:
+            The recorded Span
+        """
+        parent = parent or self.current
+        span = Span(
+            name,
+            category,
+            start_ns,
+            end_ns if end_ns is not None else self.now(),
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes,
+        )
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def event(self, name: str, category: str = "run", **attributes: Any) -> Span:
+        """Record an instant event inside the thread's current span."""
+        now = self.now()
+        span = self.record(name, now, now, category, **attributes)
+        span.instant = True
+        return span
+
+    def to_chrome_trace(self) -> dict:
+        """Spans as Chrome Trace Event JSON ({"traceEvents": [...]})."""
+        with self._lock:
+            spans = list(self.spans)
+        pid = os.getpid()
+        trace_events = []
+        threads = {}
+        for span in spans:
+            threads.setdefault(span.thread_id, span.thread_name)
+            event = {
+                "name": span.name,
+                "cat": span.category,
+                "ts": span.start_ns / 1000,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {key: _json_value(value) for key, value in span.attributes.items()},
+            }
+            if span.instant:
+                event.update(ph="i", s="t")
+            else:
+                event.update(ph="X", dur=((span.end_ns or self.now()) - span.start_ns) / 1000)
+            trace_events.append(event)
+        for thread_id, thread_name in threads.items():
+            trace_events.append(
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}}
+            )
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms", "otherData": {"trace_id": self.trace_id}}
+
+    def write_chrome_trace(self, path: str) -> str:
+        """Write to_chrome_trace() to a JSON file.
+
+        Args:
+            path: Destination file, or a directory to write
+                  "trace-<trace_id>.json" into
+
+        Returns:
+            Path of the written file
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, f"trace-{self.trace_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        return path
+
+    def to_otlp(self, service_name: str = "business-plan-generator") -> dict:
+        """Spans as an OTLP/JSON ExportTraceServiceRequest.
+
+        Args:
+            service_name: service.name resource attribute
+
+        Returns:
+            Dictionary to POST as JSON to a collector's /v1/traces
+        """
+        with self._lock:
+            spans = list(self.spans)
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or self.now()),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(_json_value(value))}}
+                    for key, value in {"category": span.category, **span.attributes}.items()
+                ],
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            if "error" in span.attributes:
+                otlp_span["status"] = {"code": 2, "message": str(span.attributes["error"])}
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]
+                    },
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": otlp_spans}],
+                }
+            ]
+        }
+
+
+def span(tracer: Optional[Tracer], name: str, category: str = "run", **attributes: Any) -> ContextManager:
+    """tracer.span(...), or a no-op context if tracing is off (tracer is None)."""
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, category, **attributes)
+
+
+def _json_value(value: Any) -> Any:
+    """Attribute value that json.dumps() accepts."""
+    return value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
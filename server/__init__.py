@@ -0,0 +1 @@
+"""HTTP service for headless business plan generation."""
@@ -0,0 +1,48 @@
+"""Command-line entry point: python -m server [--mock] [--port 8000]."""
+
+import argparse
+
+from dotenv import load_dotenv
+
+from server.service import serve
+
+
+def main() -> None:
+    """Parse arguments and start the HTTP service."""
+    parser = argparse.ArgumentParser(description="事業計画ジェネレーター HTTP/SSE サーバー")
+    parser.add_argument("--host", default="127.0.0.1", help="バインドするホスト")
+    parser.add_argument("--port", type=int, default=8000, help="バインドするポート")
+    parser.add_argument("--max-runs", type=int, default=4, help="同時実行ランの上限")
+    parser.add_argument("--max-queue", type=int, default=16, help="待機キューに入れるランの上限")
+    parser.add_argument(
+        "--express-load",
+        type=float,
+        default=None,
+        help="この負荷（実行中+待機中 / 同時実行上限）以上で新規ランをエクスプレスモードに切り替え",
+    )
+    parser.add_argument("--drain-timeout", type=float, default=300.0, help="停止時に実行中ランを待つ秒数")
+    parser.add_argument("--mock", action="store_true", help="Anthropic API の代わりにモッククライアントを使用")
+    parser.add_argument(
+        "--openai-base-url",
+        default=None,
+        help="Anthropic API の代わりに OpenAI 互換サーバー（llama.cpp / vLLM 等）を使用（例: http://localhost:8080/v1）",
+    )
+    parser.add_argument("--verbose", action="store_true", help="全リクエストをログ出力")
+    args = parser.parse_args()
+
+    load_dotenv()
+    serve(
+        host=args.host,
+        port=args.port,
+        max_concurrent_runs=args.max_runs,
+        max_queued_runs=args.max_queue,
+        express_load=args.express_load,
+        drain_timeout=args.drain_timeout,
+        mock=args.mock,
+        openai_base_url=args.openai_base_url,
+        verbose=args.verbose,
+    )
+
+
+if __name__ == "__main__":
+    main()
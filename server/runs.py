@@ -0,0 +1,312 @@
+"""Run registry for the HTTP service: one producer thread per run, many watchers."""
+
+import math
+import threading
+from typing import Any, Callable, Optional
+
+from agents.backends import LLMBackend
+from agents.key_pool import KeyPool
+from orchestrator.admission import DEFAULT_TENANT, AdmissionController, TenantQuota
+from orchestrator.coalescing import RunCoalescer, SharedRun, Subscription
+from orchestrator.estimator import MODEL_PRICING
+from orchestrator.runner import MODES, AgentOrchestrator
+from templates.catalog import TEMPLATES, get_template
+
+
+DEFAULT_MODEL = "claude-sonnet-4-5-20250929"
+
+# Bounds of the numeric fields a client may set
+PLAN_YEARS_RANGE = (1, 10)
+MAX_TOKENS_RANGE = (1, 16000)
+
+# Agent keys a max_tokens dictionary may set
+AGENT_KEYS = ("market", "product", "finance", "gtm", "integration", "express", "summary")
+
+# Fields a client may send; everything else (model routing, express model,
+# progress pacing, trace and profile output, ...) is server configuration
+CONTEXT_FIELDS = frozenset({
+    "company_name",
+    "business_description",
+    "plan_years",
+    "template",
+    "additional_context",
+    "model",
+    "max_tokens",
+    "budget_usd",
+    "downgrade_on_budget",
+    "mode",
+    "allow_express",
+    "tenant",
+    "request_id",
+})
+
+
+def _bounded_int(name: str, value: Any, bounds: tuple[int, int]) -> int:
+    """Check an integer field against its bounds."""
+    low, high = bounds
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise ValueError(f"{name} は {low}〜{high} の整数である必要があります")
+    return value
+
+
+def _template(value: Any) -> dict:
+    """Template of the catalog by key, with the client's field values."""
+    if value in (None, "", {}):
+        return {}
+    if isinstance(value, str):
+        value = {"key": value}
+    if not isinstance(value, dict) or set(value) - {"key", "fields"}:
+        raise ValueError('template はテンプレートのキー、または {"key", "fields"} である必要があります')
+    key = value.get("key")
+    template = get_template(key) if isinstance(key, str) else None
+    if template is None:
+        raise ValueError(f"template は {' / '.join(TEMPLATES)} のいずれかである必要があります")
+    fields = value.get("fields") or {}
+    if not isinstance(fields, dict) or not all(
+        isinstance(k, str) and isinstance(v, str) for k, v in fields.items()
+    ):
+        raise ValueError("template.fields は文字列の辞書である必要があります")
+    return {
+        "key": key,
+        "name": template["name"],
+        "fields": fields,
+        "hints": template.get("agent_hints", {}),
+    }
+
+
+def validate_context(payload: Any) -> dict:
+    """Validate a plan context received over HTTP.
+
+    Only CONTEXT_FIELDS are accepted, so clients cannot change server
+    settings (model routing, express model, trace or profile output)
+    through the context.
+
+    Args:
+        payload: Decoded JSON request body
+
+    Returns:
+        Context dictionary for AgentOrchestrator
+
+    Raises:
+        ValueError: If required fields are missing, a field is unknown, or
+                    a value has the wrong type or is out of range
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("リクエストボディはJSONオブジェクトである必要があります")
+
+    unknown = sorted(str(key) for key in payload if key not in CONTEXT_FIELDS)
+    if unknown:
+        raise ValueError(f"不明なフィールドです: {', '.join(unknown)}")
+
+    for key in ("company_name", "business_description"):
+        value = payload.get(key)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"{key} は必須です")
+    for key in ("additional_context", "tenant", "request_id"):
+        if not isinstance(payload.get(key, ""), str):
+            raise ValueError(f"{key} は文字列である必要があります")
+    model = payload.get("model", DEFAULT_MODEL)
+    if model not in MODEL_PRICING:
+        raise ValueError(f"model は {' / '.join(MODEL_PRICING)} のいずれかである必要があります")
+
+    context = {
+        "company_name": payload["company_name"].strip(),
+        "business_description": payload["business_description"].strip(),
+        "plan_years": _bounded_int("plan_years", payload.get("plan_years", 5), PLAN_YEARS_RANGE),
+        "template": _template(payload.get("template")),
+        "additional_context": payload.get("additional_context", "").strip(),
+        "model": model,
+    }
+    for key in ("tenant", "request_id"):
+        if key in payload:
+            context[key] = payload[key]
+
+    max_tokens = payload.get("max_tokens")
+    if isinstance(max_tokens, dict):
+        unknown = sorted(str(key) for key in max_tokens if key not in AGENT_KEYS)
+        if unknown:
+            raise ValueError(f"max_tokens のエージェントが不明です: {', '.join(unknown)}")
+        context["max_tokens"] = {
+            key: _bounded_int(f"max_tokens.{key}", value, MAX_TOKENS_RANGE)
+            for key, value in max_tokens.items()
+        }
+    elif max_tokens is not None:
+        context["max_tokens"] = _bounded_int("max_tokens", max_tokens, MAX_TOKENS_RANGE)
+
+    budget = payload.get("budget_usd")
+    if budget is not None:
+        if isinstance(budget, bool) or not isinstance(budget, (int, float)) or not 0 < budget < math.inf:
+            raise ValueError("budget_usd は正の数値である必要があります")
+        context["budget_usd"] = budget
+    for key in ("downgrade_on_budget", "allow_express"):
+        if key in payload:
+            if not isinstance(payload[key], bool):
+                raise ValueError(f"{key} は true / false である必要があります")
+            context[key] = payload[key]
+    mode = payload.get("mode", "full")
+    if mode not in MODES:
+        raise ValueError(f"mode は {' / '.join(MODES)} のいずれかである必要があります")
+    context["mode"] = mode
+    return context
+
+
+class RunManager:
+    """Start orchestrator runs and keep their events and results by run ID.
+
+    Runs are started through a RunCoalescer: identical submissions that
+    arrive while a run is in flight get the same run ID, and each run has
+    exactly one producer thread however many clients are watching. New
+    runs go through an AdmissionController, which queues them fairly
+    across tenants once every slot is busy.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_runs: int = 4,
+        max_finished_runs: int = 100,
+        client_factory: Optional[Callable[[], Any]] = None,
+        max_queued_runs: int = 16,
+        max_runs_per_tenant: int = 2,
+        tenant_quota: Optional[TenantQuota] = None,
+        express_load: Optional[float] = None,
+        backend_factory: Optional[Callable[[], LLMBackend]] = None,
+        key_pool: Optional[KeyPool] = None,
+    ) -> None:
+        """Initialize RunManager.
+
+        Args:
+            max_concurrent_runs: Maximum number of runs generating at once
+            max_finished_runs: Finished runs kept for result/export lookups
+            client_factory: Optional factory for the client shared by a run's
+                            agents (e.g., MockAnthropicClient for benchmarks)
+            max_queued_runs: Maximum number of runs waiting for a slot
+            max_runs_per_tenant: Maximum queued + running runs per tenant
+            tenant_quota: Token/cost quota applied to every tenant
+            express_load: Admission load at or above which new runs switch
+                          to the express pipeline (unless the context sets
+                          allow_express to false), or None to never switch
+            backend_factory: Optional factory for the LLM backend shared by a
+                             run's agents (e.g., FakeBackend or an
+                             OpenAICompatibleBackend); takes precedence
+                             over client_factory
+            key_pool: API keys to spread runs across; each run gets its own
+                      PooledAnthropicBackend unless backend_factory is given
+        """
+        self.max_concurrent_runs = max_concurrent_runs
+        self.max_finished_runs = max_finished_runs
+        self.client_factory = client_factory
+        self.key_pool = key_pool
+        self.backend_factory = backend_factory or (key_pool.backend if key_pool else None)
+        self.admission = AdmissionController(
+            max_concurrent_runs=max_concurrent_runs,
+            max_queue_length=max_queued_runs,
+            max_pending_per_tenant=max_runs_per_tenant,
+            default_quota=tenant_quota,
+            express_load_threshold=express_load,
+        )
+        self.coalescer = RunCoalescer(
+            orchestrator_factory=self._create_orchestrator,
+            admission=self.admission,
+        )
+
+        self._runs: dict[str, SharedRun] = {}
+        self._subscriptions: dict[str, list[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def active_count(self) -> int:
+        """Number of runs queued or generating."""
+        return self.coalescer.inflight_count
+
+    def start_run(self, context: dict, tenant: Optional[str] = None) -> Subscription:
+        """Start a new run, or attach to an identical in-flight run.
+
+        Args:
+            context: Validated context dictionary (see validate_context)
+            tenant: Tenant charged for the run; defaults to context["tenant"]
+
+        Returns:
+            Subscription to the (possibly shared) run
+
+        Raises:
+            AdmissionRejected: If the server is draining, the queue is full,
+                               or the tenant is over its limits
+            BudgetExceededError: If the run's estimate exceeds context["budget_usd"]
+        """
+        model = context.get("model") or DEFAULT_MODEL
+        tenant = tenant or context.get("tenant") or DEFAULT_TENANT
+        subscription = self.coalescer.acquire(context, model, tenant=tenant)
+        run = subscription.run
+        with self._lock:
+            self._runs[run.run_id] = run
+            self._subscriptions.setdefault(run.run_id, []).append(subscription)
+            self._evict_finished()
+        return subscription
+
+    def cancel_run(self, run_id: str) -> bool:
+        """Release one submission of a run.
+
+        The run is only cancelled once every submission that attached to it
+        has been released.
+
+        Args:
+            run_id: Run ID returned by start_run()
+
+        Returns:
+            True if a submission was released
+        """
+        with self._lock:
+            subscriptions = self._subscriptions.get(run_id)
+            if not subscriptions:
+                return False
+            subscription = subscriptions.pop()
+        subscription.release()
+        return True
+
+    def get(self, run_id: str) -> Optional[SharedRun]:
+        """Look up a run by ID.
+
+        Args:
+            run_id: Run ID returned by start_run()
+
+        Returns:
+            SharedRun, or None if unknown or evicted
+        """
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Stop accepting runs and wait for queued and active runs to finish.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if all active runs finished within the timeout
+        """
+        self.admission.drain()
+        return self.coalescer.wait_idle(timeout=timeout)
+
+    def _create_orchestrator(self, context: dict, model: str) -> AgentOrchestrator:
+        """Orchestrator factory used by the coalescer; refuses over-budget runs."""
+        client = self.client_factory() if self.client_factory else None
+        backend = self.backend_factory() if self.backend_factory else None
+        orchestrator = AgentOrchestrator(
+            context=context, model=model, client=client, backend=backend
+        )
+        orchestrator.preflight(
+            budget_usd=context.get("budget_usd"),
+            allow_downgrade=bool(context.get("downgrade_on_budget", False)),
+        )
+        return orchestrator
+
+    def _evict_finished(self) -> None:
+        """Drop the oldest finished runs beyond max_finished_runs. Lock must be held."""
+        finished = [run for run in self._runs.values() if run.done]
+        excess = len(finished) - self.max_finished_runs
+        if excess <= 0:
+            return
+        finished.sort(key=lambda run: run.finished_at or 0.0)
+        for run in finished[:excess]:
+            del self._runs[run.run_id]
+            self._subscriptions.pop(run.run_id, None)
@@ -0,0 +1,442 @@
+"""HTTP server with Server-Sent Events for headless plan generation.
+
+Endpoints:
+    POST /runs                     Start a run (JSON plan context) -> 202 {run_id, ...}
+                                   (?compare=modes adds both modes' estimates)
+                                   (429/503 with Retry-After when not admitted,
+                                   422 when over the optional budget_usd)
+    GET  /runs/{run_id}            Run status, progress and (when done) the result
+    GET  /runs/{run_id}/events     Server-Sent Events stream of the run
+    GET  /runs/{run_id}/export/{fmt}  Export the finished plan (md, xlsx, pdf)
+    GET  /runs/{run_id}/trace      Chrome Trace Event JSON of the run (Perfetto)
+    DELETE /runs/{run_id}          Release a submission; the last release cancels the run
+    GET  /healthz                  Liveness and load information
+    GET  /metrics                  Prometheus metrics (see orchestrator.metrics)
+"""
+
+import functools
+import io
+import json
+import math
+import os
+import signal
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs
+
+from agents.backends import FakeBackend, OpenAICompatibleBackend
+from agents.key_pool import KeyPool
+from exporters.cache import ExportCache
+from orchestrator.admission import AdmissionRejected
+from orchestrator.coalescing import SharedRun
+from orchestrator.estimator import BudgetExceededError
+from orchestrator.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, METRICS
+from orchestrator.tracing import Tracer
+from server.runs import RunManager, validate_context
+
+
+# Seconds between SSE keep-alive comments on an idle stream
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# Maximum accepted request body size (bytes)
+MAX_BODY_BYTES = 1_000_000
+
+# Content types of the rendered export formats
+EXPORT_CONTENT_TYPES = {
+    "md": "text/markdown; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+    "html": "text/html; charset=utf-8",
+}
+
+
+def render_export(
+    result: dict,
+    fmt: str,
+    tracer: Optional[Tracer] = None,
+    cache: Optional[ExportCache] = None,
+) -> tuple[bytes, str, str]:
+    """Render a finished run result in the requested format.
+
+    Args:
+        result: Result dictionary from AgentOrchestrator.run_all()
+        fmt: "md", "xlsx" or "pdf" (HTML when weasyprint is unavailable)
+        tracer: Tracer of the run, to record the export as a span
+        cache: Optional export cache, so repeated downloads render once
+
+    Returns:
+        Tuple of (content, content_type, filename)
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt == "md":
+        return (
+            result.get("business_plan", "").encode("utf-8"),
+            EXPORT_CONTENT_TYPES["md"],
+            "business_plan.md",
+        )
+
+    if fmt == "xlsx":
+        from exporters.excel_exporter import ExcelExporter
+
+        exporter = ExcelExporter(tracer=tracer)
+    elif fmt == "pdf":
+        from exporters.pdf_exporter import PDFExporter
+
+        exporter = PDFExporter(tracer=tracer)
+    else:
+        raise ValueError(f"未対応の形式です: {fmt}")
+
+    if cache is not None:
+        content, written = cache.get_or_render(exporter, result)
+    else:
+        # Render in memory; concurrent exports never touch the disk
+        buffer = io.BytesIO()
+        written = exporter.write(result, buffer)
+        content = buffer.getvalue()
+    return content, EXPORT_CONTENT_TYPES[written], f"business_plan.{written}"
+
+
+class PlanRequestHandler(BaseHTTPRequestHandler):
+    """Request handler; the RunManager is attached to the server instance."""
+
+    server_version = "BusinessPlanGenerator/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def manager(self) -> RunManager:
+        """RunManager shared by all requests."""
+        return self.server.manager
+
+    def log_message(self, format: str, *args) -> None:
+        """Only log requests when the server runs in verbose mode."""
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+    def do_POST(self) -> None:
+        """Handle POST /runs."""
+        path, _, query = self.path.partition("?")
+        if path.rstrip("/") != "/runs":
+            self._send_unread(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_unread(HTTPStatus.BAD_REQUEST, {"error": "Content-Length が不正です"})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_unread(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "リクエストボディが大きすぎます"})
+            return
+
+        try:
+            payload = json.loads(self.rfile.read(length) or b"null")
+            context = validate_context(payload)
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+
+        tenant = self.headers.get("X-Tenant-ID")
+        try:
+            subscription = self.manager.start_run(context, tenant=tenant)
+        except AdmissionRejected as e:
+            # Per-tenant limits are the client's own doing; the rest is load
+            status = (
+                HTTPStatus.TOO_MANY_REQUESTS
+                if e.reason in ("tenant_limit", "quota")
+                else HTTPStatus.SERVICE_UNAVAILABLE
+            )
+            retry_after = math.ceil(e.retry_after)
+            self._send_json(
+                status,
+                {"error": str(e), "reason": e.reason, "retry_after": retry_after},
+                headers={"Retry-After": str(retry_after)},
+            )
+            return
+        except BudgetExceededError as e:
+            self._send_json(
+                HTTPStatus.UNPROCESSABLE_ENTITY,
+                {"error": str(e), "estimate": e.estimate.to_dict()},
+            )
+            return
+
+        run = subscription.run
+        payload = {
+            "run_id": run.run_id,
+            "status": run.status,
+            "coalesced": subscription.coalesced,
+            "mode": run.orchestrator.mode,
+            "status_url": f"/runs/{run.run_id}",
+            "events_url": f"/runs/{run.run_id}/events",
+        }
+        if run.orchestrator.estimate is not None:
+            payload["estimate"] = run.orchestrator.estimate.to_dict()
+        if "modes" in parse_qs(query).get("compare", []):
+            # Cost and latency of both pipelines, so clients can pick one next time
+            payload["modes"] = {
+                mode: {"cost_usd": round(estimate.cost_usd, 4), "seconds": round(estimate.seconds, 1)}
+                for mode, estimate in run.orchestrator.compare_modes().items()
+            }
+        if run.status == "queued":
+            payload["queue_position"] = run.ticket.queue_position
+            payload["eta_seconds"] = round(run.ticket.eta_seconds, 1)
+        self._send_json(HTTPStatus.ACCEPTED, payload)
+
+    def do_DELETE(self) -> None:
+        """Handle DELETE /runs/{run_id}."""
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if len(parts) != 2 or parts[0] != "runs":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+
+        run = self.manager.get(parts[1])
+        if run is None or not self.manager.cancel_run(run.run_id):
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "run not found"})
+            return
+
+        self._send_json(
+            HTTPStatus.OK,
+            {"run_id": run.run_id, "status": run.status, "subscribers": run.subscribers},
+        )
+
+    def do_GET(self) -> None:
+        """Handle GET requests."""
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+
+        if parts == ["healthz"]:
+            self._send_json(
+                HTTPStatus.OK,
+                {
+                    "status": "ok",
+                    "active_runs": self.manager.active_count,
+                    "admission": self.manager.admission.snapshot(),
+                    "api_keys": (
+                        self.manager.key_pool.snapshot() if self.manager.key_pool else None
+                    ),
+                },
+            )
+            return
+
+        if parts == ["metrics"]:
+            if self.manager.key_pool is not None:
+                self.manager.key_pool.export_metrics()
+            self._send_bytes(HTTPStatus.OK, METRICS.render().encode("utf-8"), METRICS_CONTENT_TYPE)
+            return
+
+        if len(parts) < 2 or parts[0] != "runs":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+
+        run = self.manager.get(parts[1])
+        if run is None:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "run not found"})
+            return
+
+        if len(parts) == 2:
+            self._send_json(HTTPStatus.OK, run.to_dict())
+        elif parts[2:] == ["events"]:
+            self._stream_events(run)
+        elif len(parts) == 4 and parts[2] == "export":
+            self._send_export(run, parts[3])
+        elif parts[2:] == ["trace"]:
+            self._send_json(HTTPStatus.OK, run.orchestrator.tracer.to_chrome_trace())
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+    def _stream_events(self, run: SharedRun) -> None:
+        """Stream a run's events as Server-Sent Events."""
+        try:
+            after_seq = int(self.headers.get("Last-Event-ID", 0))
+        except ValueError:
+            after_seq = 0
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.send_header("X-Accel-Buffering", "no")
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            for event in run.broadcaster.subscribe(
+                after_seq=after_seq, timeout=SSE_KEEPALIVE_SECONDS
+            ):
+                if event is None:
+                    self.wfile.write(b": keep-alive\n\n")
+                else:
+                    data = json.dumps(event.to_dict(), ensure_ascii=False)
+                    self.wfile.write(
+                        f"id: {event.seq}\nevent: {event.type}\ndata: {data}\n\n".encode("utf-8")
+                    )
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; the run itself keeps going for other watchers
+            pass
+
+    def _send_export(self, run: SharedRun, fmt: str) -> None:
+        """Send an export of a finished run."""
+        if run.status != "done" or run.result is None:
+            self._send_json(
+                HTTPStatus.CONFLICT,
+                {"error": "run is not finished", "status": run.status},
+            )
+            return
+
+        try:
+            content, content_type, filename = render_export(
+                run.result, fmt, tracer=run.orchestrator.tracer, cache=self.server.export_cache
+            )
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+
+        self._send_bytes(
+            HTTPStatus.OK,
+            content,
+            content_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    def _send_unread(self, status: HTTPStatus, payload: dict) -> None:
+        """Send a JSON response without reading the request body.
+
+        The unread body would be parsed as the next request of a kept-alive
+        connection, so the connection is closed after the response.
+        """
+        self.close_connection = True
+        self._send_json(status, payload, headers={"Connection": "close"})
+
+    def _send_json(
+        self, status: HTTPStatus, payload: dict, headers: Optional[dict] = None
+    ) -> None:
+        """Send a JSON response."""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send_bytes(status, body, "application/json; charset=utf-8", headers)
+
+    def _send_bytes(
+        self,
+        status: HTTPStatus,
+        body: bytes,
+        content_type: str,
+        headers: Optional[dict] = None,
+    ) -> None:
+        """Send a complete response body."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PlanServer(ThreadingHTTPServer):
+    """Threading HTTP server that owns a RunManager."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        manager: RunManager,
+        verbose: bool = False,
+        export_cache: Optional[ExportCache] = None,
+    ) -> None:
+        """Initialize PlanServer.
+
+        Args:
+            address: (host, port) to bind; port 0 picks a free port
+            manager: RunManager handling the runs
+            verbose: Whether to log every request
+            export_cache: Cache of rendered exports (defaults to
+                          ExportCache.from_env())
+        """
+        super().__init__(address, PlanRequestHandler)
+        self.manager = manager
+        self.verbose = verbose
+        self.export_cache = export_cache or ExportCache.from_env()
+
+    def drain_and_shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Stop accepting runs, wait for active runs, then stop serving.
+
+        Args:
+            timeout: Maximum seconds to wait for active runs
+
+        Returns:
+            True if all runs finished before shutdown
+        """
+        drained = self.manager.drain(timeout=timeout)
+        self.shutdown()
+        return drained
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_concurrent_runs: int = 4,
+    max_queued_runs: int = 16,
+    express_load: Optional[float] = None,
+    drain_timeout: float = 300.0,
+    mock: bool = False,
+    openai_base_url: Optional[str] = None,
+    verbose: bool = False,
+) -> None:
+    """Run the HTTP service until SIGINT/SIGTERM, then drain gracefully.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+        max_concurrent_runs: Concurrency cap for generating runs
+        max_queued_runs: Maximum number of runs waiting for a slot
+        express_load: Admission load at which new runs switch to the
+                      express pipeline, or None to never switch
+        drain_timeout: Seconds to wait for active runs on shutdown
+        mock: Use the in-process FakeBackend instead of the Anthropic API
+        openai_base_url: Stream from this OpenAI-compatible endpoint (e.g., a
+                         local llama.cpp or vLLM server) instead of the
+                         Anthropic API
+        verbose: Whether to log every request
+    """
+    backend_factory = None
+    key_pool = None
+    if mock:
+        backend_factory = FakeBackend
+    elif openai_base_url:
+        backend_factory = functools.partial(OpenAICompatibleBackend, openai_base_url)
+    else:
+        # Spread runs across ANTHROPIC_API_KEYS when several keys are configured
+        key_pool = KeyPool.from_env()
+
+    manager = RunManager(
+        max_concurrent_runs=max_concurrent_runs,
+        max_queued_runs=max_queued_runs,
+        express_load=express_load,
+        backend_factory=backend_factory,
+        key_pool=key_pool,
+    )
+    server = PlanServer((host, port), manager, verbose=verbose)
+
+    def handle_signal(signum, frame) -> None:
+        """Drain in a separate thread; shutdown() must not run on the serving thread."""
+        print(f"🛑 停止シグナルを受信しました。実行中のランを待機します（最大{drain_timeout:.0f}秒）")
+        threading.Thread(
+            target=server.drain_and_shutdown,
+            kwargs={"timeout": drain_timeout},
+            daemon=True,
+        ).start()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    backend = "mock" if mock else "anthropic"
+    print(f"🚀 http://{host}:{server.server_port} で待機中 (backend={backend}, max_runs={max_concurrent_runs}, pid={os.getpid()})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
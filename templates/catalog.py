@@ -4,6 +4,10 @@ from typing import Optional
 
 
 # Template definitions
+#
+# "model_routing" maps agent keys to a model tier ("selected" = the model
+# chosen in the sidebar, "fast" = the next faster/cheaper model) or to a
+# model ID; agents not listed use the selected model (see orchestrator.routing).
 TEMPLATES = {
     "saas": {
         "name": "SaaS事業",
@@ -38,6 +42,7 @@ TEMPLATES = {
                 "options": None,
             },
         ],
+        "model_routing": {"market": "fast", "gtm": "fast"},
         "agent_hints": {
             "market": (
                 "SaaS市場の特性を考慮してください。"
@@ -103,6 +108,7 @@ TEMPLATES = {
                 ],
             },
         ],
+        "model_routing": {"product": "fast", "gtm": "fast"},
         "agent_hints": {
             "market": (
                 "医療市場の規制環境を詳述。"
@@ -160,6 +166,7 @@ TEMPLATES = {
                 ],
             },
         ],
+        "model_routing": {"market": "fast", "gtm": "fast"},
         "agent_hints": {
             "market": (
                 "工業用・産業用市場の特性: 長い営業サイクル（6-24ヶ月）を想定。"
@@ -220,6 +227,7 @@ TEMPLATES = {
                 "options": None,
             },
         ],
+        "model_routing": {"market": "fast", "gtm": "fast"},
         "agent_hints": {
             "market": (
                 "市場規模: 日本EC市場の成長率 8-12% (2024予測)。"
@@ -270,6 +278,7 @@ TEMPLATES = {
                 "options": None,
             },
         ],
+        "model_routing": {},
         "agent_hints": {
             "market": "ビジネスモデルに応じた市場規模推定を実施。",
             "product": "業界特性に応じたプロダクト戦略の構築。",
@@ -0,0 +1,125 @@
+"""Test script for multi-tenant admission control (no API calls)."""
+
+import sys
+import os
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.mock_client import MockAnthropicClient
+from orchestrator.admission import AdmissionController, AdmissionRejected, TenantQuota
+from orchestrator.coalescing import RunCoalescer
+from orchestrator.runner import AgentOrchestrator
+
+
+MODEL = "claude-sonnet-4-5-20250929"
+
+
+def test_weighted_fair_queuing() -> None:
+    """A tenant with a backlog doesn't push other tenants to the back."""
+    controller = AdmissionController(max_concurrent_runs=1, max_pending_per_tenant=10)
+    a1, a2, a3 = (controller.submit("a") for _ in range(3))
+    b1 = controller.submit("b")
+
+    assert a1.state == "admitted"
+    assert [a2.queue_position, a3.queue_position, b1.queue_position] == [1, 3, 2]
+
+    order = []
+    for ticket in (a1, a2, b1, a3):
+        assert ticket.wait(timeout=1)
+        order.append(ticket)
+        ticket.release()
+    assert order == [a1, a2, b1, a3]
+
+
+def test_rejects_with_retry_after() -> None:
+    """A full queue and per-tenant limits are refused with a retry hint."""
+    controller = AdmissionController(
+        max_concurrent_runs=1, max_queue_length=2, max_pending_per_tenant=1,
+        initial_run_seconds=60,
+    )
+    running = controller.submit("a")
+    first = controller.submit("b")
+    second = controller.submit("c")
+    assert running.eta_seconds == 0
+    assert 0 < first.eta_seconds < second.eta_seconds
+
+    try:
+        controller.submit("d")
+        raise AssertionError("full queue should reject")
+    except AdmissionRejected as e:
+        assert e.reason == "overloaded" and e.retry_after > 60
+        assert "秒後に再試行" in str(e)
+
+    try:
+        controller.submit("a")
+        raise AssertionError("tenant limit should reject")
+    except AdmissionRejected as e:
+        assert e.reason == "tenant_limit"
+
+    # Leaving the queue frees the place for someone else
+    assert second.cancel()
+    assert controller.submit("d").queue_position == 2
+
+
+def test_tenant_quota() -> None:
+    """A tenant over its rolling token quota is refused until the window passes."""
+    controller = AdmissionController(
+        default_quota=TenantQuota(max_tokens=10_000, window_seconds=3600),
+    )
+    controller.submit("a").release(tokens=12_000, cost_usd=0.1)
+
+    try:
+        controller.submit("a")
+        raise AssertionError("quota should reject")
+    except AdmissionRejected as e:
+        assert e.reason == "quota"
+        assert 3500 < e.retry_after <= 3600
+
+    # Other tenants are unaffected
+    assert controller.submit("b").state == "admitted"
+    assert controller.tenant_usage("a")["tokens"] == 12_000
+
+
+def test_coalescer_queues_and_cancels() -> None:
+    """Runs beyond the cap wait; releasing a queued run gives up its place."""
+    admission = AdmissionController(max_concurrent_runs=1)
+    coalescer = RunCoalescer(
+        orchestrator_factory=lambda context, model: AgentOrchestrator(
+            context=context,
+            model=model,
+            client=MockAnthropicClient(chunk_count=20, chunk_delay=0.01, first_token_delay=0.0),
+        ),
+        admission=admission,
+    )
+    context = {"company_name": "MediFlow", "business_description": "医療SaaS", "plan_years": 5}
+
+    running = coalescer.acquire(context, MODEL, tenant="a")
+    queued = coalescer.acquire({**context, "company_name": "Other"}, MODEL, tenant="b")
+    assert queued.run.status == "queued"
+    assert queued.run.to_dict()["queue_position"] == 1
+
+    queued.release()
+    assert coalescer.wait_idle(timeout=0.01) is False  # the running run keeps going
+    assert queued.run._done.wait(timeout=5) and queued.run.status == "cancelled"
+
+    assert "モック出力" in running.result(timeout=30)["business_plan"]
+    running.release()
+    assert coalescer.wait_idle(timeout=5)
+    assert admission.running_count == 0 and admission.queued_count == 0
+    assert admission.tenant_usage("a")["tokens"] > 0
+
+
+if __name__ == "__main__":
+    for test in (
+        test_weighted_fair_queuing,
+        test_rejects_with_retry_after,
+        test_tenant_quota,
+        test_coalescer_queues_and_cancels,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
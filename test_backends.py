@@ -0,0 +1,159 @@
+"""Test script for the pluggable LLM backends (local servers only, no API calls)."""
+
+import sys
+import os
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.backends import BackendError, FakeBackend, OpenAICompatibleBackend
+from agents.market_researcher import MarketResearcher
+from orchestrator.runner import AgentOrchestrator
+
+
+class _ChatCompletionsHandler(BaseHTTPRequestHandler):
+    """Minimal streaming /v1/chat/completions endpoint."""
+
+    requests: list = []
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append(body)
+        if body["model"] in ("overloaded", "slow-down"):
+            self.send_response(503)
+            self.send_header("Retry-After", "7" if body["model"] == "overloaded" else "1.5")
+            self.end_headers()
+            self.wfile.write(b"busy")
+            return
+        if body["model"] in ("stalled", "garbled"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            self.wfile.write(b'data: {"choices": [{"delta": {"content": "## "}}]}\n\n')
+            if body["model"] == "garbled":
+                self.wfile.write(b'data: {"choices": [\n\n')
+            else:
+                self.wfile.flush()
+                time.sleep(1.0)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        chunks = [
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": "## 市場"}}]},
+            {"choices": [{"delta": {"content": "分析"}, "finish_reason": "length"}]},
+            {"choices": [], "usage": {"prompt_tokens": 120, "completion_tokens": 3}},
+        ]
+        for chunk in chunks:
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+def _start_server() -> ThreadingHTTPServer:
+    _ChatCompletionsHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatCompletionsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_openai_compatible_backend() -> None:
+    """An agent streams from an OpenAI-compatible server with mapped model IDs."""
+    server = _start_server()
+    try:
+        backend = OpenAICompatibleBackend(
+            f"http://127.0.0.1:{server.server_port}/v1",
+            api_key="",
+            model_map={"*": "local-model"},
+        )
+        agent = MarketResearcher(backend=backend)
+        output = agent.run_sync({"company_name": "MediFlow", "business_description": "医療SaaS"})
+
+        assert output == "## 市場分析"
+        assert agent.token_usage == {"input": 120, "output": 3, "cache_creation": 0, "cache_read": 0}
+        assert agent.stop_reason == "max_tokens"
+        request = _ChatCompletionsHandler.requests[0]
+        assert request["model"] == "local-model" and request["stream"] is True
+        assert [message["role"] for message in request["messages"]] == ["system", "user"]
+    finally:
+        server.shutdown()
+
+
+def test_backend_errors_are_normalized() -> None:
+    """HTTP errors surface as BackendError with the status and Retry-After."""
+    server = _start_server()
+    try:
+        backend = OpenAICompatibleBackend(f"http://127.0.0.1:{server.server_port}/v1", api_key="")
+        try:
+            with backend.stream("overloaded", "system", "user", 100):
+                pass
+            raise AssertionError("503 should raise")
+        except BackendError as e:
+            assert e.status_code == 503 and e.retry_after == 7
+            assert e.provider == OpenAICompatibleBackend.name
+    finally:
+        server.shutdown()
+
+
+def test_stream_errors_are_normalized() -> None:
+    """Mid-stream timeouts and malformed data surface as ConnectionError/BackendError."""
+    server = _start_server()
+    try:
+        backend = OpenAICompatibleBackend(
+            f"http://127.0.0.1:{server.server_port}/v1", api_key="", timeout=0.3
+        )
+        for model, error_type in (("stalled", ConnectionError), ("garbled", BackendError)):
+            texts = []
+            try:
+                with backend.stream(model, "system", "user", 100) as stream:
+                    for event in stream:
+                        if event.type == "text":
+                            texts.append(event.text)
+                raise AssertionError(f"{model} should raise")
+            except error_type as e:
+                assert texts == ["## "], model
+                if isinstance(e, BackendError):
+                    assert e.status_code == 502 and e.provider == OpenAICompatibleBackend.name
+
+        try:
+            with backend.stream("slow-down", "system", "user", 100):
+                pass
+            raise AssertionError("503 should raise")
+        except BackendError as e:
+            assert e.retry_after == 1.5
+    finally:
+        server.shutdown()
+
+
+def test_orchestrator_runs_offline_with_fake_backend() -> None:
+    """A whole run completes with the in-process fake and no API key."""
+    orchestrator = AgentOrchestrator(
+        context={"company_name": "MediFlow", "business_description": "医療SaaS", "plan_years": 5},
+        backend=FakeBackend(chunk_count=10, chunk_delay=0.0, first_token_delay=0.0),
+    )
+    result = orchestrator.run_all()
+    assert "モック出力" in result["business_plan"]
+    assert result["token_usage"]["output"] > 0
+
+
+if __name__ == "__main__":
+    for test in (
+        test_openai_compatible_backend,
+        test_backend_errors_are_normalized,
+        test_stream_errors_are_normalized,
+        test_orchestrator_runs_offline_with_fake_backend,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,104 @@
+"""Test script for BatchExporter (no API calls)."""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from exporters import batch
+from exporters.batch import BatchExporter, open_sink
+from orchestrator.metrics import BATCH_EXPORTS
+
+
+def _results(count: int):
+    for i in range(count):
+        yield f"company_{i}", {
+            "business_plan": f"# 事業計画書 {i}\n\n## 概要\n\n本文",
+            "sections": {"finance": "| 項目 | 1年目 |\n|---|---|\n| 売上 | 1,200万円 |"},
+        }
+
+
+def test_batch_streams_into_zip() -> None:
+    """Every format of every plan ends up in the archive, rendered in worker processes."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "plans.zip")
+        sink = open_sink(path)
+        progress = []
+        try:
+            report = BatchExporter(max_workers=2).export(
+                _results(3), sink, on_progress=lambda r: progress.append(r.succeeded)
+            )
+        finally:
+            sink.close()
+
+        with zipfile.ZipFile(path) as archive:
+            names = sorted(archive.namelist())
+        pdf_ext = names[0].rsplit(".", 1)[1]
+        assert names == sorted(
+            f"company_{i}.{ext}" for i in range(3) for ext in ("xlsx", pdf_ext)
+        )
+    assert report.jobs == report.succeeded == 6 and report.failed == 0
+    assert report.bytes > 0 and report.files_per_second > 0
+    assert progress == [1, 2, 3, 4, 5, 6]
+
+
+def test_batch_backpressure_and_timeouts() -> None:
+    """At most max_workers renders run at once; a slow render times out alone."""
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+    original = batch.render_export
+
+    def render(fmt, result):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        try:
+            time.sleep(2.0 if "slow" in result["business_plan"] else 0.05)
+            return b"x", fmt
+        finally:
+            with lock:
+                running -= 1
+
+    def results():
+        yield from _results(4)
+        yield "company_slow", {"business_plan": "slow"}
+
+    timeouts = BATCH_EXPORTS.value(format="xlsx", result="timeout")
+    batch.render_export = render
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sink = open_sink(tmp_dir)
+            exporter = BatchExporter(max_workers=3, formats=("xlsx",), timeout=0.5, processes=False)
+            report = exporter.export(results(), sink)
+            written = sorted(os.listdir(tmp_dir))
+    finally:
+        batch.render_export = original
+
+    assert peak <= 3
+    assert report.succeeded == 4 and written == [f"company_{i}.xlsx" for i in range(4)]
+    assert [(name, error.split(":")[0]) for name, _, error in report.failures] == [
+        ("company_slow", "TimeoutError"),
+    ]
+    assert BATCH_EXPORTS.value(format="xlsx", result="timeout") == timeouts + 1
+    # The batch did not wait for the abandoned render
+    assert report.seconds < 1.5
+
+
+if __name__ == "__main__":
+    for test in (
+        test_batch_streams_into_zip,
+        test_batch_backpressure_and_timeouts,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,280 @@
+"""Test script for single-flight run coalescing (mock backend, no API calls)."""
+
+import sys
+import os
+import threading
+import time
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.base import RunCancelledError
+from agents.mock_client import MockAnthropicClient
+from orchestrator.admission import AdmissionController, AdmissionRejected
+from orchestrator.coalescing import RunCoalescer, canonical_key
+from orchestrator.runner import AgentOrchestrator
+
+
+MODEL = "claude-sonnet-4-5-20250929"
+
+test_context = {
+    "company_name": "MediFlow",
+    "business_description": "医療機関向けワークフロー自動化SaaSプラットフォーム",
+    "plan_years": 5,
+    "template": {},
+    "additional_context": "",
+}
+
+
+def _coalescer(chunk_delay: float = 0.0) -> RunCoalescer:
+    """Create a coalescer whose runs use the mock client."""
+    return RunCoalescer(
+        orchestrator_factory=lambda context, model: AgentOrchestrator(
+            context=context,
+            model=model,
+            client=MockAnthropicClient(chunk_count=20, chunk_delay=chunk_delay, first_token_delay=0.0),
+        )
+    )
+
+
+def test_canonical_key_ignores_formatting() -> None:
+    """Whitespace, key order, full-width forms and empty fields don't matter."""
+    variant = {
+        "additional_context": "",
+        "business_description": "  医療機関向けワークフロー自動化SaaSプラットフォーム ",
+        "company_name": "ＭｅｄｉＦｌｏｗ",
+        "plan_years": 5,
+        "template": {},
+        "model": "ignored",
+        "tenant": "someone-else",
+    }
+    assert canonical_key(variant, MODEL) == canonical_key(test_context, MODEL)
+    assert canonical_key(test_context, MODEL) != canonical_key(test_context, "claude-opus-4-1-20250805")
+    assert canonical_key({**test_context, "plan_years": 3}, MODEL) != canonical_key(test_context, MODEL)
+
+
+def test_identical_submissions_share_one_run() -> None:
+    """Concurrent identical submissions attach to one run and one result."""
+    coalescer = _coalescer(chunk_delay=0.01)
+    first = coalescer.acquire(test_context, MODEL)
+    second = coalescer.acquire(dict(test_context), MODEL)
+    other = coalescer.acquire({**test_context, "company_name": "Other"}, MODEL)
+
+    assert second.run is first.run and second.coalesced and not first.coalesced
+    assert other.run is not first.run
+    assert coalescer.runs_started == 2 and coalescer.submissions_coalesced == 1
+
+    result = first.result(timeout=30)
+    assert second.result(timeout=30) is result
+    assert [event.seq for event in first.events()] == [event.seq for event in second.events()]
+    other.result(timeout=30)
+
+    # Finished runs leave the in-flight table; the next submission starts fresh
+    assert coalescer.wait_idle(timeout=5)
+    assert not coalescer.acquire(test_context, MODEL).coalesced
+
+
+def test_slow_build_blocks_only_identical_submissions() -> None:
+    """Other keys start while one orchestrator builds; identical ones share its outcome."""
+    release = threading.Event()
+    building = threading.Event()
+
+    def factory(context, model):
+        if context["company_name"] in ("Slow", "Broken"):
+            building.set()
+            release.wait(timeout=10)
+            if context["company_name"] == "Broken":
+                raise ValueError("preflight failed")
+        return AgentOrchestrator(
+            context=context,
+            model=model,
+            client=MockAnthropicClient(chunk_count=5, chunk_delay=0.0, first_token_delay=0.0),
+        )
+
+    coalescer = RunCoalescer(orchestrator_factory=factory)
+    for name in ("Slow", "Broken"):
+        release.clear()
+        building.clear()
+        outcomes = []
+
+        def submit():
+            try:
+                outcomes.append(coalescer.acquire({**test_context, "company_name": name}, MODEL))
+            except ValueError as e:
+                outcomes.append(e)
+
+        threads = [threading.Thread(target=submit) for _ in range(2)]
+        threads[0].start()
+        assert building.wait(timeout=5)
+        threads[1].start()
+
+        # Not held up by the build in progress
+        other = coalescer.acquire({**test_context, "company_name": f"Other{name}"}, MODEL)
+        assert not other.coalesced
+        release.set()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        if name == "Slow":
+            assert outcomes[0].run is outcomes[1].run
+            assert sorted(outcome.coalesced for outcome in outcomes) == [False, True]
+        else:
+            assert [str(outcome) for outcome in outcomes] == ["preflight failed"] * 2
+    assert coalescer.wait_idle(timeout=30)
+
+
+def test_admission_rejection_is_not_shared() -> None:
+    """A submission waiting on a rejected tenant's build is admitted as its own tenant."""
+    release = threading.Event()
+    building = threading.Event()
+
+    def factory(context, model):
+        building.set()
+        release.wait(timeout=10)
+        return AgentOrchestrator(
+            context=context,
+            model=model,
+            client=MockAnthropicClient(chunk_count=5, chunk_delay=0.0, first_token_delay=0.0),
+        )
+
+    admission = AdmissionController(max_pending_per_tenant=1)
+    held = admission.submit("a")
+    coalescer = RunCoalescer(orchestrator_factory=factory, admission=admission)
+    outcomes = {}
+
+    def submit(tenant):
+        try:
+            outcomes[tenant] = coalescer.acquire(test_context, MODEL, tenant=tenant)
+        except AdmissionRejected as e:
+            outcomes[tenant] = e
+
+    threads = {tenant: threading.Thread(target=submit, args=(tenant,)) for tenant in ("a", "b")}
+    threads["a"].start()
+    assert building.wait(timeout=5)
+    threads["b"].start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads.values():
+        thread.join(timeout=10)
+
+    assert isinstance(outcomes["a"], AdmissionRejected) and outcomes["a"].reason == "tenant_limit"
+    assert not outcomes["b"].coalesced and outcomes["b"].run.ticket.tenant == "b"
+    outcomes["b"].result(timeout=30)
+    held.release()
+    assert coalescer.wait_idle(timeout=30)
+
+
+def test_express_switch_runs_outside_the_lock() -> None:
+    """A slow switch to the express pipeline does not hold up other submissions."""
+    release = threading.Event()
+    switching = threading.Event()
+
+    def factory(context, model):
+        orchestrator = AgentOrchestrator(
+            context=context,
+            model=model,
+            client=MockAnthropicClient(chunk_count=5, chunk_delay=0.0, first_token_delay=0.0),
+        )
+        if context["company_name"] == "Slow":
+            set_mode = orchestrator.set_mode
+
+            def slow_set_mode(mode):
+                switching.set()
+                release.wait(timeout=10)
+                set_mode(mode)
+
+            orchestrator.set_mode = slow_set_mode
+        return orchestrator
+
+    coalescer = RunCoalescer(
+        orchestrator_factory=factory,
+        admission=AdmissionController(max_concurrent_runs=4, express_load_threshold=0.0),
+    )
+    slow = []
+    thread = threading.Thread(
+        target=lambda: slow.append(coalescer.acquire({**test_context, "company_name": "Slow"}, MODEL))
+    )
+    thread.start()
+    assert switching.wait(timeout=5)
+    started = time.monotonic()
+    other = coalescer.acquire(test_context, MODEL)
+    assert time.monotonic() - started < 5 and other.run.orchestrator.mode == "express"
+    release.set()
+    thread.join(timeout=10)
+    assert slow[0].run.orchestrator.mode == "express"
+    assert coalescer.wait_idle(timeout=30)
+
+
+def test_cancelled_run_is_in_flight_until_it_ends() -> None:
+    """wait_idle() waits for a cancelled run's producer, not just its release."""
+    finish = threading.Event()
+
+    def factory(context, model):
+        orchestrator = AgentOrchestrator(
+            context=context,
+            model=model,
+            client=MockAnthropicClient(chunk_count=5, chunk_delay=0.0, first_token_delay=0.0),
+        )
+
+        def stream_run():
+            # Winds down slowly after the cancel
+            finish.wait(timeout=10)
+            yield from ()
+
+        orchestrator.stream_run = stream_run
+        return orchestrator
+
+    coalescer = RunCoalescer(orchestrator_factory=factory)
+    subscription = coalescer.acquire(test_context, MODEL)
+    subscription.release()
+    assert subscription.run.orchestrator.cancelled
+    assert coalescer.inflight_count == 1 and not coalescer.wait_idle(timeout=0.05)
+
+    # A new identical submission does not attach to the cancelled run
+    fresh = coalescer.acquire(test_context, MODEL)
+    assert not fresh.coalesced and fresh.run is not subscription.run
+    fresh.release()
+
+    finish.set()
+    assert coalescer.wait_idle(timeout=5) and subscription.run.done
+    assert coalescer.inflight_count == 0
+
+
+def test_cancel_only_when_last_subscriber_leaves() -> None:
+    """Releasing one of two subscriptions keeps the run; releasing both cancels it."""
+    coalescer = _coalescer(chunk_delay=0.05)
+    first = coalescer.acquire(test_context, MODEL)
+    second = coalescer.acquire(test_context, MODEL)
+
+    first.release()
+    assert not first.run.orchestrator.cancelled
+
+    second.release()
+    assert second.run.orchestrator.cancelled
+    try:
+        second.result(timeout=30)
+    except RunCancelledError:
+        pass
+    else:
+        raise AssertionError("cancelled run should raise RunCancelledError")
+    assert second.run.status == "cancelled"
+    # Phase 2 never started
+    assert second.run.orchestrator.integration_editor.status != "done"
+
+
+if __name__ == "__main__":
+    for test in (
+        test_canonical_key_ignores_formatting,
+        test_identical_submissions_share_one_run,
+        test_slow_build_blocks_only_identical_submissions,
+        test_admission_rejection_is_not_shared,
+        test_express_switch_runs_outside_the_lock,
+        test_cancelled_run_is_in_flight_until_it_ends,
+        test_cancel_only_when_last_subscriber_leaves,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
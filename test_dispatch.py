@@ -0,0 +1,155 @@
+"""Test script for ProgressDispatcher and BaseAgent output buffering (no API calls)."""
+
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.dispatch import ProgressDispatcher
+from agents.test_agent import TestAgent as SampleAgent
+
+
+class _FakeStream:
+    """Minimal stand-in for anthropic's MessageStream."""
+
+    def __init__(self, chunks: list[str]) -> None:
+        self.chunks = chunks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __iter__(self):
+        yield SimpleNamespace(type="message_start", message=self.get_final_message())
+        for text in self.chunks:
+            yield SimpleNamespace(type="text", text=text)
+
+    def get_final_message(self):
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=12, output_tokens=34))
+
+
+def _fake_client(chunks: list[str]):
+    return SimpleNamespace(messages=SimpleNamespace(stream=lambda **kwargs: _FakeStream(chunks)))
+
+
+def test_inline_dispatch_coalesces_by_size() -> None:
+    """Deltas are delivered in batches once flush_chars is reached."""
+    calls = []
+    dispatcher = ProgressDispatcher(
+        "Agent",
+        lambda name, progress, text: calls.append((name, progress, text)),
+        min_interval=60,
+        flush_chars=10,
+        threaded=False,
+    )
+    # The first feed is always due (nothing delivered yet)
+    for idx in range(25):
+        dispatcher.feed(idx / 25, "ab")
+    dispatcher.close()
+
+    assert "".join(text for _, _, text in calls) == "ab" * 25
+    assert len(calls) < 25
+    assert calls[-1][1] == 24 / 25
+    assert dispatcher.chunks_received == 25
+    assert dispatcher.callbacks_delivered == len(calls)
+
+
+def test_threaded_dispatch_does_not_block_reader() -> None:
+    """A slow consumer does not slow down feed()."""
+    release = threading.Event()
+    calls = []
+
+    def slow_callback(name, progress, text):
+        release.wait(timeout=5)
+        calls.append(text)
+
+    dispatcher = ProgressDispatcher("Agent", slow_callback, min_interval=0.01)
+    start = time.monotonic()
+    for _ in range(1000):
+        dispatcher.feed(0.5, "x")
+    feed_seconds = time.monotonic() - start
+    release.set()
+    dispatcher.close()
+
+    assert feed_seconds < 1.0
+    assert "".join(calls) == "x" * 1000
+    assert len(calls) < 1000
+
+
+def test_threaded_dispatch_delivers_trailing_delta() -> None:
+    """A delta fed right after a callback arrives min_interval later, not at close()."""
+    delivered = threading.Event()
+    calls = []
+
+    def callback(name, progress, text):
+        calls.append((time.monotonic(), text))
+        if len(calls) == 2:
+            delivered.set()
+
+    dispatcher = ProgressDispatcher("Agent", callback, min_interval=0.1)
+    try:
+        dispatcher.feed(0.1, "a")
+        while not calls:
+            time.sleep(0.001)
+        fed = time.monotonic()
+        dispatcher.feed(0.2, "b")
+        assert delivered.wait(timeout=2)
+        assert [text for _, text in calls] == ["a", "b"]
+        assert calls[1][0] - fed < 0.5
+        assert calls[1][0] - calls[0][0] >= 0.09
+    finally:
+        dispatcher.close()
+
+
+def test_agent_output_is_joined_lazily() -> None:
+    """BaseAgent.output joins buffered chunks and supports assignment."""
+    agent = SampleAgent()
+    agent._chunks.extend(["a", "b", "c"])
+    assert agent.output == "abc"
+    agent._chunks.append("d")
+    assert agent.output == "abcd"
+    agent.output += "e"
+    assert agent.output == "abcde"
+    agent.output = ""
+    assert agent.output == ""
+
+
+def test_agent_run_delivers_coalesced_progress() -> None:
+    """BaseAgent.run streams into the buffer and coalesces callbacks."""
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-test")
+    agent = SampleAgent()
+    agent.client = _fake_client(["日本の"] * 200)
+    calls = []
+
+    output = agent.run_sync(
+        context={"max_tokens": 500, "progress_interval": 60, "progress_flush_chars": 100},
+        on_progress=lambda name, progress, text: calls.append(text),
+    )
+
+    assert output == "日本の" * 200
+    assert "".join(calls) == output
+    assert len(calls) <= 7
+    assert agent.token_usage == {"input": 12, "output": 34, "cache_creation": 0, "cache_read": 0}
+    assert agent.status == "done"
+
+
+if __name__ == "__main__":
+    for test in (
+        test_inline_dispatch_coalesces_by_size,
+        test_threaded_dispatch_does_not_block_reader,
+        test_threaded_dispatch_delivers_trailing_delta,
+        test_agent_output_is_joined_lazily,
+        test_agent_run_delivers_coalesced_progress,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
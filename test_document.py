@@ -0,0 +1,83 @@
+"""Test script for the parse-once plan document model (no API calls)."""
+
+import os
+import sys
+from io import BytesIO
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from exporters import document as document_module
+from exporters.document import MarkdownDocument, plan_document
+from exporters.excel_exporter import ExcelExporter
+from exporters.markdown_blocks import CodeBlock, parse_blocks
+from exporters.pdf_exporter import PDFExporter
+
+
+PLAN = """# 事業計画書
+
+## 1. エグゼクティブサマリー
+
+概要です。
+
+```markdown
+## コード内の見出し
+```
+
+## 2. 財務計画
+
+| 項目 | 1年目 |
+|---|---|
+| 売上 | 1,200万円 |"""
+
+
+def test_chapters_and_blocks() -> None:
+    """Chapters split at ## headings outside code; blocks match a plain parse."""
+    document = MarkdownDocument(PLAN)
+    assert [chapter.title for chapter in document.chapters] == [
+        "", "1. エグゼクティブサマリー", "2. 財務計画",
+    ]
+    assert document.blocks == parse_blocks(PLAN)
+    assert "\n".join(chapter.markdown for chapter in document.chapters) == PLAN
+
+    summary = document.chapter("サマリー")
+    assert isinstance(summary.blocks[-1], CodeBlock)
+    assert document.chapter("財務").blocks[-1].rows[0][1].value == 1200
+    assert [section.title for section in document.outline.children[0].children] == [
+        "1. エグゼクティブサマリー", "2. 財務計画",
+    ]
+    assert "<table>" in document.html and "2. 財務計画</h2>" in document.html
+
+
+def test_plan_parsed_once_for_all_formats() -> None:
+    """Excel, PDF and the UI share one cached parse of a plan."""
+    result = {"business_plan": PLAN + "\n\n<!-- once -->", "sections": {"finance": PLAN}}
+    parses = []
+    original = document_module._split_chapters
+
+    def counting(markdown):
+        parses.append(markdown)
+        return original(markdown)
+
+    document_module._split_chapters = counting
+    try:
+        ExcelExporter().write(result, BytesIO())
+        PDFExporter().write(result, BytesIO())
+        assert plan_document(dict(result)) is plan_document(result)
+    finally:
+        document_module._split_chapters = original
+    # The plan and the four sections, each parsed once
+    assert len(parses) == 5
+
+
+if __name__ == "__main__":
+    for test in (
+        test_chapters_and_blocks,
+        test_plan_parsed_once_for_all_formats,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
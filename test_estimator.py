@@ -0,0 +1,113 @@
+"""Test script for pre-flight cost estimation and budget enforcement (no API calls)."""
+
+import sys
+import os
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.mock_client import MockAnthropicClient
+from orchestrator.estimator import (
+    HAIKU_MODEL,
+    OPUS_MODEL,
+    SONNET_MODEL,
+    BudgetExceededError,
+    CostEstimator,
+    OutputHistory,
+    approximate_tokens,
+    get_pricing,
+)
+from orchestrator.runner import AgentOrchestrator
+
+
+test_context = {
+    "company_name": "MediFlow",
+    "business_description": "医療機関向けワークフロー自動化SaaSプラットフォーム",
+    "plan_years": 5,
+    "template": {},
+    "additional_context": "",
+    "max_tokens": {"market": 4000, "product": 5000, "finance": 5000, "gtm": 4000, "integration": 8000},
+}
+
+
+def _orchestrator(model: str = SONNET_MODEL, context: dict | None = None) -> AgentOrchestrator:
+    """Create an orchestrator with the mock client and a fresh output history."""
+    return AgentOrchestrator(
+        context=context or test_context,
+        model=model,
+        client=MockAnthropicClient(chunk_count=10, chunk_delay=0.0, first_token_delay=0.0),
+        estimator=CostEstimator(history=OutputHistory()),
+    )
+
+
+def test_pricing_and_token_approximation() -> None:
+    """Prices follow the model family; Japanese counts about a token per character."""
+    assert get_pricing(OPUS_MODEL).output == 5 * get_pricing(SONNET_MODEL).output
+    assert get_pricing("claude-haiku-future") is get_pricing(HAIKU_MODEL)
+    assert get_pricing("unknown-model") is get_pricing(SONNET_MODEL)
+    assert approximate_tokens("事業計画") == 4
+    assert approximate_tokens("a" * 40) == 10
+
+
+def test_estimate_uses_budgets_and_model() -> None:
+    """Per-agent max_tokens and the selected model drive the estimate."""
+    orchestrator = _orchestrator()
+    estimate = orchestrator.preflight()
+
+    assert estimate.agents["market"].max_output_tokens == 4000
+    assert estimate.agents["integration"].max_output_tokens == 8000
+    phase1_output = sum(estimate.agents[key].output_tokens for key in ("market", "product", "finance", "gtm"))
+    assert estimate.agents["integration"].input_tokens > phase1_output
+    assert estimate.cost_usd < estimate.max_cost_usd
+    assert estimate.seconds > max(estimate.agents[key].seconds for key in ("market", "gtm"))
+
+    opus = _orchestrator(OPUS_MODEL).preflight()
+    assert opus.cost_usd > 4 * estimate.cost_usd
+    assert all(agent.model == OPUS_MODEL for agent in opus.agents.values())
+
+
+def test_budget_refuses_or_downgrades() -> None:
+    """Over-budget runs are refused, or switched to a cheaper model that fits."""
+    sonnet_cost = _orchestrator().preflight().cost_usd
+
+    orchestrator = _orchestrator(OPUS_MODEL)
+    try:
+        orchestrator.preflight(budget_usd=sonnet_cost * 1.1)
+        raise AssertionError("over-budget run should be refused")
+    except BudgetExceededError as e:
+        assert e.estimate.model == OPUS_MODEL
+
+    estimate = orchestrator.preflight(budget_usd=sonnet_cost * 1.1, allow_downgrade=True)
+    assert estimate.model == SONNET_MODEL and estimate.downgraded_from == OPUS_MODEL
+    assert all(agent.model == SONNET_MODEL for agent in orchestrator.agents.values())
+
+
+def test_run_records_history_and_prices_per_model() -> None:
+    """Finished runs refine the output history; actual cost uses each agent's model."""
+    orchestrator = _orchestrator(OPUS_MODEL, context={**test_context, "max_tokens": 2000})
+    before = orchestrator.preflight().output_tokens
+    result = orchestrator.run_all()
+
+    assert result["preflight"]["model"] == OPUS_MODEL
+    assert orchestrator.market_researcher.model == OPUS_MODEL
+    usage = result["token_usage"]
+    assert abs(result["estimated_cost_usd"] - get_pricing(OPUS_MODEL).cost(usage["input"], usage["output"])) < 1e-9
+
+    # The mock writes far less than max_tokens, so the next estimate shrinks
+    after = orchestrator.estimator.estimate(orchestrator.agents, orchestrator.context).output_tokens
+    assert after < before
+
+
+if __name__ == "__main__":
+    for test in (
+        test_pricing_and_token_approximation,
+        test_estimate_uses_budgets_and_model,
+        test_budget_refuses_or_downgrades,
+        test_run_records_history_and_prices_per_model,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,183 @@
+"""Test script for the content-hash keyed export cache."""
+
+import sys
+import os
+import tempfile
+import threading
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from exporters.cache import ExportCache, export_key
+from exporters.excel_exporter import ExcelExporter
+from exporters.pdf_exporter import PDFExporter
+from exporters.scheduler import ExportScheduler
+from orchestrator.metrics import EXPORT_SECONDS
+from orchestrator.tracing import Tracer
+
+
+RESULT = {
+    "business_plan": "# 事業計画書\n\n## 市場分析\n\n医療DX市場は年率10%で成長しています。",
+    "sections": {"market": "## 市場分析\n\n- TAM: 5,000億円"},
+}
+
+
+class CountingExcelExporter(ExcelExporter):
+    """ExcelExporter that counts its renders."""
+
+    renders = 0
+
+    def write(self, result, stream):
+        type(self).renders += 1
+        return super().write(result, stream)
+
+
+def test_each_format_renders_once_per_plan() -> None:
+    """Repeated and concurrent requests for the same plan share one render."""
+    CountingExcelExporter.renders = 0
+    cache = ExportCache()
+
+    threads = [
+        threading.Thread(target=cache.get_or_render, args=(CountingExcelExporter(), RESULT))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    content, export_format = cache.get_or_render(CountingExcelExporter(), RESULT)
+    assert CountingExcelExporter.renders == 1
+    assert export_format == "xlsx" and content[:2] == b"PK"
+
+    # Other content, formats and exporter versions are separate entries
+    cache.get_or_render(CountingExcelExporter(), {**RESULT, "business_plan": "# 改訂版"})
+    assert CountingExcelExporter.renders == 2
+    _, pdf_format = cache.get_or_render(PDFExporter(), RESULT)
+    assert pdf_format == PDFExporter().get_export_format().lower()
+    CountingExcelExporter.VERSION = "test"
+    try:
+        cache.get_or_render(CountingExcelExporter(), RESULT)
+    finally:
+        del CountingExcelExporter.VERSION
+    assert CountingExcelExporter.renders == 3 and len(cache) == 4
+
+
+def cache_key(result: dict) -> str:
+    """export_key() of rendering a result with CountingExcelExporter."""
+    return export_key(CountingExcelExporter(), result)
+
+
+def test_lru_eviction_and_disk_tier() -> None:
+    """Memory stays within budget; evicted entries are served from disk."""
+    with tempfile.TemporaryDirectory() as directory:
+        CountingExcelExporter.renders = 0
+        size = len(ExcelExporter().to_bytes(RESULT))
+        cache = ExportCache(max_bytes=int(size * 2.5), directory=directory)
+        plans = [{**RESULT, "business_plan": f"# 計画 {i}"} for i in range(4)]
+        for plan in plans:
+            cache.get_or_render(CountingExcelExporter(), plan)
+        assert len(cache) == 2 and cache.size_bytes <= cache.max_bytes
+        assert len(os.listdir(directory)) == 4
+
+        # The oldest plan was evicted from memory but not re-rendered
+        cache.get_or_render(CountingExcelExporter(), plans[0])
+        assert CountingExcelExporter.renders == 4
+
+        # A fresh cache (e.g., after a restart) reads the directory,
+        # opening the key's file without listing the directory
+        listdir = os.listdir
+        os.listdir = None
+        try:
+            assert ExportCache(directory=directory).get(cache_key(plans[1]))[1] == "xlsx"
+            assert ExportCache(directory=directory).get("0" * 64) is None
+        finally:
+            os.listdir = listdir
+        assert ExportCache(directory=directory).get_or_render(CountingExcelExporter(), plans[1])[1] == "xlsx"
+        assert CountingExcelExporter.renders == 4
+
+        # The directory is trimmed to its budget, oldest first
+        ExportCache(directory=directory, max_disk_bytes=int(size * 1.5)).get_or_render(
+            CountingExcelExporter(), {**RESULT, "business_plan": "# 新規"}
+        )
+        assert len(os.listdir(directory)) == 1
+
+
+def test_scheduler_renders_in_worker_processes() -> None:
+    """Scheduled exports land in the cache with the workers' metrics and spans."""
+    cache = ExportCache()
+    scheduler = ExportScheduler(cache, max_workers=2)
+    tracer = Tracer()
+    exported = EXPORT_SECONDS.count(format="xlsx")
+    try:
+        scheduler.schedule(RESULT, tracer=tracer)
+        content, export_format = scheduler.wait(RESULT, "xlsx", timeout=60)
+        assert export_format == "xlsx" and content[:2] == b"PK"
+        _, pdf_format = scheduler.wait(RESULT, "pdf", timeout=60)
+        assert pdf_format in ("pdf", "html")
+        assert scheduler.get(RESULT, "xlsx") == (content, "xlsx")
+
+        # Nothing is rendered twice; the parent got the workers' metrics
+        scheduler.schedule(RESULT)
+        assert not scheduler._pending and len(cache) == 2
+        assert EXPORT_SECONDS.count(format="xlsx") == exported + 1
+        formats = {span.attributes["format"] for span in tracer.spans if span.name == "export"}
+        assert formats == {"xlsx", pdf_format}
+    finally:
+        scheduler.shutdown()
+
+
+def test_scheduler_serves_exports_too_large_to_cache() -> None:
+    """An export the cache cannot keep is served from its render, not rendered again."""
+    cache = ExportCache(max_bytes=16)
+    scheduler = ExportScheduler(cache, processes=False)
+    exported = EXPORT_SECONDS.count(format="xlsx")
+    plans = [{**RESULT, "business_plan": f"# 計画 {i}"} for i in range(4)]
+    try:
+        content, export_format = scheduler.wait(plans[0], "xlsx", timeout=60)
+        assert export_format == "xlsx" and len(content) > cache.max_bytes and len(cache) == 0
+        for _ in range(3):
+            assert scheduler.ready(plans[0], "xlsx")
+            assert scheduler.get(plans[0], "xlsx") == (content, "xlsx")
+        assert EXPORT_SECONDS.count(format="xlsx") == exported + 1
+
+        # Only the latest few are held; older ones are rendered again on request
+        for plan in plans[1:]:
+            scheduler.wait(plan, "xlsx", timeout=60)
+        assert len(scheduler._pending) == 2
+        assert not scheduler.ready(plans[0], "xlsx")
+    finally:
+        scheduler.shutdown()
+
+
+def test_scheduler_keys_exports_without_exporters() -> None:
+    """The parent keys scheduled exports by class, creating no exporter."""
+    for exporter in (ExcelExporter, PDFExporter):
+        assert export_key(exporter, RESULT) == export_key(exporter(), RESULT)
+
+    cache = ExportCache()
+    cache.put(export_key(PDFExporter(), RESULT), (b"%PDF", "pdf"))
+    scheduler = ExportScheduler(cache, max_workers=1)
+    init = PDFExporter.__init__
+    PDFExporter.__init__ = None
+    try:
+        assert scheduler.ready(RESULT, "pdf")
+        assert scheduler.get(RESULT, "pdf") == (b"%PDF", "pdf")
+    finally:
+        PDFExporter.__init__ = init
+        scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    for test in (
+        test_each_format_renders_once_per_plan,
+        test_lru_eviction_and_disk_tier,
+        test_scheduler_renders_in_worker_processes,
+        test_scheduler_serves_exports_too_large_to_cache,
+        test_scheduler_keys_exports_without_exporters,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -123,6 +123,9 @@ TEST_SECTIONS = {
 }
 
 
+TEST_RESULT = {"business_plan": TEST_MARKDOWN, "sections": TEST_SECTIONS}
+
+
 def test_excel_exporter() -> bool:
     """Test Excel exporter.
     
@@ -134,7 +137,8 @@ def test_excel_exporter() -> bool:
     
     try:
         exporter = ExcelExporter()
-        excel_bytes = exporter.export(TEST_MARKDOWN, TEST_SECTIONS)
+        excel_bytes = exporter.to_bytes(TEST_RESULT)
+        assert excel_bytes.startswith(b"PK")
         
         # Save to file
         output_file = Path("test_output.xlsx")
@@ -167,14 +171,15 @@ def test_pdf_exporter() -> bool:
         exporter = PDFExporter()
         
         # Try to export (will fallback to HTML if weasyprint unavailable)
-        html_bytes = exporter.export(TEST_MARKDOWN)
+        html_bytes = exporter.to_bytes(TEST_RESULT)
+        export_format = exporter.get_export_format()
+        assert html_bytes.startswith(b"%PDF" if export_format == "PDF" else b"<!DOCTYPE html>")
         
         # Save to file
-        output_file = Path("test_output.html")
+        output_file = Path(f"test_output.{export_format.lower()}")
         output_file.write_bytes(html_bytes)
         
         size_kb = len(html_bytes) / 1_024
-        export_format = exporter.get_export_format()
         
         print(f"✅ {export_format} ファイル生成成功")
         print(f"   形式: {export_format} {'(weasyprint利用不可なためHTMLで出力)' if export_format == 'HTML' else '(PDF生成完了)'}")
@@ -187,9 +192,7 @@ def test_pdf_exporter() -> bool:
         # Try HTML export directly
         try:
             exporter = PDFExporter()
-            html_bytes = exporter._export_html(exporter._create_html_document(
-                "# テストMarkdown\n\n簡単なHTMLファイルです。"
-            ))
+            html_bytes = exporter.to_bytes({"business_plan": "# テストMarkdown\n\n簡単なHTMLファイルです。"})
             output_file = Path("test_output_fallback.html")
             output_file.write_bytes(html_bytes)
             print(f"✅ HTMLフォールバック出力成功: {output_file.absolute()}")
@@ -199,6 +202,99 @@ def test_pdf_exporter() -> bool:
             return False
 
 
+def test_excel_tables_are_typed() -> None:
+    """Markdown tables become typed rows and columns; headings are styled rows."""
+    from io import BytesIO
+    from openpyxl import load_workbook
+    from exporters.markdown_blocks import parse_number
+    
+    workbook = load_workbook(BytesIO(ExcelExporter().to_bytes(TEST_RESULT)))
+    rows = list(workbook["財務計画"].iter_rows(values_only=True))
+    
+    header = rows.index(("年度", "MRR", "ARR", "顧客数", "成長率"))
+    assert rows[header + 2] == ("2025年", 200, 2400, 40, 3)
+    pl = [row for row in rows if row and row[0] == "営業利益(EBIT)"][0]
+    assert pl[1:4] == (-1050, -1200, 0)
+    
+    sheet = workbook["財務計画"]
+    arr = sheet.cell(row=header + 3, column=3)
+    assert arr.number_format == '#,##0"万円"' and arr.style == "bpg_table_cell"
+    assert sheet.cell(row=header + 1, column=1).style == "bpg_table_header"
+    assert ("売上予測", None, None, None, None) in rows
+    
+    # Long sections are no longer cut at 100 lines
+    long_section = "\n".join(f"- 項目{i}" for i in range(500))
+    long_sheet = load_workbook(
+        BytesIO(ExcelExporter().to_bytes({"business_plan": "", "sections": {"gtm": long_section}}))
+    )["GTM戦略"]
+    assert long_sheet.max_row == 500 and long_sheet["A500"].value == "• 項目499"
+    
+    assert parse_number("▲1,200万円") == (-1200, '#,##0"万円";"▲"#,##0"万円"')
+    assert parse_number("10.5%") == (0.105, "0.0%")
+    assert parse_number("2024年") is None and parse_number("10.0x") is None
+
+
+def test_unicode_digits_stay_text() -> None:
+    """Cells like "①" and "²" (isdigit() but not int()) are kept as text."""
+    from io import BytesIO
+    from openpyxl import load_workbook
+    from exporters.markdown_blocks import parse_number
+    
+    for text in ("①", "²", "１２", "1,②00", "3.①"):
+        assert parse_number(text) is None, text
+    plan = "## 手順\n\n| 項目 | 番号 |\n|---|---|\n| 準備 | ① |\n| 面積 | 100m² |\n| 件数 | ² |\n"
+    workbook = load_workbook(BytesIO(ExcelExporter().to_bytes({"business_plan": plan, "sections": {}})))
+    values = {value for sheet in workbook for row in sheet.iter_rows(values_only=True) for value in row}
+    assert {"①", "100m²", "²"} <= values
+
+
+def test_exports_in_memory() -> None:
+    """Concurrent in-memory exports never write to the working directory."""
+    from concurrent.futures import ThreadPoolExecutor
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cwd = os.getcwd()
+        os.chdir(tmp_dir)
+        try:
+            results = [
+                {"business_plan": f"# 計画 {i}", "sections": {"market": f"市場 {i}"}}
+                for i in range(8)
+            ]
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                html = list(executor.map(lambda r: PDFExporter().to_bytes(r), results))
+                xlsx = list(executor.map(lambda r: ExcelExporter().to_bytes(r), results))
+            assert os.listdir(tmp_dir) == []
+        finally:
+            os.chdir(cwd)
+    
+    assert all(f"計画 {i}".encode("utf-8") in body for i, body in enumerate(html))
+    assert len(set(xlsx)) == len(results)
+
+
+def test_pdf_fonts_are_local() -> None:
+    """Exports never reference remote fonts; local font files become @font-face rules."""
+    import tempfile
+    from exporters.fonts import font_face_css, font_files
+    from orchestrator.metrics import EXPORT_BYTES
+    
+    assert "http" not in PDFExporter.CSS_STYLE
+    
+    exported = EXPORT_BYTES.count(format="html")
+    exporter = PDFExporter()
+    exporter._weasyprint_available = False
+    body = exporter.to_bytes({"business_plan": TEST_MARKDOWN})
+    assert b"googleapis" not in body
+    assert EXPORT_BYTES.count(format="html") == exported + 1
+    
+    with tempfile.TemporaryDirectory() as font_dir:
+        Path(font_dir, "NotoSansJP-Regular.subset.otf").write_bytes(b"")
+        files = font_files(font_dir)
+        assert list(files) == [400]
+        css = font_face_css(files)
+        assert "font-weight: 400" in css and files[400].as_uri() in css
+
+
 def main():
     """Run all exporter tests."""
     print("=" * 70)
@@ -211,6 +307,22 @@ def main():
     # Test PDF exporter
     pdf_ok = test_pdf_exporter()
     
+    # Test typed Excel tables
+    test_excel_tables_are_typed()
+    print("\n✅ test_excel_tables_are_typed")
+    
+    # Test Unicode digits in tables
+    test_unicode_digits_stay_text()
+    print("\n✅ test_unicode_digits_stay_text")
+    
+    # Test in-memory exports
+    test_exports_in_memory()
+    print("\n✅ test_exports_in_memory")
+    
+    # Test local PDF fonts
+    test_pdf_fonts_are_local()
+    print("\n✅ test_pdf_fonts_are_local")
+    
     print("\n" + "=" * 70)
     print("テスト完了")
     print("=" * 70)
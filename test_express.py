@@ -0,0 +1,120 @@
+"""Test script for the express draft pipeline (mock backend, no API calls)."""
+
+import sys
+import os
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.express_drafter import parse_sections
+from agents.mock_client import MockAnthropicClient
+from orchestrator import events
+from orchestrator.admission import AdmissionController
+from orchestrator.coalescing import RunCoalescer
+from orchestrator.estimator import HAIKU_MODEL, CostEstimator, OutputHistory
+from orchestrator.runner import AgentOrchestrator
+
+
+MODEL = "claude-sonnet-4-5-20250929"
+CONTEXT = {
+    "company_name": "MediFlow",
+    "business_description": "医療機関向けワークフロー自動化SaaSプラットフォーム",
+    "plan_years": 5,
+}
+
+
+def _mock_client() -> MockAnthropicClient:
+    return MockAnthropicClient(chunk_count=20, chunk_delay=0.0, first_token_delay=0.0)
+
+
+def test_parse_sections() -> None:
+    """Sections are split at marker lines, including a partial last section."""
+    text = (
+        "前置き\n"
+        "<!-- section:market -->\n### 市場規模\nTAM 1兆円\n"
+        "<!-- section:product -->\n### 価値提案\n途中まで"
+    )
+    assert parse_sections(text) == {
+        "market": "### 市場規模\nTAM 1兆円",
+        "product": "### 価値提案\n途中まで",
+    }
+    assert parse_sections("マーカーなし") == {}
+
+
+def test_express_run_matches_full_structure() -> None:
+    """An express run returns every section in two calls on the smaller model."""
+    orchestrator = AgentOrchestrator(
+        context={**CONTEXT, "mode": "express"},
+        model=MODEL,
+        client=_mock_client(),
+        estimator=CostEstimator(history=OutputHistory()),
+    )
+    received = list(orchestrator.stream_run())
+    result = received[-1].data["result"]
+
+    assert result["mode"] == "express"
+    assert set(result["sections"]) == {"market", "product", "finance", "gtm"}
+    assert all("モック出力" in section for section in result["sections"].values())
+    plan = result["business_plan"]
+    assert plan.index("## 1. エグゼクティブサマリー") < plan.index("## 2. 市場分析") < plan.index("## 7. 実行ロードマップ")
+
+    started = [event for event in received if event.type == events.AGENT_STARTED]
+    assert [event.agent for event in started] == ["express", "summary"]
+    assert all(event.data["model"] == HAIKU_MODEL for event in started)
+    assert result["estimated_cost_usd"] > 0
+    assert all(state["status"] == "done" for state in orchestrator.get_progress().values())
+    assert "モック出力" in orchestrator.get_preview("finance")
+
+
+def test_compare_modes() -> None:
+    """Express is estimated cheaper and faster than the full pipeline."""
+    orchestrator = AgentOrchestrator(
+        context=CONTEXT, model=MODEL, estimator=CostEstimator(history=OutputHistory())
+    )
+    estimates = orchestrator.compare_modes()
+    assert estimates["express"].cost_usd < estimates["full"].cost_usd / 3
+    assert estimates["express"].seconds < estimates["full"].seconds
+    assert set(estimates["express"].agents) == {"express", "summary"}
+    assert orchestrator.estimate is None  # no side effects
+
+
+def test_admission_switches_to_express_under_load() -> None:
+    """Runs submitted at or above the load threshold use the express pipeline."""
+    admission = AdmissionController(
+        max_concurrent_runs=1, max_pending_per_tenant=5, express_load_threshold=1.0
+    )
+    coalescer = RunCoalescer(
+        orchestrator_factory=lambda context, model: AgentOrchestrator(
+            context=context, model=model, client=_mock_client()
+        ),
+        admission=admission,
+    )
+
+    first = coalescer.acquire(CONTEXT, MODEL, tenant="a")
+    second = coalescer.acquire({**CONTEXT, "company_name": "Other"}, MODEL, tenant="b")
+    opted_out = coalescer.acquire(
+        {**CONTEXT, "company_name": "Third", "allow_express": False}, MODEL, tenant="c"
+    )
+    assert first.run.orchestrator.mode == "full"
+    assert second.run.to_dict()["mode"] == "express"
+    assert opted_out.run.orchestrator.mode == "full"
+
+    assert second.result(timeout=30)["mode"] == "express"
+    for subscription in (first, second, opted_out):
+        subscription.release()
+    assert coalescer.wait_idle(timeout=30)
+
+
+if __name__ == "__main__":
+    for test in (
+        test_parse_sections,
+        test_express_run_matches_full_structure,
+        test_compare_modes,
+        test_admission_switches_to_express_under_load,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
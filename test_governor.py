@@ -0,0 +1,104 @@
+"""Test script for the live cost governor (mock backend, no API calls)."""
+
+import sys
+import os
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.base import TRUNCATED_NOTE
+from agents.mock_client import MockAnthropicClient
+from orchestrator import events
+from orchestrator.estimator import OPUS_MODEL, SONNET_MODEL, CostEstimator, OutputHistory, get_pricing
+from orchestrator.governor import CostGovernor
+from orchestrator.runner import AgentOrchestrator
+
+
+def test_cache_rates_are_charged() -> None:
+    """Input is charged at message_start, including prompt-cache writes and reads."""
+    governor = CostGovernor(budget_usd=10.0)
+    governor.start("market", SONNET_MODEL, {"input": 1000, "cache_creation": 2000, "cache_read": 4000})
+    pricing = get_pricing(SONNET_MODEL)
+    expected = (1000 * pricing.input + 2000 * pricing.cache_write + 4000 * pricing.cache_read) / 1_000_000
+    assert abs(governor.spent_usd - expected) < 1e-12
+
+    governor.finish("market", {"input": 1000, "output": 500, "cache_creation": 0, "cache_read": 6000})
+    assert abs(governor.spent_usd - pricing.cost(1000, 500, cache_read_tokens=6000)) < 1e-12
+
+
+def test_retried_attempts_add_up() -> None:
+    """A failed attempt stays spent; the retry is charged on top of it."""
+    pricing = get_pricing(SONNET_MODEL)
+    governor = CostGovernor(budget_usd=10.0)
+    governor.start("market", SONNET_MODEL, {"input": 1000})
+    governor.charge_text("market", "x" * 400)
+    failed = governor.spent_usd
+    governor.restart("market")
+    assert abs(governor.spent_usd - failed) < 1e-12
+    assert governor.output_tokens("market") == 0
+
+    governor.start("market", SONNET_MODEL, {"input": 1000})
+    governor.finish("market", {"input": 1000, "output": 500})
+    assert abs(governor.spent_usd - failed - pricing.cost(1000, 500)) < 1e-12
+
+
+def test_low_priority_agents_stop_first() -> None:
+    """Near the budget, outranked agents stop; the top agent runs to the hard limit."""
+    governor = CostGovernor(budget_usd=0.1, safety_margin=0.2)
+    governor.reserve("integration", 0.05)
+    assert governor.start("gtm", OPUS_MODEL, {"input": 0})
+    assert governor.start("finance", OPUS_MODEL, {"input": 0})
+
+    # 500 tokens of output at $75/MTok = $0.0375 -> committed $0.0875 (past the margin)
+    assert governor.charge_text("finance", "x" * 2000) is False  # outranked by integration
+    assert governor.charge_text("gtm", "x") is False
+    assert governor.limited == ["finance", "gtm"]
+
+    governor.finish("finance")
+    governor.finish("gtm")
+    assert governor.cap_max_tokens("integration", OPUS_MODEL, 8000) < 8000
+    assert governor.charge_text("integration", "x" * 100) is True   # nothing outranks it
+    assert governor.charge_text("integration", "x" * 4000) is False  # hard limit
+
+
+def test_run_stays_within_budget() -> None:
+    """A runaway Opus run is cut short and its spend stays within the budget."""
+    budget = 0.3
+    orchestrator = AgentOrchestrator(
+        context={
+            "company_name": "MediFlow",
+            "business_description": "医療機関向けワークフロー自動化SaaSプラットフォーム",
+            "plan_years": 5,
+            "budget_usd": budget,
+        },
+        model=OPUS_MODEL,
+        client=MockAnthropicClient(chunk_count=200, chunk_delay=0.0, first_token_delay=0.0),
+        estimator=CostEstimator(history=OutputHistory()),
+    )
+    # Estimate without refusing, so the live governor is what stops the run
+    orchestrator.preflight()
+    received = list(orchestrator.stream_run())
+    result = received[-1].data["result"]
+
+    assert result["budget"]["limited_agents"]
+    assert result["estimated_cost_usd"] <= budget * 1.01
+    limited = [event.agent for event in received if event.type == events.BUDGET_LIMITED]
+    assert limited
+    truncated = orchestrator.agents[limited[0]]
+    assert truncated.truncated and truncated.output.endswith(TRUNCATED_NOTE)
+    assert orchestrator.get_progress()[limited[0]]["truncated"] is True
+
+
+if __name__ == "__main__":
+    for test in (
+        test_cache_rates_are_charged,
+        test_retried_attempts_add_up,
+        test_low_priority_agents_stop_first,
+        test_run_stays_within_budget,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,108 @@
+"""Test script for multi-key sharding of API traffic (mock clients, no API calls)."""
+
+import sys
+import os
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.key_pool import KeyPool
+from agents.mock_client import MockAnthropicClient
+from orchestrator.metrics import METRICS
+from orchestrator.runner import AgentOrchestrator
+
+
+def _headers(requests_remaining: int, tokens_remaining: int) -> dict:
+    return {
+        "anthropic-ratelimit-requests-limit": "50",
+        "anthropic-ratelimit-requests-remaining": str(requests_remaining),
+        "anthropic-ratelimit-input-tokens-limit": "100000",
+        "anthropic-ratelimit-input-tokens-remaining": str(tokens_remaining),
+    }
+
+
+def _pool(headers_by_key: dict) -> KeyPool:
+    return KeyPool(
+        [f"{label}=sk-ant-{label}" for label in headers_by_key],
+        client_factory=lambda api_key: MockAnthropicClient(
+            chunk_count=5,
+            chunk_delay=0.0,
+            first_token_delay=0.0,
+            headers=headers_by_key[api_key.removeprefix("sk-ant-")],
+        ),
+    )
+
+
+def _run_plan(pool: KeyPool) -> AgentOrchestrator:
+    orchestrator = AgentOrchestrator(
+        context={"company_name": "MediFlow", "business_description": "医療SaaS", "plan_years": 5},
+        backend=pool.backend(),
+    )
+    orchestrator.run_all()
+    return orchestrator
+
+
+def test_plans_go_to_the_key_with_most_headroom() -> None:
+    """A plan sticks to one key; the next plan moves once its headroom drops."""
+    pool = _pool({"a": _headers(49, 99_000), "b": _headers(10, 20_000)})
+    by_label = {key.label: key for key in pool.keys}
+
+    _run_plan(pool)
+    assert by_label["a"].client.requests == 5 and by_label["b"].client.requests == 0
+
+    # Key "a" reports it is nearly exhausted; the next plan goes to "b"
+    by_label["a"].client.headers = _headers(1, 1_000)
+    pool.record_headers(by_label["a"], by_label["a"].client.headers)
+    _run_plan(pool)
+    assert by_label["b"].client.requests == 5
+
+    snapshot = {entry["label"]: entry for entry in pool.snapshot()}
+    assert snapshot["a"]["requests"] == 5 and snapshot["a"]["spend_usd"] > 0
+    assert snapshot["b"]["headroom"] == 0.2
+    assert all(entry["in_flight"] == 0 for entry in snapshot.values())
+
+
+def test_unhealthy_keys_leave_rotation() -> None:
+    """Rate-limited keys cool down, rejected keys are disabled."""
+    pool = _pool({"a": {}, "b": {}})
+    a, b = pool.keys
+
+    pool.record_failure(a, 429, retry_after=30)
+    assert not a.healthy and pool.acquire(preferred=a) is b
+    pool.release(b)
+
+    pool.record_failure(b, 401)
+    assert b.disabled
+    # Every key is unusable right now: fall back to the one that recovers first
+    assert pool.acquire() is a
+
+
+def test_key_usage_reaches_metrics() -> None:
+    """Per-key requests, errors and spend appear in the /metrics exposition."""
+    pool = _pool({"metrics-a": {}, "metrics-b": {}})
+    a, b = pool.keys
+    pool.record_success(a, "claude-sonnet-4-5-20250929", {"input": 1_000_000, "output": 0})
+    pool.record_failure(b, 429)
+    pool.record_failure(b, None)
+    pool.export_metrics()
+
+    lines = METRICS.render().splitlines()
+    assert 'bpg_api_key_requests_total{key="metrics-a"} 1' in lines
+    assert 'bpg_api_key_spend_usd_total{key="metrics-a"} 3' in lines
+    assert 'bpg_api_key_errors_total{key="metrics-b",status="429"} 1' in lines
+    assert 'bpg_api_key_errors_total{key="metrics-b",status="connection"} 1' in lines
+    assert 'bpg_api_key_healthy{key="metrics-b"} 0' in lines
+
+
+if __name__ == "__main__":
+    for test in (
+        test_plans_go_to_the_key_with_most_headroom,
+        test_unhealthy_keys_leave_rotation,
+        test_key_usage_reaches_metrics,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
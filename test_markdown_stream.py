@@ -0,0 +1,99 @@
+"""Test script for MarkdownStreamParser and the documents agents parse while streaming."""
+
+import os
+import random
+import sys
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.backends import FakeBackend
+from exporters.markdown_blocks import Heading, MarkdownStreamParser, Table, parse_blocks
+from orchestrator.runner import AgentOrchestrator
+
+
+DOCUMENT = """# 事業計画書
+
+## 市場分析
+
+市場は**拡大**しています。
+
+| 指標 | 2024年 | 2025年 |
+|:---|---:|---:|
+| 市場規模 | 5,000億円 | 5,500億円 |
+| 成長率 | 10.0% | ▲2.5% |
+
+### 競合
+
+- 大手A社
+  - 国内シェア1位
+1. 差別化
+
+```text
+コード | 表ではない
+```
+
+## 財務計画
+
+| 項目 | 1年目 |
+|---|---|
+| 売上 | 1,200万円 |"""
+
+
+def test_chunked_feed_matches_whole_document() -> None:
+    """Any split of the stream gives the blocks of a whole-document parse."""
+    expected = parse_blocks(DOCUMENT)
+    rng = random.Random(0)
+    for _ in range(20):
+        parser = MarkdownStreamParser()
+        position = 0
+        while position < len(DOCUMENT):
+            size = rng.randint(1, 12)
+            parser.feed(DOCUMENT[position:position + size])
+            position += size
+        parser.close()
+        assert parser.blocks == expected
+
+    # Blocks complete as soon as their last line has arrived
+    parser = MarkdownStreamParser()
+    assert parser.feed("## 市場") == []
+    assert parser.feed("分析\n") == [Heading(2, "市場分析")]
+
+    # Section tree
+    parser.feed(DOCUMENT[DOCUMENT.index("\n\n市場は"):])
+    parser.close()
+    market = parser.outline.find("市場分析")
+    assert [child.title for child in market.children] == ["競合"]
+    assert isinstance(market.blocks[1], Table)
+    assert market.blocks[1].rows[1][2].value == -0.025
+    assert parser.current_section.title == "財務計画"
+    assert parser.tables[-1].rows[0][1].value == 1200
+
+
+def test_agents_parse_their_stream() -> None:
+    """Each agent's document is complete when its run ends."""
+    orchestrator = AgentOrchestrator(
+        context={"company_name": "MediFlow", "business_description": "医療SaaS", "plan_years": 5},
+        backend=FakeBackend(chunk_count=5, chunk_delay=0.0, first_token_delay=0.0),
+    )
+    orchestrator.run_all()
+
+    document = orchestrator.get_document("finance")
+    assert document.closed
+    assert document.blocks == parse_blocks(orchestrator.financial_modeler.output)
+    assert document.current_section.title == "モック出力"
+    assert document.tables[0].rows[0][1].value == 100
+    assert orchestrator.get_document("unknown") is None
+
+
+if __name__ == "__main__":
+    for test in (
+        test_chunked_feed_matches_whole_document,
+        test_agents_parse_their_stream,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
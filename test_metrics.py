@@ -0,0 +1,105 @@
+"""Test script for the metrics registry and its exposition (mock client, no API calls)."""
+
+import sys
+import os
+import threading
+import urllib.request
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.mock_client import MockAnthropicClient
+from orchestrator import metrics
+from orchestrator.estimator import CostEstimator, OutputHistory
+from orchestrator.runner import AgentOrchestrator
+from server.runs import RunManager
+from server.service import PlanServer
+
+
+CONTEXT = {
+    "company_name": "MediFlow",
+    "business_description": "医療機関向けワークフロー自動化SaaSプラットフォーム",
+    "plan_years": 5,
+}
+
+
+def test_registry_render_and_merge() -> None:
+    """Counters and histograms render in the text format and merge across processes."""
+    registry = metrics.MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests", ("route",))
+    latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.5, 1.0))
+
+    threads = [
+        threading.Thread(target=lambda: [requests.inc(route='/a"b') for _ in range(1000)])
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latency.observe(0.2)
+    latency.observe(3.0)
+
+    text = registry.render()
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{route="/a\\"b"} 4000' in text
+    assert 'test_latency_seconds_bucket{le="0.5"} 1' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "test_latency_seconds_count 2" in text
+
+    # A worker process's snapshot adds to the parent's samples
+    registry.merge(registry.snapshot())
+    assert requests.value(route='/a"b') == 8000
+    assert latency.count() == 4 and latency.sum() == 6.4
+
+
+def test_run_updates_metrics() -> None:
+    """A run counts its outcome, agent latency, TTFT and tokens."""
+    completed = metrics.RUNS.value(mode="full", status="completed")
+    ttft_count = metrics.AGENT_TTFT.count(agent="finance", model="claude-sonnet-4-5-20250929")
+
+    orchestrator = AgentOrchestrator(
+        context=CONTEXT,
+        client=MockAnthropicClient(chunk_count=20, chunk_delay=0.0, first_token_delay=0.0),
+        estimator=CostEstimator(history=OutputHistory()),
+    )
+    result = orchestrator.run_all()
+
+    assert metrics.RUNS.value(mode="full", status="completed") == completed + 1
+    assert metrics.AGENT_TTFT.count(agent="finance", model="claude-sonnet-4-5-20250929") == ttft_count + 1
+    output_tokens = sum(
+        metrics.TOKENS.value(agent=key, model=agent.model, kind="output")
+        for key, agent in orchestrator.agents.items()
+    )
+    assert output_tokens >= result["token_usage"]["output"] > 0
+
+
+def test_metrics_endpoint() -> None:
+    """GET /metrics serves the registry in the Prometheus text format."""
+    manager = RunManager(
+        client_factory=lambda: MockAnthropicClient(chunk_count=5, chunk_delay=0.0, first_token_delay=0.0)
+    )
+    server = PlanServer(("127.0.0.1", 0), manager)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            body = response.read().decode("utf-8")
+        assert "# TYPE bpg_runs_total counter" in body
+        assert "# TYPE bpg_agent_ttft_seconds histogram" in body
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    for test in (
+        test_registry_render_and_merge,
+        test_run_updates_metrics,
+        test_metrics_endpoint,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,123 @@
+"""Test script for parallel chapter PDF rendering (merge logic, no WeasyPrint needed)."""
+
+import os
+import re
+import sys
+import threading
+from io import BytesIO
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pypdf import PdfReader, PdfWriter
+
+from exporters import pdf_chapters
+from exporters.pdf_chapters import ChapterRenderer, thread_cached
+from exporters.pdf_exporter import PDFExporter
+
+
+PLAN = """# 事業計画書
+
+概要です。
+
+## 目次
+
+- 1. 市場
+- 2. 財務
+
+## 1. 市場
+
+段落1
+
+段落2
+
+## 2. 財務
+
+段落1
+
+段落2
+
+段落3"""
+
+
+def _fake_render_part(html_document: str, footer: bool = False) -> tuple[bytes, int]:
+    """One page per paragraph (at least one), bookmarked by its heading."""
+    if footer:
+        pages = html_document.count("<div></div>")
+    else:
+        pages = max(html_document.count("<p>"), 1)
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(595, 842)
+    heading = re.search(r"<h2[^>]*>(.*?)</h2>", html_document)
+    if heading and not footer:
+        writer.add_outline_item(heading.group(1), 0)
+    buffer = BytesIO()
+    writer.write(buffer)
+    _fake_render_part.documents.append(html_document)
+    return buffer.getvalue(), pages
+
+
+def test_chapters_merge_with_continuous_pages_and_toc() -> None:
+    """Chapters merge in order behind a table of contents with their first pages."""
+    _fake_render_part.documents = []
+    original = pdf_chapters._render_part
+    pdf_chapters._render_part = _fake_render_part
+    renderer = ChapterRenderer(max_workers=2, processes=False)
+    try:
+        exporter = PDFExporter(chapter_renderer=renderer)
+        exporter._weasyprint_available = True
+        pdf = exporter.to_bytes({"business_plan": PLAN})
+    finally:
+        pdf_chapters._render_part = original
+        renderer.shutdown()
+
+    assert exporter.get_export_format() == "PDF"
+    reader = PdfReader(BytesIO(pdf))
+    # Title page, table of contents, 2 + 3 chapter pages
+    assert len(reader.pages) == 7
+    assert [(item.title, reader.get_destination_page_number(item)) for item in reader.outline] == [
+        ("目次", 1), ("1. 市場", 2), ("2. 財務", 4),
+    ]
+
+    # The plan's own 目次 is replaced; the generated one lists 1-based first pages
+    toc = next(document for document in _fake_render_part.documents if 'class="toc"' in document)
+    assert re.findall(r"<td>(.*?)</td><td class=\"toc-page\">(\d+)</td>", toc) == [
+        ("1. 市場", "3"), ("2. 財務", "5"),
+    ]
+    assert not any("<li>" in document for document in _fake_render_part.documents)
+
+
+def test_render_context_is_cached_per_thread() -> None:
+    """Each thread builds its (font configuration) context once and keeps it."""
+    built = []
+
+    @thread_cached
+    def context():
+        built.append(threading.current_thread().name)
+        return object()
+
+    main = context()
+    assert context() is main
+    others = []
+    threads = [threading.Thread(target=lambda: others.append((context(), context()))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(first is second for first, second in others)
+    assert len({id(main), *(id(first) for first, _ in others)}) == 3 and len(built) == 3
+
+
+if __name__ == "__main__":
+    for test in (
+        test_chapters_merge_with_continuous_pages_and_toc,
+        test_render_context_is_cached_per_thread,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,92 @@
+"""Test script for opt-in profiling of runs and exports (mock client, no API calls)."""
+
+import sys
+import os
+import pstats
+import tempfile
+import tracemalloc
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.mock_client import MockAnthropicClient
+from exporters.excel_exporter import ExcelExporter
+from orchestrator.estimator import CostEstimator, OutputHistory
+from orchestrator.profiling import PROFILE_DIR_ENV
+from orchestrator.runner import AgentOrchestrator
+
+
+CONTEXT = {
+    "company_name": "MediFlow",
+    "business_description": "医療機関向けワークフロー自動化SaaSプラットフォーム",
+    "plan_years": 5,
+}
+
+
+def test_run_and_export_profiles() -> None:
+    """Profiles of the run (all threads) and its export land under the run ID."""
+    with tempfile.TemporaryDirectory() as profile_dir:
+        # The context (client input) cannot turn profiling on
+        AgentOrchestrator(
+            context={**CONTEXT, "profile_dir": profile_dir},
+            client=MockAnthropicClient(chunk_count=5, chunk_delay=0.0, first_token_delay=0.0),
+            estimator=CostEstimator(history=OutputHistory()),
+        ).run_all()
+        assert os.listdir(profile_dir) == []
+
+        os.environ[PROFILE_DIR_ENV] = profile_dir
+        try:
+            orchestrator = AgentOrchestrator(
+                context=CONTEXT,
+                client=MockAnthropicClient(chunk_count=20, chunk_delay=0.0, first_token_delay=0.0),
+                estimator=CostEstimator(history=OutputHistory()),
+            )
+            result = orchestrator.run_all()
+            ExcelExporter(tracer=orchestrator.tracer).export(
+                result, os.path.join(profile_dir, "plan.xlsx")
+            )
+        finally:
+            del os.environ[PROFILE_DIR_ENV]
+
+        run_dir = os.path.join(profile_dir, orchestrator.tracer.trace_id)
+        assert sorted(os.listdir(run_dir)) == [
+            "excel_export.allocations.txt",
+            "excel_export.pstats",
+            "excel_export.txt",
+            "run_all.allocations.txt",
+            "run_all.pstats",
+            "run_all.txt",
+        ]
+
+        # Phase 1 worker threads are merged into the run's statistics
+        functions = {name for _, _, name in pstats.Stats(os.path.join(run_dir, "run_all.pstats")).stats}
+        assert "get_user_prompt" in functions and "run_phase1" in functions
+        with open(os.path.join(run_dir, "run_all.allocations.txt"), encoding="utf-8") as f:
+            assert f.readline().startswith("peak traced memory:")
+
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiling_is_off_by_default() -> None:
+    """Without a profile directory nothing is traced or written."""
+    orchestrator = AgentOrchestrator(
+        context=CONTEXT,
+        client=MockAnthropicClient(chunk_count=5, chunk_delay=0.0, first_token_delay=0.0),
+        estimator=CostEstimator(history=OutputHistory()),
+    )
+    orchestrator.run_all()
+    assert orchestrator._profile is None
+    assert not tracemalloc.is_tracing()
+
+
+if __name__ == "__main__":
+    for test in (
+        test_run_and_export_profiles,
+        test_profiling_is_off_by_default,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,97 @@
+"""Test script for per-agent model routing (mock client, no API calls)."""
+
+import sys
+import os
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.mock_client import MockAnthropicClient
+from orchestrator.estimator import HAIKU_MODEL, OPUS_MODEL, SONNET_MODEL, CostEstimator, OutputHistory
+from orchestrator.routing import resolve_model, routing_policy
+from orchestrator.runner import AgentOrchestrator
+
+
+CONTEXT = {
+    "company_name": "MediFlow",
+    "business_description": "医療機関向けワークフロー自動化SaaSプラットフォーム",
+    "plan_years": 5,
+    "template": {"key": "saas"},
+}
+
+
+def _orchestrator(model: str = SONNET_MODEL, context: dict = CONTEXT) -> AgentOrchestrator:
+    return AgentOrchestrator(
+        context=context,
+        model=model,
+        client=MockAnthropicClient(chunk_count=20, chunk_delay=0.0, first_token_delay=0.0),
+        estimator=CostEstimator(history=OutputHistory()),
+    )
+
+
+def test_policy_resolution() -> None:
+    """Template policies apply unless the context overrides them."""
+    assert routing_policy(CONTEXT) == {"market": "fast", "gtm": "fast"}
+    assert routing_policy({**CONTEXT, "model_routing": {}}) == {}
+    assert routing_policy({"template": {}}) == {}
+
+    assert resolve_model("fast", OPUS_MODEL) == SONNET_MODEL
+    assert resolve_model("fast", SONNET_MODEL) == HAIKU_MODEL
+    assert resolve_model("fast", HAIKU_MODEL) == HAIKU_MODEL
+    assert resolve_model(None, SONNET_MODEL) == SONNET_MODEL
+    assert resolve_model("custom-model", SONNET_MODEL) == "custom-model"
+
+
+def test_routing_follows_model_changes() -> None:
+    """Routed agents stay one tier below the selected model after a downgrade."""
+    orchestrator = _orchestrator(model=OPUS_MODEL)
+    models = {key: agent.model for key, agent in orchestrator.agents.items()}
+    assert models == {
+        "market": SONNET_MODEL,
+        "product": OPUS_MODEL,
+        "finance": OPUS_MODEL,
+        "gtm": SONNET_MODEL,
+        "integration": OPUS_MODEL,
+    }
+
+    orchestrator.set_model(SONNET_MODEL)
+    assert orchestrator.agents["market"].model == HAIKU_MODEL
+    assert orchestrator.agents["finance"].model == SONNET_MODEL
+
+    # The estimate prices each agent at its routed model
+    estimate = orchestrator.preflight()
+    assert estimate.model == SONNET_MODEL
+    assert estimate.agents["gtm"].model == HAIKU_MODEL
+    assert estimate.agents["integration"].model == SONNET_MODEL
+
+
+def test_run_reports_routing_trade_off() -> None:
+    """The result compares routed agents with running them on the selected model."""
+    result = _orchestrator().run_all()
+    routing = result["routing"]
+
+    assert routing["selected_model"] == SONNET_MODEL
+    assert routing["agents"]["market"]["model"] == HAIKU_MODEL
+    market = routing["agents"]["market"]
+    assert market["selected_cost_usd"] > market["cost_usd"]
+    finance = routing["agents"]["finance"]
+    assert finance["selected_cost_usd"] == finance["cost_usd"]
+    assert routing["savings_usd"] > 0
+
+    unrouted = _orchestrator(context={**CONTEXT, "model_routing": {}}).run_all()["routing"]
+    assert unrouted["savings_usd"] == 0
+    assert unrouted["seconds_saved"] == 0
+
+
+if __name__ == "__main__":
+    for test in (
+        test_policy_resolution,
+        test_routing_follows_model_changes,
+        test_run_reports_routing_trade_off,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,243 @@
+"""Test script for the HTTP/SSE service (mock backend, no API calls)."""
+
+import json
+import sys
+import os
+import socket
+import threading
+import urllib.error
+import urllib.request
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.mock_client import MockAnthropicClient
+from orchestrator.events import EventBroadcaster, RunEvent
+from server.runs import RunManager, validate_context
+from server.service import PlanServer
+
+
+PLAN_REQUEST = {
+    "company_name": "MediFlow",
+    "business_description": "医療機関向けワークフロー自動化SaaSプラットフォーム",
+}
+
+
+def _start_server(
+    max_runs: int = 2, first_token_delay: float = 0.0, max_queued: int = 16
+) -> tuple[PlanServer, str]:
+    """Start a PlanServer on a free port with a fast mock backend."""
+    manager = RunManager(
+        max_concurrent_runs=max_runs,
+        max_queued_runs=max_queued,
+        client_factory=lambda: MockAnthropicClient(
+            chunk_count=20, chunk_delay=0.0, first_token_delay=first_token_delay
+        ),
+    )
+    server = PlanServer(("127.0.0.1", 0), manager)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def _request(
+    url: str, payload: dict | None = None, tenant: str | None = None
+) -> tuple[int, bytes, dict]:
+    """Send a GET (or POST with JSON payload) request."""
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    headers = {"Content-Type": "application/json"}
+    if tenant:
+        headers["X-Tenant-ID"] = tenant
+    request = urllib.request.Request(url, data=data, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read(), dict(response.headers)
+    except urllib.error.HTTPError as e:
+        return e.code, e.read(), dict(e.headers)
+
+
+def _read_sse(url: str, last_event_id: int = 0) -> list[dict]:
+    """Read a complete SSE stream and return the decoded events."""
+    request = urllib.request.Request(url, headers={"Last-Event-ID": str(last_event_id)})
+    received = []
+    with urllib.request.urlopen(request) as response:
+        assert response.headers["Content-Type"].startswith("text/event-stream")
+        for line in response:
+            if line.startswith(b"data: "):
+                received.append(json.loads(line[len(b"data: "):]))
+    return received
+
+
+def test_run_lifecycle_over_http() -> None:
+    """A run can be started, watched by several clients, read and exported."""
+    server, base_url = _start_server()
+    try:
+        status, body, _ = _request(f"{base_url}/runs", PLAN_REQUEST)
+        assert status == 202 and "modes" not in json.loads(body)
+        run_id = json.loads(body)["run_id"]
+
+        # Both modes are estimated only on request (the identical run is shared)
+        status, body, _ = _request(f"{base_url}/runs?compare=modes", PLAN_REQUEST)
+        assert status == 202 and set(json.loads(body)["modes"]) == {"full", "express"}
+
+        watchers = [[] for _ in range(3)]
+        threads = [
+            threading.Thread(target=lambda out=out: out.extend(_read_sse(f"{base_url}/runs/{run_id}/events")))
+            for out in watchers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+
+        # Every watcher sees the same sequence from the single producer
+        assert watchers[0][-1]["type"] == "run_completed"
+        assert [event["seq"] for event in watchers[0]] == [event["seq"] for event in watchers[1]]
+
+        # Reconnecting clients resume after Last-Event-ID
+        resumed = _read_sse(f"{base_url}/runs/{run_id}/events", last_event_id=3)
+        assert resumed[0]["seq"] == 4
+
+        status, body, _ = _request(f"{base_url}/runs/{run_id}")
+        run = json.loads(body)
+        assert status == 200 and run["status"] == "done"
+        assert "モック出力" in run["result"]["business_plan"]
+
+        status, body, headers = _request(f"{base_url}/runs/{run_id}/export/md")
+        assert status == 200 and "モック出力" in body.decode("utf-8")
+
+        status, body, headers = _request(f"{base_url}/runs/{run_id}/export/xlsx")
+        assert status == 200 and body[:2] == b"PK"
+
+        status, _, _ = _request(f"{base_url}/runs/{run_id}/export/docx")
+        assert status == 400
+    finally:
+        server.drain_and_shutdown(timeout=10)
+        server.server_close()
+
+
+def test_validation_and_capacity() -> None:
+    """Invalid contexts get 400, runs beyond the cap queue, then get 503/429."""
+    server, base_url = _start_server(max_runs=1, first_token_delay=0.5, max_queued=1)
+    try:
+        status, _, _ = _request(f"{base_url}/runs", {"company_name": "x"})
+        assert status == 400
+
+        status, body, _ = _request(f"{base_url}/runs", PLAN_REQUEST, tenant="a")
+        assert status == 202 and json.loads(body)["status"] == "running"
+
+        # Beyond the cap, runs wait in the queue with an ETA...
+        status, body, _ = _request(f"{base_url}/runs", {**PLAN_REQUEST, "company_name": "Other"}, tenant="b")
+        queued = json.loads(body)
+        assert status == 202 and queued["status"] == "queued"
+        assert queued["queue_position"] == 1 and queued["eta_seconds"] > 0
+
+        # ...and beyond the queue they are refused with Retry-After
+        status, body, headers = _request(f"{base_url}/runs", {**PLAN_REQUEST, "company_name": "Third"}, tenant="c")
+        assert status == 503
+        assert int(headers["Retry-After"]) >= 1
+        assert "秒後に再試行" in json.loads(body)["error"]
+
+        # Identical submissions attach to the in-flight run despite the cap
+        status, body, _ = _request(f"{base_url}/runs", PLAN_REQUEST)
+        assert status == 202 and json.loads(body)["coalesced"] is True
+
+        status, _, _ = _request(f"{base_url}/runs/unknown")
+        assert status == 404
+    finally:
+        assert server.drain_and_shutdown(timeout=30)
+        server.server_close()
+
+    # All runs finished while draining
+    assert server.manager.active_count == 0
+
+
+def _raw_post(base_url: str, path: str, content_length: str, body: bytes) -> bytes:
+    """Send a raw POST on one connection and read until the server closes it."""
+    host, port = base_url.removeprefix("http://").split(":")
+    with socket.create_connection((host, int(port)), timeout=5) as connection:
+        connection.sendall(
+            f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {content_length}\r\n\r\n".encode()
+            + body
+        )
+        received = b""
+        while chunk := connection.recv(65536):
+            received += chunk
+    return received
+
+
+def test_unread_bodies_close_the_connection() -> None:
+    """Bad Content-Length values are refused up front; unread bodies never become requests."""
+    server, base_url = _start_server()
+    smuggled = b"GET /healthz HTTP/1.1\r\nHost: x\r\n\r\n"
+    try:
+        for path, content_length, status in (
+            ("/runs", "-1", b"400"),
+            ("/runs", "abc", b"400"),
+            ("/runs", str(10_000_000), b"413"),
+            ("/unknown", str(len(smuggled)), b"404"),
+        ):
+            received = _raw_post(base_url, path, content_length, smuggled)
+            assert received.startswith(b"HTTP/1.1 " + status), received[:40]
+            assert received.count(b"HTTP/1.1 ") == 1 and b"Connection: close" in received
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_validate_context_allows_listed_fields_only() -> None:
+    """Server settings and out-of-range values are refused; templates come from the catalog."""
+    for extra in (
+        {"trace_dir": "/tmp/x"},
+        {"profile_dir": "/tmp/x"},
+        {"model_routing": {}},
+        {"express_model": "claude-opus-4-1-20250805"},
+        {"progress_interval": 0},
+        {"max_tokens": 10**9},
+        {"max_tokens": {"market": 0}},
+        {"max_tokens": {"unknown": 1000}},
+        {"model": "some-other-model"},
+        {"plan_years": "5"},
+        {"budget_usd": True},
+        {"template": {"key": "saas", "hints": {"market": "..."}}},
+    ):
+        try:
+            validate_context({**PLAN_REQUEST, **extra})
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {extra}")
+
+    context = validate_context({
+        **PLAN_REQUEST,
+        "template": {"key": "saas", "fields": {"target_market": "中小企業"}},
+        "max_tokens": {"finance": 6000},
+        "downgrade_on_budget": True,
+    })
+    assert context["template"]["name"] == "SaaS事業" and context["template"]["hints"]
+    assert context["max_tokens"] == {"finance": 6000} and context["mode"] == "full"
+
+
+def test_broadcaster_replays_history() -> None:
+    """Late subscribers replay earlier events and see the close."""
+    broadcaster = EventBroadcaster()
+    broadcaster.publish(RunEvent(seq=1, type="agent_started", agent="market"))
+    broadcaster.publish(RunEvent(seq=2, type="chunk", agent="market"))
+    broadcaster.close()
+
+    assert [event.seq for event in broadcaster.subscribe()] == [1, 2]
+    assert [event.seq for event in broadcaster.subscribe(after_seq=1)] == [2]
+
+
+if __name__ == "__main__":
+    for test in (
+        test_run_lifecycle_over_http,
+        test_validation_and_capacity,
+        test_unread_bodies_close_the_connection,
+        test_validate_context_allows_listed_fields_only,
+        test_broadcaster_replays_history,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,42 @@
+"""Test script for lazy imports of heavy dependencies (no API calls)."""
+
+import os
+import sys
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_startup import STARTUP_BUDGETS_MS, measure
+from exporters import pdf_exporter
+from exporters.scheduler import exporter_class
+from exporters.pdf_exporter import PDFExporter
+
+
+def test_entry_points_defer_heavy_imports() -> None:
+    """Importing the app and service loads none of the first-use libraries."""
+    for target in STARTUP_BUDGETS_MS:
+        profile = measure(target)
+        assert profile.milliseconds > 0, target
+        assert profile.lazy_loaded == [], (target, profile.lazy_loaded)
+
+
+def test_weasyprint_probe_runs_once() -> None:
+    """Exporters share one capability probe per process."""
+    pdf_exporter.weasyprint_available.cache_clear()
+    exporters = [exporter_class("pdf")() for _ in range(3)]
+    assert exporter_class("pdf") is PDFExporter
+    assert pdf_exporter.weasyprint_available.cache_info().misses == 1
+    assert len({exporter.get_export_format() for exporter in exporters}) == 1
+
+
+if __name__ == "__main__":
+    for test in (
+        test_entry_points_defer_heavy_imports,
+        test_weasyprint_probe_runs_once,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
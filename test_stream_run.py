@@ -0,0 +1,312 @@
+"""Test script for AgentOrchestrator.stream_run() (no API calls)."""
+
+import asyncio
+import sys
+import os
+import threading
+import time
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tenacity import wait_none
+
+from agents.backends import FakeBackend, StreamEvent
+from agents.base import BaseAgent
+from orchestrator.runner import AgentOrchestrator
+from orchestrator.events import EventQueue
+from orchestrator import events
+from exporters import markdown_blocks
+
+
+# Test context
+test_context = {
+    "company_name": "MediFlow",
+    "business_description": "医療機関向けワークフロー自動化SaaSプラットフォーム",
+    "plan_years": 5,
+    "template": {},
+    "additional_context": "",
+}
+
+
+def _fake_run(agent, chunks: list[str], fail: bool = False):
+    """Build a run_sync replacement that streams fixed chunks."""
+    def run_sync(context, on_progress=None):
+        agent.status = "streaming"
+        for idx, chunk in enumerate(chunks, 1):
+            agent.output += chunk
+            if on_progress:
+                on_progress(agent.name, idx / (len(chunks) + 1), chunk)
+        if fail:
+            agent.status = "error"
+            agent.error_message = "boom"
+            raise RuntimeError("boom")
+        agent.token_usage = {"input": 10, "output": len(chunks)}
+        agent.status = "done"
+        return "".join(chunks)
+    return run_sync
+
+
+def _make_orchestrator(fail_key: str | None = None) -> AgentOrchestrator:
+    """Create an orchestrator whose agents stream canned output."""
+    orchestrator = AgentOrchestrator(context=test_context)
+    agents = {
+        "market": orchestrator.market_researcher,
+        "product": orchestrator.product_strategist,
+        "finance": orchestrator.financial_modeler,
+        "gtm": orchestrator.gtm_strategist,
+        "integration": orchestrator.integration_editor,
+    }
+    for key, agent in agents.items():
+        agent.run_sync = _fake_run(agent, [f"# {key}\n", "本文"], fail=(key == fail_key))
+    return orchestrator
+
+
+def test_stream_run_event_order() -> None:
+    """Events are sequence-numbered and end with run_completed."""
+    orchestrator = _make_orchestrator()
+    received = list(orchestrator.stream_run())
+
+    seqs = [event.seq for event in received]
+    assert seqs == list(range(1, len(received) + 1))
+
+    types = [event.type for event in received]
+    assert types[-1] == events.RUN_COMPLETED
+    assert types.count(events.AGENT_STARTED) == 5
+    assert types.count(events.SECTION_COMPLETED) == 5
+    assert types.count(events.USAGE) == 5
+    assert types.count(events.PHASE_COMPLETED) == 2
+
+    # Integration only starts after Phase 1 completed
+    phase1_done = types.index(events.PHASE_COMPLETED)
+    integration_start = next(
+        idx for idx, event in enumerate(received)
+        if event.type == events.AGENT_STARTED and event.agent == "integration"
+    )
+    assert integration_start > phase1_done
+
+    result = received[-1].data["result"]
+    assert result["business_plan"] == "# integration\n本文"
+    assert result["token_usage"] == {"input": 50, "output": 10}
+
+
+def test_stream_run_agent_failure() -> None:
+    """A failing Phase 1 agent yields agent_failed and a placeholder section."""
+    orchestrator = _make_orchestrator(fail_key="finance")
+    received = list(orchestrator.stream_run())
+
+    failed = [event for event in received if event.type == events.AGENT_FAILED]
+    assert [event.agent for event in failed] == ["finance"]
+    assert failed[0].data["error"] == "boom"
+
+    result = received[-1].data["result"]
+    assert "財務計画の生成に失敗しました" in result["sections"]["finance"]
+
+
+class _DroppedStream:
+    """Stream that loses its connection after a few events."""
+
+    def __init__(self, inner) -> None:
+        self._inner = inner
+        self.stop_reason = None
+
+    def __enter__(self):
+        self._inner.__enter__()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return self._inner.__exit__(*exc_info)
+
+    def __iter__(self):
+        for index, event in enumerate(self._inner):
+            if index == 4:
+                raise ConnectionError("connection dropped")
+            yield event
+
+
+class _FlakyBackend(FakeBackend):
+    """FakeBackend whose first stream drops mid-way."""
+
+    def __init__(self) -> None:
+        super().__init__(chunk_count=10, chunk_delay=0.0, first_token_delay=0.0)
+        self.calls = 0
+
+    def stream(self, model, system, user, max_tokens):
+        self.calls += 1
+        stream = super().stream(model, system, user, max_tokens)
+        return _DroppedStream(stream) if self.calls == 1 else stream
+
+
+def test_stream_run_retry_resets_streamed_text() -> None:
+    """A retried agent publishes agent_retried; its later chunks are the full output."""
+    orchestrator = AgentOrchestrator(
+        context=test_context,
+        backend=FakeBackend(chunk_count=10, chunk_delay=0.0, first_token_delay=0.0),
+    )
+    orchestrator.financial_modeler.backend = _FlakyBackend()
+    wait = BaseAgent.run.retry.wait
+    BaseAgent.run.retry.wait = wait_none()
+    try:
+        received = list(orchestrator.stream_run())
+    finally:
+        BaseAgent.run.retry.wait = wait
+
+    finance = [event for event in received if event.agent == "finance"]
+    types = [event.type for event in finance]
+    assert types.count(events.AGENT_RETRIED) == 1
+    assert finance[types.index(events.AGENT_RETRIED)].data["error_type"] == "ConnectionError"
+    retried = types.index(events.AGENT_RETRIED)
+    assert events.CHUNK in types[:retried]
+    chunks_after = "".join(event.data["text"] for event in finance[retried:] if event.type == events.CHUNK)
+    section = next(event for event in finance if event.type == events.SECTION_COMPLETED)
+    assert chunks_after == section.data["content"]
+
+
+class _TableStream(_DroppedStream):
+    """Stream that sends a table with a circled-number cell first."""
+
+    def __iter__(self):
+        for index, event in enumerate(self._inner):
+            yield event
+            if index == 0:
+                yield StreamEvent("text", text="| 手順 | 番号 |\n|---|---|\n| 準備 | ① |\n\n")
+        self.stop_reason = self._inner.stop_reason
+
+    def final_usage(self) -> dict:
+        return self._inner.final_usage()
+
+
+class _TableBackend(FakeBackend):
+    """FakeBackend that streams a table _TableStream adds."""
+
+    def __init__(self) -> None:
+        super().__init__(chunk_count=10, chunk_delay=0.0, first_token_delay=0.0)
+
+    def stream(self, model, system, user, max_tokens):
+        return _TableStream(super().stream(model, system, user, max_tokens))
+
+
+def test_stream_run_survives_parser_errors() -> None:
+    """A cell the progressive parser fails on stays text; generation goes on."""
+    orchestrator = AgentOrchestrator(context=test_context, backend=_TableBackend())
+    parse_cell = markdown_blocks.parse_cell
+
+    def failing_parse_cell(text):
+        if "①" in text:
+            raise ValueError(f"invalid literal for int() with base 10: {text!r}")
+        return parse_cell(text)
+
+    markdown_blocks.parse_cell = failing_parse_cell
+    try:
+        received = list(orchestrator.stream_run())
+    finally:
+        markdown_blocks.parse_cell = parse_cell
+
+    types = [event.type for event in received]
+    assert types[-1] == events.RUN_COMPLETED
+    assert events.AGENT_FAILED not in types and events.AGENT_RETRIED not in types
+    assert "| 準備 | ① |" in received[-1].data["result"]["sections"]["finance"]
+    document = orchestrator.get_document("finance")
+    assert document.errors == 1
+    assert markdown_blocks.Text("| 準備 | ① |") in document.blocks
+
+
+def test_stream_run_reraises_run_failure() -> None:
+    """A Phase 2 failure ends the stream with run_failed and re-raises."""
+    orchestrator = _make_orchestrator(fail_key="integration")
+    received = []
+    try:
+        for event in orchestrator.stream_run():
+            received.append(event)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("stream_run() should re-raise the run failure")
+    assert received[-1].type == events.RUN_FAILED
+
+
+def test_stream_run_cancels_when_consumer_leaves() -> None:
+    """Closing the stream early cancels the run and detaches its queue."""
+    for cancel_on_close in (True, False):
+        orchestrator = AgentOrchestrator(
+            context=test_context,
+            backend=FakeBackend(chunk_count=20, chunk_delay=0.02, first_token_delay=0.0),
+        )
+        stream = orchestrator.stream_run(cancel_on_close=cancel_on_close)
+        for event in stream:
+            if event.type == events.CHUNK:
+                break
+        stream.close()
+
+        assert orchestrator._events is None
+        assert orchestrator.cancelled is cancel_on_close
+        deadline = time.monotonic() + 30
+        agent = orchestrator.market_researcher
+        while agent.status not in ("done", "cancelled", "error"):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        # Stopped mid-stream, or left to finish for nobody
+        assert agent.status == ("cancelled" if cancel_on_close else "done")
+
+
+def test_astream_run() -> None:
+    """The async iterator yields the same events."""
+    async def collect():
+        orchestrator = _make_orchestrator()
+        return [event async for event in orchestrator.astream_run()]
+
+    received = asyncio.run(collect())
+    assert received[-1].type == events.RUN_COMPLETED
+
+
+def test_event_queue_drops_chunks_when_full() -> None:
+    """Chunk events are dropped instead of blocking when the buffer is full."""
+    event_queue = EventQueue(maxsize=2)
+    assert event_queue.publish(events.CHUNK, "market", text="a") is not None
+    assert event_queue.publish(events.CHUNK, "market", text="b") is not None
+    assert event_queue.publish(events.CHUNK, "market", text="c") is None
+    assert event_queue.dropped_chunks == 1
+
+    # Lifecycle events wait for the consumer instead of being dropped
+    publisher = threading.Thread(
+        target=event_queue.publish, args=(events.SECTION_COMPLETED, "market")
+    )
+    publisher.start()
+    assert event_queue.get().data == {"text": "a"}
+    publisher.join(timeout=1)
+    assert not publisher.is_alive()
+    event_queue.close()
+
+    remaining = list(event_queue)
+    assert [event.seq for event in remaining] == [2, 3]
+    assert remaining[-1].type == events.SECTION_COMPLETED
+
+
+def test_get_preview_cuts_at_line_boundary() -> None:
+    """Previews show the tail of the stream starting at a full line."""
+    orchestrator = AgentOrchestrator(context=test_context)
+    orchestrator.market_researcher.output = "## 見出し\n" + "a" * 20 + "\n| 表 | 値 |\n"
+
+    assert orchestrator.get_preview("market", max_chars=100).startswith("## 見出し")
+    assert orchestrator.get_preview("market", max_chars=15) == "| 表 | 値 |\n"
+    assert orchestrator.get_preview("unknown") == ""
+
+
+if __name__ == "__main__":
+    for test in (
+        test_stream_run_event_order,
+        test_stream_run_agent_failure,
+        test_stream_run_retry_resets_streamed_text,
+        test_stream_run_survives_parser_errors,
+        test_stream_run_reraises_run_failure,
+        test_stream_run_cancels_when_consumer_leaves,
+        test_astream_run,
+        test_event_queue_drops_chunks_when_full,
+        test_get_preview_cuts_at_line_boundary,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
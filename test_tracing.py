@@ -0,0 +1,105 @@
+"""Test script for span tracing of plan runs (mock client, no API calls)."""
+
+import sys
+import os
+import json
+import tempfile
+
+# Set UTF-8 encoding for output
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from agents.mock_client import MockAnthropicClient
+from exporters.excel_exporter import ExcelExporter
+from orchestrator.estimator import CostEstimator, OutputHistory
+from orchestrator.runner import AgentOrchestrator
+
+
+CONTEXT = {
+    "company_name": "MediFlow",
+    "business_description": "医療機関向けワークフロー自動化SaaSプラットフォーム",
+    "plan_years": 5,
+}
+
+
+def _run(context: dict, trace_dir: str | None = None) -> AgentOrchestrator:
+    orchestrator = AgentOrchestrator(
+        context=context,
+        client=MockAnthropicClient(chunk_count=20, chunk_delay=0.0, first_token_delay=0.01),
+        estimator=CostEstimator(history=OutputHistory()),
+        trace_dir=trace_dir,
+    )
+    orchestrator.run_all()
+    return orchestrator
+
+
+def test_run_spans_form_a_tree() -> None:
+    """Phases, agents, queue waits and API requests nest under the run span."""
+    tracer = _run(CONTEXT).tracer
+    by_id = {span.span_id: span for span in tracer.spans}
+    names = [span.name for span in tracer.spans]
+
+    run = next(span for span in tracer.spans if span.name == "run")
+    phase1 = next(span for span in tracer.spans if span.name == "phase1")
+    phase2 = next(span for span in tracer.spans if span.name == "phase2")
+    assert phase1.parent_id == phase2.parent_id == run.span_id
+    assert phase1.end_ns <= phase2.start_ns <= phase2.end_ns <= run.end_ns
+
+    # Phase 1 agents run on worker threads but belong to the phase
+    for key in ("market", "product", "finance", "gtm"):
+        agent = next(span for span in tracer.spans if span.name == f"agent:{key}")
+        assert agent.parent_id == phase1.span_id
+        assert agent.thread_id != phase1.thread_id
+        assert agent.attributes["output_tokens"] > 0
+    assert names.count("queue_wait") == 4
+
+    integration = next(span for span in tracer.spans if span.name == "agent:integration")
+    assert integration.parent_id == phase2.span_id
+
+    requests = [span for span in tracer.spans if span.name == "request"]
+    assert len(requests) == 5 and names.count("first_token") == 5 and names.count("stream") == 5
+    assert all(by_id[span.parent_id].category == "agent" for span in requests)
+    assert all(span.duration_seconds >= 0.01 for span in requests)
+
+
+def test_chrome_trace_and_otlp_export() -> None:
+    """Runs write a Chrome trace to the configured trace_dir; exporters add spans."""
+    with tempfile.TemporaryDirectory() as trace_dir:
+        # The context (client input) cannot choose where traces go
+        _run({**CONTEXT, "trace_dir": os.path.join(trace_dir, "from_context")})
+        assert os.listdir(trace_dir) == []
+
+        orchestrator = _run(CONTEXT, trace_dir=trace_dir)
+        files = os.listdir(trace_dir)
+        assert files == [f"trace-{orchestrator.tracer.trace_id}.json"]
+        with open(os.path.join(trace_dir, files[0]), encoding="utf-8") as f:
+            trace = json.load(f)
+
+        ExcelExporter(tracer=orchestrator.tracer).export(
+            {"business_plan": "# 計画", "sections": {}}, os.path.join(trace_dir, "plan.xlsx")
+        )
+
+    phases = {event["ph"] for event in trace["traceEvents"]}
+    assert phases == {"X", "i", "M"}
+    run = next(event for event in trace["traceEvents"] if event["name"] == "run")
+    assert run["dur"] > 0 and run["args"]["mode"] == "full"
+
+    export = next(span for span in orchestrator.tracer.spans if span.name == "export")
+    assert export.attributes["format"] == "xlsx"
+
+    otlp_spans = orchestrator.tracer.to_otlp()["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(otlp_spans) == len(orchestrator.tracer.spans)
+    assert all(span["traceId"] == orchestrator.tracer.trace_id for span in otlp_spans)
+    assert sum("parentSpanId" not in span for span in otlp_spans) == 2  # run and export
+
+
+if __name__ == "__main__":
+    for test in (
+        test_run_spans_form_a_tree,
+        test_chrome_trace_and_otlp_export,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
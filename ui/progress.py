@@ -53,12 +53,16 @@ def render_progress(orchestrator: AgentOrchestrator) -> None:
             st.progress(progress, text=f"{progress:.0%}")
             
             # Status text
-            if status == "done":
+            if status == "done" and agent_info.get("truncated"):
+                st.warning("💰 予算上限で打ち切り")
+            elif status == "done":
                 st.success("✅ 完了")
             elif status == "error":
                 st.error("❌ エラー")
                 if error_msg:
                     st.caption(error_msg[:50])  # Show first 50 chars
+            elif status == "cancelled":
+                st.warning("⏹️ 中止")
             elif status == "running" or status == "streaming":
                 st.info("⏳ 生成中...")
             else:
@@ -77,13 +81,50 @@ def render_progress(orchestrator: AgentOrchestrator) -> None:
         
         st.progress(progress, text=f"{progress:.0%}")
         
-        if status == "done":
+        if status == "done" and integration_info.get("truncated"):
+            st.warning("💰 予算上限で打ち切り")
+        elif status == "done":
             st.success("✅ 完了")
         elif status == "error":
             st.error("❌ エラー")
+        elif status == "cancelled":
+            st.warning("⏹️ 中止")
         elif status == "running" or status == "streaming":
             st.info("⏳ 統合中...")
         else:
             st.info("⏱️ 待機中")
     
     st.markdown("---")
+
+
+def render_stream_previews(orchestrator: AgentOrchestrator, max_chars: int = 1500) -> None:
+    """Render a live text preview of each agent's stream.
+    
+    Only agents that have started streaming are shown. The caller controls
+    how often this is re-rendered (see app.py), which throttles the cost of
+    re-parsing Markdown while the text grows.
+    
+    Args:
+        orchestrator: AgentOrchestrator instance
+        max_chars: Maximum number of trailing characters shown per agent
+    """
+    progress_data = orchestrator.get_progress()
+    
+    for agent_key in ["market", "product", "finance", "gtm", "integration"]:
+        status = progress_data.get(agent_key, {}).get("status", "waiting")
+        if status == "waiting":
+            continue
+        
+        preview = orchestrator.get_preview(agent_key, max_chars=max_chars)
+        if not preview:
+            continue
+        
+        icon = AGENT_ICONS.get(agent_key, "⚙️")
+        name_ja = AGENT_NAMES_JA.get(agent_key, "エージェント")
+        expanded = status in ("running", "streaming")
+        with st.expander(f"{icon} {name_ja} プレビュー", expanded=expanded):
+            document = orchestrator.get_document(agent_key)
+            if document is not None and document.blocks:
+                section = document.current_section.title or "（冒頭）"
+                st.caption(f"📑 {section} ・ 📊 表 {len(document.tables)}件")
+            st.markdown(preview)
@@ -1,9 +1,50 @@
 """Sidebar UI component for business plan generator."""
 
 import streamlit as st
+from orchestrator.runner import AgentOrchestrator
 from templates.catalog import list_templates, get_template
 
 
+# Generation mode labels and their orchestrator modes
+MODE_OPTIONS = {
+    "標準（5エージェント）": "full",
+    "エクスプレス（高速・低コスト）": "express",
+}
+
+
+# Seconds a mode comparison is reused across reruns (the output history
+# behind the estimates only changes when a run finishes)
+MODE_COMPARISON_TTL = 60
+
+
+@st.cache_data(ttl=MODE_COMPARISON_TTL, max_entries=64, show_spinner=False)
+def estimate_modes(context: dict) -> dict[str, tuple[float, float]]:
+    """Estimate both generation modes of a context, cached across reruns.
+    
+    Args:
+        context: Context dictionary the run would use
+    
+    Returns:
+        (cost in USD, seconds) by mode ("full", "express")
+    """
+    estimates = AgentOrchestrator(context=context, model=context["model"]).compare_modes()
+    return {mode: (estimate.cost_usd, estimate.seconds) for mode, estimate in estimates.items()}
+
+
+def render_mode_comparison(context: dict) -> None:
+    """Show the estimated cost and time of both generation modes.
+    
+    Args:
+        context: Context dictionary the run would use
+    """
+    estimates = estimate_modes(context)
+    (full_cost, full_seconds), (express_cost, express_seconds) = estimates["full"], estimates["express"]
+    st.caption(
+        f"標準: 約${full_cost:.2f}・約{full_seconds:.0f}秒 ／ "
+        f"エクスプレス: 約${express_cost:.2f}・約{express_seconds:.0f}秒"
+    )
+
+
 def render_sidebar() -> dict | None:
     """Render sidebar and collect user input.
     
@@ -107,6 +148,12 @@ def render_sidebar() -> dict | None:
             }
             actual_model = model_map.get(model, "claude-sonnet-4-5-20250929")
             
+            use_routing = st.checkbox(
+                "テンプレート推奨のモデル振り分けを使う（市場分析・GTMなどを高速モデルで生成）",
+                value=True,
+                key="use_routing",
+            )
+            
             st.markdown("#### トークン設定")
             st.info("各エージェントの max_tokens（デフォルト値を推奨）")
             
@@ -145,6 +192,21 @@ def render_sidebar() -> dict | None:
                 step=500,
                 key="integration_tokens",
             )
+            
+            st.markdown("#### 予算設定")
+            budget_usd = st.number_input(
+                "1回あたりの予算上限（USD、0で無制限）",
+                value=0.0,
+                min_value=0.0,
+                step=0.1,
+                format="%.2f",
+                key="budget_usd",
+            )
+            downgrade_on_budget = st.checkbox(
+                "予算を超える場合は低コストのモデルに切り替える",
+                value=True,
+                key="downgrade_on_budget",
+            )
         
         st.markdown("---")
         
@@ -159,46 +221,67 @@ def render_sidebar() -> dict | None:
         
         st.markdown("---")
         
+        # Collect template-specific fields
+        template_fields = {}
+        if template and template.get("context_fields"):
+            for field in template["context_fields"]:
+                field_key = f"{selected_template_key}_{field['key']}"
+                template_fields[field["key"]] = st.session_state.get(field_key, "")
+        
+        # Generation mode
+        st.markdown("### ⚡ 生成モード")
+        mode_label = st.radio(
+            "生成モード",
+            options=list(MODE_OPTIONS),
+            index=0,
+            key="mode",
+            label_visibility="collapsed",
+        )
+        
+        # Build context dictionary
+        context = {
+            "company_name": (company_name or "").strip(),
+            "business_description": (business_description or "").strip(),
+            "plan_years": plan_years,
+            "template": {
+                "key": selected_template_key,
+                "name": selected_template_name,
+                "fields": template_fields,
+                "hints": template.get("agent_hints", {}) if template else {},
+            },
+            "additional_context": (additional_context or "").strip(),
+            "model": actual_model,
+            "max_tokens": {
+                "market": market_tokens,
+                "product": product_tokens,
+                "finance": finance_tokens,
+                "gtm": gtm_tokens,
+                "integration": integration_tokens,
+            },
+            "budget_usd": budget_usd or None,
+            "downgrade_on_budget": downgrade_on_budget,
+            "mode": MODE_OPTIONS[mode_label],
+        }
+        if not use_routing:
+            # Every agent on the selected model
+            context["model_routing"] = {}
+        
+        if context["company_name"] and context["business_description"]:
+            render_mode_comparison(context)
+        
+        st.markdown("---")
+        
         # Generate button
         if st.button("🚀 事業計画を生成", type="primary", use_container_width=True):
             # Validation
-            if not company_name or not company_name.strip():
+            if not context["company_name"]:
                 st.warning("⚠️ 企業名を入力してください")
                 return None
             
-            if not business_description or not business_description.strip():
+            if not context["business_description"]:
                 st.warning("⚠️ 事業内容を入力してください")
                 return None
             
-            # Collect template-specific fields
-            template_fields = {}
-            if template and template.get("context_fields"):
-                for field in template["context_fields"]:
-                    field_key = f"{selected_template_key}_{field['key']}"
-                    template_fields[field["key"]] = st.session_state.get(field_key, "")
-            
-            # Build context dictionary
-            context = {
-                "company_name": company_name.strip(),
-                "business_description": business_description.strip(),
-                "plan_years": plan_years,
-                "template": {
-                    "key": selected_template_key,
-                    "name": selected_template_name,
-                    "fields": template_fields,
-                    "hints": template.get("agent_hints", {}) if template else {},
-                },
-                "additional_context": additional_context.strip(),
-                "model": actual_model,
-                "max_tokens": {
-                    "market": market_tokens,
-                    "product": product_tokens,
-                    "finance": finance_tokens,
-                    "gtm": gtm_tokens,
-                    "integration": integration_tokens,
-                },
-            }
-            
             return context
     
     return None